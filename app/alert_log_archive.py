@@ -0,0 +1,299 @@
+"""
+alert_logs retention: monthly partitions, gzip JSONL archives, archive reader.
+
+On Postgres alert_logs is range-partitioned by received_month (UTC month,
+migration 005). The scheduler keeps the next few monthly partitions created
+and, once a month falls out of ALERT_LOG_RETENTION_MONTHS, exports it to
+<archive dir>/alert_logs_YYYY-MM.jsonl.gz and drops the partition. On an
+unpartitioned table (SQLite, or before the migration) the month is exported
+the same way and deleted by received_month instead.
+
+Months are never archived while an OPEN position was entered in them or
+later: missed-SELL detection looks for skipped SELL alerts since entry.
+
+A month can be archived more than once: late rows land in the DEFAULT
+partition, or an old received_at is backfilled. The new rows are merged into
+the existing file, never written over it.
+"""
+
+import gzip
+import os
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Iterator, Optional
+
+from sqlalchemy import delete, func, select, text
+import structlog
+
+from app.codec import dumps, loads
+from app.config import settings
+from app.database.connection import get_session
+from app.models.alert_log import AlertLog, alert_log_month
+from app.models.position import Position, POSITION_IS_OPEN
+
+logger = structlog.get_logger()
+
+ARCHIVE_PREFIX = "alert_logs_"
+ARCHIVE_SUFFIX = ".jsonl.gz"
+_EXPORT_BATCH = 1000
+
+
+def add_months(month: date, count: int) -> date:
+    index = month.year * 12 + (month.month - 1) + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"alert_logs_p{month:%Y%m}"
+
+
+def archive_dir() -> Path:
+    return Path(settings.alert_log_archive_dir)
+
+
+def archive_path(month: date, directory: Optional[Path] = None) -> Path:
+    return (directory or archive_dir()) / f"{ARCHIVE_PREFIX}{month:%Y-%m}{ARCHIVE_SUFFIX}"
+
+
+def archived_months(directory: Optional[Path] = None) -> list[date]:
+    directory = directory or archive_dir()
+    if not directory.is_dir():
+        return []
+    months = []
+    for path in directory.glob(f"{ARCHIVE_PREFIX}*{ARCHIVE_SUFFIX}"):
+        label = path.name[len(ARCHIVE_PREFIX):-len(ARCHIVE_SUFFIX)]
+        try:
+            months.append(datetime.strptime(label, "%Y-%m").date())
+        except ValueError:
+            continue
+    return sorted(months)
+
+
+def _record_key(record: dict) -> tuple:
+    return record.get("id"), record.get("received_at")
+
+
+def _copy_archive(path: Path, fh) -> set[tuple]:
+    """Copy an existing month archive into `fh`; returns the keys it held."""
+    keys = set()
+    if not path.exists():
+        return keys
+    with gzip.open(path, "rb") as existing:
+        for line in existing:
+            if not line.strip():
+                continue
+            keys.add(_record_key(loads(line)))
+            fh.write(line if line.endswith(b"\n") else line + b"\n")
+    return keys
+
+
+def _archive_record(row: AlertLog) -> dict:
+    record = {}
+    for column in AlertLog.__table__.columns:
+        value = getattr(row, column.key)
+        if isinstance(value, (datetime, date)):
+            value = value.isoformat()
+        record[column.key] = value
+    return record
+
+
+async def _is_partitioned(session) -> bool:
+    if session.get_bind().dialect.name != "postgresql":
+        return False
+    result = await session.execute(
+        text(
+            "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+            "WHERE c.relname = 'alert_logs' AND c.relnamespace = 'public'::regnamespace"
+        )
+    )
+    return result.scalar() is not None
+
+
+async def _partition_months(session) -> dict[date, str]:
+    """Monthly partitions attached to alert_logs (excluding the default one)."""
+    result = await session.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = 'alert_logs'"
+        )
+    )
+    months = {}
+    for (name,) in result.all():
+        try:
+            months[datetime.strptime(name, "alert_logs_p%Y%m").date()] = name
+        except ValueError:
+            continue
+    return months
+
+
+async def ensure_alert_log_partitions(
+    session,
+    now: Optional[datetime] = None,
+    months_ahead: Optional[int] = None,
+) -> list[str]:
+    """Create the current and next monthly partitions if missing."""
+    if not await _is_partitioned(session):
+        return []
+    ahead = settings.alert_log_partition_months_ahead if months_ahead is None else months_ahead
+    current = alert_log_month(now)
+    existing = await _partition_months(session)
+    created = []
+    for offset in range(max(0, int(ahead)) + 1):
+        month = add_months(current, offset)
+        if month in existing:
+            continue
+        name = partition_name(month)
+        await session.execute(
+            text(
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF alert_logs "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+            )
+        )
+        created.append(name)
+    return created
+
+
+async def archive_alert_log_month(session, month: date, partitioned: Optional[bool] = None) -> dict:
+    """
+    Export one UTC month of alert logs to gzip JSONL, then drop it from the DB.
+    The file is complete and fsynced before anything is deleted; re-running
+    after a crash re-exports from the rows that are still there. Rows already
+    in an existing archive for the month (same id and received_at) are not
+    written twice.
+    """
+    if partitioned is None:
+        partitioned = await _is_partitioned(session)
+    path = archive_path(month)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    rows = 0
+    result = await session.stream_scalars(
+        select(AlertLog)
+        .where(AlertLog.received_month == month)
+        .order_by(AlertLog.id)
+        .execution_options(yield_per=_EXPORT_BATCH)
+    )
+    with open(tmp_path, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb") as fh:
+        archived = _copy_archive(path, fh)
+        async for row in result:
+            record = _archive_record(row)
+            if _record_key(record) in archived:
+                continue
+            fh.write(dumps(record).encode("utf-8") + b"\n")
+            rows += 1
+            if rows % _EXPORT_BATCH == 0:
+                session.expunge_all()
+        fh.close()
+        raw.flush()
+        os.fsync(raw.fileno())
+    if rows:
+        os.replace(tmp_path, path)
+    else:
+        tmp_path.unlink()
+
+    if partitioned and month in await _partition_months(session):
+        name = partition_name(month)
+        await session.execute(text(f"ALTER TABLE alert_logs DETACH PARTITION {name}"))
+        await session.execute(text(f"DROP TABLE {name}"))
+    else:
+        await session.execute(delete(AlertLog).where(AlertLog.received_month == month))
+    session.expunge_all()
+
+    logger.info(
+        "Alert log month archived",
+        month=month.isoformat(),
+        rows=rows,
+        merged=len(archived),
+        path=str(path),
+    )
+    return {"month": month.isoformat(), "rows": rows, "path": str(path) if rows else None}
+
+
+async def _retention_cutoff(session, now: Optional[datetime]) -> Optional[date]:
+    months = int(settings.alert_log_retention_months or 0)
+    if months <= 0:
+        return None
+    cutoff = add_months(alert_log_month(now), -months)
+    earliest_open_entry = (
+        await session.execute(select(func.min(Position.entry_time)).where(POSITION_IS_OPEN))
+    ).scalar()
+    if earliest_open_entry is not None:
+        cutoff = min(cutoff, alert_log_month(earliest_open_entry))
+    return cutoff
+
+
+async def run_alert_log_retention(now: Optional[datetime] = None) -> dict:
+    """Scheduler entry point: pre-create partitions and archive expired months."""
+    report = {"created_partitions": [], "archived": [], "cutoff": None}
+    async with get_session() as session:
+        partitioned = await _is_partitioned(session)
+        report["created_partitions"] = await ensure_alert_log_partitions(session, now=now)
+        cutoff = await _retention_cutoff(session, now)
+        if cutoff is None:
+            return report
+        report["cutoff"] = cutoff.isoformat()
+
+        months = set(
+            (
+                await session.execute(
+                    select(AlertLog.received_month).where(AlertLog.received_month < cutoff).distinct()
+                )
+            ).scalars()
+        )
+        if partitioned:
+            months.update(month for month in await _partition_months(session) if month < cutoff)
+
+    # One transaction per month: a failure leaves earlier months archived.
+    for month in sorted(months):
+        async with get_session() as session:
+            report["archived"].append(await archive_alert_log_month(session, month, partitioned=partitioned))
+    return report
+
+
+def _parse_time(value) -> Optional[datetime]:
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def iter_archived_alert_logs(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    *,
+    ticker: Optional[str] = None,
+    action: Optional[str] = None,
+    idempotency_key: Optional[str] = None,
+    alert_id: Optional[str] = None,
+    directory: Optional[Path] = None,
+) -> Iterator[dict]:
+    """
+    Archived alert logs with received_at in [start, end), oldest month first.
+    Only the month files overlapping the window are opened.
+    """
+    first_month = alert_log_month(start) if start else None
+    last_month = alert_log_month(end) if end else None
+    for month in archived_months(directory):
+        if first_month and month < first_month:
+            continue
+        if last_month and month > last_month:
+            continue
+        with gzip.open(archive_path(month, directory), "rt", encoding="utf-8") as fh:
+            for line in fh:
+                record = loads(line)
+                received_at = _parse_time(record.get("received_at"))
+                if start and (received_at is None or received_at < start):
+                    continue
+                if end and (received_at is None or received_at >= end):
+                    continue
+                if ticker and record.get("ticker") != ticker:
+                    continue
+                if action and record.get("action") != action:
+                    continue
+                if idempotency_key and record.get("idempotency_key") != idempotency_key:
+                    continue
+                if alert_id and record.get("alert_id") != alert_id:
+                    continue
+                yield record
@@ -0,0 +1,217 @@
+"""
+Learned order-confirmation latency and the adaptive poll schedule built on it.
+
+Each confirmed fill records how long after submit it happened, in a
+per-exchange histogram persisted to a small JSON file (same pattern as the
+KIS token cache). Execution notices give that time directly; a fill found by
+polling is recorded at the midpoint between the last poll that missed it and
+the poll that saw it, so the histogram does not just learn its own schedule.
+Writes are batched and run off the event loop. Poll offsets are then placed
+at the histogram quantiles so most orders are confirmed by the first or
+second poll; with too few samples the schedule is a geometric backoff
+starting at 200ms. When polling starts late (after an execution-notice
+wait), the quantiles are taken over the fills slower than that wait. Either
+way the schedule uses the caller's poll count and a window of the caller's
+old length, so the number of API calls and the polling time do not grow.
+"""
+
+import asyncio
+import bisect
+import json
+import os
+from typing import Optional
+
+import structlog
+
+from app.config import settings
+
+logger = structlog.get_logger()
+
+# Upper bounds (seconds) of the latency buckets; the last bucket is open.
+LATENCY_BUCKETS = (0.2, 0.4, 0.6, 0.8, 1.0, 1.5, 2.0, 3.0, 4.0, 6.0, 8.0, 12.0, 16.0, 24.0, 32.0)
+MIN_POLL_OFFSET_SECONDS = 0.2
+MIN_POLL_GAP_SECONDS = 0.2
+_MIN_SAMPLES = 5
+# Counts are halved once an exchange passes this many samples so the
+# schedule follows regime changes (opening auction, holiday sessions).
+_DECAY_AT_SAMPLES = 1000
+# Recorded samples are written at most this often.
+_SAVE_DELAY_SECONDS = 30.0
+
+
+def geometric_offsets(poll_count: int, window_seconds: float) -> list[float]:
+    """poll_count offsets growing geometrically from 200ms to window_seconds."""
+    count = max(1, int(poll_count))
+    window = max(MIN_POLL_OFFSET_SECONDS, float(window_seconds))
+    if count == 1:
+        return [window]
+    ratio = (window / MIN_POLL_OFFSET_SECONDS) ** (1.0 / (count - 1))
+    return [round(MIN_POLL_OFFSET_SECONDS * ratio**idx, 3) for idx in range(count)]
+
+
+class FillLatencyModel:
+    """Per-exchange histogram of submit -> confirmed-fill latency."""
+
+    def __init__(self, path: Optional[str] = None):
+        self._path = path
+        self._counts: dict[str, list[int]] = {}
+        self._loaded = False
+        self._dirty = False
+        self._save_handle: Optional[asyncio.TimerHandle] = None
+
+    @property
+    def path(self) -> str:
+        return self._path or os.getenv("KIS_FILL_LATENCY_PATH") or settings.kis_fill_latency_path
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                payload = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logger.warning("Failed to read fill latency histogram", path=self.path, error=str(e))
+            return
+        if list(payload.get("buckets") or []) != list(LATENCY_BUCKETS):
+            # Bucket layout changed; start over rather than mis-map counts.
+            return
+        for exchange, counts in (payload.get("exchanges") or {}).items():
+            if isinstance(counts, list) and len(counts) == len(LATENCY_BUCKETS) + 1:
+                self._counts[str(exchange)] = [max(0, int(value)) for value in counts]
+
+    def _snapshot(self) -> dict:
+        self._dirty = False
+        return {
+            "buckets": list(LATENCY_BUCKETS),
+            "exchanges": {exchange: list(counts) for exchange, counts in self._counts.items()},
+        }
+
+    @staticmethod
+    def _write(path: str, payload: dict) -> None:
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(payload, f)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning("Failed to persist fill latency histogram", path=path, error=str(e))
+
+    def _schedule_save(self) -> None:
+        if self._save_handle is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush()
+            return
+        self._save_handle = loop.call_later(_SAVE_DELAY_SECONDS, self._save_in_background, loop)
+
+    def _save_in_background(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._save_handle = None
+        if self._dirty:
+            loop.run_in_executor(None, self._write, self.path, self._snapshot())
+
+    def flush(self) -> None:
+        """Write pending samples now (blocking)."""
+        if self._save_handle is not None:
+            self._save_handle.cancel()
+            self._save_handle = None
+        if self._dirty:
+            self._write(self.path, self._snapshot())
+
+    def samples(self, exchange: str) -> int:
+        self._ensure_loaded()
+        return sum(self._counts.get(exchange, ()))
+
+    def record(self, exchange: str, latency_seconds: float) -> None:
+        self._ensure_loaded()
+        counts = self._counts.setdefault(exchange, [0] * (len(LATENCY_BUCKETS) + 1))
+        counts[bisect.bisect_left(LATENCY_BUCKETS, max(0.0, float(latency_seconds)))] += 1
+        if sum(counts) > _DECAY_AT_SAMPLES:
+            self._counts[exchange] = [value // 2 for value in counts]
+        self._dirty = True
+        self._schedule_save()
+
+    def share_within(self, exchange: str, seconds: float) -> float:
+        """Share of samples in buckets that end at or before seconds."""
+        self._ensure_loaded()
+        counts = self._counts.get(exchange)
+        total = sum(counts or ())
+        if not total:
+            return 0.0
+        within = bisect.bisect_right(LATENCY_BUCKETS, max(0.0, float(seconds)))
+        return sum(counts[:within]) / total
+
+    def quantile(self, exchange: str, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding quantile q (None without data)."""
+        self._ensure_loaded()
+        counts = self._counts.get(exchange)
+        total = sum(counts or ())
+        if not total:
+            return None
+        target = max(1.0, q * total)
+        running = 0
+        for idx, value in enumerate(counts):
+            running += value
+            if running >= target:
+                return LATENCY_BUCKETS[idx] if idx < len(LATENCY_BUCKETS) else float("inf")
+        return float("inf")
+
+    def poll_offsets(
+        self,
+        exchange: str,
+        poll_count: int,
+        window_seconds: float,
+        elapsed_seconds: float = 0.0,
+    ) -> list[float]:
+        """
+        Seconds after submit at which to poll, for an order not filled in the
+        first elapsed_seconds. The last offset is always elapsed_seconds +
+        window_seconds; earlier ones sit at the learned 50/75/87.5/..%
+        quantiles of the slower fills, or follow a geometric backoff from
+        elapsed_seconds until enough samples exist.
+        """
+        count = max(1, int(poll_count))
+        start = max(0.0, float(elapsed_seconds or 0.0))
+        window = max(MIN_POLL_OFFSET_SECONDS, float(window_seconds))
+        end = round(start + window, 3)
+        if self.samples(exchange) < _MIN_SAMPLES:
+            return [round(start + value, 3) for value in geometric_offsets(count, window)]
+
+        settled = self.share_within(exchange, start) if start else 0.0
+        offsets: list[float] = []
+        for idx in range(count - 1):
+            value = self.quantile(exchange, settled + (1.0 - settled) * (1.0 - 0.5 ** (idx + 1))) or end
+            # Keep backing off after the learned quantiles bunch up.
+            floor = (
+                max(offsets[-1] + MIN_POLL_GAP_SECONDS, start + (offsets[-1] - start) * 1.5)
+                if offsets
+                else start + MIN_POLL_OFFSET_SECONDS
+            )
+            value = max(floor, min(value, end - MIN_POLL_GAP_SECONDS))
+            if value >= end:
+                break
+            offsets.append(round(value, 3))
+        offsets.append(end)
+        # Quantiles that collapsed near the window leave polls unused; spread
+        # them back geometrically below the first learned offset.
+        missing = count - len(offsets)
+        if missing > 0:
+            head = [
+                round(start + value, 3)
+                for value in geometric_offsets(missing + 1, offsets[0] - start)[:-1]
+                if start + value < offsets[0]
+            ]
+            offsets = sorted(set(head + offsets))
+        return offsets
+
+
+fill_latency_model = FillLatencyModel()
+
+
+def get_fill_latency_model() -> FillLatencyModel:
+    return fill_latency_model
@@ -6,10 +6,17 @@ Designed for optional dual-broker operation alongside IBKR.
 from __future__ import annotations
 
 import asyncio
+import contextlib
+import contextvars
+import enum
+import functools
+import heapq
+import itertools
 import json
 import os
 import random
 import re
+import time
 from datetime import datetime, timedelta, timezone
 from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
 from typing import Optional
@@ -18,8 +25,11 @@ import httpx
 import structlog
 
 from app.config import settings
+from app.broker.fill_latency import geometric_offsets, get_fill_latency_model
+from app.broker.kis_fill_notices import DOMESTIC_MARKET, OVERSEAS_MARKET, KISFillNoticeSubscriber
 from app.gateway.symbol_mapper import (
     canonical_trade_symbol,
+    is_kis_domestic_symbol,
     kis_overseas_exchange_meta,
     trade_symbol_code,
 )
@@ -228,6 +238,65 @@ def _normalize_domestic_symbol(symbol: str) -> str:
     return symbol_upper
 
 
+def _raise_for_rt_cd(data: dict) -> dict:
+    """Raise RuntimeError(msg) for a non-zero KIS rt_cd, else return data."""
+    if str(data.get("rt_cd", "1")) != "0":
+        raise RuntimeError(data.get("msg1") or data.get("msg_cd") or "unknown")
+    return data
+
+
+async def _fan_out_exchanges(codes: list[str], fetch) -> tuple[list[tuple[str, object]], list[str]]:
+    """
+    Run fetch(code) for every exchange code concurrently.
+    Each call still passes the client's rate governor. Returns the successful
+    (code, result) pairs in the original code order, so callers can merge and
+    dedupe exactly as the sequential loops did, plus "code:error" strings.
+    """
+    outcomes = await asyncio.gather(*(fetch(code) for code in codes), return_exceptions=True)
+    results: list[tuple[str, object]] = []
+    errors: list[str] = []
+    for code, outcome in zip(codes, outcomes):
+        if isinstance(outcome, asyncio.CancelledError):
+            raise outcome
+        if isinstance(outcome, Exception):
+            errors.append(f"{code}:{str(outcome)}")
+            continue
+        results.append((code, outcome))
+    return results, errors
+
+
+def _match_domestic_holding(rows: list[dict], symbol_code: str) -> dict:
+    """Simplified holding for one KRX code from domestic balance rows (zeros when absent)."""
+    for row in rows:
+        pdno = str(row.get("pdno") or row.get("PDNO") or "").strip()
+        if pdno != symbol_code:
+            continue
+        return {
+            "symbol": symbol_code,
+            "qty": _to_int_or_zero(row.get("hldg_qty")),
+            "orderable_qty": _to_int_or_zero(row.get("ord_psbl_qty")),
+            "avg_price": round(_to_float_or_zero(row.get("pchs_avg_pric")), 6),
+            "price": round(_to_float_or_zero(row.get("prpr")), 6),
+            "purchase_amount": round(_to_float_or_zero(row.get("pchs_amt")), 2),
+            "eval_amount": round(_to_float_or_zero(row.get("evlu_amt")), 2),
+            "eval_pnl": round(_to_float_signed_or_zero(row.get("evlu_pfls_amt")), 2),
+            "eval_pnl_pct": round(_to_float_signed_or_zero(row.get("evlu_pfls_rt")), 4),
+            "raw": row,
+        }
+    return {
+        "symbol": symbol_code,
+        "qty": 0,
+        "orderable_qty": 0,
+        "avg_price": 0.0,
+        "price": 0.0,
+        "purchase_amount": 0.0,
+        "eval_amount": 0.0,
+        "eval_pnl": 0.0,
+        "eval_pnl_pct": 0.0,
+        "raw": None,
+    }
+
+
 def _dedupe_preserve_order(values: list[str]) -> list[str]:
     seen = set()
     out = []
@@ -240,6 +309,306 @@ def _dedupe_preserve_order(values: list[str]) -> list[str]:
     return out
 
 
+class KISPriority(enum.IntEnum):
+    """KIS call priority classes (lower value is served first)."""
+
+    ORDER_SUBMIT = 0
+    ORDER_POLL = 1
+    LIVE = 2
+    REPORTING = 3
+
+
+_ORDER_POLL_PATHS = (
+    "/uapi/overseas-stock/v1/trading/inquire-ccnl",
+    "/uapi/overseas-stock/v1/trading/inquire-nccs",
+    "/uapi/domestic-stock/v1/trading/inquire-daily-ccld",
+)
+_kis_priority_var: contextvars.ContextVar[Optional[KISPriority]] = contextvars.ContextVar(
+    "kis_priority", default=None
+)
+
+
+@contextlib.contextmanager
+def kis_priority(priority: KISPriority):
+    """Tag every KIS call made inside the block (and tasks it spawns)."""
+    token = _kis_priority_var.set(priority)
+    try:
+        yield
+    finally:
+        _kis_priority_var.reset(token)
+
+
+def kis_priority_scope(priority: KISPriority):
+    """Decorator form of kis_priority() for coroutine functions."""
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with kis_priority(priority):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def _infer_kis_priority(method: str, path: str) -> KISPriority:
+    explicit = _kis_priority_var.get()
+    if explicit is not None:
+        return explicit
+    if method.upper() == "POST":
+        return KISPriority.ORDER_SUBMIT
+    if path in _ORDER_POLL_PATHS:
+        return KISPriority.ORDER_POLL
+    return KISPriority.LIVE
+
+
+# Shared token bucket: refills from the Redis clock, takes one token unless
+# that would leave fewer than ARGV[3] (the caller's priority floor). Returns
+# 0 when granted, else the milliseconds until a retry can succeed.
+_ACCOUNT_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local floor = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) * 1000 + math.floor(tonumber(clock[2]) / 1000)
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate / 1000)
+local wait = 0
+if tokens - 1 >= floor then
+    tokens = tokens - 1
+else
+    wait = math.max(1, math.ceil((floor + 1 - tokens) * 1000 / rate))
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity * 1000 / rate) + 1000)
+return wait
+"""
+
+
+class _KISAccountRateBucket:
+    """
+    Token bucket in Redis shared by every process calling one KIS account.
+
+    The KIS limit is per account, so the scheduler, Telegram and worker
+    processes draw from one bucket. Reporting-class calls may not take it
+    below `reserved`, which keeps most of the budget for the worker's order
+    submits, fill polls and quotes. If Redis is unreachable the call goes
+    through on the local governor alone; the worker cannot dequeue orders
+    then either, so only background calls are affected.
+    """
+
+    _RETRY_AFTER_ERROR_SECONDS = 5.0
+
+    def __init__(self, key: str, rate_per_second: float, reserved: float = 0.0):
+        self.key = key
+        self.rate = max(0.0, float(rate_per_second or 0.0))
+        self.capacity = max(1.0, self.rate)
+        self.reserved = min(max(0.0, float(reserved or 0.0)), self.capacity - 1.0)
+        self._unavailable_until = 0.0
+        self._stats = {"granted": 0, "wait_total": 0.0, "wait_max": 0.0, "bypassed": 0}
+
+    def _floor(self, priority: KISPriority) -> float:
+        return self.reserved if priority >= KISPriority.REPORTING else 0.0
+
+    async def _take(self, priority: KISPriority) -> float:
+        from app.queue.order_queue import get_redis
+
+        r = await get_redis()
+        wait_ms = await r.eval(
+            _ACCOUNT_BUCKET_SCRIPT,
+            1,
+            self.key,
+            self.rate,
+            self.capacity,
+            self._floor(priority),
+        )
+        return int(wait_ms or 0) / 1000.0
+
+    async def acquire(self, priority: KISPriority) -> None:
+        if self.rate <= 0:
+            return
+        started = time.monotonic()
+        while True:
+            if time.monotonic() < self._unavailable_until:
+                self._stats["bypassed"] += 1
+                return
+            try:
+                wait = await self._take(priority)
+            except Exception as e:
+                logger.warning("KIS account rate bucket unavailable, using local limit", error=str(e))
+                self._unavailable_until = time.monotonic() + self._RETRY_AFTER_ERROR_SECONDS
+                self._stats["bypassed"] += 1
+                return
+            if wait <= 0:
+                break
+            await asyncio.sleep(wait)
+        waited = time.monotonic() - started
+        self._stats["granted"] += 1
+        self._stats["wait_total"] += waited
+        self._stats["wait_max"] = max(self._stats["wait_max"], waited)
+
+    def metrics(self) -> dict:
+        granted = self._stats["granted"]
+        return {
+            "rate_per_second": self.rate,
+            "reserved": self.reserved,
+            "granted": granted,
+            "bypassed": self._stats["bypassed"],
+            "wait_avg_ms": round(self._stats["wait_total"] / granted * 1000, 1) if granted else 0.0,
+            "wait_max_ms": round(self._stats["wait_max"] * 1000, 1),
+        }
+
+
+class _KISRateGovernor:
+    """
+    Token bucket shared by all KIS calls of one client, served by priority.
+
+    Waiters queue in a heap ordered by (priority, arrival), and a single
+    dispatcher hands out tokens as they refill, so a queued order submit is
+    always served before any queued balance/quote or reporting call.
+    Reporting calls additionally leave `reserved` tokens in the bucket.
+    """
+
+    def __init__(self, rate_per_second: float, capacity: float = 0.0, reserved: float = 0.0):
+        self.rate = max(0.0, float(rate_per_second or 0.0))
+        self.capacity = max(1.0, float(capacity or self.rate or 1.0))
+        self.reserved = min(max(0.0, float(reserved or 0.0)), self.capacity - 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self._stats = {
+            priority: {"granted": 0, "wait_total": 0.0, "wait_max": 0.0}
+            for priority in KISPriority
+        }
+        self._last_metrics_log = time.monotonic()
+        self._granted_since_log = 0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _floor(self, priority: KISPriority) -> float:
+        return self.reserved if priority >= KISPriority.REPORTING else 0.0
+
+    def _record(self, priority: KISPriority, waited: float) -> None:
+        stats = self._stats[priority]
+        stats["granted"] += 1
+        stats["wait_total"] += waited
+        stats["wait_max"] = max(stats["wait_max"], waited)
+        self._granted_since_log += 1
+
+        interval = float(settings.kis_rate_metrics_log_interval_seconds or 0.0)
+        now = time.monotonic()
+        if interval > 0 and now - self._last_metrics_log >= interval:
+            self._last_metrics_log = now
+            if self._granted_since_log:
+                logger.info("KIS rate governor metrics", **self.metrics())
+            self._granted_since_log = 0
+
+    async def acquire(self, priority: KISPriority) -> None:
+        if self.rate <= 0:
+            return
+        started = time.monotonic()
+        self._refill()
+        if not self._waiters and self._tokens - 1.0 >= self._floor(priority):
+            self._tokens -= 1.0
+            self._record(priority, 0.0)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (int(priority), next(self._seq), future))
+        self._wakeup.set()
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Token was granted just before cancellation; give it back.
+                self._tokens = min(self.capacity, self._tokens + 1.0)
+            else:
+                future.cancel()
+            raise
+        self._record(priority, time.monotonic() - started)
+
+    async def _dispatch(self) -> None:
+        while self._waiters:
+            priority, _, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            self._refill()
+            needed = 1.0 + self._floor(KISPriority(priority))
+            if self._tokens < needed:
+                # Sleep until refilled, but wake early if a more urgent call queues.
+                self._wakeup.clear()
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(self._wakeup.wait(), (needed - self._tokens) / self.rate)
+                continue
+            heapq.heappop(self._waiters)
+            self._tokens -= 1.0
+            future.set_result(None)
+
+    def metrics(self) -> dict:
+        """Queue depth and wait times per priority class."""
+        depth = {priority.name.lower(): 0 for priority in KISPriority}
+        for priority, _, future in self._waiters:
+            if not future.done():
+                depth[KISPriority(priority).name.lower()] += 1
+        classes = {}
+        for priority, stats in self._stats.items():
+            granted = stats["granted"]
+            classes[priority.name.lower()] = {
+                "queue_depth": depth[priority.name.lower()],
+                "granted": granted,
+                "wait_avg_ms": round(stats["wait_total"] / granted * 1000, 1) if granted else 0.0,
+                "wait_max_ms": round(stats["wait_max"] * 1000, 1),
+            }
+        return {
+            "rate_per_second": self.rate,
+            "tokens": round(self._tokens, 2),
+            "classes": classes,
+        }
+
+
+def _request_timeout(method: str) -> httpx.Timeout:
+    """Per-phase timeouts; order POSTs get their own read timeout."""
+    read = (
+        settings.kis_http_order_read_timeout_seconds
+        if method.upper() == "POST"
+        else settings.kis_http_read_timeout_seconds
+    )
+    return httpx.Timeout(
+        connect=float(settings.kis_http_connect_timeout_seconds or 5.0),
+        read=float(read or 20.0),
+        write=float(settings.kis_http_connect_timeout_seconds or 5.0),
+        pool=float(settings.kis_http_connect_timeout_seconds or 5.0),
+    )
+
+
+def _build_http_client() -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=max(1, int(settings.kis_http_max_connections or 1)),
+        max_keepalive_connections=max(0, int(settings.kis_http_max_keepalive_connections or 0)),
+        keepalive_expiry=float(settings.kis_http_keepalive_expiry_seconds or 5.0),
+    )
+    http2 = bool(settings.kis_http2)
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            logger.warning("KIS_HTTP2 is enabled but the h2 package is missing; using HTTP/1.1")
+            http2 = False
+    return httpx.AsyncClient(timeout=_request_timeout("GET"), limits=limits, http2=http2)
+
+
 class KISClient:
     """Minimal async client for KIS overseas quote/order APIs."""
 
@@ -250,6 +619,28 @@ class KISClient:
         self._token_lock = asyncio.Lock()
         # symbol -> (quote_exchange, order_exchange)
         self._symbol_exchange_cache: dict[str, tuple[str, str]] = {}
+        # (exchange, currency) -> (monotonic fetch time, balance rows)
+        self._balance_cache: dict[tuple[str, str], tuple[float, list[dict]]] = {}
+        self._balance_locks: dict[tuple[str, str], asyncio.Lock] = {}
+        # Bumped on invalidation so an in-flight fetch cannot re-cache stale rows.
+        self._balance_generation = 0
+        self._ws_approval_key: Optional[str] = None
+        self._fill_notices: Optional[KISFillNoticeSubscriber] = None
+        # ("overseas"|"domestic", symbol) -> (monotonic request time, snapshot)
+        self._quote_cache: dict[tuple[str, str], tuple[float, dict]] = {}
+        self._quote_inflight: dict[tuple[str, str], asyncio.Future] = {}
+        # In-flight quote request -> monotonic time it was sent.
+        self._quote_sent_at: dict[asyncio.Future, float] = {}
+        self._rate_governor = _KISRateGovernor(
+            settings.kis_rate_limit_per_second,
+            settings.kis_rate_limit_burst,
+            settings.kis_rate_reserved_tokens,
+        )
+        self._account_rate = _KISAccountRateBucket(
+            f"kis:rate:{settings.kis_account_no or 'default'}",
+            settings.kis_rate_account_limit_per_second,
+            settings.kis_rate_account_reserved_tokens,
+        )
 
     @property
     def is_configured(self) -> bool:
@@ -264,9 +655,31 @@ class KISClient:
 
     async def _http(self) -> httpx.AsyncClient:
         if self._client is None:
-            self._client = httpx.AsyncClient(timeout=20.0)
+            self._client = _build_http_client()
         return self._client
 
+    async def warmup(self) -> dict:
+        """
+        Pre-open pooled connections and make sure the access token is valid,
+        so the first order of a session does not pay TLS/token setup.
+        The probe requests hit the API host root and are not budgeted calls.
+        """
+        started = time.monotonic()
+        await self.get_access_token()
+        client = await self._http()
+        base = settings.kis_base_url.rstrip("/")
+        count = max(1, int(settings.kis_warmup_connections or 1))
+        results = await asyncio.gather(
+            *(client.head(f"{base}/") for _ in range(count)),
+            return_exceptions=True,
+        )
+        failures = [str(item) for item in results if isinstance(item, Exception)]
+        return {
+            "connections": count - len(failures),
+            "errors": failures[:3],
+            "elapsed_ms": round((time.monotonic() - started) * 1000, 1),
+        }
+
     def _symbol_key(self, symbol: Optional[str]) -> str:
         return canonical_trade_symbol(str(symbol or "").strip().upper())
 
@@ -313,6 +726,173 @@ class KISClient:
     def _currency_for_quote_exchange(self, quote_exchange: str) -> str:
         return _QUOTE_TO_CURRENCY.get(str(quote_exchange or "").strip().upper(), "USD")
 
+    def rate_metrics(self) -> dict:
+        """Client-side rate governor metrics (queue depth / wait per class)."""
+        metrics = self._rate_governor.metrics()
+        metrics["account"] = self._account_rate.metrics()
+        return metrics
+
+    async def _acquire_rate(self, priority: KISPriority) -> None:
+        # Process queue first (priority order), then the account-wide budget.
+        await self._rate_governor.acquire(priority)
+        await self._account_rate.acquire(priority)
+
+    def invalidate_balance_cache(self) -> None:
+        """Drop cached balance snapshots (order submitted or fill confirmed)."""
+        self._balance_cache.clear()
+        self._balance_generation += 1
+
+    async def get_ws_approval_key(self) -> str:
+        """Websocket approval key (valid for a day; reissued on reconnect failure)."""
+        if self._ws_approval_key:
+            return self._ws_approval_key
+        data = await self._request_json(
+            "POST",
+            "/oauth2/Approval",
+            json={
+                "grant_type": "client_credentials",
+                "appkey": settings.kis_app_key,
+                "secretkey": settings.kis_app_secret,
+            },
+            headers={"content-type": "application/json; charset=utf-8"},
+        )
+        key = str(data.get("approval_key") or "").strip()
+        if not key:
+            raise RuntimeError(f"KIS 웹소켓 접속키 발급 실패: {data}")
+        self._ws_approval_key = key
+        return key
+
+    def start_fill_notices(self) -> bool:
+        """Start the execution-notice subscriber if it is configured."""
+        if not (self.is_configured and settings.kis_ws_url and settings.kis_hts_id):
+            return False
+        if self._fill_notices is None:
+
+            async def approval_key() -> str:
+                # A failed session may be due to an expired key; reissue then.
+                self._ws_approval_key = None
+                return await self.get_ws_approval_key()
+
+            tr_ids = [item.strip() for item in settings.kis_fill_notice_tr_ids.split(",") if item.strip()]
+            self._fill_notices = KISFillNoticeSubscriber(
+                settings.kis_ws_url,
+                approval_key,
+                settings.kis_hts_id,
+                tr_ids,
+                custtype=settings.kis_custtype,
+                on_fill=lambda notice: self.invalidate_balance_cache(),
+            )
+        self._fill_notices.start()
+        return True
+
+    async def _await_fill_notice(self, market: str, order_id: str, expected_qty: int) -> Optional[dict]:
+        """Outcome pushed by execution notices, or None to fall back to polling."""
+        subscriber = self._fill_notices
+        if subscriber is None or not subscriber.ready or not order_id:
+            return None
+        outcome = await subscriber.wait_for_fill(
+            market,
+            order_id,
+            int(expected_qty),
+            float(settings.kis_fill_notice_timeout_seconds or 0.0),
+        )
+        if outcome is None:
+            logger.info("No execution notice before timeout; polling", order_id=order_id)
+        return outcome
+
+    def _note_fill(self, outcome: dict) -> dict:
+        """Invalidate balance snapshots once an outcome confirms filled shares."""
+        if _to_float_or_zero(outcome.get("filled_qty")) > 0:
+            self.invalidate_balance_cache()
+        return outcome
+
+    async def _cached_balance_rows(
+        self,
+        key: tuple[str, str],
+        fetch,
+        max_age_seconds: Optional[float] = None,
+    ) -> list[dict]:
+        """
+        Return balance rows for one exchange/currency, reusing a recent snapshot.
+        Concurrent misses for the same key share one request. Pass
+        max_age_seconds=0 to force a fresh read (fill polling); the fresh rows
+        still refresh the cache for later readers.
+        """
+        ttl = (
+            float(settings.kis_balance_cache_ttl_seconds or 0.0)
+            if max_age_seconds is None
+            else float(max_age_seconds)
+        )
+
+        def _fresh_cached() -> Optional[list[dict]]:
+            cached = self._balance_cache.get(key)
+            if ttl > 0 and cached and time.monotonic() - cached[0] <= ttl:
+                return list(cached[1])
+            return None
+
+        rows = _fresh_cached()
+        if rows is not None:
+            return rows
+
+        lock = self._balance_locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            rows = _fresh_cached()
+            if rows is not None:
+                return rows
+            generation = self._balance_generation
+            rows = await fetch()
+            if generation == self._balance_generation:
+                self._balance_cache[key] = (time.monotonic(), list(rows))
+            return list(rows)
+
+    async def _cached_quote(
+        self,
+        key: tuple[str, str],
+        fetch,
+        max_age_seconds: Optional[float] = None,
+    ) -> dict:
+        """
+        Return a quote snapshot no older than max_age_seconds (default:
+        kis_quote_cache_ttl_seconds; 0 demands a fresh request), counting
+        from when its request was sent. Callers for the same symbol share an
+        in-flight request that is not sent yet or was sent within their
+        max_age_seconds; an older one is left to its callers and a new
+        request is started.
+        """
+        ttl = (
+            float(settings.kis_quote_cache_ttl_seconds or 0.0)
+            if max_age_seconds is None
+            else float(max_age_seconds)
+        )
+        cached = self._quote_cache.get(key)
+        if ttl > 0 and cached and time.monotonic() - cached[0] <= ttl:
+            return dict(cached[1])
+
+        inflight = self._quote_inflight.get(key)
+        sent_at = self._quote_sent_at.get(inflight) if inflight is not None else None
+        if inflight is None or (sent_at is not None and time.monotonic() - sent_at > ttl):
+            inflight = asyncio.ensure_future(self._fetch_quote_into_cache(key, fetch))
+            # Keep an unobserved failure (all callers cancelled) from being logged.
+            inflight.add_done_callback(lambda f: f.cancelled() or f.exception())
+            self._quote_inflight[key] = inflight
+        # Shield so one cancelled caller does not cancel the shared request.
+        return dict(await asyncio.shield(inflight))
+
+    async def _fetch_quote_into_cache(self, key: tuple[str, str], fetch) -> dict:
+        task = asyncio.current_task()
+        sent_at = self._quote_sent_at[task] = time.monotonic()
+        try:
+            snapshot = await fetch()
+            cached = self._quote_cache.get(key)
+            # An older request finishing late must not replace a newer quote.
+            if cached is None or cached[0] <= sent_at:
+                self._quote_cache[key] = (sent_at, snapshot)
+            return snapshot
+        finally:
+            self._quote_sent_at.pop(task, None)
+            if self._quote_inflight.get(key) is task:
+                self._quote_inflight.pop(key, None)
+
     def _order_tr_id(self, order_exchange: str, side: str) -> str:
         order_code = str(order_exchange or "").strip().upper()
         side_upper = str(side or "").strip().upper()
@@ -379,6 +959,12 @@ class KISClient:
         base = settings.kis_base_url.rstrip("/")
         url = f"{base}{path}"
         client = await self._http()
+        # Token/approval issuance has its own per-minute limit and is not budgeted here.
+        governed = not path.startswith("/oauth2/")
+        priority = _infer_kis_priority(method, path)
+        kwargs.setdefault("timeout", _request_timeout(method))
+        if governed:
+            await self._acquire_rate(priority)
         response = await client.request(method, url, **kwargs)
         if (
             response.status_code == 401
@@ -392,6 +978,7 @@ class KISClient:
             refreshed_headers["authorization"] = f"Bearer {await self.get_access_token(force_refresh=True)}"
             retry_kwargs = dict(kwargs)
             retry_kwargs["headers"] = refreshed_headers
+            await self._acquire_rate(priority)
             response = await client.request(method, url, **retry_kwargs)
         response.raise_for_status()
         data = response.json()
@@ -532,7 +1119,7 @@ class KISClient:
             "custtype": settings.kis_custtype,
         }
 
-    async def get_quote_snapshot(self, symbol: str) -> dict:
+    async def get_quote_snapshot(self, symbol: str, *, max_age_seconds: Optional[float] = None) -> dict:
         """
         Get overseas quote snapshot.
         Returns:
@@ -540,7 +1127,15 @@ class KISClient:
         - prev_close: previous close price (0 if unavailable)
         - quote_exchange: resolved quote exchange code
         - raw: raw KIS response payload
+        Pass max_age_seconds=0 when pricing an order.
         """
+        return await self._cached_quote(
+            ("overseas", self._symbol_key(symbol)),
+            lambda: self._fetch_quote_snapshot(symbol),
+            max_age_seconds,
+        )
+
+    async def _fetch_quote_snapshot(self, symbol: str) -> dict:
         headers = await self._authorized_headers(settings.kis_quote_tr_id)
         symbol_key = self._symbol_key(symbol)
         symbol_code = self._symbol_code(symbol)
@@ -626,22 +1221,34 @@ class KISClient:
             f"(종목:{symbol_key}, 시도:{tried}, 원인:{reason})"
         )
 
-    async def get_quote_price(self, symbol: str) -> float:
+    async def get_quote_price(self, symbol: str, *, max_age_seconds: Optional[float] = None) -> float:
         """
         Get overseas quote price.
         Returns a positive price or raises RuntimeError.
         """
-        snapshot = await self.get_quote_snapshot(symbol)
+        snapshot = await self.get_quote_snapshot(symbol, max_age_seconds=max_age_seconds)
         price = float(snapshot.get("price", 0.0) or 0.0)
         if price <= 0:
             raise RuntimeError(f"KIS 시세 응답에서 유효 가격을 찾지 못했습니다 (종목:{symbol})")
         return price
 
-    async def get_domestic_quote_snapshot(self, symbol: str) -> dict:
+    async def get_domestic_quote_snapshot(
+        self,
+        symbol: str,
+        *,
+        max_age_seconds: Optional[float] = None,
+    ) -> dict:
         """
         Get KRX/domestic quote snapshot.
         Returns price fields in KRW.
         """
+        return await self._cached_quote(
+            ("domestic", _normalize_domestic_symbol(symbol)),
+            lambda: self._fetch_domestic_quote_snapshot(symbol),
+            max_age_seconds,
+        )
+
+    async def _fetch_domestic_quote_snapshot(self, symbol: str) -> dict:
         symbol_code = _normalize_domestic_symbol(symbol)
         headers = await self._authorized_headers("FHPST01010000")
         params = {
@@ -692,9 +1299,9 @@ class KISClient:
             "raw": data,
         }
 
-    async def get_domestic_quote_price(self, symbol: str) -> float:
+    async def get_domestic_quote_price(self, symbol: str, *, max_age_seconds: Optional[float] = None) -> float:
         """Get KRX/domestic quote price in KRW."""
-        snapshot = await self.get_domestic_quote_snapshot(symbol)
+        snapshot = await self.get_domestic_quote_snapshot(symbol, max_age_seconds=max_age_seconds)
         price = float(snapshot.get("price", 0.0) or 0.0)
         if price <= 0:
             raise RuntimeError(f"KIS 국내 시세 응답에서 유효 가격을 찾지 못했습니다 (종목:{symbol})")
@@ -710,12 +1317,7 @@ class KISClient:
             if exchange_code
             else self._order_exchange_candidates()
         )
-        rows: list[dict] = []
-        seen = set()
-        errors = []
-        success_calls = 0
-
-        for code in target_codes:
+        async def _fetch(code: str):
             params = {
                 "CANO": settings.kis_account_no,
                 "ACNT_PRDT_CD": settings.kis_account_product_code,
@@ -724,22 +1326,19 @@ class KISClient:
                 "CTX_AREA_FK200": "",
                 "CTX_AREA_NK200": "",
             }
-            try:
-                data = await self._get(
+            return _raise_for_rt_cd(
+                await self._get(
                     "/uapi/overseas-stock/v1/trading/inquire-nccs",
                     headers=headers,
                     params=params,
                 )
-            except Exception as e:
-                errors.append(f"{code}:{str(e)}")
-                continue
+            )
 
-            if str(data.get("rt_cd", "1")) != "0":
-                msg = data.get("msg1") or data.get("msg_cd") or "unknown"
-                errors.append(f"{code}:{msg}")
-                continue
+        results, errors = await _fan_out_exchanges(target_codes, _fetch)
+        rows: list[dict] = []
+        seen = set()
 
-            success_calls += 1
+        for _, data in results:
             output = data.get("output") or []
             if not isinstance(output, list):
                 continue
@@ -755,7 +1354,7 @@ class KISClient:
                 seen.add(key)
                 rows.append(row)
 
-        if success_calls == 0 and errors:
+        if not results and errors:
             raise RuntimeError("KIS 미체결 조회 실패: " + " / ".join(errors[:3]))
         return rows
 
@@ -792,56 +1391,59 @@ class KISClient:
                 return True
         return False
 
+    async def _fetch_overseas_balance_rows(self, exchange_code: str, currency_code: str) -> list[dict]:
+        headers = await self._authorized_headers("TTTS3012R")
+        params = {
+            "CANO": settings.kis_account_no,
+            "ACNT_PRDT_CD": settings.kis_account_product_code,
+            "OVRS_EXCG_CD": exchange_code,
+            "TR_CRCY_CD": currency_code,
+            "CTX_AREA_FK200": "",
+            "CTX_AREA_NK200": "",
+        }
+        data = await self._get(
+            "/uapi/overseas-stock/v1/trading/inquire-balance",
+            headers=headers,
+            params=params,
+        )
+        if str(data.get("rt_cd", "1")) != "0":
+            raise RuntimeError(data.get("msg1") or data.get("msg_cd") or "unknown")
+
+        output = data.get("output1") or []
+        if not isinstance(output, list):
+            return []
+        return [row for row in output if isinstance(row, dict)]
+
     async def get_overseas_balance(
         self,
         exchange_code: Optional[str] = None,
         currency_code: Optional[str] = None,
+        *,
+        max_age_seconds: Optional[float] = None,
     ) -> list[dict]:
         """
         Query overseas balance rows (output1).
+        Per-exchange snapshots are cached briefly; see _cached_balance_rows.
         """
-        headers = await self._authorized_headers("TTTS3012R")
         target_codes = (
             [str(exchange_code).strip().upper()]
             if exchange_code
             else self._order_exchange_candidates()
         )
+        def _fetch(code: str):
+            currency = str(currency_code or self._currency_for_order_exchange(code)).upper()
+            return self._cached_balance_rows(
+                (code, currency),
+                lambda: self._fetch_overseas_balance_rows(code, currency),
+                max_age_seconds,
+            )
+
+        results, errors = await _fan_out_exchanges(target_codes, _fetch)
         rows: list[dict] = []
         seen_symbols = set()
-        errors = []
-        success_calls = 0
 
-        for code in target_codes:
-            params = {
-                "CANO": settings.kis_account_no,
-                "ACNT_PRDT_CD": settings.kis_account_product_code,
-                "OVRS_EXCG_CD": code,
-                "TR_CRCY_CD": str(currency_code or self._currency_for_order_exchange(code)).upper(),
-                "CTX_AREA_FK200": "",
-                "CTX_AREA_NK200": "",
-            }
-            try:
-                data = await self._get(
-                    "/uapi/overseas-stock/v1/trading/inquire-balance",
-                    headers=headers,
-                    params=params,
-                )
-            except Exception as e:
-                errors.append(f"{code}:{str(e)}")
-                continue
-
-            if str(data.get("rt_cd", "1")) != "0":
-                msg = data.get("msg1") or data.get("msg_cd") or "unknown"
-                errors.append(f"{code}:{msg}")
-                continue
-
-            success_calls += 1
-            output = data.get("output1") or []
-            if not isinstance(output, list):
-                continue
+        for _, output in results:
             for row in output:
-                if not isinstance(row, dict):
-                    continue
                 symbol_key = str(
                     row.get("ovrs_pdno")
                     or row.get("pdno")
@@ -854,7 +1456,7 @@ class KISClient:
                     seen_symbols.add(symbol_key)
                 rows.append(row)
 
-        if success_calls == 0 and errors:
+        if not results and errors:
             raise RuntimeError("KIS 잔고 조회 실패: " + " / ".join(errors[:3]))
         return rows
 
@@ -913,71 +1515,144 @@ class KISClient:
             "raw": output2,
         }
 
-    async def get_symbol_balance(self, symbol: str) -> dict:
+    async def get_symbol_balance(self, symbol: str, *, max_age_seconds: Optional[float] = None) -> dict:
         """
         Return simplified per-symbol balance snapshot.
         """
         target_key = self._symbol_key(symbol)
-        target = self._symbol_code(target_key)
         order_candidates = self._order_exchange_candidates(target_key)
-        currency = self._currency_for_order_exchange(order_candidates[0])
 
         for order_code in order_candidates:
-            currency = self._currency_for_order_exchange(order_code)
-            rows = await self.get_overseas_balance(exchange_code=order_code, currency_code=currency)
+            rows = await self.get_overseas_balance(
+                exchange_code=order_code,
+                currency_code=self._currency_for_order_exchange(order_code),
+                max_age_seconds=max_age_seconds,
+            )
+            holding = self._match_overseas_holding(rows, target_key, order_code)
+            if holding is not None:
+                return holding
 
-            for row in rows:
-                if not isinstance(row, dict):
-                    continue
-                pdno = str(
-                    row.get("ovrs_pdno")
-                    or row.get("pdno")
-                    or row.get("item_cd")
-                    or ""
-                ).strip().upper()
-                if pdno != target:
-                    continue
+        return self._empty_overseas_holding(target_key, order_candidates[-1])
 
-                qty = _to_int_or_zero(
-                    row.get("ovrs_cblc_qty")
-                    or row.get("cblc_qty")
-                    or row.get("hold_qty")
-                    or row.get("blce_qty")
-                )
-                orderable_qty = _to_int_or_zero(
-                    row.get("ord_psbl_qty")
-                    or row.get("sell_psbl_qty")
-                    or row.get("ovrs_ord_psbl_qty")
-                )
-                avg_price = _to_float_or_zero(
-                    row.get("pchs_avg_pric")
-                    or row.get("avg_unpr")
-                    or row.get("avg_price")
-                )
-                self._symbol_exchange_cache[target_key] = (
-                    _ORDER_TO_QUOTE_EXCHANGE.get(order_code, ""),
-                    order_code,
-                )
-                return {
-                    "symbol": target_key,
-                    "symbol_code": target,
-                    "currency": currency,
-                    "qty": qty,
-                    "orderable_qty": orderable_qty,
-                    "avg_price": round(avg_price, 6),
-                    "raw": row,
-                }
+    def _match_overseas_holding(self, rows: list[dict], target_key: str, order_code: str) -> Optional[dict]:
+        target = self._symbol_code(target_key)
+        for row in rows:
+            if not isinstance(row, dict):
+                continue
+            pdno = str(
+                row.get("ovrs_pdno")
+                or row.get("pdno")
+                or row.get("item_cd")
+                or ""
+            ).strip().upper()
+            if pdno != target:
+                continue
+
+            qty = _to_int_or_zero(
+                row.get("ovrs_cblc_qty")
+                or row.get("cblc_qty")
+                or row.get("hold_qty")
+                or row.get("blce_qty")
+            )
+            orderable_qty = _to_int_or_zero(
+                row.get("ord_psbl_qty")
+                or row.get("sell_psbl_qty")
+                or row.get("ovrs_ord_psbl_qty")
+            )
+            avg_price = _to_float_or_zero(
+                row.get("pchs_avg_pric")
+                or row.get("avg_unpr")
+                or row.get("avg_price")
+            )
+            self._symbol_exchange_cache[target_key] = (
+                _ORDER_TO_QUOTE_EXCHANGE.get(order_code, ""),
+                order_code,
+            )
+            return {
+                "symbol": target_key,
+                "symbol_code": target,
+                "currency": self._currency_for_order_exchange(order_code),
+                "qty": qty,
+                "orderable_qty": orderable_qty,
+                "avg_price": round(avg_price, 6),
+                "raw": row,
+            }
+        return None
 
+    def _empty_overseas_holding(self, target_key: str, order_code: str) -> dict:
         return {
             "symbol": target_key,
-            "symbol_code": target,
-            "currency": currency,
+            "symbol_code": self._symbol_code(target_key),
+            "currency": self._currency_for_order_exchange(order_code),
             "qty": 0,
             "orderable_qty": 0,
             "avg_price": 0.0,
             "raw": None,
         }
 
+    async def get_holdings_snapshot(
+        self,
+        *,
+        overseas: bool = True,
+        domestic: bool = True,
+        max_age_seconds: Optional[float] = None,
+    ) -> dict:
+        """
+        Whole-account balance rows for answering many per-symbol lookups.
+        Every overseas exchange and the domestic account are read concurrently,
+        one (cached) balance request each, regardless of how many symbols are
+        looked up afterwards with snapshot_symbol_balance().
+        """
+        snapshot: dict = {"overseas": {}, "domestic": None, "errors": []}
+
+        async def _overseas():
+            def _fetch(code: str):
+                return self.get_overseas_balance(
+                    exchange_code=code,
+                    currency_code=self._currency_for_order_exchange(code),
+                    max_age_seconds=max_age_seconds,
+                )
+
+            results, errors = await _fan_out_exchanges(self._order_exchange_candidates(), _fetch)
+            snapshot["overseas"] = dict(results)
+            snapshot["errors"].extend(errors)
+
+        async def _domestic():
+            try:
+                snapshot["domestic"] = await self.get_domestic_balance(max_age_seconds=max_age_seconds)
+            except Exception as e:
+                snapshot["errors"].append(f"KRX:{str(e)}")
+
+        await asyncio.gather(*([_overseas()] if overseas else []), *([_domestic()] if domestic else []))
+        return snapshot
+
+    def snapshot_symbol_balance(self, snapshot: dict, symbol: str) -> Optional[dict]:
+        """
+        Per-symbol balance from get_holdings_snapshot(), in the same shape as
+        get_symbol_balance()/get_domestic_symbol_balance(). None when the
+        exchange that could hold the symbol was not read successfully.
+        """
+        if is_kis_domestic_symbol(symbol):
+            rows = snapshot.get("domestic")
+            if rows is None:
+                return None
+            return _match_domestic_holding(rows, _normalize_domestic_symbol(symbol))
+
+        target_key = self._symbol_key(symbol)
+        order_candidates = self._order_exchange_candidates(target_key)
+        complete = True
+        for order_code in order_candidates:
+            rows = snapshot.get("overseas", {}).get(order_code)
+            if rows is None:
+                complete = False
+                continue
+            holding = self._match_overseas_holding(rows, target_key, order_code)
+            if holding is not None:
+                return holding
+        if not complete:
+            return None
+        return self._empty_overseas_holding(target_key, order_candidates[-1])
+
     async def get_order_history(
         self,
         start_ymd: str,
@@ -999,12 +1674,7 @@ class KISClient:
             if exchange_code
             else self._order_exchange_candidates(None if is_all_symbols else symbol_key)
         )
-        rows: list[dict] = []
-        seen = set()
-        errors = []
-        success_calls = 0
-
-        for code in target_codes:
+        async def _fetch(code: str):
             params = {
                 "CANO": settings.kis_account_no,
                 "ACNT_PRDT_CD": settings.kis_account_product_code,
@@ -1021,22 +1691,19 @@ class KISClient:
                 "CTX_AREA_NK200": "",
                 "CTX_AREA_FK200": "",
             }
-            try:
-                data = await self._get(
+            return _raise_for_rt_cd(
+                await self._get(
                     "/uapi/overseas-stock/v1/trading/inquire-ccnl",
                     headers=headers,
                     params=params,
                 )
-            except Exception as e:
-                errors.append(f"{code}:{str(e)}")
-                continue
+            )
 
-            if str(data.get("rt_cd", "1")) != "0":
-                msg = data.get("msg1") or data.get("msg_cd") or "unknown"
-                errors.append(f"{code}:{msg}")
-                continue
+        results, errors = await _fan_out_exchanges(target_codes, _fetch)
+        rows: list[dict] = []
+        seen = set()
 
-            success_calls += 1
+        for _, data in results:
             output = data.get("output") or []
             if isinstance(output, dict):
                 output = [output]
@@ -1055,7 +1722,7 @@ class KISClient:
                 seen.add(key)
                 rows.append(row)
 
-        if success_calls == 0 and errors:
+        if not results and errors:
             raise RuntimeError("KIS 주문체결내역 조회 실패: " + " / ".join(errors[:3]))
         return rows
 
@@ -1123,29 +1790,61 @@ class KISClient:
         poll_delay_seconds: float = 2.0,
         ) -> dict:
         """
-        Poll order history and unfilled queues to determine fill outcome safely.
+        Determine the fill outcome of a submitted order: execution notices
+        first, then order history / unfilled queues, then balance delta.
         """
         side_upper = str(side or "").strip().upper()
         symbol_key = self._symbol_key(symbol)
+        exchange = self._order_exchange_candidates(symbol_key)[0]
+
+        # Offsets and recorded latencies count from here (just after submit).
+        started = time.monotonic()
+        latency_model = get_fill_latency_model()
+        pushed = await self._await_fill_notice(OVERSEAS_MARKET, order_id, expected_qty)
+        if pushed is not None:
+            if pushed.get("state") == "filled":
+                latency_model.record(exchange, time.monotonic() - started)
+            return self._note_fill(pushed)
+
+        # Same poll count and poll window as a fixed schedule, but polls are
+        # placed where fills on this exchange are usually confirmed.
+        missed_at = time.monotonic() - started
+        offsets = latency_model.poll_offsets(
+            exchange,
+            max(1, poll_count),
+            max(0.2, poll_delay_seconds) * (max(1, poll_count) - 1),
+            elapsed_seconds=missed_at,
+        )
+        for offset in offsets:
+            delay = offset - (time.monotonic() - started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            polled_at = time.monotonic() - started
+            results = await asyncio.gather(
+                self.find_order_history_row(order_id=order_id, symbol=symbol_key),
+                self.find_unfilled_order(order_id=order_id, symbol=symbol_key),
+                return_exceptions=True,
+            )
+            for result in results:
+                if isinstance(result, BaseException):
+                    raise result
+            row, unfilled = results
 
-        for idx in range(max(1, poll_count)):
-            row = await self.find_order_history_row(order_id=order_id, symbol=symbol_key)
             if row:
                 parsed = self._parse_execution_row(row)
                 if parsed["filled_qty"] > 0 and parsed["unfilled_qty"] == 0:
-                    return {"state": "filled", "raw": row, **parsed}
+                    latency_model.record(exchange, (missed_at + polled_at) / 2)
+                    return self._note_fill({"state": "filled", "raw": row, **parsed})
                 if parsed["unfilled_qty"] > 0:
-                    return {"state": "open", "raw": row, **parsed}
+                    return self._note_fill({"state": "open", "raw": row, **parsed})
                 if parsed["status_name"] in ("완료", "거부", "접수거부"):
                     return {"state": "closed_unfilled", "raw": row, **parsed}
 
-            unfilled = await self.find_unfilled_order(order_id=order_id, symbol=symbol_key)
             if unfilled:
                 parsed = self._parse_execution_row(unfilled)
-                return {"state": "open", "raw": unfilled, **parsed}
-
-            if idx < poll_count - 1:
-                await asyncio.sleep(max(0.2, poll_delay_seconds))
+                return self._note_fill({"state": "open", "raw": unfilled, **parsed})
+            missed_at = polled_at
 
         # Fallback: infer from post-order balance delta when history query is delayed.
         inferred = await self._infer_fill_from_balance_delta(
@@ -1155,7 +1854,7 @@ class KISClient:
             pre_qty=pre_qty,
         )
         if inferred.get("filled_qty", 0) > 0:
-            return inferred
+            return self._note_fill(inferred)
 
         return {
             "state": "unknown",
@@ -1184,8 +1883,16 @@ class KISClient:
             if pre_qty is None:
                 pre_qty = 0
 
-            for idx in range(max(1, poll_count)):
-                balance = await self.get_symbol_balance(symbol_key)
+            started = time.monotonic()
+            offsets = geometric_offsets(
+                max(1, poll_count),
+                max(0.2, poll_delay_seconds) * (max(1, poll_count) - 1),
+            )
+            for offset in offsets:
+                delay = offset - (time.monotonic() - started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                balance = await self.get_symbol_balance(symbol_key, max_age_seconds=0)
                 now_qty = int(balance.get("qty", 0))
                 avg_price = float(balance.get("avg_price", 0.0) or 0.0)
 
@@ -1206,9 +1913,6 @@ class KISClient:
                         "status_name": "BALANCE_CONFIRMED",
                         "raw": balance.get("raw"),
                     }
-
-                if idx < poll_count - 1:
-                    await asyncio.sleep(max(0.2, poll_delay_seconds))
         except Exception:
             pass
 
@@ -1244,12 +1948,15 @@ class KISClient:
             "MGCO_APTM_ODNO": "",
             "ORD_SVR_DVSN_CD": "0",
         }
-        data = await self._request_json(
-            "POST",
-            "/uapi/overseas-stock/v1/trading/order-rvsecncl",
-            headers=headers,
-            json=body,
-        )
+        try:
+            data = await self._request_json(
+                "POST",
+                "/uapi/overseas-stock/v1/trading/order-rvsecncl",
+                headers=headers,
+                json=body,
+            )
+        finally:
+            self.invalidate_balance_cache()
         if str(data.get("rt_cd", "1")) != "0":
             msg = data.get("msg1") or data.get("msg_cd") or "unknown"
             raise RuntimeError(f"KIS 주문 취소 실패: {msg}")
@@ -1352,71 +2059,83 @@ class KISClient:
             "raw": output,
         }
 
-    async def get_effective_overseas_orderable(self, symbol: str = "AAPL", order_price: float = 1.0) -> dict:
+    async def _direct_orderable(self, item_code: str, order_price_text: str, codes: list[str]) -> tuple[float, float]:
         """
-        Return effective buying power for the symbol's KIS overseas market.
-        Amounts are reported in the market currency plus KRW conversion.
+        Query inquire-psamount on every candidate exchange concurrently.
+        Returns the best (ovrs_ord_psbl_amt, ord_psbl_frcr_amt) across them.
         """
-        symbol_key = self._symbol_key(symbol)
-        symbol_code = self._symbol_code(symbol_key)
-        order_code = self._order_exchange_candidates(symbol_key)[0]
-        currency = self._currency_for_order_exchange(order_code)
         headers = await self._authorized_headers("TTTS3007R")
-        order_price_text = _format_overseas_order_price(order_price, currency)
-        direct_ovrs = 0.0
-        direct_frcr = 0.0
-        psamount_errors = []
-        success_calls = 0
 
-        for candidate_order_code in self._order_exchange_candidates(symbol_key):
+        async def _fetch(code: str):
             params = {
                 "CANO": settings.kis_account_no,
                 "ACNT_PRDT_CD": settings.kis_account_product_code,
-                "OVRS_EXCG_CD": candidate_order_code,
+                "OVRS_EXCG_CD": code,
                 "OVRS_ORD_UNPR": order_price_text,
-                "ITEM_CD": symbol_code,
+                "ITEM_CD": item_code,
             }
-            try:
-                data = await self._get(
+            return _raise_for_rt_cd(
+                await self._get(
                     "/uapi/overseas-stock/v1/trading/inquire-psamount",
                     headers=headers,
                     params=params,
                 )
-            except Exception as e:
-                psamount_errors.append(f"{candidate_order_code}:{str(e)}")
-                continue
+            )
 
-            if str(data.get("rt_cd", "1")) != "0":
-                msg = data.get("msg1") or data.get("msg_cd") or "unknown"
-                psamount_errors.append(f"{candidate_order_code}:{msg}")
-                continue
+        results, psamount_errors = await _fan_out_exchanges(codes, _fetch)
+        if not results and psamount_errors:
+            raise RuntimeError(f"KIS 매수가능금액 조회 실패: {' / '.join(psamount_errors[:3])}")
 
-            success_calls += 1
+        direct_ovrs = 0.0
+        direct_frcr = 0.0
+        for _, data in results:
             output = data.get("output") or {}
             if not isinstance(output, dict):
                 output = {}
             direct_ovrs = max(direct_ovrs, _to_float_or_zero(output.get("ovrs_ord_psbl_amt")))
             direct_frcr = max(direct_frcr, _to_float_or_zero(output.get("ord_psbl_frcr_amt")))
+        return direct_ovrs, direct_frcr
 
-        if success_calls == 0 and psamount_errors:
-            raise RuntimeError(f"KIS 매수가능금액 조회 실패: {' / '.join(psamount_errors[:3])}")
+    async def get_effective_overseas_orderable(self, symbol: str = "AAPL", order_price: float = 1.0) -> dict:
+        """
+        Return effective buying power for the symbol's KIS overseas market.
+        Amounts are reported in the market currency plus KRW conversion.
+        """
+        symbol_key = self._symbol_key(symbol)
+        symbol_code = self._symbol_code(symbol_key)
+        order_code = self._order_exchange_candidates(symbol_key)[0]
+        currency = self._currency_for_order_exchange(order_code)
+        order_price_text = _format_overseas_order_price(order_price, currency)
 
-        try:
-            integrated = await self.get_integrated_margin_currency_orderable(currency)
-        except Exception as e:
-            logger.warning(
-                "KIS integrated margin lookup failed, falling back to direct buying power",
-                symbol=symbol_key,
-                currency=currency,
-                error=str(e),
-            )
-            integrated = {
-                "currency": currency,
-                "mode_name": "",
-                "integrated_krw": 0.0,
-                "exchange_rate_krw": 0.0,
-                "integrated_local": 0.0,
-            }
+        async def _integrated() -> dict:
+            try:
+                return await self.get_integrated_margin_currency_orderable(currency)
+            except Exception as e:
+                logger.warning(
+                    "KIS integrated margin lookup failed, falling back to direct buying power",
+                    symbol=symbol_key,
+                    currency=currency,
+                    error=str(e),
+                )
+                return {
+                    "currency": currency,
+                    "mode_name": "",
+                    "integrated_krw": 0.0,
+                    "exchange_rate_krw": 0.0,
+                    "integrated_local": 0.0,
+                }
+
+        # Direct buying power (per exchange) and integrated margin are independent.
+        direct, integrated = await asyncio.gather(
+            self._direct_orderable(symbol_code, order_price_text, self._order_exchange_candidates(symbol_key)),
+            _integrated(),
+            return_exceptions=True,
+        )
+        if isinstance(direct, BaseException):
+            raise direct
+        if isinstance(integrated, BaseException):
+            raise integrated
+        direct_ovrs, direct_frcr = direct
 
         exchange_rate_krw = float(integrated.get("exchange_rate_krw", 0.0) or 0.0)
         integrated_local = float(integrated.get("integrated_local", 0.0) or 0.0)
@@ -1448,70 +2167,43 @@ class KISClient:
         Return effective USD buying power for overseas orders.
         Combines direct 해외주문가능금액 and 통합증거금 USD 가능금액.
         """
-        headers = await self._authorized_headers("TTTS3007R")
         symbol_upper = str(symbol or "").strip().upper()
         order_price_text = _format_us_order_price(order_price)
-        direct_ovrs_usd = 0.0
-        direct_frcr_usd = 0.0
-        psamount_errors = []
-        success_calls = 0
 
-        for order_code in self._order_exchange_candidates(symbol_upper):
-            params = {
-                "CANO": settings.kis_account_no,
-                "ACNT_PRDT_CD": settings.kis_account_product_code,
-                "OVRS_EXCG_CD": order_code,
-                "OVRS_ORD_UNPR": order_price_text,
-                "ITEM_CD": symbol_upper,
-            }
+        async def _integrated() -> tuple[dict, float]:
             try:
-                data = await self._get(
-                    "/uapi/overseas-stock/v1/trading/inquire-psamount",
-                    headers=headers,
-                    params=params,
-                )
+                integrated = await self.get_integrated_margin_usd_orderable()
+                return integrated, float(integrated.get("usd_itgr_orderable_usd", 0.0))
             except Exception as e:
-                psamount_errors.append(f"{order_code}:{str(e)}")
-                continue
-
-            if str(data.get("rt_cd", "1")) != "0":
-                msg = data.get("msg1") or data.get("msg_cd") or "unknown"
-                psamount_errors.append(f"{order_code}:{msg}")
-                continue
-
-            success_calls += 1
-            output = data.get("output") or {}
-            if not isinstance(output, dict):
-                output = {}
-
-            direct_ovrs_usd = max(direct_ovrs_usd, _to_float_or_zero(output.get("ovrs_ord_psbl_amt")))
-            direct_frcr_usd = max(direct_frcr_usd, _to_float_or_zero(output.get("ord_psbl_frcr_amt")))
-
-        if success_calls == 0 and psamount_errors:
-            raise RuntimeError(f"KIS 매수가능금액 조회 실패: {' / '.join(psamount_errors[:3])}")
-
-        try:
-            integrated = await self.get_integrated_margin_usd_orderable()
-            integrated_usd = float(integrated.get("usd_itgr_orderable_usd", 0.0))
-        except Exception as e:
-            logger.warning(
-                "KIS integrated margin lookup failed, falling back to direct buying power",
-                symbol=symbol_upper,
-                error=str(e),
-            )
-            integrated = {
-                "mode_name": "",
-                "usd_itgr_orderable_krw": 0.0,
-                "usd_exrt": 0.0,
-                "usd_itgr_orderable_usd": 0.0,
-                "stock_cash_objt_krw": 0.0,
-                "stock_eval_objt_krw": 0.0,
-                "stock_cash_use_krw": 0.0,
-                "stock_eval_use_krw": 0.0,
-                "total_asset_objt_krw": 0.0,
-                "total_asset_use_krw": 0.0,
-            }
-            integrated_usd = 0.0
+                logger.warning(
+                    "KIS integrated margin lookup failed, falling back to direct buying power",
+                    symbol=symbol_upper,
+                    error=str(e),
+                )
+                return {
+                    "mode_name": "",
+                    "usd_itgr_orderable_krw": 0.0,
+                    "usd_exrt": 0.0,
+                    "usd_itgr_orderable_usd": 0.0,
+                    "stock_cash_objt_krw": 0.0,
+                    "stock_eval_objt_krw": 0.0,
+                    "stock_cash_use_krw": 0.0,
+                    "stock_eval_use_krw": 0.0,
+                    "total_asset_objt_krw": 0.0,
+                    "total_asset_use_krw": 0.0,
+                }, 0.0
+
+        direct, integrated_result = await asyncio.gather(
+            self._direct_orderable(symbol_upper, order_price_text, self._order_exchange_candidates(symbol_upper)),
+            _integrated(),
+            return_exceptions=True,
+        )
+        if isinstance(direct, BaseException):
+            raise direct
+        if isinstance(integrated_result, BaseException):
+            raise integrated_result
+        direct_ovrs_usd, direct_frcr_usd = direct
+        integrated, integrated_usd = integrated_result
 
         effective_usd = max(direct_ovrs_usd, direct_frcr_usd, integrated_usd)
 
@@ -1560,7 +2252,7 @@ class KISClient:
         # Resolve quote exchange before choosing the order exchange. Many ETFs
         # are not NASDAQ-listed, and KIS requires the matching order venue.
         if limit_price is None:
-            quote = await self.get_quote_snapshot(symbol_key)
+            quote = await self.get_quote_snapshot(symbol_key, max_age_seconds=0)
             px = float(quote.get("price", 0.0) or 0.0)
         else:
             px = float(limit_price)
@@ -1596,12 +2288,16 @@ class KISClient:
             "ORD_SVR_DVSN_CD": "0",
         }
 
-        data = await self._request_json(
-            "POST",
-            settings.kis_order_path,
-            headers=headers,
-            json=body,
-        )
+        try:
+            data = await self._request_json(
+                "POST",
+                settings.kis_order_path,
+                headers=headers,
+                json=body,
+            )
+        finally:
+            # Even a failed/timeout POST may have reached KIS.
+            self.invalidate_balance_cache()
 
         if str(data.get("rt_cd", "1")) != "0":
             msg = data.get("msg1") or data.get("msg_cd") or "unknown"
@@ -1625,7 +2321,7 @@ class KISClient:
         last_error = ""
 
         for attempt in range(max_attempts):
-            quote = await self.get_quote_snapshot(symbol_key)
+            quote = await self.get_quote_snapshot(symbol_key, max_age_seconds=0)
             currency = str(
                 quote.get("currency")
                 or self._currency_for_order_exchange(self._order_exchange_candidates(symbol_key)[0])
@@ -1861,7 +2557,7 @@ class KISClient:
         pre_balance = await self.get_symbol_balance(symbol_key)
         pre_qty = int(pre_balance.get("qty", 0))
 
-        quote = await self.get_quote_snapshot(symbol_key)
+        quote = await self.get_quote_snapshot(symbol_key, max_age_seconds=0)
         currency = str(quote.get("currency") or self._currency_for_order_exchange(self._order_exchange_candidates(symbol_key)[0]))
         price = float(quote.get("price", 0.0) or 0.0)
         order_price = _buffered_sell_limit_price(price, currency, min_limit_price=min_limit_price)
@@ -2065,10 +2761,17 @@ class KISClient:
             "raw": output,
         }
 
-    async def get_domestic_balance(self) -> list[dict]:
+    async def get_domestic_balance(self, *, max_age_seconds: Optional[float] = None) -> list[dict]:
         """
-        Query KIS domestic balance rows.
+        Query KIS domestic balance rows (cached briefly like overseas balances).
         """
+        return await self._cached_balance_rows(
+            ("KRX", "KRW"),
+            self._fetch_domestic_balance_rows,
+            max_age_seconds,
+        )
+
+    async def _fetch_domestic_balance_rows(self) -> list[dict]:
         base_headers = await self._authorized_headers("TTTC8434R")
         rows_out: list[dict] = []
         fk100 = ""
@@ -2115,38 +2818,16 @@ class KISClient:
 
         return rows_out
 
-    async def get_domestic_symbol_balance(self, symbol: str) -> dict:
+    async def get_domestic_symbol_balance(
+        self,
+        symbol: str,
+        *,
+        max_age_seconds: Optional[float] = None,
+    ) -> dict:
         """Return simplified KRX/domestic per-symbol balance snapshot."""
         symbol_code = _normalize_domestic_symbol(symbol)
-        rows = await self.get_domestic_balance()
-        for row in rows:
-            pdno = str(row.get("pdno") or row.get("PDNO") or "").strip()
-            if pdno != symbol_code:
-                continue
-            return {
-                "symbol": symbol_code,
-                "qty": _to_int_or_zero(row.get("hldg_qty")),
-                "orderable_qty": _to_int_or_zero(row.get("ord_psbl_qty")),
-                "avg_price": round(_to_float_or_zero(row.get("pchs_avg_pric")), 6),
-                "price": round(_to_float_or_zero(row.get("prpr")), 6),
-                "purchase_amount": round(_to_float_or_zero(row.get("pchs_amt")), 2),
-                "eval_amount": round(_to_float_or_zero(row.get("evlu_amt")), 2),
-                "eval_pnl": round(_to_float_signed_or_zero(row.get("evlu_pfls_amt")), 2),
-                "eval_pnl_pct": round(_to_float_signed_or_zero(row.get("evlu_pfls_rt")), 4),
-                "raw": row,
-            }
-        return {
-            "symbol": symbol_code,
-            "qty": 0,
-            "orderable_qty": 0,
-            "avg_price": 0.0,
-            "price": 0.0,
-            "purchase_amount": 0.0,
-            "eval_amount": 0.0,
-            "eval_pnl": 0.0,
-            "eval_pnl_pct": 0.0,
-            "raw": None,
-        }
+        rows = await self.get_domestic_balance(max_age_seconds=max_age_seconds)
+        return _match_domestic_holding(rows, symbol_code)
 
     async def place_domestic_cash_order(
         self,
@@ -2187,12 +2868,15 @@ class KISClient:
             "SLL_TYPE": "01" if side_upper == "SELL" else "",
             "CNDT_PRIC": "",
         }
-        data = await self._request_json(
-            "POST",
-            settings.kis_domestic_order_path,
-            headers=headers,
-            json=body,
-        )
+        try:
+            data = await self._request_json(
+                "POST",
+                settings.kis_domestic_order_path,
+                headers=headers,
+                json=body,
+            )
+        finally:
+            self.invalidate_balance_cache()
         if str(data.get("rt_cd", "1")) != "0":
             msg = data.get("msg1") or data.get("msg_cd") or "unknown"
             raise RuntimeError(f"KIS 국내 주문 실패: {msg}")
@@ -2297,14 +2981,23 @@ class KISClient:
         poll_delay_seconds: float = 1.5,
     ) -> dict:
         """
-        Poll domestic order history and balance delta to confirm KRX order fill.
+        Confirm a KRX order fill: execution notices first, then domestic
+        order history and balance delta polling on the adaptive schedule.
         """
         symbol_code = _normalize_domestic_symbol(symbol)
         side_upper = str(side or "").strip().upper()
+        # Offsets and recorded latencies count from here (just after submit).
+        started = time.monotonic()
+        latency_model = get_fill_latency_model()
+        pushed = await self._await_fill_notice(DOMESTIC_MARKET, order_id, expected_qty)
+        if pushed is not None:
+            if pushed.get("state") == "filled":
+                latency_model.record("KRX", time.monotonic() - started)
+            return self._note_fill(pushed)
         now_kst = datetime.now(timezone.utc).astimezone(timezone(timedelta(hours=9)))
         ymd = now_kst.strftime("%Y%m%d")
 
-        for idx in range(max(1, poll_count)):
+        async def history_fill() -> Optional[dict]:
             try:
                 rows = await self.get_domestic_order_history(
                     start_ymd=ymd,
@@ -2314,53 +3007,77 @@ class KISClient:
                     side_code="02" if side_upper == "BUY" else "01",
                     filled_code="00",
                 )
-                for row in rows:
-                    if str(row.get("odno") or "").strip() != str(order_id or "").strip():
-                        continue
-                    filled_qty = _to_int_or_zero(row.get("tot_ccld_qty"))
-                    total_qty = _to_int_or_zero(row.get("tot_ord_qty") or row.get("ord_qty") or expected_qty)
-                    remaining_qty = _to_int_or_zero(row.get("rmn_qty"))
-                    fill_price = _to_float_or_zero(row.get("avg_prvs") or row.get("pchs_avg_pric"))
-                    fill_amount = _to_float_or_zero(row.get("tot_ccld_amt") or row.get("prsm_tlex_smtl"))
-                    if fill_amount <= 0 and fill_price > 0 and filled_qty > 0:
-                        fill_amount = fill_price * filled_qty
-                    if filled_qty > 0:
-                        return {
-                            "state": "filled" if remaining_qty == 0 else "partial",
-                            "filled_qty": filled_qty,
-                            "unfilled_qty": max(0, total_qty - filled_qty, remaining_qty),
-                            "fill_price": round(fill_price, 6),
-                            "fill_amount": round(fill_amount, 2),
-                            "raw": row,
-                        }
             except Exception as e:
                 logger.debug("KIS domestic history polling failed", symbol=symbol_code, error=str(e))
+                return None
+            for row in rows:
+                if str(row.get("odno") or "").strip() != str(order_id or "").strip():
+                    continue
+                filled_qty = _to_int_or_zero(row.get("tot_ccld_qty"))
+                total_qty = _to_int_or_zero(row.get("tot_ord_qty") or row.get("ord_qty") or expected_qty)
+                remaining_qty = _to_int_or_zero(row.get("rmn_qty"))
+                fill_price = _to_float_or_zero(row.get("avg_prvs") or row.get("pchs_avg_pric"))
+                fill_amount = _to_float_or_zero(row.get("tot_ccld_amt") or row.get("prsm_tlex_smtl"))
+                if fill_amount <= 0 and fill_price > 0 and filled_qty > 0:
+                    fill_amount = fill_price * filled_qty
+                if filled_qty > 0:
+                    return {
+                        "state": "filled" if remaining_qty == 0 else "partial",
+                        "filled_qty": filled_qty,
+                        "unfilled_qty": max(0, total_qty - filled_qty, remaining_qty),
+                        "fill_price": round(fill_price, 6),
+                        "fill_amount": round(fill_amount, 2),
+                        "raw": row,
+                    }
+            return None
 
+        async def balance_fill() -> Optional[dict]:
+            if pre_qty is None:
+                return None
             try:
-                if pre_qty is not None:
-                    balance = await self.get_domestic_symbol_balance(symbol_code)
-                    now_qty = int(balance.get("qty", 0) or 0)
-                    avg_price = float(balance.get("avg_price", 0.0) or 0.0)
-                    if side_upper == "BUY":
-                        delta = max(0, now_qty - pre_qty)
-                    else:
-                        delta = max(0, pre_qty - now_qty)
-                    if delta > 0:
-                        qty = min(int(expected_qty), int(delta))
-                        price = avg_price if avg_price > 0 else float(balance.get("price", 0.0) or 0.0)
-                        return {
-                            "state": "filled_via_balance",
-                            "filled_qty": qty,
-                            "unfilled_qty": max(0, int(expected_qty) - qty),
-                            "fill_price": round(price, 6),
-                            "fill_amount": round(price * qty, 2) if price > 0 else 0.0,
-                            "raw": balance.get("raw"),
-                        }
+                balance = await self.get_domestic_symbol_balance(symbol_code, max_age_seconds=0)
             except Exception:
-                pass
+                return None
+            now_qty = int(balance.get("qty", 0) or 0)
+            avg_price = float(balance.get("avg_price", 0.0) or 0.0)
+            if side_upper == "BUY":
+                delta = max(0, now_qty - pre_qty)
+            else:
+                delta = max(0, pre_qty - now_qty)
+            if delta <= 0:
+                return None
+            qty = min(int(expected_qty), int(delta))
+            price = avg_price if avg_price > 0 else float(balance.get("price", 0.0) or 0.0)
+            return {
+                "state": "filled_via_balance",
+                "filled_qty": qty,
+                "unfilled_qty": max(0, int(expected_qty) - qty),
+                "fill_price": round(price, 6),
+                "fill_amount": round(price * qty, 2) if price > 0 else 0.0,
+                "raw": balance.get("raw"),
+            }
 
-            if idx < poll_count - 1:
-                await asyncio.sleep(max(0.2, poll_delay_seconds))
+        missed_at = time.monotonic() - started
+        offsets = latency_model.poll_offsets(
+            "KRX",
+            max(1, poll_count),
+            max(0.2, poll_delay_seconds) * (max(1, poll_count) - 1),
+            elapsed_seconds=missed_at,
+        )
+        for offset in offsets:
+            delay = offset - (time.monotonic() - started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            polled_at = time.monotonic() - started
+            history, balance = await asyncio.gather(history_fill(), balance_fill())
+            if history is not None:
+                if history["state"] == "filled":
+                    latency_model.record("KRX", (missed_at + polled_at) / 2)
+                return self._note_fill(history)
+            if balance is not None:
+                return balance
+            missed_at = polled_at
 
         return {
             "state": "unknown",
@@ -2374,7 +3091,7 @@ class KISClient:
     async def place_domestic_buy_by_amount(self, symbol: str, amount_krw: float) -> dict:
         """Buy a domestic/KRX symbol using an approximate KRW target amount."""
         symbol_code = _normalize_domestic_symbol(symbol)
-        price = await self.get_domestic_quote_price(symbol_code)
+        price = await self.get_domestic_quote_price(symbol_code, max_age_seconds=0)
         qty = max(1, int(float(amount_krw or 0.0) // float(price)))
 
         pre_balance = await self.get_domestic_symbol_balance(symbol_code)
@@ -2489,6 +3206,8 @@ class KISClient:
         }
 
     async def close(self):
+        if self._fill_notices is not None:
+            await self._fill_notices.stop()
         if self._client is not None:
             await self._client.aclose()
             self._client = None
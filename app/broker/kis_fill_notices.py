@@ -0,0 +1,491 @@
+"""
+KIS real-time execution notices (체결통보) over websocket.
+
+One subscriber per process keeps a websocket open, subscribes the account's
+execution-notice TRs and folds every notice into a per-order state, keyed
+by market and order number (KRX and overseas order numbers come from
+separate sequences and can collide). The
+order paths await that state right after submitting instead of polling
+inquire-ccnl / inquire-nccs; polling stays as the fallback when no notice
+arrives in time or the socket is down.
+
+Wire format (KIS): text frames are either JSON control messages (subscribe
+ack carrying the AES key/iv, PINGPONG) or `flag|tr_id|count|payload`, where
+flag 1 means the payload is AES-256-CBC encrypted and base64 encoded, and
+the decrypted payload is `^`-separated fields.
+"""
+
+import asyncio
+import base64
+import json
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Optional
+
+from cryptography.hazmat.primitives import padding
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+import structlog
+import websockets
+
+logger = structlog.get_logger()
+
+# Field layouts of the execution-notice TRs (real / paper share a layout).
+_OVERSEAS_FIELDS = (
+    "CUST_ID", "ACNT_NO", "ODER_NO", "OODER_NO", "SELN_BYOV_CLS", "RCTF_CLS",
+    "ODER_KIND2", "STCK_SHRN_ISCD", "CNTG_QTY", "CNTG_UNPR", "STCK_CNTG_HOUR",
+    "RFUS_YN", "CNTG_YN", "ACPT_YN", "BRNC_NO", "ODER_QTY", "ACNT_NAME",
+    "CNTG_ISNM", "ODER_COND", "DEBT_GB", "DEBT_DATE", "START_TM", "END_TM",
+    "TM_DIV_TP", "CNTG_UNPR12",
+)
+_DOMESTIC_FIELDS = (
+    "CUST_ID", "ACNT_NO", "ODER_NO", "OODER_NO", "SELN_BYOV_CLS", "RCTF_CLS",
+    "ODER_KIND", "ODER_COND", "STCK_SHRN_ISCD", "CNTG_QTY", "CNTG_UNPR",
+    "STCK_CNTG_HOUR", "RFUS_YN", "CNTG_YN", "ACPT_YN", "BRNC_NO", "ODER_QTY",
+    "ACNT_NAME", "ORD_COND_PRC", "ORD_EXG_GB", "POPUP_YN", "FILLER", "CRDT_CLS",
+    "CRDT_LOAN_DATE", "CNTG_ISNM40", "ODER_PRC",
+)
+NOTICE_FIELDS = {
+    "H0GSCNI0": _OVERSEAS_FIELDS,
+    "H0GSCNI9": _OVERSEAS_FIELDS,
+    "H0STCNI0": _DOMESTIC_FIELDS,
+    "H0STCNI9": _DOMESTIC_FIELDS,
+}
+OVERSEAS_MARKET = "overseas"
+DOMESTIC_MARKET = "domestic"
+NOTICE_MARKETS = {
+    "H0GSCNI0": OVERSEAS_MARKET,
+    "H0GSCNI9": OVERSEAS_MARKET,
+    "H0STCNI0": DOMESTIC_MARKET,
+    "H0STCNI9": DOMESTIC_MARKET,
+}
+
+_MAX_TRACKED_ORDERS = 512
+_ORDER_STATE_TTL_SECONDS = 600.0
+
+
+def normalize_order_id(order_id) -> str:
+    """REST ODNO and notice ODER_NO differ in zero padding."""
+    return str(order_id or "").strip().lstrip("0")
+
+
+def _to_float(value) -> float:
+    try:
+        return float(str(value or "").replace(",", "").strip() or 0.0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def decrypt_notice(payload: str, key: str, iv: str) -> str:
+    """Decrypt one AES-256-CBC, base64 encoded notice payload."""
+    decryptor = Cipher(algorithms.AES(key.encode("utf-8")), modes.CBC(iv.encode("utf-8"))).decryptor()
+    padded = decryptor.update(base64.b64decode(payload)) + decryptor.finalize()
+    unpadder = padding.PKCS7(128).unpadder()
+    return (unpadder.update(padded) + unpadder.finalize()).decode("utf-8")
+
+
+def encrypt_notice(plain: str, key: str, iv: str) -> str:
+    """Inverse of decrypt_notice (used by the local stand-in server)."""
+    padder = padding.PKCS7(128).padder()
+    padded = padder.update(plain.encode("utf-8")) + padder.finalize()
+    encryptor = Cipher(algorithms.AES(key.encode("utf-8")), modes.CBC(iv.encode("utf-8"))).encryptor()
+    return base64.b64encode(encryptor.update(padded) + encryptor.finalize()).decode("ascii")
+
+
+@dataclass
+class FillNotice:
+    """One parsed execution notice."""
+
+    tr_id: str
+    order_id: str
+    symbol: str
+    side: str  # BUY | SELL
+    qty: int  # executed qty for fills, order qty otherwise
+    price: float
+    order_qty: int
+    filled: bool  # CNTG_YN == 2 (execution), otherwise an order ack
+    rejected: bool
+    raw: dict = field(default_factory=dict)
+
+    @property
+    def market(self) -> str:
+        return NOTICE_MARKETS.get(self.tr_id, "")
+
+
+def parse_notice_fields(tr_id: str, values: list[str]) -> Optional[FillNotice]:
+    names = NOTICE_FIELDS.get(tr_id)
+    if not names:
+        return None
+    row = dict(zip(names, values))
+    order_id = normalize_order_id(row.get("ODER_NO"))
+    if not order_id:
+        return None
+    filled = str(row.get("CNTG_YN", "")).strip() == "2"
+    return FillNotice(
+        tr_id=tr_id,
+        order_id=order_id,
+        symbol=str(row.get("STCK_SHRN_ISCD", "")).strip().upper(),
+        side="SELL" if str(row.get("SELN_BYOV_CLS", "")).strip() == "01" else "BUY",
+        qty=int(_to_float(row.get("CNTG_QTY"))),
+        price=_to_float(row.get("CNTG_UNPR")),
+        order_qty=int(_to_float(row.get("ODER_QTY"))),
+        filled=filled,
+        rejected=str(row.get("RFUS_YN", "")).strip() == "1",
+        raw=row,
+    )
+
+
+class OrderNoticeState:
+    """Cumulative execution state of one order as seen through notices."""
+
+    def __init__(self):
+        self.filled_qty = 0
+        self.fill_amount = 0.0
+        self.order_qty = 0
+        self.rejected = False
+        self.notices: list[FillNotice] = []
+        self.updated_at = time.monotonic()
+        self.changed = asyncio.Event()
+
+    @property
+    def fill_price(self) -> float:
+        return self.fill_amount / self.filled_qty if self.filled_qty > 0 else 0.0
+
+    def apply(self, notice: FillNotice) -> None:
+        self.notices.append(notice)
+        self.updated_at = time.monotonic()
+        if notice.order_qty > 0:
+            self.order_qty = notice.order_qty
+        if notice.rejected:
+            self.rejected = True
+        elif notice.filled and notice.qty > 0:
+            self.filled_qty += notice.qty
+            self.fill_amount += notice.qty * notice.price
+        self.changed.set()
+
+    def settled(self, expected_qty: int) -> bool:
+        return self.rejected or (expected_qty > 0 and self.filled_qty >= expected_qty)
+
+    def outcome(self, expected_qty: int) -> dict:
+        if self.rejected and self.filled_qty <= 0:
+            state = "closed_unfilled"
+        elif self.filled_qty >= expected_qty:
+            state = "filled"
+        else:
+            state = "partial"
+        return {
+            "state": state,
+            "filled_qty": self.filled_qty,
+            "unfilled_qty": max(0, expected_qty - self.filled_qty),
+            "fill_price": round(self.fill_price, 6),
+            "fill_amount": round(self.fill_amount, 2),
+            "status_name": "NOTICE_REJECTED" if self.rejected else "NOTICE_FILLED",
+            "raw": self.notices[-1].raw if self.notices else None,
+        }
+
+
+class KISFillNoticeSubscriber:
+    """
+    Websocket subscriber for KIS execution notices.
+
+    Notices are kept per order for a while even when nobody is waiting yet:
+    a market order can fill before the REST submit response is processed.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        approval_key: Callable[[], Awaitable[str]],
+        hts_id: str,
+        tr_ids: list[str],
+        *,
+        custtype: str = "P",
+        on_fill: Optional[Callable[[FillNotice], None]] = None,
+        reconnect_delay_seconds: float = 1.0,
+        reconnect_max_delay_seconds: float = 30.0,
+    ):
+        self.url = url
+        self._approval_key = approval_key
+        self.hts_id = hts_id
+        self.tr_ids = [tr_id for tr_id in tr_ids if tr_id in NOTICE_FIELDS]
+        self.custtype = custtype
+        self._on_fill = on_fill
+        self.reconnect_delay_seconds = max(0.05, float(reconnect_delay_seconds))
+        self.reconnect_max_delay_seconds = max(self.reconnect_delay_seconds, float(reconnect_max_delay_seconds))
+        self._orders: "OrderedDict[tuple[str, str], OrderNoticeState]" = OrderedDict()
+        self._ciphers: dict[str, tuple[str, str]] = {}
+        self._subscribed: set[str] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._ready = asyncio.Event()
+
+    @property
+    def ready(self) -> bool:
+        """True while the socket is open and every TR subscription is acked."""
+        return self._ready.is_set()
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def wait_ready(self, timeout: float) -> bool:
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        self._ready.clear()
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    def _state(self, market: str, order_id: str) -> OrderNoticeState:
+        key = (market, normalize_order_id(order_id))
+        state = self._orders.get(key)
+        if state is None:
+            state = OrderNoticeState()
+            self._orders[key] = state
+        self._orders.move_to_end(key)
+        self._prune()
+        return state
+
+    def _prune(self) -> None:
+        cutoff = time.monotonic() - _ORDER_STATE_TTL_SECONDS
+        while self._orders:
+            oldest_key, oldest = next(iter(self._orders.items()))
+            if len(self._orders) <= _MAX_TRACKED_ORDERS and oldest.updated_at >= cutoff:
+                break
+            self._orders.pop(oldest_key)
+
+    def handle_notice(self, notice: FillNotice) -> None:
+        self._state(notice.market, notice.order_id).apply(notice)
+        if notice.filled and self._on_fill is not None:
+            self._on_fill(notice)
+        logger.info(
+            "KIS execution notice",
+            order_id=notice.order_id,
+            market=notice.market,
+            symbol=notice.symbol,
+            side=notice.side,
+            filled=notice.filled,
+            rejected=notice.rejected,
+            qty=notice.qty,
+            price=notice.price,
+        )
+
+    async def wait_for_fill(
+        self,
+        market: str,
+        order_id: str,
+        expected_qty: int,
+        timeout: float,
+    ) -> Optional[dict]:
+        """
+        Wait until notices for market's order_id account for expected_qty (or
+        a rejection). Returns the outcome, or None when the order is not
+        settled within timeout (callers then fall back to polling).
+        """
+        state = self._state(market, order_id)
+        deadline = time.monotonic() + max(0.0, timeout)
+        while not state.settled(expected_qty):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            state.changed.clear()
+            try:
+                await asyncio.wait_for(state.changed.wait(), remaining)
+            except asyncio.TimeoutError:
+                return None
+        return state.outcome(expected_qty)
+
+    def _subscribe_message(self, approval_key: str, tr_id: str) -> str:
+        return json.dumps(
+            {
+                "header": {
+                    "approval_key": approval_key,
+                    "custtype": self.custtype,
+                    "tr_type": "1",
+                    "content-type": "utf-8",
+                },
+                "body": {"input": {"tr_id": tr_id, "tr_key": self.hts_id}},
+            }
+        )
+
+    async def _handle_control(self, ws, message: str) -> None:
+        try:
+            data = json.loads(message)
+        except ValueError:
+            logger.warning("Unparseable KIS websocket message", message=message[:200])
+            return
+        header = data.get("header") or {}
+        tr_id = str(header.get("tr_id") or "")
+        if tr_id == "PINGPONG":
+            await ws.send(message)
+            return
+        body = data.get("body") or {}
+        if str(body.get("rt_cd", "")) != "0":
+            logger.warning("KIS websocket subscribe failed", tr_id=tr_id, msg=body.get("msg1"))
+            return
+        output = body.get("output") or {}
+        if output.get("key") and output.get("iv"):
+            self._ciphers[tr_id] = (str(output["key"]), str(output["iv"]))
+        self._subscribed.add(tr_id)
+        if self._subscribed.issuperset(self.tr_ids):
+            self._ready.set()
+
+    def _handle_data(self, message: str) -> None:
+        parts = message.split("|", 3)
+        if len(parts) < 4:
+            return
+        encrypted, tr_id, _count, payload = parts
+        if tr_id not in NOTICE_FIELDS:
+            return
+        if encrypted == "1":
+            cipher = self._ciphers.get(tr_id)
+            if cipher is None:
+                logger.warning("KIS notice arrived before its cipher key", tr_id=tr_id)
+                return
+            payload = decrypt_notice(payload, *cipher)
+        notice = parse_notice_fields(tr_id, payload.split("^"))
+        if notice is not None:
+            self.handle_notice(notice)
+
+    async def _session(self) -> None:
+        approval_key = await self._approval_key()
+        async with websockets.connect(self.url, ping_interval=None) as ws:
+            self._subscribed.clear()
+            for tr_id in self.tr_ids:
+                await ws.send(self._subscribe_message(approval_key, tr_id))
+            async for message in ws:
+                if isinstance(message, bytes):
+                    message = message.decode("utf-8", errors="replace")
+                if message[:1] in ("0", "1"):
+                    self._handle_data(message)
+                else:
+                    await self._handle_control(ws, message)
+
+    async def _run(self) -> None:
+        delay = self.reconnect_delay_seconds
+        while True:
+            started = time.monotonic()
+            try:
+                await self._session()
+                logger.warning("KIS execution notice socket closed; reconnecting")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("KIS execution notice socket error", error=str(e))
+            finally:
+                self._ready.clear()
+            if time.monotonic() - started > 60.0:
+                delay = self.reconnect_delay_seconds
+            await asyncio.sleep(delay)
+            delay = min(self.reconnect_max_delay_seconds, delay * 2)
+
+
+class LocalNoticeServer:
+    """
+    Local stand-in for the KIS websocket: acks subscriptions with an AES
+    key/iv and pushes execution notices on demand. Used by tests and for
+    running the worker against a fake feed.
+    """
+
+    def __init__(self, key: str = "0123456789abcdef0123456789abcdef", iv: str = "abcdef0123456789"):
+        self.key = key
+        self.iv = iv
+        self.subscriptions: list[dict] = []
+        self.pongs: list[str] = []
+        self._connections: set = set()
+        self._server = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f"ws://{host}:{port}"
+
+    async def start(self) -> "LocalNoticeServer":
+        from websockets.asyncio.server import serve
+
+        self._server = await serve(self._handler, "127.0.0.1", 0)
+        return self
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def drop_connections(self) -> None:
+        for connection in list(self._connections):
+            await connection.close()
+
+    async def _handler(self, connection) -> None:
+        self._connections.add(connection)
+        try:
+            async for message in connection:
+                data = json.loads(message)
+                tr_id = str((data.get("header") or {}).get("tr_id") or "")
+                if tr_id == "PINGPONG":
+                    self.pongs.append(message)
+                    continue
+                self.subscriptions.append(data)
+                tr_id = data["body"]["input"]["tr_id"]
+                await connection.send(
+                    json.dumps(
+                        {
+                            "header": {"tr_id": tr_id, "tr_key": data["body"]["input"]["tr_key"], "encrypt": "N"},
+                            "body": {
+                                "rt_cd": "0",
+                                "msg_cd": "OPSP0000",
+                                "msg1": "SUBSCRIBE SUCCESS",
+                                "output": {"iv": self.iv, "key": self.key},
+                            },
+                        }
+                    )
+                )
+        except Exception:
+            pass
+        finally:
+            self._connections.discard(connection)
+
+    async def _broadcast(self, message: str) -> None:
+        for connection in list(self._connections):
+            await connection.send(message)
+
+    async def ping(self) -> None:
+        await self._broadcast(json.dumps({"header": {"tr_id": "PINGPONG", "datetime": "20260101090000"}}))
+
+    async def push_notice(
+        self,
+        tr_id: str,
+        order_id: str,
+        symbol: str,
+        *,
+        side: str = "BUY",
+        qty: int = 0,
+        price: float = 0.0,
+        order_qty: int = 0,
+        filled: bool = True,
+        rejected: bool = False,
+        encrypted: bool = True,
+    ) -> None:
+        values = {
+            "ODER_NO": str(order_id),
+            "SELN_BYOV_CLS": "01" if side.upper() == "SELL" else "02",
+            "STCK_SHRN_ISCD": symbol,
+            "CNTG_QTY": str(qty),
+            "CNTG_UNPR": str(price),
+            "ODER_QTY": str(order_qty or qty),
+            "CNTG_YN": "2" if filled else "1",
+            "RFUS_YN": "1" if rejected else "0",
+            "ACPT_YN": "2",
+        }
+        payload = "^".join(values.get(name, "") for name in NOTICE_FIELDS[tr_id])
+        if encrypted:
+            payload = encrypt_notice(payload, self.key, self.iv)
+        await self._broadcast(f"{1 if encrypted else 0}|{tr_id}|001|{payload}")
@@ -0,0 +1,453 @@
+"""
+Account-wide KIS holdings -> DB OPEN(KIS) position reconciliation.
+
+One broker snapshot (KISClient.get_holdings_snapshot) and one read of every
+OPEN synthetic position are diffed into a plan. For each symbol, the plan
+closes DB rows, oldest first, when the DB holds more than KIS. It adds a
+synthetic BUY position and trade when KIS holds more. apply_kis_reconcile_plan()
+writes the whole plan in one transaction with bulk INSERT/UPDATE statements.
+
+The scheduler job and scripts/reconcile_kis_positions.py (--dry-run prints the
+plan only) share this engine. The per-symbol _reconcile_kis_*_to_db helpers in
+order_executor still serve the order paths that reconcile one symbol right
+after a BUY/SELL attempt.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Optional
+
+import structlog
+from sqlalchemy import insert, select, update
+
+from app.broker.order_executor import _kis_synthetic_order_id
+from app.config import settings
+from app.database.connection import get_session
+from app.gateway.symbol_mapper import is_kis_domestic_symbol, trade_symbol_code
+from app.models.position import Position, PositionStatus, POSITION_IS_OPEN, POSITION_IS_SYNTHETIC
+from app.models.trade import Trade, TradeSide, TradeStatus
+from app.risk.pnl_rollup import fold_fills_statement
+from app.risk.portfolio_ledger import sync_ledger_ticker
+
+logger = structlog.get_logger()
+
+# Same tolerances as the scheduler job and the per-symbol helpers.
+MISMATCH_TOLERANCE = 0.001
+_CLOSE_TOLERANCE = 0.0001
+
+
+@dataclass
+class PositionClose:
+    """One OPEN row (partly) closed at its entry price."""
+
+    position_id: int
+    qty: float
+    amount: float
+    full: bool
+    entry_price: float
+    entry_time: datetime
+    entry_order_id: Optional[int]
+    remaining_qty: float = 0.0
+    remaining_amount: float = 0.0
+
+
+@dataclass
+class SymbolReconcile:
+    symbol: str
+    broker_qty: float
+    db_qty: float
+    broker_avg: float = 0.0
+    closes: list[PositionClose] = field(default_factory=list)
+    add_qty: float = 0.0
+    add_price: float = 0.0
+    error: Optional[str] = None
+    # {position id: qty} the plan was computed from, re-checked before writing.
+    db_rows: dict[int, float] = field(default_factory=dict)
+
+    @property
+    def domestic(self) -> bool:
+        return is_kis_domestic_symbol(self.symbol)
+
+    @property
+    def closed_qty(self) -> float:
+        return round(sum(item.qty for item in self.closes), 4)
+
+    @property
+    def add_amount(self) -> float:
+        return round(self.add_qty * self.add_price, 2)
+
+    @property
+    def changed(self) -> bool:
+        return self.error is None and (self.add_qty > 0 or bool(self.closes))
+
+    def as_result(self) -> dict:
+        """Same shape as the per-symbol _reconcile_kis_*_to_db results."""
+        if self.error:
+            return {"ok": False, "error": self.error}
+        result = {
+            "ok": True,
+            "reconciled": self.changed,
+            "added_qty": self.add_qty,
+            "closed_qty": self.closed_qty,
+        }
+        if self.add_qty > 0:
+            result.update(price=round(self.add_price, 8), amount=self.add_amount)
+        return result
+
+
+@dataclass
+class KisReconcilePlan:
+    items: list[SymbolReconcile] = field(default_factory=list)
+    broker_symbols: int = 0
+    db_symbols: int = 0
+    symbols_checked: int = 0
+    # Symbols whose balance could not be read from the snapshot.
+    unreadable: list[str] = field(default_factory=list)
+    snapshot_errors: list[str] = field(default_factory=list)
+    applied: bool = False
+
+    @property
+    def changes(self) -> list[SymbolReconcile]:
+        return [item for item in self.items if item.changed]
+
+    @property
+    def errors(self) -> list[tuple[str, str]]:
+        return [(item.symbol, item.error) for item in self.items if item.error]
+
+    @property
+    def added_total(self) -> float:
+        return sum(item.add_qty for item in self.changes)
+
+    @property
+    def closed_total(self) -> float:
+        return sum(item.closed_qty for item in self.changes)
+
+
+def plan_symbol_reconcile(
+    symbol: str,
+    broker_qty: float,
+    broker_avg: float,
+    open_rows: list,
+) -> SymbolReconcile:
+    """
+    Diff one symbol's KIS quantity against its OPEN rows (oldest first).
+    open_rows carry id, qty, entry_price, entry_amount_usd, entry_time and
+    entry_order_id. A missing add price is left at 0 for the caller to quote.
+    """
+    amount_digits = 2 if is_kis_domestic_symbol(symbol) else 8
+    db_qty = sum(float(row.qty or 0.0) for row in open_rows)
+    item = SymbolReconcile(
+        symbol=symbol,
+        broker_qty=broker_qty,
+        db_qty=db_qty,
+        broker_avg=broker_avg,
+        db_rows={row.id: float(row.qty or 0.0) for row in open_rows},
+    )
+
+    if db_qty > broker_qty + _CLOSE_TOLERANCE:
+        qty_to_close = round(db_qty - broker_qty, 4)
+        for row in open_rows:
+            if qty_to_close <= 0:
+                break
+            pos_qty = float(row.qty or 0.0)
+            if pos_qty <= 0:
+                continue
+            close_qty = min(pos_qty, qty_to_close)
+            entry_amount = float(row.entry_amount_usd or 0.0)
+            full = close_qty >= pos_qty - _CLOSE_TOLERANCE
+            close_amount = entry_amount if full else round((entry_amount / pos_qty) * close_qty, amount_digits)
+            item.closes.append(
+                PositionClose(
+                    position_id=row.id,
+                    qty=close_qty,
+                    amount=close_amount,
+                    full=full,
+                    entry_price=row.entry_price,
+                    entry_time=row.entry_time,
+                    entry_order_id=row.entry_order_id,
+                    remaining_qty=0.0 if full else round(pos_qty - close_qty, 4),
+                    remaining_amount=0.0 if full else round(entry_amount - close_amount, amount_digits),
+                )
+            )
+            qty_to_close = round(qty_to_close - close_qty, 4)
+        db_qty = round(db_qty - item.closed_qty, 4)
+
+    diff = round(broker_qty - db_qty, 4)
+    if diff > 0:
+        item.add_qty = diff
+        item.add_price = broker_avg if broker_avg > 0 else 0.0
+    return item
+
+
+def _snapshot_held_codes(snapshot: dict) -> set[str]:
+    """Symbol codes with a positive quantity anywhere in the snapshot."""
+    codes = set()
+    for rows in (snapshot.get("overseas") or {}).values():
+        for row in rows or []:
+            code = str(row.get("ovrs_pdno") or row.get("pdno") or row.get("item_cd") or "").strip().upper()
+            qty = float(
+                row.get("ovrs_cblc_qty")
+                or row.get("cblc_qty")
+                or row.get("hold_qty")
+                or row.get("blce_qty")
+                or 0.0
+            )
+            if code and qty > 0:
+                codes.add(code)
+    for row in snapshot.get("domestic") or []:
+        code = str(row.get("pdno") or "").strip().upper()
+        if code and float(row.get("hldg_qty") or 0.0) > 0:
+            codes.add(code)
+    return codes
+
+
+async def _read_open_synthetic_rows(session) -> dict[str, list]:
+    rows = (
+        await session.execute(
+            select(
+                Position.id,
+                Position.ticker,
+                Position.qty,
+                Position.entry_price,
+                Position.entry_amount_usd,
+                Position.entry_time,
+                Position.entry_order_id,
+            )
+            .where(POSITION_IS_OPEN, POSITION_IS_SYNTHETIC)
+            .order_by(Position.ticker, Position.entry_time.asc(), Position.id.asc())
+        )
+    ).all()
+    by_symbol: dict[str, list] = {}
+    for row in rows:
+        symbol = str(row.ticker or "").strip().upper()
+        if symbol:
+            by_symbol.setdefault(symbol, []).append(row)
+    return by_symbol
+
+
+async def _fill_missing_prices(kis, items: list[SymbolReconcile]) -> None:
+    """Quote symbols whose add has no KIS average price, concurrently."""
+    missing = [item for item in items if item.add_qty > 0 and item.add_price <= 0]
+    if not missing:
+        return
+    quotes = await asyncio.gather(
+        *(
+            kis.get_domestic_quote_price(item.symbol) if item.domestic else kis.get_quote_price(item.symbol)
+            for item in missing
+        ),
+        return_exceptions=True,
+    )
+    for item, quote in zip(missing, quotes):
+        if isinstance(quote, asyncio.CancelledError):
+            raise quote
+        price = 0.0 if isinstance(quote, Exception) else float(quote or 0.0)
+        if price > 0:
+            item.add_price = price
+        elif item.domestic:
+            item.error = f"{item.symbol}: KIS 국내 평균단가/현재가를 찾지 못해 정합화에 실패했습니다."
+        else:
+            item.error = f"{item.symbol}: KIS 평균단가/현재가를 찾지 못해 정합화에 실패했습니다."
+
+
+async def build_kis_reconcile_plan(kis) -> KisReconcilePlan:
+    """Read the DB and one KIS holdings snapshot and diff them. Writes nothing."""
+    async with get_session() as session:
+        open_rows = await _read_open_synthetic_rows(session)
+
+    read_domestic = bool(settings.kis_domestic_enabled) or any(is_kis_domestic_symbol(s) for s in open_rows)
+    snapshot = await kis.get_holdings_snapshot(overseas=True, domestic=read_domestic)
+    plan = KisReconcilePlan(snapshot_errors=list(snapshot.get("errors") or []))
+
+    # Broker rows carry bare codes; prefer the DB ticker that maps to the same code.
+    db_by_code = {trade_symbol_code(symbol): symbol for symbol in open_rows}
+    held = {db_by_code.get(code, code) for code in _snapshot_held_codes(snapshot)}
+    plan.broker_symbols = len(held)
+    plan.db_symbols = len(open_rows)
+
+    targets = sorted(held | set(open_rows))
+    plan.symbols_checked = len(targets)
+    for symbol in targets:
+        balance = kis.snapshot_symbol_balance(snapshot, symbol)
+        if balance is None:
+            plan.unreadable.append(symbol)
+            continue
+        broker_qty = float(balance.get("qty", 0.0) or 0.0)
+        rows = open_rows.get(symbol, [])
+        db_qty = sum(float(row.qty or 0.0) for row in rows)
+        if abs(broker_qty - db_qty) <= MISMATCH_TOLERANCE:
+            continue
+        plan.items.append(
+            plan_symbol_reconcile(symbol, broker_qty, float(balance.get("avg_price", 0.0) or 0.0), rows)
+        )
+
+    await _fill_missing_prices(kis, plan.items)
+    if plan.unreadable:
+        logger.warning(
+            "KIS reconcile skipped unreadable symbols",
+            symbols=plan.unreadable,
+            errors=plan.snapshot_errors,
+        )
+    return plan
+
+
+def _closed_position_row(symbol: str, close: PositionClose, exit_order_id: int, now: datetime) -> dict:
+    return {
+        "ticker": symbol,
+        "qty": close.qty,
+        "entry_price": close.entry_price,
+        "entry_amount_usd": close.amount,
+        "entry_time": close.entry_time,
+        "exit_price": close.entry_price,
+        "exit_amount_usd": close.amount,
+        "exit_time": now,
+        "pnl_usd": 0.0,
+        "pnl_pct": 0.0,
+        "status": PositionStatus.CLOSED,
+        "entry_order_id": close.entry_order_id,
+        "exit_order_id": exit_order_id,
+    }
+
+
+async def apply_kis_reconcile_plan(plan: KisReconcilePlan) -> list[SymbolReconcile]:
+    """
+    Write every change in the plan in one transaction and return the applied
+    items. A symbol whose OPEN rows changed since the plan was read (an order
+    landed meanwhile) is left for the next run and marked with an error.
+    """
+    changes = plan.changes
+    if not changes:
+        return []
+    now = datetime.now(timezone.utc)
+    stamp = int(now.timestamp())
+
+    async with get_session() as session:
+        current = (
+            await session.execute(
+                select(Position.ticker, Position.id, Position.qty)
+                .where(
+                    Position.ticker.in_([item.symbol for item in changes]),
+                    POSITION_IS_OPEN,
+                    POSITION_IS_SYNTHETIC,
+                )
+                .with_for_update()
+            )
+        ).all()
+        current_rows: dict[str, dict[int, float]] = {}
+        for ticker, position_id, qty in current:
+            current_rows.setdefault(ticker, {})[position_id] = float(qty or 0.0)
+
+        applied = []
+        full_closes, partial_closes, new_positions, new_trades = [], [], [], []
+        for item in changes:
+            if current_rows.get(item.symbol, {}) != item.db_rows:
+                item.error = f"{item.symbol}: 정합화 중 DB 포지션이 변경되어 다음 주기에 다시 확인합니다."
+                continue
+            applied.append(item)
+            prefix = "reconcile-kis-krx" if item.domestic else "reconcile-kis"
+            exit_order_id = _kis_synthetic_order_id(f"{prefix}-{item.symbol}-{stamp}", item.symbol, "RECON")
+            for close in item.closes:
+                if close.full:
+                    full_closes.append(
+                        {
+                            "id": close.position_id,
+                            "exit_price": close.entry_price,
+                            "exit_amount_usd": close.amount,
+                            "exit_time": now,
+                            "pnl_usd": 0.0,
+                            "pnl_pct": 0.0,
+                            "status": PositionStatus.CLOSED,
+                            "exit_order_id": exit_order_id,
+                            "updated_at": now,
+                        }
+                    )
+                else:
+                    partial_closes.append(
+                        {
+                            "id": close.position_id,
+                            "qty": close.remaining_qty,
+                            "entry_amount_usd": close.remaining_amount,
+                            "updated_at": now,
+                        }
+                    )
+                    new_positions.append(_closed_position_row(item.symbol, close, exit_order_id, now))
+
+            if item.add_qty > 0:
+                alert_id = f"{prefix}-{item.symbol}-{stamp}"
+                order_id = _kis_synthetic_order_id(alert_id, item.symbol, "BUY")
+                new_positions.append(
+                    {
+                        "ticker": item.symbol,
+                        "qty": item.add_qty,
+                        "entry_price": item.add_price,
+                        "entry_amount_usd": item.add_amount,
+                        "entry_time": now,
+                        # Same keys as the split rows (nulls rendered), so all positions
+                        # go in one executemany.
+                        "exit_price": None,
+                        "exit_amount_usd": None,
+                        "exit_time": None,
+                        "pnl_usd": None,
+                        "pnl_pct": None,
+                        "status": PositionStatus.OPEN,
+                        "entry_order_id": order_id,
+                        "exit_order_id": None,
+                    }
+                )
+                new_trades.append(
+                    {
+                        "ticker": item.symbol,
+                        "side": TradeSide.BUY,
+                        "order_type": "MKT",
+                        "requested_qty": item.add_qty,
+                        "filled_qty": item.add_qty,
+                        "requested_amount_usd": item.add_amount,
+                        "avg_fill_price": item.add_price,
+                        "total_fill_amount_usd": item.add_amount,
+                        "commission": 0.0,
+                        "ib_order_id": order_id,
+                        "status": TradeStatus.FILLED,
+                        "alert_id": alert_id,
+                        "created_at": now,
+                        "filled_at": now,
+                    }
+                )
+
+        if full_closes:
+            await session.execute(update(Position), full_closes)
+        if partial_closes:
+            await session.execute(update(Position), partial_closes)
+        if new_positions:
+            await session.execute(insert(Position).execution_options(render_nulls=True), new_positions)
+        if new_trades:
+            await session.execute(insert(Trade), new_trades)
+            # Bulk INSERTs skip the flush hook that keeps the P&L rollup current.
+            rollup = fold_fills_statement(
+                session.get_bind().dialect.name,
+                [Trade(**row) for row in new_trades],
+            )
+            if rollup is not None:
+                await session.execute(rollup)
+
+    plan.applied = True
+    for item in applied:
+        logger.warning(
+            "KIS domestic/DB qty mismatch reconciled" if item.domestic else "KIS/DB qty mismatch reconciled",
+            ticker=item.symbol,
+            broker_qty=item.broker_qty,
+            db_qty=item.db_qty,
+            added_qty=item.add_qty,
+            closed_qty=item.closed_qty,
+        )
+        await sync_ledger_ticker(item.symbol)
+    return applied
+
+
+async def reconcile_kis_holdings(kis, *, dry_run: bool = False) -> KisReconcilePlan:
+    """Plan and, unless dry_run, apply an account-wide reconcile."""
+    plan = await build_kis_reconcile_plan(kis)
+    if not dry_run:
+        await apply_kis_reconcile_plan(plan)
+    return plan
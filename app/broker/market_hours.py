@@ -339,6 +339,26 @@ def seconds_until_asia_market_open(market: str) -> int:
     return 0
 
 
+def seconds_until_next_session_open() -> tuple[str, int]:
+    """
+    Return (market, seconds) for the soonest upcoming regular-session open
+    across US, KRX and the Asia markets. Markets that are open right now are
+    skipped; ("", 0) means nothing is upcoming.
+    """
+    candidates = {
+        "US": seconds_until_market_open(),
+        "KRX": seconds_until_krx_market_open(),
+    }
+    for market_key in ASIA_MARKET_SESSIONS:
+        candidates[market_key] = seconds_until_asia_market_open(market_key)
+
+    upcoming = {market: seconds for market, seconds in candidates.items() if seconds > 0}
+    if not upcoming:
+        return "", 0
+    market = min(upcoming, key=upcoming.get)
+    return market, upcoming[market]
+
+
 def get_market_status() -> dict:
     """Get detailed market status for display."""
     now_et = get_et_now()
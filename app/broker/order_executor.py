@@ -7,10 +7,11 @@ SELL: 100% market sell of all positions for the ticker
 from __future__ import annotations
 
 import asyncio
+import functools
 import hashlib
 from datetime import datetime, timezone
 import structlog
-from sqlalchemy import select, func, and_, or_
+from sqlalchemy import select, func
 
 from app.config import settings
 from app.broker.ib_client import get_ib_client
@@ -24,8 +25,10 @@ from app.gateway.symbol_mapper import (
     kis_overseas_currency,
 )
 from app.database.connection import get_session, get_bot_settings
-from app.models.position import Position, PositionStatus
-from app.models.trade import Trade, TradeSide, TradeStatus
+from app.models.position import Position, PositionStatus, POSITION_IS_OPEN, POSITION_IS_SYNTHETIC
+from app.models.trade import Trade, TradeSide, TradeStatus, trade_time_window
+from app.risk.portfolio_ledger import record_position_open, sync_ledger_ticker
+from app.risk import pnl_rollup  # noqa: F401  registers the daily P&L rollup flush hook
 
 logger = structlog.get_logger()
 
@@ -84,18 +87,7 @@ def _result_currency_for_symbol(symbol: str) -> str:
 
 
 def _filled_trade_time_window(start_utc, end_utc):
-    return or_(
-        and_(
-            Trade.filled_at.is_not(None),
-            Trade.filled_at >= start_utc,
-            Trade.filled_at < end_utc,
-        ),
-        and_(
-            Trade.filled_at.is_(None),
-            Trade.created_at >= start_utc,
-            Trade.created_at < end_utc,
-        ),
-    )
+    return trade_time_window(start_utc, end_utc)
 
 
 async def _resolve_kis_buy_amount_usd(bot_settings, kis, symbol: str) -> float:
@@ -144,6 +136,23 @@ async def _resolve_kis_overseas_buy_amount(bot_settings, kis, symbol: str) -> tu
     return round(fallback_usd, 2), currency
 
 
+def _syncs_portfolio_ledger(func):
+    """
+    Re-sync the portfolio ledger for a reconciled symbol once the wrapped
+    call's transaction has committed. Untouched symbols skip the extra read.
+    """
+
+    @functools.wraps(func)
+    async def wrapper(kis, symbol: str, *args, **kwargs) -> dict:
+        result = await func(kis, symbol, *args, **kwargs)
+        if result.get("reconciled") or not result.get("ok"):
+            await sync_ledger_ticker(symbol)
+        return result
+
+    return wrapper
+
+
+@_syncs_portfolio_ledger
 async def _reconcile_kis_symbol_to_db(kis, symbol: str, alert_id: str | None = None) -> dict:
     """
     Reconcile one symbol between KIS real holdings and DB OPEN(KIS) rows.
@@ -160,8 +169,8 @@ async def _reconcile_kis_symbol_to_db(kis, symbol: str, alert_id: str | None = N
         result = await session.execute(
             select(Position).where(
                 Position.ticker == symbol,
-                Position.status == PositionStatus.OPEN,
-                Position.entry_order_id < 0,
+                POSITION_IS_OPEN,
+                POSITION_IS_SYNTHETIC,
             ).order_by(Position.entry_time.asc(), Position.id.asc())
         )
         open_positions = list(result.scalars().all())
@@ -290,6 +299,7 @@ async def _reconcile_kis_symbol_to_db(kis, symbol: str, alert_id: str | None = N
     }
 
 
+@_syncs_portfolio_ledger
 async def _reconcile_kis_domestic_symbol_to_db(kis, symbol: str, alert_id: str | None = None) -> dict:
     """
     Reconcile one domestic/KRX symbol between KIS real holdings and DB OPEN(KIS) rows.
@@ -305,8 +315,8 @@ async def _reconcile_kis_domestic_symbol_to_db(kis, symbol: str, alert_id: str |
         result = await session.execute(
             select(Position).where(
                 Position.ticker == symbol,
-                Position.status == PositionStatus.OPEN,
-                Position.entry_order_id < 0,
+                POSITION_IS_OPEN,
+                POSITION_IS_SYNTHETIC,
             ).order_by(Position.entry_time.asc(), Position.id.asc())
         )
         open_positions = list(result.scalars().all())
@@ -680,6 +690,8 @@ async def _execute_buy_ib(ticker: str, alert_id: str = "") -> dict:
         )
         session.add(trade)
 
+    await record_position_open(symbol, fill_qty, fill_amount)
+
     logger.info(
         "BUY executed",
         ticker=symbol,
@@ -842,6 +854,8 @@ async def _execute_buy_kis(ticker: str, alert_id: str = "") -> dict:
             "currency": currency,
         }
 
+    await record_position_open(symbol, fill_qty, fill_amount)
+
     logger.info(
         "BUY executed via KIS",
         ticker=symbol,
@@ -1003,6 +1017,8 @@ async def _execute_buy_kis_domestic(symbol: str, alert_id: str = "") -> dict:
             "db_persist_pending_reconcile": True,
         }
 
+    await record_position_open(symbol, fill_qty, fill_amount)
+
     logger.info(
         "BUY executed via KIS domestic",
         ticker=symbol,
@@ -1042,7 +1058,7 @@ async def _execute_sell_ib(ticker: str, alert_id: str = "") -> dict:
         result = await session.execute(
             select(Position).where(
                 Position.ticker == symbol,
-                Position.status == PositionStatus.OPEN,
+                POSITION_IS_OPEN,
             )
         )
         open_positions = result.scalars().all()
@@ -1121,7 +1137,7 @@ async def _execute_sell_ib(ticker: str, alert_id: str = "") -> dict:
         result = await session.execute(
             select(Position).where(
                 Position.ticker == symbol,
-                Position.status == PositionStatus.OPEN,
+                POSITION_IS_OPEN,
             )
         )
         positions_to_close = [p for p in result.scalars().all() if _is_ib_or_legacy_position(p)]
@@ -1156,6 +1172,8 @@ async def _execute_sell_ib(ticker: str, alert_id: str = "") -> dict:
         )
         session.add(trade)
 
+    await sync_ledger_ticker(symbol)
+
     logger.info(
         "SELL executed",
         ticker=symbol,
@@ -1238,7 +1256,7 @@ async def _apply_kis_sell_fill(
             result = await session.execute(
                 select(Position).where(
                     Position.ticker == symbol,
-                    Position.status == PositionStatus.OPEN,
+                    POSITION_IS_OPEN,
                 ).order_by(Position.entry_time.asc(), Position.id.asc())
             )
             open_positions = [p for p in result.scalars().all() if _is_kis_position(p)]
@@ -1354,6 +1372,8 @@ async def _apply_kis_sell_fill(
         )
         return _pending_reconcile_result(str(db_err))
 
+    await sync_ledger_ticker(symbol)
+
     logger.info(
         "SELL applied via KIS",
         ticker=symbol,
@@ -1406,7 +1426,7 @@ async def _execute_sell_kis_domestic(symbol: str, alert_id: str = "") -> dict:
         result = await session.execute(
             select(Position).where(
                 Position.ticker == symbol,
-                Position.status == PositionStatus.OPEN,
+                POSITION_IS_OPEN,
             )
         )
         open_positions = result.scalars().all()
@@ -1557,7 +1577,7 @@ async def _execute_sell_kis(ticker: str, alert_id: str = "") -> dict:
         result = await session.execute(
             select(Position).where(
                 Position.ticker == symbol,
-                Position.status == PositionStatus.OPEN,
+                POSITION_IS_OPEN,
             )
         )
         open_positions = result.scalars().all()
@@ -8,7 +8,7 @@ from sqlalchemy import select, func, or_
 import structlog
 
 from app.database.connection import get_session
-from app.models.position import Position, PositionStatus
+from app.models.position import Position, POSITION_IS_OPEN, POSITION_IS_SYNTHETIC
 from app.broker.ib_client import get_ib_client
 
 logger = structlog.get_logger()
@@ -46,7 +46,7 @@ async def sync_positions() -> dict:
                 Position.ticker,
                 func.sum(Position.qty).label("total_qty"),
             ).where(
-                Position.status == PositionStatus.OPEN,
+                POSITION_IS_OPEN,
                 or_(Position.entry_order_id.is_(None), Position.entry_order_id >= 0),
             ).group_by(Position.ticker)
         )
@@ -57,8 +57,8 @@ async def sync_positions() -> dict:
                 func.count(Position.id).label("rows"),
                 func.count(func.distinct(Position.ticker)).label("symbols"),
             ).where(
-                Position.status == PositionStatus.OPEN,
-                Position.entry_order_id < 0,
+                POSITION_IS_OPEN,
+                POSITION_IS_SYNTHETIC,
             )
         )
         kis_rows, kis_symbols = kis_excluded.one()
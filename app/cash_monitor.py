@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+from app.broker.kis_client import KISPriority, kis_priority_scope
 from app.config import settings
 from app.database.connection import get_bot_settings
 from app.gateway.symbol_mapper import (
@@ -12,6 +13,7 @@ from app.gateway.symbol_mapper import (
 from app.queue.order_queue import get_waiting_buy_orders
 
 
+@kis_priority_scope(KISPriority.REPORTING)
 async def estimate_pending_buy_cash_coverage(max_quote_checks: int = 80) -> dict:
     """
     Estimate whether current KIS buying power can cover waiting BUY orders.
@@ -0,0 +1,76 @@
+"""
+Payload codec shared by the webhook gateway and the Redis order queue.
+
+Order payloads stay JSON objects: the queue's Lua scripts `cjson.decode`
+them to keep the stats hashes in step, so a binary format is not an option
+there. The envelope is compact (no whitespace, UTF-8 kept as is) and carries
+a version field; fields are only ever added, and the version is bumped when
+an existing field changes meaning. Payloads written before the envelope
+existed have no version field and decode as version 0.
+
+orjson is used when installed (it is optional) and the stdlib otherwise;
+both produce the same text for the string/int/bool payloads used here.
+"""
+
+import hashlib
+import json
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:  # optional speedup
+    orjson = None
+
+ORDER_ENVELOPE_VERSION = 1
+ENVELOPE_VERSION_FIELD = "v"
+
+JSONDecodeError = json.JSONDecodeError  # orjson.JSONDecodeError subclasses it
+
+
+def dumps(obj: Any) -> str:
+    """Compact JSON text."""
+    if orjson is not None:
+        return orjson.dumps(obj).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def canonical_json(obj: Any) -> str:
+    """Sorted-key compact JSON, the stable form used for hashing and audit."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+
+
+def sha256_hex(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def encode_order(order: dict) -> str:
+    """Serialize an order for Redis, stamping the envelope version."""
+    if order.get(ENVELOPE_VERSION_FIELD) == ORDER_ENVELOPE_VERSION:
+        return dumps(order)
+    return dumps({ENVELOPE_VERSION_FIELD: ORDER_ENVELOPE_VERSION, **order})
+
+
+def decode_order(data: Union[str, bytes]) -> dict:
+    """
+    Decode one queued order. Raises JSONDecodeError for malformed text and
+    ValueError when the payload is not an object.
+    """
+    order = loads(data)
+    if not isinstance(order, dict):
+        raise ValueError(f"order payload is {type(order).__name__}, not an object")
+    return order
+
+
+def order_envelope_version(order: dict) -> int:
+    try:
+        return int(order.get(ENVELOPE_VERSION_FIELD) or 0)
+    except (TypeError, ValueError):
+        return 0
@@ -3,7 +3,16 @@ Database connection management.
 Provides async SQLAlchemy sessions and initialization.
 """
 
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine, async_sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from contextlib import asynccontextmanager
 import structlog
 
@@ -14,27 +23,250 @@ from app.models.position import Position  # noqa: F401
 from app.models.trade import Trade  # noqa: F401
 from app.models.alert_log import AlertLog  # noqa: F401
 from app.models.portfolio_snapshot import PortfolioSnapshot  # noqa: F401
+from app.models.daily_pnl_rollup import DailyPnlRollup  # noqa: F401
 
 logger = structlog.get_logger()
 
-# Create async engine
-engine = create_async_engine(
-    settings.database_url,
-    echo=False,
-    pool_size=10,
-    max_overflow=20,
-    pool_pre_ping=True,
-)
 
-# Session factory
-async_session = async_sessionmaker(
-    engine, class_=AsyncSession, expire_on_commit=False
-)
+@dataclass(frozen=True)
+class EngineProfile:
+    pool_size: int
+    max_overflow: int
+    pool_timeout: float  # seconds a checkout may wait before failing
+    prepared_statement_cache_size: int  # asyncpg prepared statements per connection
+    query_cache_size: int  # SQLAlchemy compiled-SQL cache for the engine
+    health_check: bool = True
+
+
+# Postgres max_connections defaults to 100; the api + worker + telegram
+# ceilings below (40 + 10 + 5) leave room for scripts and psql.
+ENGINE_PROFILES = {
+    # Alert storms: short writes from the batched audit log plus dashboard
+    # reads. Wide overflow absorbs bursts; a short timeout fails fast
+    # instead of stacking requests behind an exhausted pool.
+    "api": EngineProfile(
+        pool_size=10, max_overflow=30, pool_timeout=5.0, prepared_statement_cache_size=256, query_cache_size=500
+    ),
+    # One session per execution lane plus the housekeeping loops; the same
+    # handful of risk/ledger queries run on every order.
+    "worker": EngineProfile(
+        pool_size=6, max_overflow=4, pool_timeout=30.0, prepared_statement_cache_size=512, query_cache_size=1000
+    ),
+    "telegram": EngineProfile(
+        pool_size=2, max_overflow=3, pool_timeout=30.0, prepared_statement_cache_size=128, query_cache_size=500
+    ),
+    "script": EngineProfile(
+        pool_size=2,
+        max_overflow=2,
+        pool_timeout=30.0,
+        prepared_statement_cache_size=100,
+        query_cache_size=500,
+        health_check=False,
+    ),
+}
+DEFAULT_PROCESS_ROLE = "script"
+
+
+class PoolCheckoutStats:
+    """How long sessions waited for a pooled connection in this process."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.slow_checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self._last_slow_log = 0.0
+
+    def record(self, waited: float, pool) -> None:
+        self.checkouts += 1
+        self.wait_total += waited
+        self.wait_max = max(self.wait_max, waited)
+        slow_ms = float(settings.db_pool_slow_checkout_ms or 0)
+        if slow_ms > 0 and waited * 1000 >= slow_ms:
+            self.slow_checkouts += 1
+            now = time.monotonic()
+            if now - self._last_slow_log >= 10.0:
+                self._last_slow_log = now
+                logger.warning(
+                    "Slow DB pool checkout",
+                    wait_ms=round(waited * 1000, 1),
+                    checked_out=pool.checkedout(),
+                    pool_size=pool.size(),
+                    overflow=pool.overflow(),
+                    slow_checkouts=self.slow_checkouts,
+                )
+
+    def snapshot(self) -> dict:
+        return {
+            "checkouts": self.checkouts,
+            "slow_checkouts": self.slow_checkouts,
+            "timeouts": self.timeouts,
+            "wait_avg_ms": round(self.wait_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+            "wait_max_ms": round(self.wait_max * 1000, 3),
+        }
+
+
+pool_checkout_stats = PoolCheckoutStats()
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long each checkout waited for a connection."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            pool_checkout_stats.timeouts += 1
+            raise
+        pool_checkout_stats.record(time.perf_counter() - started, self)
+        return connection
+
+
+_process_role = DEFAULT_PROCESS_ROLE
+engine: Optional[AsyncEngine] = None
+async_session: Optional[async_sessionmaker] = None
+_engine_profile_name = ""
+_health_check_task: Optional[asyncio.Task] = None
+_last_health_check: dict = {}
+
+
+def _profile_name() -> str:
+    configured = str(settings.db_engine_profile or "").strip().lower()
+    name = configured or _process_role
+    return name if name in ENGINE_PROFILES else DEFAULT_PROCESS_ROLE
+
+
+def _engine_kwargs(profile: EngineProfile, database_url: str) -> dict:
+    kwargs = {
+        "echo": False,
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": profile.pool_size,
+        "max_overflow": profile.max_overflow,
+        "pool_timeout": profile.pool_timeout,
+        # No pre-ping: stale connections are caught by the background health
+        # check (or SQLAlchemy's disconnect handling) instead of an extra round
+        # trip on every checkout. Recycling covers server-side idle timeouts.
+        "pool_pre_ping": False,
+        "pool_recycle": 1800,
+        "query_cache_size": profile.query_cache_size,
+    }
+    if make_url(database_url).get_driver_name() == "asyncpg":
+        kwargs["connect_args"] = {"prepared_statement_cache_size": profile.prepared_statement_cache_size}
+    return kwargs
+
+
+def get_engine() -> AsyncEngine:
+    """Engine for this process, built on first use from its role profile."""
+    global engine, async_session, _engine_profile_name
+    if engine is None:
+        _engine_profile_name = _profile_name()
+        profile = ENGINE_PROFILES[_engine_profile_name]
+        engine = create_async_engine(settings.database_url, **_engine_kwargs(profile, settings.database_url))
+        async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    return engine
+
+
+async def set_process_role(role: str) -> None:
+    """Select the engine profile for this process (api, worker, telegram, script)."""
+    global _process_role, engine, async_session
+    _process_role = str(role or DEFAULT_PROCESS_ROLE).strip().lower()
+    if engine is not None and _profile_name() != _engine_profile_name:
+        old_engine = engine
+        engine = None
+        async_session = None
+        await old_engine.dispose()
+
+
+def get_pool_stats() -> dict:
+    """Pool occupancy and checkout wait times for health output."""
+    stats = {"profile": _engine_profile_name or _profile_name(), **pool_checkout_stats.snapshot()}
+    if engine is not None:
+        pool = engine.pool
+        stats.update(
+            {
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "overflow": pool.overflow(),
+                "max_overflow": ENGINE_PROFILES[_engine_profile_name].max_overflow,
+            }
+        )
+    if _last_health_check:
+        stats["health_check"] = dict(_last_health_check)
+    return stats
+
+
+async def check_db_health(timeout: float = 5.0) -> bool:
+    """Run SELECT 1; on failure drop pooled connections so checkouts reconnect."""
+    started = time.perf_counter()
+    db_engine = get_engine()
+    try:
+        async with db_engine.connect() as conn:
+            await asyncio.wait_for(conn.execute(text("SELECT 1")), timeout=timeout)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        _last_health_check.update({"ok": False, "at": time.time(), "error": str(e)})
+        logger.warning("Database health check failed; recycling pool", error=str(e))
+        await db_engine.dispose()
+        return False
+    _last_health_check.update(
+        {"ok": True, "at": time.time(), "latency_ms": round((time.perf_counter() - started) * 1000, 1), "error": ""}
+    )
+    return True
+
+
+async def _db_health_check_loop(interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await check_db_health()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("Database health check error", error=str(e))
+
+
+def _start_health_check() -> None:
+    global _health_check_task
+    interval = float(settings.db_health_check_interval_seconds or 0)
+    profile = ENGINE_PROFILES[_profile_name()]
+    if interval <= 0 or not profile.health_check:
+        return
+    if _health_check_task is not None and not _health_check_task.done():
+        return
+    _health_check_task = asyncio.get_running_loop().create_task(_db_health_check_loop(interval))
+
+
+async def close_db() -> None:
+    """Stop the health check and close pooled connections."""
+    global _health_check_task
+    if _health_check_task is not None:
+        _health_check_task.cancel()
+        try:
+            await _health_check_task
+        except asyncio.CancelledError:
+            pass
+        _health_check_task = None
+    if engine is not None:
+        await engine.dispose()
+
+
+# BotSettings cache shared by the hot path. update_bot_setting() publishes on
+# BOT_SETTINGS_CHANNEL and every process drops its copy when the message lands.
+BOT_SETTINGS_CHANNEL = "bot_settings:invalidate"
+_bot_settings_cache: Optional[BotSettings] = None
+_bot_settings_cached_at = 0.0
+_bot_settings_generation = 0
+_bot_settings_listener_task: Optional[asyncio.Task] = None
+_bot_settings_listener_ready = False
 
 
 @asynccontextmanager
 async def get_session():
     """Get an async database session."""
+    get_engine()
     session = async_session()
     try:
         yield session
@@ -46,9 +278,11 @@ async def get_session():
         await session.close()
 
 
-async def init_db():
+async def init_db(role: Optional[str] = None):
     """Initialize database tables and seed default settings."""
-    async with engine.begin() as conn:
+    if role:
+        await set_process_role(role)
+    async with get_engine().begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
 
     logger.info("Database tables created")
@@ -72,9 +306,59 @@ async def init_db():
             session.add(default_settings)
             logger.info("Default bot settings seeded")
 
+    _start_health_check()
+
+
+def invalidate_bot_settings_cache() -> None:
+    """Drop the cached BotSettings row in this process."""
+    global _bot_settings_cache, _bot_settings_generation
+    _bot_settings_cache = None
+    _bot_settings_generation += 1
+
+
+async def _bot_settings_listener():
+    """Invalidate the cache whenever any process publishes a settings change."""
+    global _bot_settings_listener_ready
+    from app.queue.order_queue import get_redis
+
+    while True:
+        pubsub = None
+        try:
+            redis_client = await get_redis()
+            pubsub = redis_client.pubsub()
+            await pubsub.subscribe(BOT_SETTINGS_CHANNEL)
+            # Anything cached before the subscription may have missed a change.
+            invalidate_bot_settings_cache()
+            _bot_settings_listener_ready = True
+            async for message in pubsub.listen():
+                if message.get("type") == "message":
+                    invalidate_bot_settings_cache()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("Bot settings invalidation listener error", error=str(e))
+        finally:
+            _bot_settings_listener_ready = False
+            if pubsub is not None:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+        await asyncio.sleep(1.0)
 
-async def get_bot_settings() -> BotSettings:
-    """Fetch current bot settings from DB."""
+
+def _ensure_bot_settings_listener() -> None:
+    global _bot_settings_listener_task
+    if _bot_settings_listener_task is not None and not _bot_settings_listener_task.done():
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    _bot_settings_listener_task = loop.create_task(_bot_settings_listener())
+
+
+async def _load_bot_settings() -> BotSettings:
     async with get_session() as session:
         from sqlalchemy import select
         result = await session.execute(select(BotSettings).limit(1))
@@ -84,11 +368,52 @@ async def get_bot_settings() -> BotSettings:
         return bot_settings
 
 
+async def get_bot_settings(*, max_age_seconds: Optional[float] = None) -> BotSettings:
+    """
+    Fetch current bot settings, served from a short-lived in-process cache.
+
+    The cache is only trusted while the pub/sub invalidation listener is
+    subscribed, so a kill-switch change is never hidden by a Redis outage.
+    The returned row is shared between callers; treat it as read-only.
+    """
+    global _bot_settings_cache, _bot_settings_cached_at
+    _ensure_bot_settings_listener()
+
+    ttl = settings.bot_settings_cache_ttl_seconds if max_age_seconds is None else max_age_seconds
+    now = time.monotonic()
+    cached = _bot_settings_cache
+    if (
+        cached is not None
+        and ttl > 0
+        and _bot_settings_listener_ready
+        and now - _bot_settings_cached_at <= ttl
+    ):
+        return cached
+
+    generation = _bot_settings_generation
+    bot_settings = await _load_bot_settings()
+    # Skip caching when an invalidation arrived while the row was loading.
+    if generation == _bot_settings_generation:
+        _bot_settings_cache = bot_settings
+        _bot_settings_cached_at = now
+    return bot_settings
+
+
 async def update_bot_setting(key: str, value) -> BotSettings:
-    """Update a single bot setting and return updated settings."""
+    """Update a single bot setting, publish the invalidation and return updated settings."""
     async with get_session() as session:
         from sqlalchemy import select
         result = await session.execute(select(BotSettings).limit(1))
         bot_settings = result.scalar_one()
         setattr(bot_settings, key, value)
-        return bot_settings
+
+    invalidate_bot_settings_cache()
+    try:
+        from app.queue.order_queue import get_redis
+
+        redis_client = await get_redis()
+        await redis_client.publish(BOT_SETTINGS_CHANNEL, key)
+    except Exception as e:
+        # Other processes fall back to the cache TTL / uncached reads.
+        logger.warning("Bot settings invalidation publish failed", key=key, error=str(e))
+    return bot_settings
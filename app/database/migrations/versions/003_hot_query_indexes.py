@@ -0,0 +1,78 @@
+"""Add composite and partial indexes for hot trade/alert/position queries.
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-17 09:30:00.000000
+
+Built CONCURRENTLY outside the migration transaction so a live bot keeps
+writing trades and alert logs while the indexes build.
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "003"
+down_revision = "002"
+branch_labels = None
+depends_on = None
+
+# Must match app.models.trade.trade_effective_time exactly for the planner to match it.
+TRADE_EFFECTIVE_TIME = sa.text("COALESCE(filled_at, created_at)")
+
+INDEXES = (
+    # Daily/weekly realized-trade windows (_filled_trade_time_window).
+    ("ix_trades_side_status_effective_time", "trades", ["side", "status", TRADE_EFFECTIVE_TIME], None),
+    (
+        "ix_trades_ticker_side_status_effective_time",
+        "trades",
+        ["ticker", "side", "status", TRADE_EFFECTIVE_TIME],
+        None,
+    ),
+    # Skipped-alert lookups and the queued-but-unprocessed check.
+    (
+        "ix_alert_logs_ticker_action_received_skipped",
+        "alert_logs",
+        ["ticker", "action", "received_at"],
+        "skipped IS true",
+    ),
+    ("ix_alert_logs_action_received_skipped", "alert_logs", ["action", "received_at"], "skipped IS true"),
+    (
+        "ix_alert_logs_ticker_action_unprocessed",
+        "alert_logs",
+        ["ticker", "action"],
+        "queued IS true AND processed IS false",
+    ),
+    # Open positions, and the KIS-managed ones (negative synthetic entry_order_id).
+    ("ix_positions_open_ticker", "positions", ["ticker", "entry_time"], "status = 'OPEN'"),
+    (
+        "ix_positions_open_synthetic_ticker",
+        "positions",
+        ["ticker", "entry_time"],
+        "status = 'OPEN' AND entry_order_id < 0",
+    ),
+)
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                unique=False,
+                if_not_exists=True,
+                postgresql_concurrently=True,
+                postgresql_where=sa.text(where) if where else None,
+            )
+        for table in ("trades", "alert_logs", "positions"):
+            op.execute(f"ANALYZE {table}")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
@@ -0,0 +1,46 @@
+"""Add daily P&L rollup table.
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-17 14:00:00.000000
+
+New fills are folded in by the worker from the moment it runs this code;
+fill the history afterwards with python -m scripts.backfill_daily_pnl_rollup.
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "004"
+down_revision = "003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "daily_pnl_rollup",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("trade_date", sa.Date(), nullable=False),
+        sa.Column("market", sa.String(length=10), nullable=False),
+        sa.Column("currency", sa.String(length=3), nullable=False),
+        sa.Column("buy_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("buy_amount", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("sell_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("sell_amount", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("realized_pnl", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("commission", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("kis_sell_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("first_buy_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.PrimaryKeyConstraint("id"),
+        # Leading trade_date also serves the reports' date-range reads.
+        sa.UniqueConstraint("trade_date", "market", "currency", name="uq_daily_pnl_rollup_date_market_currency"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("daily_pnl_rollup")
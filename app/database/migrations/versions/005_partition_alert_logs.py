@@ -0,0 +1,158 @@
+"""Partition alert_logs by UTC month.
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-17 16:00:00.000000
+
+Postgres only. The old table is renamed aside, a RANGE-partitioned
+alert_logs is created on the new received_month column with one partition
+per month from the oldest alert through two months ahead (plus a DEFAULT
+partition), rows are copied over and the old table is dropped. The id
+sequence is kept, so alert_log ids stay stable.
+
+Partitioned tables need the partition key in every unique constraint, so the
+primary key becomes (id, received_month) and idempotency keys are unique per
+month; the webhook batch writer upserts on (idempotency_key, received_month).
+
+The copy holds an exclusive lock on alert_logs: run it in a quiet window.
+Webhook audit rows that fail to write meanwhile stay buffered and are retried.
+
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "005"
+down_revision = "004"
+branch_labels = None
+depends_on = None
+
+COLUMNS = (
+    "id, ticker, action, price, alert_id, raw_payload, source_ip, processed, queued, skipped, "
+    "skip_reason, received_at, processed_at, idempotency_key"
+)
+
+# Same definitions as app.models.alert_log (and migration 003 for the partial ones).
+PARENT_INDEXES = (
+    "CREATE INDEX ix_alert_logs_ticker ON alert_logs (ticker)",
+    "CREATE INDEX ix_alert_logs_idempotency_key ON alert_logs (idempotency_key)",
+    "CREATE INDEX ix_alert_logs_ticker_action_received_skipped ON alert_logs "
+    "(ticker, action, received_at) WHERE skipped IS true",
+    "CREATE INDEX ix_alert_logs_action_received_skipped ON alert_logs "
+    "(action, received_at) WHERE skipped IS true",
+    "CREATE INDEX ix_alert_logs_ticker_action_unprocessed ON alert_logs "
+    "(ticker, action) WHERE queued IS true AND processed IS false",
+)
+
+_RENAME_INDEXES = """
+DO $$
+DECLARE r record;
+BEGIN
+    FOR r IN
+        SELECT indexname FROM pg_indexes
+        WHERE schemaname = current_schema() AND tablename = '{table}'
+    LOOP
+        EXECUTE format('ALTER INDEX %I RENAME TO %I', r.indexname, left(r.indexname, 52) || '_{suffix}');
+    END LOOP;
+END $$
+"""
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE alert_logs RENAME TO alert_logs_legacy")
+    op.execute(_RENAME_INDEXES.format(table="alert_logs_legacy", suffix="legacy"))
+
+    op.execute(
+        """
+        CREATE TABLE alert_logs (
+            id INTEGER NOT NULL DEFAULT nextval('alert_logs_id_seq'::regclass),
+            ticker VARCHAR(20) NOT NULL,
+            action VARCHAR(10) NOT NULL,
+            price FLOAT,
+            alert_id VARCHAR(100),
+            raw_payload TEXT,
+            source_ip VARCHAR(50),
+            processed BOOLEAN NOT NULL DEFAULT false,
+            queued BOOLEAN NOT NULL DEFAULT false,
+            skipped BOOLEAN NOT NULL DEFAULT false,
+            skip_reason VARCHAR(200),
+            received_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+            processed_at TIMESTAMP WITH TIME ZONE,
+            idempotency_key VARCHAR(100),
+            received_month DATE NOT NULL,
+            CONSTRAINT pk_alert_logs PRIMARY KEY (id, received_month),
+            CONSTRAINT uq_alert_logs_idempotency_key UNIQUE (idempotency_key, received_month)
+        ) PARTITION BY RANGE (received_month)
+        """
+    )
+    op.execute(
+        """
+        DO $$
+        DECLARE
+            part_month date;
+            last_month date := (date_trunc('month', now() AT TIME ZONE 'UTC') + interval '2 months')::date;
+        BEGIN
+            SELECT date_trunc('month', coalesce(min(received_at), now()) AT TIME ZONE 'UTC')::date
+            INTO part_month FROM alert_logs_legacy;
+            WHILE part_month <= last_month LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF alert_logs FOR VALUES FROM (%L) TO (%L)',
+                    'alert_logs_p' || to_char(part_month, 'YYYYMM'),
+                    part_month,
+                    (part_month + interval '1 month')::date
+                );
+                part_month := (part_month + interval '1 month')::date;
+            END LOOP;
+        END $$
+        """
+    )
+    op.execute("CREATE TABLE alert_logs_default PARTITION OF alert_logs DEFAULT")
+
+    op.execute(
+        f"INSERT INTO alert_logs ({COLUMNS}, received_month) "
+        f"SELECT {COLUMNS}, date_trunc('month', received_at AT TIME ZONE 'UTC')::date FROM alert_logs_legacy"
+    )
+    for statement in PARENT_INDEXES:
+        op.execute(statement)
+
+    op.execute("ALTER SEQUENCE alert_logs_id_seq OWNED BY alert_logs.id")
+    op.execute("DROP TABLE alert_logs_legacy")
+    op.execute("ANALYZE alert_logs")
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE alert_logs RENAME TO alert_logs_partitioned")
+    op.execute(_RENAME_INDEXES.format(table="alert_logs_partitioned", suffix="part"))
+    op.execute(
+        """
+        CREATE TABLE alert_logs (
+            id INTEGER NOT NULL DEFAULT nextval('alert_logs_id_seq'::regclass),
+            ticker VARCHAR(20) NOT NULL,
+            action VARCHAR(10) NOT NULL,
+            price FLOAT,
+            alert_id VARCHAR(100),
+            raw_payload TEXT,
+            source_ip VARCHAR(50),
+            processed BOOLEAN NOT NULL DEFAULT false,
+            queued BOOLEAN NOT NULL DEFAULT false,
+            skipped BOOLEAN NOT NULL DEFAULT false,
+            skip_reason VARCHAR(200),
+            received_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+            processed_at TIMESTAMP WITH TIME ZONE,
+            idempotency_key VARCHAR(100),
+            CONSTRAINT pk_alert_logs PRIMARY KEY (id),
+            CONSTRAINT uq_alert_logs_idempotency_key UNIQUE (idempotency_key)
+        )
+        """
+    )
+    # Keys repeated across months collapse to the newest row.
+    op.execute(
+        f"INSERT INTO alert_logs ({COLUMNS}) "
+        f"SELECT DISTINCT ON (coalesce(idempotency_key, id::text)) {COLUMNS} FROM alert_logs_partitioned "
+        f"ORDER BY coalesce(idempotency_key, id::text), received_at DESC"
+    )
+    for statement in PARENT_INDEXES:
+        op.execute(statement)
+    op.execute("ALTER SEQUENCE alert_logs_id_seq OWNED BY alert_logs.id")
+    op.execute("DROP TABLE alert_logs_partitioned")
@@ -0,0 +1,169 @@
+"""
+Buffered AlertLog writer for the webhook path.
+
+Accepted alerts are appended to an in-memory buffer and written in batches
+with one `INSERT ... ON CONFLICT (idempotency_key, received_month) DO UPDATE`
+per flush (received_month is the partition key), so a
+burst of alerts costs a handful of DB sessions instead of one per alert.
+AlertLog rows are audit data: the worker creates a missing row when it
+records processing status, so rows dropped on overflow are recovered there.
+"""
+
+import asyncio
+from typing import Optional
+
+from sqlalchemy import case, func
+from sqlalchemy.dialects.postgresql import insert
+import structlog
+
+from app.config import settings
+from app.database.connection import get_session
+from app.models.alert_log import AlertLog, alert_log_month
+
+logger = structlog.get_logger()
+
+
+def _merge_rows(rows: list[dict]) -> list[dict]:
+    """One row per conflict target (Postgres rejects duplicates in one statement)."""
+    merged: dict[tuple, dict] = {}
+    for row in rows:
+        row = dict(row)
+        row.setdefault("received_month", alert_log_month(row.get("received_at")))
+        target = (row["idempotency_key"], row["received_month"])
+        existing = merged.get(target)
+        if existing is None:
+            merged[target] = row
+            continue
+        for key in ("raw_payload", "source_ip"):
+            if not existing.get(key):
+                existing[key] = row.get(key)
+    return list(merged.values())
+
+
+def _upsert_statement(rows: list[dict]):
+    stmt = insert(AlertLog).values(rows)
+    table = AlertLog.__table__
+    # Same rules as the old per-alert SELECT + update: a processed row keeps
+    # its status, and audit fields are only filled when missing.
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.idempotency_key, table.c.received_month],
+        set_={
+            "queued": case((table.c.processed, table.c.queued), else_=True),
+            "skipped": case((table.c.processed, table.c.skipped), else_=False),
+            "skip_reason": case((table.c.processed, table.c.skip_reason), else_=None),
+            "raw_payload": func.coalesce(func.nullif(table.c.raw_payload, ""), stmt.excluded.raw_payload),
+            "source_ip": func.coalesce(func.nullif(table.c.source_ip, ""), stmt.excluded.source_ip),
+        },
+    )
+
+
+class AlertLogBatchWriter:
+    """Collects queued-alert audit rows and upserts them in batches."""
+
+    def __init__(
+        self,
+        *,
+        flush_interval_ms: Optional[float] = None,
+        max_batch: Optional[int] = None,
+        max_buffer: Optional[int] = None,
+    ):
+        self.flush_interval_ms = float(
+            flush_interval_ms if flush_interval_ms is not None else settings.alert_log_flush_interval_ms
+        )
+        self.max_batch = max(1, int(max_batch if max_batch is not None else settings.alert_log_batch_size))
+        self.max_buffer = max(
+            self.max_batch,
+            int(max_buffer if max_buffer is not None else settings.alert_log_max_buffer),
+        )
+        self._buffer: list[dict] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self.dropped = 0
+
+    @property
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    def submit(self, row: dict) -> None:
+        """Buffer one row; never blocks the webhook response."""
+        if not row.get("idempotency_key"):
+            return
+        self._buffer.append(row)
+        if len(self._buffer) > self.max_buffer:
+            overflow = len(self._buffer) - self.max_buffer
+            del self._buffer[:overflow]
+            self.dropped += overflow
+            logger.warning("Alert log buffer full, dropped oldest rows", dropped=overflow)
+        self._ensure_started()
+        if len(self._buffer) >= self.max_batch:
+            self._wakeup.set()
+
+    def _ensure_started(self) -> None:
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+            self._flush_lock = asyncio.Lock()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        interval = max(0.001, self.flush_interval_ms / 1000.0)
+        failures = 0
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), interval * (2 ** min(failures, 6)))
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+                failures = 0
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                failures += 1
+                logger.warning(
+                    "Alert log batch write failed; will retry",
+                    pending=len(self._buffer),
+                    error=str(e),
+                )
+
+    async def flush(self) -> int:
+        """Write everything buffered so far. Failed batches go back to the buffer."""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        written = 0
+        async with self._flush_lock:
+            while self._buffer:
+                batch = self._buffer[: self.max_batch]
+                del self._buffer[: len(batch)]
+                try:
+                    async with get_session() as session:
+                        await session.execute(_upsert_statement(_merge_rows(batch)))
+                except Exception:
+                    self._buffer[:0] = batch
+                    raise
+                written += len(batch)
+        return written
+
+    async def close(self) -> None:
+        """Stop the flusher and write what is left (app shutdown)."""
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        if self._buffer:
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error("Alert log final flush failed", pending=len(self._buffer), error=str(e))
+
+
+alert_log_writer = AlertLogBatchWriter()
+
+
+def get_alert_log_writer() -> AlertLogBatchWriter:
+    return alert_log_writer
@@ -3,8 +3,6 @@ FastAPI Webhook endpoint.
 Receives TradingView alerts, validates, and pushes to Redis order queue.
 """
 
-import json
-import hashlib
 import asyncio
 from time import perf_counter
 from datetime import datetime, timezone
@@ -12,8 +10,8 @@ from typing import Optional
 from fastapi import APIRouter, Request, HTTPException
 import structlog
 from sqlalchemy import select
-from sqlalchemy.exc import IntegrityError
 
+from app.codec import JSONDecodeError, canonical_json, loads as decode_json, sha256_hex
 from app.config import settings
 from app.gateway.security import (
     validate_webhook_request,
@@ -21,12 +19,13 @@ from app.gateway.security import (
     check_timestamp_freshness,
 )
 from app.gateway.symbol_mapper import validate_ticker, parse_tv_ticker, canonical_trade_symbol
-from app.database.connection import get_session, get_bot_settings
-from app.models.alert_log import AlertLog
-from app.models.position import Position, PositionStatus
+from app.database.connection import get_session, get_bot_settings, get_pool_stats
+from app.gateway.alert_log_writer import get_alert_log_writer
+from app.models.position import Position, POSITION_IS_OPEN
 from app.queue.order_queue import enqueue_order_once
 from app.notifications.telegram_bot import send_notification
 from app.broker.market_hours import is_market_open
+from app.risk.portfolio_ledger import is_open_ticker
 
 logger = structlog.get_logger()
 
@@ -52,14 +51,13 @@ def _build_webhook_idempotency(
     now_utc: Optional[datetime] = None,
 ) -> tuple[str, str, str, int]:
     """Return the audit fingerprint, AlertLog key, Redis dedupe key, and TTL."""
+    # Canonicalize once: the masked secret is a constant, so the audit
+    # fingerprint doubles as the hash input.
     audit_payload = dict(payload)
     if "secret" in audit_payload:
         audit_payload["secret"] = "***"
-    hash_payload = dict(payload)
-    hash_payload.pop("secret", None)
-    payload_fingerprint = json.dumps(audit_payload, sort_keys=True, separators=(",", ":"))
-    hash_fingerprint = json.dumps(hash_payload, sort_keys=True, separators=(",", ":"))
-    payload_hash = hashlib.sha256(hash_fingerprint.encode("utf-8")).hexdigest()
+    payload_fingerprint = canonical_json(audit_payload)
+    payload_hash = sha256_hex(payload_fingerprint)
     idempotency_ttl = int(settings.webhook_idempotency_ttl_seconds)
 
     dedupe_raw_key = ""
@@ -88,12 +86,12 @@ def _build_webhook_idempotency(
             f"{price_float if price_float is not None else ''}|{payload_hash}"
         )
 
-    idempotency_key = hashlib.sha256(raw_key.encode("utf-8")).hexdigest()
-    dedupe_key = hashlib.sha256((dedupe_raw_key or raw_key).encode("utf-8")).hexdigest()
+    idempotency_key = sha256_hex(raw_key)
+    dedupe_key = sha256_hex(dedupe_raw_key or raw_key)
     return payload_fingerprint, idempotency_key, dedupe_key, idempotency_ttl
 
 
-async def _persist_queued_alert_log(
+def _persist_queued_alert_log_in_background(
     *,
     ticker: str,
     action: str,
@@ -104,65 +102,22 @@ async def _persist_queued_alert_log(
     idempotency_key: str,
     received_at: datetime,
 ) -> None:
-    """Persist webhook audit data without delaying TradingView's response."""
-    try:
-        async with get_session() as session:
-            existing = (
-                await session.execute(
-                    select(AlertLog)
-                    .where(AlertLog.idempotency_key == idempotency_key)
-                    .limit(1)
-                )
-            ).scalar_one_or_none()
-
-            if existing:
-                if not existing.processed:
-                    existing.queued = True
-                    existing.skipped = False
-                    existing.skip_reason = None
-                if not existing.raw_payload:
-                    existing.raw_payload = raw_payload
-                if not existing.source_ip:
-                    existing.source_ip = source_ip
-                return
-
-            session.add(
-                AlertLog(
-                    ticker=ticker,
-                    action=action,
-                    price=price,
-                    alert_id=alert_id,
-                    raw_payload=raw_payload,
-                    source_ip=source_ip,
-                    idempotency_key=idempotency_key,
-                    received_at=received_at,
-                    queued=True,
-                    processed=False,
-                    skipped=False,
-                )
-            )
-    except IntegrityError:
-        logger.info(
-            "Alert log already exists after concurrent webhook processing",
-            ticker=ticker,
-            action=action,
-            idempotency_key=idempotency_key,
-        )
-    except Exception as exc:
-        logger.warning(
-            "Background alert-log persistence failed",
-            ticker=ticker,
-            action=action,
-            idempotency_key=idempotency_key,
-            error=str(exc),
-        )
-
-
-def _persist_queued_alert_log_in_background(**kwargs) -> None:
-    async def _runner() -> None:
-        await _persist_queued_alert_log(**kwargs)
-
-    asyncio.create_task(_runner())
+    """Hand the audit row to the batch writer; TradingView's response never waits on the DB."""
+    get_alert_log_writer().submit(
+        {
+            "ticker": ticker,
+            "action": action,
+            "price": price,
+            "alert_id": alert_id,
+            "raw_payload": raw_payload,
+            "source_ip": source_ip,
+            "idempotency_key": idempotency_key,
+            "received_at": received_at,
+            "queued": True,
+            "processed": False,
+            "skipped": False,
+        }
+    )
 
 
 def _notify_received_alert_in_background(
@@ -175,6 +130,10 @@ def _notify_received_alert_in_background(
     idempotency_key: str,
 ) -> None:
     """Evaluate verbose notification policy outside the webhook response path."""
+    if not settings.telegram_verbose_webhook_alerts:
+        # Default policy: no intake messages, so do not spawn a task per alert.
+        return
+
     async def _runner() -> None:
         try:
             if await _should_send_received_alert_notification():
@@ -243,10 +202,13 @@ async def _should_send_received_alert_notification() -> bool:
 
 async def _has_open_position(symbol: str) -> bool:
     """Return True when a symbol is currently held in the local position ledger."""
+    cached = await is_open_ticker(symbol)
+    if cached is not None:
+        return cached
     async with get_session() as session:
         result = await session.execute(
             select(Position.id)
-            .where(Position.ticker == symbol, Position.status == PositionStatus.OPEN)
+            .where(Position.ticker == symbol, POSITION_IS_OPEN)
             .limit(1)
         )
         return result.first() is not None
@@ -275,8 +237,8 @@ async def receive_webhook(request: Request):
 
     # 2. Parse JSON
     try:
-        payload = json.loads(body)
-    except json.JSONDecodeError:
+        payload = decode_json(body)
+    except JSONDecodeError:
         logger.error("Invalid JSON payload")
         raise HTTPException(status_code=400, detail="Invalid JSON")
 
@@ -464,4 +426,5 @@ async def health_check():
         "status": "healthy",
         "timestamp": datetime.now(timezone.utc).isoformat(),
         "service": "ib-trading-bot",
+        "db_pool": get_pool_stats(),
     }
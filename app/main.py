@@ -10,7 +10,8 @@ from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 import structlog
 
-from app.database.connection import init_db
+from app.database.connection import close_db, init_db
+from app.gateway.alert_log_writer import get_alert_log_writer
 from app.gateway.webhook import router as webhook_router
 from app.scheduler import setup_scheduler
 from app.web.router import router as web_router
@@ -43,7 +44,7 @@ def create_app(*, skip_startup: bool = False) -> FastAPI:
 
         logger.info("Starting IB Trading Bot API...")
 
-        await init_db()
+        await init_db(role="api")
         logger.info("Database initialized")
 
         sched = setup_scheduler()
@@ -55,6 +56,8 @@ def create_app(*, skip_startup: bool = False) -> FastAPI:
 
         logger.info("Shutting down IB Trading Bot API...")
         sched.shutdown(wait=False)
+        await get_alert_log_writer().close()
+        await close_db()
 
     app = FastAPI(
         title="IB Trading Bot",
@@ -4,5 +4,6 @@ from app.models.trade import Trade
 from app.models.alert_log import AlertLog
 from app.models.settings import BotSettings
 from app.models.portfolio_snapshot import PortfolioSnapshot
+from app.models.daily_pnl_rollup import DailyPnlRollup
 
-__all__ = ["Base", "Position", "Trade", "AlertLog", "BotSettings", "PortfolioSnapshot"]
+__all__ = ["Base", "Position", "Trade", "AlertLog", "BotSettings", "PortfolioSnapshot", "DailyPnlRollup"]
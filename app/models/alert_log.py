@@ -3,14 +3,27 @@ Alert log model.
 Records every incoming webhook alert for debugging and audit.
 """
 
-from datetime import datetime
+from datetime import date, datetime, timezone
 from typing import Optional
-from sqlalchemy import String, Float, Integer, DateTime, Boolean, Text
+from sqlalchemy import String, Float, Integer, Date, DateTime, Boolean, Text, Index, UniqueConstraint, and_, cast, func, text
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.models.base import Base
 
 
+def alert_log_month(received_at: Optional[datetime]) -> date:
+    """UTC month (first day) an alert belongs to; the alert_logs partition key."""
+    if received_at is None:
+        received_at = datetime.now(timezone.utc)
+    elif received_at.tzinfo is not None:
+        received_at = received_at.astimezone(timezone.utc)
+    return received_at.date().replace(day=1)
+
+
+def _received_month_default(context) -> date:
+    return alert_log_month(context.get_current_parameters().get("received_at"))
+
+
 class AlertLog(Base):
     __tablename__ = "alert_logs"
 
@@ -42,10 +55,66 @@ class AlertLog(Base):
         DateTime(timezone=True), nullable=True
     )
 
-    # Idempotency
-    idempotency_key: Mapped[Optional[str]] = mapped_column(
-        String(100), nullable=True, unique=True, index=True
+    # Idempotency (unique per partition month, see below)
+    idempotency_key: Mapped[Optional[str]] = mapped_column(String(100), nullable=True, index=True)
+
+    # Partition key. On Postgres the table is range-partitioned by this column
+    # (migration 005), so the primary key there is (id, received_month) and
+    # idempotency keys are unique within a month.
+    received_month: Mapped[date] = mapped_column(Date, default=_received_month_default, nullable=False)
+
+    # Skipped-alert lookups (failed SELL detection, daily skip counts) and the
+    # queued-but-unprocessed check only ever touch a small slice of the log.
+    # Predicates match what SQLAlchemy renders for .is_(True)/.is_(False).
+    __table_args__ = (
+        UniqueConstraint("idempotency_key", "received_month"),
+        Index(
+            "ix_alert_logs_ticker_action_received_skipped",
+            "ticker",
+            "action",
+            "received_at",
+            postgresql_where=text("skipped IS true"),
+            sqlite_where=text("skipped IS 1"),
+        ),
+        Index(
+            "ix_alert_logs_action_received_skipped",
+            "action",
+            "received_at",
+            postgresql_where=text("skipped IS true"),
+            sqlite_where=text("skipped IS 1"),
+        ),
+        Index(
+            "ix_alert_logs_ticker_action_unprocessed",
+            "ticker",
+            "action",
+            postgresql_where=text("queued IS true AND processed IS false"),
+            sqlite_where=text("queued IS 1 AND processed IS 0"),
+        ),
     )
 
     def __repr__(self) -> str:
         return f"<AlertLog(id={self.id}, {self.action} {self.ticker}, processed={self.processed})>"
+
+
+def alert_log_received_since(start_utc: datetime):
+    """received_at >= start, plus the matching partition-key bound so Postgres prunes old months."""
+    return and_(AlertLog.received_at >= start_utc, AlertLog.received_month >= alert_log_month(start_utc))
+
+
+def alert_log_month_expr(column, dialect_name: str):
+    """SQL counterpart of alert_log_month() for a timestamptz column expression."""
+    if dialect_name == "postgresql":
+        return cast(func.date_trunc("month", func.timezone("UTC", column)), Date)
+    return func.date(column, "start of month")
+
+
+def alert_log_received_since_column(start_column, dialect_name: str):
+    """
+    alert_log_received_since() against a correlated column (e.g. a per-ticker
+    earliest entry). Postgres prunes partitions at run time from the
+    received_month bound.
+    """
+    return and_(
+        AlertLog.received_at >= start_column,
+        AlertLog.received_month >= alert_log_month_expr(start_column, dialect_name),
+    )
@@ -0,0 +1,51 @@
+"""
+Daily P&L rollup model.
+One row per (ET trade date, market, currency) with the filled BUY/SELL
+aggregates the Telegram reports read, so they stay O(days) instead of
+re-scanning the trades table.
+"""
+
+from datetime import date, datetime
+from typing import Optional
+
+from sqlalchemy import Date, DateTime, Float, Integer, String, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base
+
+
+class DailyPnlRollup(Base):
+    __tablename__ = "daily_pnl_rollup"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    trade_date: Mapped[date] = mapped_column(Date, nullable=False)
+    # KRX for domestic symbols, otherwise the KIS overseas region (US/ASIA).
+    market: Mapped[str] = mapped_column(String(10), nullable=False)
+    currency: Mapped[str] = mapped_column(String(3), nullable=False)
+
+    # FILLED trades only; amounts are in the trade rows' native currency.
+    buy_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    buy_amount: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    sell_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    sell_amount: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    realized_pnl: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    commission: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    # SELLs routed through KIS (synthetic negative order ids).
+    kis_sell_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    # Earliest FILLED/PARTIAL BUY fill of the day (investment start date).
+    first_buy_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=datetime.utcnow, nullable=False
+    )
+
+    __table_args__ = (
+        UniqueConstraint("trade_date", "market", "currency", name="uq_daily_pnl_rollup_date_market_currency"),
+    )
+
+    def __repr__(self) -> str:
+        return (
+            f"<DailyPnlRollup(date={self.trade_date}, {self.market}/{self.currency}, "
+            f"buys={self.buy_count}, sells={self.sell_count}, pnl={self.realized_pnl:,.2f})>"
+        )
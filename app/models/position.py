@@ -6,7 +6,7 @@ Supports multiple positions per ticker (duplicate buys).
 
 from datetime import datetime
 from typing import Optional
-from sqlalchemy import String, Float, Integer, DateTime, Enum as SAEnum, Index
+from sqlalchemy import String, Float, Integer, DateTime, Enum as SAEnum, Index, literal_column, text
 from sqlalchemy.orm import Mapped, mapped_column
 import enum
 
@@ -61,6 +61,22 @@ class Position(Base):
     # Indexes for common queries
     __table_args__ = (
         Index("ix_positions_ticker_status", "ticker", "status"),
+        # Open rows are a small slice of the table; KIS-managed ones carry a
+        # negative synthetic entry_order_id.
+        Index(
+            "ix_positions_open_ticker",
+            "ticker",
+            "entry_time",
+            postgresql_where=text("status = 'OPEN'"),
+            sqlite_where=text("status = 'OPEN'"),
+        ),
+        Index(
+            "ix_positions_open_synthetic_ticker",
+            "ticker",
+            "entry_time",
+            postgresql_where=text("status = 'OPEN' AND entry_order_id < 0"),
+            sqlite_where=text("status = 'OPEN' AND entry_order_id < 0"),
+        ),
     )
 
     def __repr__(self) -> str:
@@ -68,3 +84,10 @@ class Position(Base):
             f"<Position(id={self.id}, ticker={self.ticker}, qty={self.qty}, "
             f"entry={self.entry_price}, status={self.status})>"
         )
+
+
+# Partial-index predicates rendered as SQL literals. A bound parameter would
+# hide the value from the planner, and cached (generic) plans for prepared
+# statements could then not use the partial indexes above.
+POSITION_IS_OPEN = Position.status == literal_column("'OPEN'")
+POSITION_IS_SYNTHETIC = Position.entry_order_id < literal_column("0")
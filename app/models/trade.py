@@ -5,7 +5,7 @@ Records every individual order execution for audit trail.
 
 from datetime import datetime
 from typing import Optional
-from sqlalchemy import String, Float, Integer, DateTime, Enum as SAEnum, Index
+from sqlalchemy import String, Float, Integer, DateTime, Enum as SAEnum, Index, and_, func
 from sqlalchemy.orm import Mapped, mapped_column
 import enum
 
@@ -78,3 +78,23 @@ class Trade(Base):
             f"<Trade(id={self.id}, {self.side} {self.ticker}, "
             f"qty={self.filled_qty}, status={self.status})>"
         )
+
+
+# Realized-trade time: fill time, or creation time for legacy rows without
+# one. Day/week windows filter on this exact expression so the expression
+# indexes below can serve them.
+trade_effective_time = func.coalesce(Trade.filled_at, Trade.created_at)
+
+Index("ix_trades_side_status_effective_time", Trade.side, Trade.status, trade_effective_time)
+Index(
+    "ix_trades_ticker_side_status_effective_time",
+    Trade.ticker,
+    Trade.side,
+    Trade.status,
+    trade_effective_time,
+)
+
+
+def trade_time_window(start_utc, end_utc):
+    """Trades whose fill (or, lacking one, creation) time is in [start, end)."""
+    return and_(trade_effective_time >= start_utc, trade_effective_time < end_utc)
@@ -23,6 +23,7 @@ from telegram.ext import (
 import structlog
 
 from app.config import settings
+from app.broker.kis_client import KISPriority, kis_priority_scope
 from app.database.connection import init_db, get_bot_settings, update_bot_setting, get_session
 from app.risk.risk_manager import get_risk_summary
 from app.queue.order_queue import get_queue_stats, clear_all_queues, get_waiting_ticker_stats, get_redis
@@ -360,20 +361,11 @@ def _kis_exchange_to_currency(value: str) -> str:
 
 
 def _filled_trade_time_window(model, start_utc, end_utc):
-    from sqlalchemy import and_, or_
+    from sqlalchemy import and_, func
 
-    return or_(
-        and_(
-            model.filled_at.is_not(None),
-            model.filled_at >= start_utc,
-            model.filled_at < end_utc,
-        ),
-        and_(
-            model.filled_at.is_(None),
-            model.created_at >= start_utc,
-            model.created_at < end_utc,
-        ),
-    )
+    # Same expression as the trades time-window indexes (filled_at, else created_at).
+    effective_time = func.coalesce(model.filled_at, model.created_at)
+    return and_(effective_time >= start_utc, effective_time < end_utc)
 
 
 async def _get_display_usdkrw_rate() -> tuple[float, str]:
@@ -504,7 +496,7 @@ async def cmd_status(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     try:
         from sqlalchemy import select, func
-        from app.models.alert_log import AlertLog
+        from app.models.alert_log import AlertLog, alert_log_received_since
         from app.models.trade import Trade, TradeSide, TradeStatus
 
         risk = await get_risk_summary()
@@ -524,7 +516,7 @@ async def cmd_status(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 select(func.count(AlertLog.id)).where(
                     AlertLog.action == "BUY",
                     AlertLog.skipped.is_(True),
-                    AlertLog.received_at >= today_start,
+                    alert_log_received_since(today_start),
                     AlertLog.received_at < today_end,
                 )
             )).scalar() or 0
@@ -533,7 +525,7 @@ async def cmd_status(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 select(func.count(AlertLog.id)).where(
                     AlertLog.action == "SELL",
                     AlertLog.skipped.is_(True),
-                    AlertLog.received_at >= today_start,
+                    alert_log_received_since(today_start),
                     AlertLog.received_at < today_end,
                 )
             )).scalar() or 0
@@ -545,7 +537,7 @@ async def cmd_status(update: Update, context: ContextTypes.DEFAULT_TYPE):
                     AlertLog.skip_reason,
                 ).where(
                     AlertLog.skipped.is_(True),
-                    AlertLog.received_at >= today_start,
+                    alert_log_received_since(today_start),
                     AlertLog.received_at < today_end,
                 ).order_by(AlertLog.id.desc()).limit(5)
             )).all()
@@ -802,6 +794,7 @@ async def _fetch_kis_balance_snapshot() -> dict:
     }
 
 
+@kis_priority_scope(KISPriority.REPORTING)
 async def _fetch_kis_portfolio_metrics(
     *,
     include_today_eval_pnl: bool = False,
@@ -1115,9 +1108,8 @@ async def _fetch_all_time_total_pnl_snapshot_series(usdkrw_rate: float) -> list[
     """
     from sqlalchemy import select
     from app.models.portfolio_snapshot import PortfolioSnapshot
-    from app.models.trade import Trade, TradeSide, TradeStatus
+    from app.risk.pnl_rollup import fetch_daily_realized_pnl
 
-    et_tz = get_et_now().tzinfo
     rate = float(usdkrw_rate or 0.0)
 
     async with get_session() as session:
@@ -1128,29 +1120,11 @@ async def _fetch_all_time_total_pnl_snapshot_series(usdkrw_rate: float) -> list[
         )
         snapshots = list(snapshot_result.scalars().all())
 
-        trade_result = await session.execute(
-            select(Trade).where(
-                Trade.side == TradeSide.SELL,
-                Trade.status == TradeStatus.FILLED,
-            )
-        )
-        sell_trades = list(trade_result.scalars().all())
-
-    if not snapshots:
-        return []
-
-    realized_by_date: dict = {}
-    for trade in sell_trades:
-        ts = trade.filled_at or trade.created_at
-        if ts is None:
-            continue
-        if ts.tzinfo is None:
-            ts = ts.replace(tzinfo=timezone.utc)
-        trade_date = ts.astimezone(et_tz).date()
-        realized_net_usd = float(trade.total_pnl_usd or 0.0) - float(trade.commission or 0.0)
-        realized_by_date[trade_date] = realized_by_date.get(trade_date, 0.0) + realized_net_usd
+        if not snapshots:
+            return []
+        daily_realized = await fetch_daily_realized_pnl(session)
 
-    realized_items = sorted(realized_by_date.items())
+    realized_items = [(trade_date, pnl - commission) for trade_date, (pnl, commission) in daily_realized.items()]
     realized_idx = 0
     cumulative_realized_usd = 0.0
     series = []
@@ -1200,32 +1174,14 @@ async def _fetch_all_time_total_pnl_snapshot_series(usdkrw_rate: float) -> list[
 
 async def _fetch_investment_start_date_label() -> Optional[str]:
     """Return the ET date of the first actual buy fill, if available."""
-    from sqlalchemy import select
-    from app.models.trade import Trade, TradeSide, TradeStatus
+    from app.risk.pnl_rollup import fetch_first_buy_date
 
-    et_tz = get_et_now().tzinfo
     async with get_session() as session:
-        result = await session.execute(
-            select(Trade).where(
-                Trade.side == TradeSide.BUY,
-                Trade.status.in_([TradeStatus.FILLED, TradeStatus.PARTIAL]),
-            )
-        )
-        buy_trades = list(result.scalars().all())
-
-    first_ts = None
-    for trade in buy_trades:
-        ts = trade.filled_at or trade.created_at
-        if ts is None:
-            continue
-        if ts.tzinfo is None:
-            ts = ts.replace(tzinfo=timezone.utc)
-        if first_ts is None or ts < first_ts:
-            first_ts = ts
+        first_date = await fetch_first_buy_date(session)
 
-    if first_ts is None:
+    if first_date is None:
         return None
-    return first_ts.astimezone(et_tz).strftime("%Y-%m-%d")
+    return first_date.strftime("%Y-%m-%d")
 
 
 def _format_investment_elapsed_line(start_date_label: Optional[str]) -> str:
@@ -1266,43 +1222,29 @@ async def _fetch_recent_daily_pnl_series(days: int = 7) -> list[dict]:
     Return recent ET-day realized net P&L series.
     Net P&L = realized sell pnl - commission.
     """
-    from sqlalchemy import select, func
     from app.database.connection import get_session
-    from app.models.trade import Trade, TradeSide, TradeStatus
+    from app.risk.pnl_rollup import fetch_daily_realized_pnl
 
     count = max(1, int(days or 7))
-    now_utc = datetime.now(timezone.utc)
+    today = get_et_now().date()
+    first_day = today - timedelta(days=count - 1)
     series = []
 
     async with get_session() as session:
-        for day_offset in range(count - 1, -1, -1):
-            ref_utc = now_utc - timedelta(days=day_offset)
-            day_start, day_end = get_et_day_bounds_utc(now_utc=ref_utc)
-            filled_window = _filled_trade_time_window(Trade, day_start, day_end)
+        daily_realized = await fetch_daily_realized_pnl(session, first_day, today + timedelta(days=1))
 
-            result = await session.execute(
-                select(
-                    func.sum(Trade.total_pnl_usd),
-                    func.sum(Trade.commission),
-                ).where(
-                    Trade.side == TradeSide.SELL,
-                    Trade.status == TradeStatus.FILLED,
-                    filled_window,
-                )
-            )
-            row = result.one()
-            gross_pnl = float(row[0] or 0.0)
-            commission = float(row[1] or 0.0)
-            net_pnl = gross_pnl - commission
-            label = day_start.astimezone(get_et_now().tzinfo).strftime("%m-%d")
-            series.append(
-                {
-                    "label": label,
-                    "gross_pnl_usd": round(gross_pnl, 2),
-                    "commission_usd": round(commission, 2),
-                    "net_pnl_usd": round(net_pnl, 2),
-                }
-            )
+    for day_offset in range(count):
+        trade_date = first_day + timedelta(days=day_offset)
+        gross_pnl, commission = daily_realized.get(trade_date, (0.0, 0.0))
+        net_pnl = gross_pnl - commission
+        series.append(
+            {
+                "label": trade_date.strftime("%m-%d"),
+                "gross_pnl_usd": round(gross_pnl, 2),
+                "commission_usd": round(commission, 2),
+                "net_pnl_usd": round(net_pnl, 2),
+            }
+        )
 
     return series
 
@@ -1419,7 +1361,7 @@ async def cmd_positions(update: Update, context: ContextTypes.DEFAULT_TYPE):
     try:
         from sqlalchemy import select, func
         from app.database.connection import get_session
-        from app.models.position import Position, PositionStatus
+        from app.models.position import Position, POSITION_IS_OPEN
         usdkrw_rate, _ = await _get_display_usdkrw_rate()
 
         async with get_session() as session:
@@ -1432,7 +1374,7 @@ async def cmd_positions(update: Update, context: ContextTypes.DEFAULT_TYPE):
                     func.sum(Position.entry_amount_usd).label("total_amount"),
                     func.avg(Position.entry_price).label("avg_price"),
                 ).where(
-                    Position.status == PositionStatus.OPEN
+                    POSITION_IS_OPEN
                 ).group_by(Position.ticker).order_by(
                     func.sum(Position.entry_amount_usd).desc()
                 )
@@ -1590,46 +1532,24 @@ async def cmd_pnl_week(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     try:
-        from sqlalchemy import select, func
         from app.database.connection import get_session
-        from app.models.trade import Trade, TradeSide, TradeStatus
+        from app.risk.pnl_rollup import fetch_rollup_rows
         week_start, week_end = get_et_week_bounds_utc()
-        filled_window = _filled_trade_time_window(Trade, week_start, week_end)
+        et_tz = get_et_now().tzinfo
         usdkrw_rate, _ = await _get_display_usdkrw_rate()
 
         async with get_session() as session:
-            buy_count = (await session.execute(
-                select(func.count(Trade.id)).where(
-                    Trade.side == TradeSide.BUY,
-                    Trade.status == TradeStatus.FILLED,
-                    filled_window,
-                )
-            )).scalar() or 0
-
-            result = await session.execute(
-                select(
-                    func.count(Trade.id),
-                    func.sum(Trade.total_pnl_usd),
-                    func.sum(Trade.commission),
-                ).where(
-                    Trade.side == TradeSide.SELL,
-                    Trade.status == TradeStatus.FILLED,
-                    filled_window,
-                )
+            rollup_rows = await fetch_rollup_rows(
+                session,
+                week_start.astimezone(et_tz).date(),
+                week_end.astimezone(et_tz).date(),
             )
-            row = result.one()
-            sell_count = row[0] or 0
-            total_pnl = row[1] or 0.0
-            total_comm = row[2] or 0.0
 
-            kis_sell_count = (await session.execute(
-                select(func.count(Trade.id)).where(
-                    Trade.side == TradeSide.SELL,
-                    Trade.status == TradeStatus.FILLED,
-                    Trade.ib_order_id < 0,
-                    filled_window,
-                )
-            )).scalar() or 0
+        buy_count = sum(row.buy_count for row in rollup_rows)
+        sell_count = sum(row.sell_count for row in rollup_rows)
+        total_pnl = sum(float(row.realized_pnl or 0.0) for row in rollup_rows)
+        total_comm = sum(float(row.commission or 0.0) for row in rollup_rows)
+        kis_sell_count = sum(row.kis_sell_count for row in rollup_rows)
 
         realized_net_pnl = float(total_pnl or 0.0) - float(total_comm or 0.0)
         pnl_emoji = "🟢" if realized_net_pnl >= 0 else "🔴"
@@ -1985,13 +1905,13 @@ async def cmd_sell_all(update: Update, context: ContextTypes.DEFAULT_TYPE):
     try:
         from sqlalchemy import select, func
         from app.database.connection import get_session
-        from app.models.position import Position, PositionStatus
+        from app.models.position import Position, POSITION_IS_OPEN
         from app.queue.order_queue import enqueue_order
 
         async with get_session() as session:
             result = await session.execute(
                 select(func.distinct(Position.ticker)).where(
-                    Position.status == PositionStatus.OPEN
+                    POSITION_IS_OPEN
                 )
             )
             tickers = [row[0] for row in result.all()]
@@ -2172,12 +2092,10 @@ async def send_daily_report():
     try:
         from sqlalchemy import select, func
         from app.database.connection import get_session
-        from app.models.trade import Trade, TradeSide, TradeStatus
-        from app.models.position import Position, PositionStatus
-        from app.gateway.symbol_mapper import is_kis_domestic_symbol
+        from app.models.position import Position, POSITION_IS_OPEN
+        from app.risk.pnl_rollup import fetch_rollup_rows
 
-        today_start, today_end = get_et_day_bounds_utc()
-        filled_window = _filled_trade_time_window(Trade, today_start, today_end)
+        today = get_et_now().date()
         usdkrw_rate, _ = await _get_display_usdkrw_rate()
         kis_portfolio = await _fetch_kis_portfolio_metrics(
             include_today_eval_pnl=True,
@@ -2190,85 +2108,30 @@ async def send_daily_report():
 
         async with get_session() as session:
             # Today's stats
-            buy_count = (await session.execute(
-                select(func.count(Trade.id)).where(
-                    Trade.side == TradeSide.BUY,
-                    Trade.status == TradeStatus.FILLED,
-                    filled_window,
-                )
-            )).scalar() or 0
-
-            buy_rows = (
-                await session.execute(
-                    select(Trade.ticker, Trade.total_fill_amount_usd).where(
-                        Trade.side == TradeSide.BUY,
-                        Trade.status == TradeStatus.FILLED,
-                        filled_window,
-                    )
-                )
-            ).all()
-
-            buy_amount_krw = 0.0
-            for ticker, amount in buy_rows:
-                native_amount = float(amount or 0.0)
-                if is_kis_domestic_symbol(str(ticker or "")):
-                    buy_amount_krw += native_amount
-                elif usdkrw_rate > 0:
-                    buy_amount_krw += native_amount * usdkrw_rate
-
-            sell_rows = (
-                await session.execute(
-                    select(Trade.ticker, Trade.total_fill_amount_usd, Trade.total_pnl_usd).where(
-                        Trade.side == TradeSide.SELL,
-                        Trade.status == TradeStatus.FILLED,
-                        filled_window,
-                    )
-                )
-            ).all()
-            sell_count = len(sell_rows)
-            sell_amount_krw = 0.0
-            total_pnl_krw_from_trades = 0.0
-            for ticker, amount, pnl in sell_rows:
-                native_amount = float(amount or 0.0)
-                native_pnl = float(pnl or 0.0)
-                if is_kis_domestic_symbol(str(ticker or "")):
-                    sell_amount_krw += native_amount
-                    total_pnl_krw_from_trades += native_pnl
-                elif usdkrw_rate > 0:
-                    sell_amount_krw += native_amount * usdkrw_rate
-                    total_pnl_krw_from_trades += native_pnl * usdkrw_rate
-
-            # Legacy USD aggregates are intentionally no longer used for display
-            # because domestic/KRX trades store native KRW in the same amount fields.
-            _legacy_buy_amount_usd = float((await session.execute(
-                select(func.sum(Trade.total_fill_amount_usd)).where(
-                    Trade.side == TradeSide.BUY,
-                    Trade.status == TradeStatus.FILLED,
-                    filled_window,
-                )
-            )).scalar() or 0.0)
-
-            sell_result = await session.execute(
-                select(
-                    func.count(Trade.id),
-                    func.sum(Trade.total_fill_amount_usd),
-                    func.sum(Trade.total_pnl_usd),
-                ).where(
-                    Trade.side == TradeSide.SELL,
-                    Trade.status == TradeStatus.FILLED,
-                    filled_window,
-                )
-            )
-            sell_row = sell_result.one()
-            _legacy_sell_count = sell_row[0] or 0
-            _legacy_sell_amount_usd = float(sell_row[1] or 0.0)
-            _legacy_total_pnl = sell_row[2] or 0.0
+            rollup_rows = await fetch_rollup_rows(session, today, today + timedelta(days=1))
 
             # Open positions
             open_count = (await session.execute(
-                select(func.count(Position.id)).where(Position.status == PositionStatus.OPEN)
+                select(func.count(Position.id)).where(POSITION_IS_OPEN)
             )).scalar() or 0
 
+        buy_count = sum(row.buy_count for row in rollup_rows)
+        sell_count = sum(row.sell_count for row in rollup_rows)
+        buy_amount_krw = 0.0
+        sell_amount_krw = 0.0
+        total_pnl_krw_from_trades = 0.0
+        for row in rollup_rows:
+            # Domestic/KRX rows are native KRW; everything else is converted like USD.
+            if row.currency == "KRW":
+                krw_per_unit = 1.0
+            elif usdkrw_rate > 0:
+                krw_per_unit = usdkrw_rate
+            else:
+                continue
+            buy_amount_krw += float(row.buy_amount or 0.0) * krw_per_unit
+            sell_amount_krw += float(row.sell_amount or 0.0) * krw_per_unit
+            total_pnl_krw_from_trades += float(row.realized_pnl or 0.0) * krw_per_unit
+
         waiting = await get_waiting_ticker_stats(include_processing=False)
         cash_shortage_block = ""
         if int(waiting.get("buy_order_count") or 0) > 0:
@@ -2445,7 +2308,7 @@ def create_bot_app():
 
 async def run_bot():
     """Run the Telegram bot."""
-    await init_db()
+    await init_db(role="telegram")
 
     app = create_bot_app()
     if not app:
@@ -1,14 +1,23 @@
 """
 Redis-based order queue with priority handling.
 SELL orders get higher priority than BUY orders.
+
+Two active-queue backends are available (ORDER_QUEUE_BACKEND):
+- list: LPUSH/RPOPLPUSH with an orders:processing list (default)
+- stream: Redis Streams consumer groups with XACK and XAUTOCLAIM reclaim,
+  safe for more than one worker process
 """
 
-import json
+import os
+import socket
+import time
+from collections import OrderedDict
 from datetime import datetime, timezone
 from typing import Optional
 import redis.asyncio as redis
 import structlog
 
+from app.codec import JSONDecodeError, encode_order, loads as decode_json
 from app.config import settings
 
 logger = structlog.get_logger()
@@ -16,19 +25,377 @@ logger = structlog.get_logger()
 # Redis keys
 SELL_QUEUE = "orders:sell"    # High priority
 BUY_QUEUE = "orders:buy"     # Normal priority
-PENDING_QUEUE = "orders:pending"  # Queued for market open
+PENDING_QUEUE = "orders:pending"  # Queued for market open (legacy list, migrated on access)
+PENDING_PREFIX = "orders:pending"  # Per-market sorted sets: orders:pending:<market>:<action>
+# Pending market keys; Asia keys mirror market_hours.ASIA_MARKET_SESSIONS.
+PENDING_MARKETS = ("US", "KRX", "HKEX", "SSE", "SZSE", "TSE")
 PROCESSING_SET = "orders:processing"  # Currently being processed
-IDEMPOTENCY_PREFIX = "orders:idempotency"
+SELL_SIGNAL_KEY = "orders:signal:sell"  # Wake-up tokens for blocking dequeue
+BUY_SIGNAL_KEY = "orders:signal:buy"
+IDEMPOTENCY_PREFIX = "orders:idempotency"  # Legacy per-order markers: orders:idempotency:<key>
+IDEMPOTENCY_BUCKET_PREFIX = "orders:idempotency:day"  # Hash per UTC day: key -> expiry epoch
+IDEMPOTENCY_BUCKET_SECONDS = 86400
+SELL_STREAM = "orders:stream:sell"
+BUY_STREAM = "orders:stream:buy"
+STREAM_PAYLOAD_FIELD = "payload"
+STREAM_CONSUMER_LEASE_PREFIX = "orders:stream:consumer"  # Liveness lease per consumer name
+STREAM_RECOVERY_CONSUMER = "recovery"  # Parks released entries until a lane reclaims them
+STATS_KEY = "orders:stats"  # Hash: "<tier>:<action>" -> order count
+STATS_TICKERS_PREFIX = "orders:stats:tickers"  # Hash per tier/action: ticker -> order count
+STATS_TIERS = ("waiting", "all")  # waiting = sell/buy/pending; all = waiting + in-flight
+_STATS_FIELDS = tuple(f"{tier}:{action}" for tier in STATS_TIERS for action in ("BUY", "SELL"))
+
+# Lua helper shared by every script that adds, moves or removes orders, so the
+# stats hashes change in the same atomic step as the queues. The stats hashes
+# are the last KEYS of every such script (STATS_KEY, then one ticker hash per
+# _STATS_FIELDS entry; see _eval_order_script); stats_base is the number of
+# KEYS before them.
+_ORDER_STATS_LUA = """
+local stats_base = #KEYS - __STATS_KEY_COUNT__
+local stats_tickers_keys = {}
+for i, field in ipairs({__STATS_FIELDS__}) do
+    stats_tickers_keys[field] = KEYS[stats_base + 1 + i]
+end
+
+local function trimmed_upper(value)
+    if type(value) ~= 'string' then
+        return ''
+    end
+    return string.upper(value:match('^%s*(.-)%s*$'))
+end
 
-_ENQUEUE_ONCE_SCRIPT = """
+local function order_stats(payload, waiting_delta, all_delta)
+    local ok, order = pcall(cjson.decode, payload)
+    if not ok or type(order) ~= 'table' then
+        return
+    end
+    local action = trimmed_upper(order['action'])
+    if action ~= 'BUY' and action ~= 'SELL' then
+        return
+    end
+    local ticker = trimmed_upper(order['ticker'])
+    local deltas = {waiting = waiting_delta, all = all_delta}
+    for tier, delta in pairs(deltas) do
+        if delta ~= 0 then
+            local field = tier .. ':' .. action
+            redis.call('HINCRBY', KEYS[stats_base + 1], field, delta)
+            if ticker ~= '' then
+                local tickers_key = stats_tickers_keys[field]
+                if redis.call('HINCRBY', tickers_key, ticker, delta) <= 0 then
+                    redis.call('HDEL', tickers_key, ticker)
+                end
+            end
+        end
+    end
+end
+""".replace("__STATS_KEY_COUNT__", str(1 + len(_STATS_FIELDS))).replace(
+    "__STATS_FIELDS__", ", ".join(f"'{field}'" for field in _STATS_FIELDS)
+)
+
+_ENQUEUE_ONCE_SCRIPT = _ORDER_STATS_LUA + """
 if redis.call('SET', KEYS[1], ARGV[2], 'NX', 'EX', ARGV[3]) then
     redis.call('LPUSH', KEYS[2], ARGV[1])
+    order_stats(ARGV[1], 1, 1)
     return 1
 end
 return 0
 """
 
+# Append to an active queue (list or stream) and wake a blocked lane.
+# KEYS: target queue/stream, signal; ARGV: payload, 'list' or 'stream'
+_PUSH_ACTIVE_SCRIPT = _ORDER_STATS_LUA + """
+if ARGV[2] == 'stream' then
+    redis.call('XADD', KEYS[1], '*', 'payload', ARGV[1])
+else
+    redis.call('LPUSH', KEYS[1], ARGV[1])
+end
+order_stats(ARGV[1], 1, 1)
+redis.call('LPUSH', KEYS[2], '1')
+return 1
+"""
+
+# KEYS: pending sorted set; ARGV: payload, score
+_PENDING_ADD_SCRIPT = _ORDER_STATS_LUA + """
+if redis.call('ZADD', KEYS[1], ARGV[2], ARGV[1]) == 1 then
+    order_stats(ARGV[1], 1, 1)
+end
+return 1
+"""
+
+# KEYS: processing list; ARGV: payload
+_ACK_SCRIPT = _ORDER_STATS_LUA + """
+local removed = redis.call('LREM', KEYS[1], 1, ARGV[1])
+if removed > 0 then
+    order_stats(ARGV[1], 0, -1)
+end
+return removed
+"""
+
+# KEYS: stream; ARGV: group, entry id
+_STREAM_ACK_SCRIPT = _ORDER_STATS_LUA + """
+local entries = redis.call('XRANGE', KEYS[1], ARGV[2], ARGV[2])
+local acked = redis.call('XACK', KEYS[1], ARGV[1], ARGV[2])
+redis.call('XDEL', KEYS[1], ARGV[2])
+if acked > 0 and entries[1] then
+    order_stats(entries[1][2][2], 0, -1)
+end
+return acked
+"""
+
+# KEYS: processing list, source queue, signal; ARGV: payload
+_REQUEUE_PROCESSING_SCRIPT = _ORDER_STATS_LUA + """
+local removed = redis.call('LREM', KEYS[1], 1, ARGV[1])
+redis.call('LPUSH', KEYS[2], ARGV[1])
+redis.call('LPUSH', KEYS[3], '1')
+if removed > 0 then
+    order_stats(ARGV[1], 1, 0)
+else
+    order_stats(ARGV[1], 1, 1)
+end
+return 1
+"""
+
+# Move every in-flight list order back to its active queue on startup.
+# KEYS: processing list, sell queue, buy queue, sell signal, buy signal
+_REQUEUE_INFLIGHT_SCRIPT = _ORDER_STATS_LUA + """
+local moved = 0
+local dropped = {}
+while true do
+    local payload = redis.call('RPOP', KEYS[1])
+    if not payload then
+        break
+    end
+    local ok, order = pcall(cjson.decode, payload)
+    local action = ''
+    if ok and type(order) == 'table' then
+        action = trimmed_upper(order['action'])
+    end
+    if action == 'SELL' or action == 'BUY' then
+        local target = 3
+        if action == 'SELL' then
+            target = 2
+        end
+        redis.call('LPUSH', KEYS[target], payload)
+        redis.call('LPUSH', KEYS[target + 2], '1')
+        order_stats(payload, 1, 0)
+        moved = moved + 1
+    else
+        dropped[#dropped + 1] = payload
+    end
+end
+return {moved, dropped}
+"""
+
+# Move the next order into the processing list in one round trip, SELL first.
+# When an active queue is empty its wake-up tokens are stale (every order pushed
+# before this point is visible to the script), so they are cleared here.
+# ARGV[1] == '1' restricts the move to the SELL queue for reserved SELL lanes.
+_DEQUEUE_SCRIPT = _ORDER_STATS_LUA + """
+local payload = redis.call('RPOPLPUSH', KEYS[1], KEYS[3])
+if payload then
+    order_stats(payload, -1, 0)
+    return {KEYS[1], payload}
+end
+redis.call('DEL', KEYS[4])
+if ARGV[1] == '1' then
+    return false
+end
+payload = redis.call('RPOPLPUSH', KEYS[2], KEYS[3])
+if payload then
+    order_stats(payload, -1, 0)
+    return {KEYS[2], payload}
+end
+redis.call('DEL', KEYS[5])
+return false
+"""
+
+_STREAM_ENQUEUE_ONCE_SCRIPT = _ORDER_STATS_LUA + """
+if redis.call('SET', KEYS[1], ARGV[2], 'NX', 'EX', ARGV[3]) then
+    redis.call('XADD', KEYS[2], '*', 'payload', ARGV[1])
+    order_stats(ARGV[1], 1, 1)
+    return 1
+end
+return 0
+"""
+
+# Day-bucketed dedupe: one hash per UTC day whose fields hold each marker's
+# expiry epoch, so the TTL stays exact per order while Redis drops a whole
+# day's markers with a single key expiry. A legacy per-order marker still
+# counts as a duplicate until it expires. Returns {queued, expiry epoch}.
+# KEYS: legacy marker, target queue/stream, current bucket, older buckets...,
+# then the stats hashes
+# ARGV: payload, 'list' or 'stream', field, now epoch, expiry epoch, bucket ttl
+_BUCKET_ENQUEUE_ONCE_SCRIPT = _ORDER_STATS_LUA + """
+local now = tonumber(ARGV[4])
+local legacy_ttl = redis.call('TTL', KEYS[1])
+if legacy_ttl > 0 or legacy_ttl == -1 then
+    return {0, now + math.max(legacy_ttl, 0)}
+end
+for i = 3, stats_base do
+    local expires_at = tonumber(redis.call('HGET', KEYS[i], ARGV[3]) or '0')
+    if expires_at > now then
+        return {0, expires_at}
+    end
+end
+redis.call('HSET', KEYS[3], ARGV[3], ARGV[5])
+if redis.call('TTL', KEYS[3]) < tonumber(ARGV[6]) then
+    redis.call('EXPIRE', KEYS[3], ARGV[6])
+end
+if ARGV[2] == 'stream' then
+    redis.call('XADD', KEYS[2], '*', 'payload', ARGV[1])
+else
+    redis.call('LPUSH', KEYS[2], ARGV[1])
+end
+order_stats(ARGV[1], 1, 1)
+return {1, tonumber(ARGV[5])}
+"""
+
+# Stream counterpart of _DEQUEUE_SCRIPT. Entries idle past the claim threshold
+# (crashed consumer or released for retry) are reclaimed before new entries are
+# read, and the per-entry delivery count comes back with the payload. Only new
+# reads leave the waiting tier; reclaimed entries were already in flight.
+# KEYS: sell stream, buy stream, sell signal, buy signal
+# ARGV: group, consumer, min idle ms, sell_only flag
+_STREAM_DEQUEUE_SCRIPT = _ORDER_STATS_LUA + """
+local function take(stream)
+    local entries = redis.call('XAUTOCLAIM', stream, ARGV[1], ARGV[2], ARGV[3], '0-0', 'COUNT', 1)[2]
+    local fresh = false
+    if #entries == 0 then
+        local read = redis.call('XREADGROUP', 'GROUP', ARGV[1], ARGV[2], 'COUNT', 1, 'STREAMS', stream, '>')
+        if not read then
+            return nil
+        end
+        entries = read[1][2]
+        if #entries == 0 then
+            return nil
+        end
+        fresh = true
+    end
+    local entry = entries[1]
+    if fresh then
+        order_stats(entry[2][2], -1, 0)
+    end
+    local deliveries = 1
+    local pending = redis.call('XPENDING', stream, ARGV[1], entry[1], entry[1], 1)
+    if pending[1] then
+        deliveries = pending[1][4]
+    end
+    return {stream, entry[1], entry[2][2], deliveries}
+end
+
+local taken = take(KEYS[1])
+if taken then
+    return taken
+end
+redis.call('DEL', KEYS[3])
+if ARGV[4] == '1' then
+    return false
+end
+taken = take(KEYS[2])
+if taken then
+    return taken
+end
+redis.call('DEL', KEYS[4])
+return false
+"""
+
+# Expire and wake pending orders in one atomic pass. Sorted-set scores are the
+# original alert timestamps, so expiry is a score range and waking a market is
+# a full-range move; cost is proportional to the orders touched.
+# KEYS[1..4]: sell target, buy target, sell signal, buy signal
+# KEYS[5..stats_base]: pending sorted sets as (SELL, BUY) pairs, one pair per market
+# ARGV[1]: expiry cutoff score ('-inf' disables), ARGV[2]: 'list' or 'stream',
+# ARGV[3..]: '1' to wake the market pair with the same index
+_PENDING_SWEEP_SCRIPT = _ORDER_STATS_LUA + """
+local expired = {}
+local moved = {0, 0}
+local kept = 0
+for i = 5, stats_base do
+    local side = ((i - 5) % 2) + 1
+    local stale = redis.call('ZRANGEBYSCORE', KEYS[i], '-inf', ARGV[1])
+    if #stale > 0 then
+        redis.call('ZREMRANGEBYSCORE', KEYS[i], '-inf', ARGV[1])
+        for _, payload in ipairs(stale) do
+            order_stats(payload, -1, -1)
+            expired[#expired + 1] = payload
+        end
+    end
+    if ARGV[3 + math.floor((i - 5) / 2)] == '1' then
+        local ready = redis.call('ZRANGE', KEYS[i], 0, -1)
+        for _, payload in ipairs(ready) do
+            if ARGV[2] == 'stream' then
+                redis.call('XADD', KEYS[side], '*', 'payload', payload)
+            else
+                redis.call('LPUSH', KEYS[side], payload)
+            end
+        end
+        redis.call('DEL', KEYS[i])
+        moved[side] = moved[side] + #ready
+    else
+        kept = kept + redis.call('ZCARD', KEYS[i])
+    end
+end
+for side = 1, 2 do
+    if moved[side] > 0 then
+        redis.call('LPUSH', KEYS[side + 2], '1')
+    end
+end
+return {moved[1], moved[2], kept, expired}
+"""
+
+# Hand a consumer's pending entries to the recovery consumer, already idle past
+# the claim threshold. Returns -1 for consumers whose lease is still held
+# (the caller's own consumer, ARGV[5] = '1', is released regardless).
+# KEYS: stream, consumer lease; ARGV: group, consumer, recovery consumer, idle ms, own flag
+_STREAM_RELEASE_CONSUMER_SCRIPT = """
+if ARGV[5] ~= '1' and redis.call('EXISTS', KEYS[2]) == 1 then
+    return -1
+end
+local released = 0
+while true do
+    local rows = redis.call('XPENDING', KEYS[1], ARGV[1], '-', '+', 100, ARGV[2])
+    if #rows == 0 then
+        break
+    end
+    local claim = {'XCLAIM', KEYS[1], ARGV[1], ARGV[3], 0}
+    for _, row in ipairs(rows) do
+        table.insert(claim, row[1])
+    end
+    table.insert(claim, 'IDLE')
+    table.insert(claim, ARGV[4])
+    table.insert(claim, 'JUSTID')
+    redis.call(unpack(claim))
+    released = released + #rows
+end
+return released
+"""
+
+# Reset the idle time of entries the consumer still owns and report the ones
+# another worker has reclaimed meanwhile (those are left alone).
+# KEYS: stream; ARGV: group, consumer, entry ids...
+_STREAM_REFRESH_SCRIPT = """
+local lost = {}
+for i = 3, #ARGV do
+    local row = redis.call('XPENDING', KEYS[1], ARGV[1], ARGV[i], ARGV[i], 1)[1]
+    if row and row[2] == ARGV[2] then
+        redis.call('XCLAIM', KEYS[1], ARGV[1], ARGV[2], 0, ARGV[i], 'JUSTID')
+    else
+        table.insert(lost, ARGV[i])
+    end
+end
+return lost
+"""
+
 _redis_client = None
+_stream_groups_ready = False
+# In-flight stream entries owned by this process: entry id -> stream key.
+_stream_inflight: dict[str, str] = {}
+
+
+def _eval_order_script(r: redis.Redis, script: str, keys: list[str], *args):
+    """Run a script built on _ORDER_STATS_LUA: its own KEYS, then the stats hashes."""
+    stats_keys = _stats_keys()
+    return r.eval(script, len(keys) + len(stats_keys), *keys, *stats_keys, *args)
 
 
 def _queue_name_for_action(action: str) -> str:
@@ -41,23 +408,191 @@ def _queue_name_for_action(action: str) -> str:
     raise ValueError(f"Unknown action, not queued: {action}")
 
 
+def _use_streams() -> bool:
+    return (settings.order_queue_backend or "list").strip().lower() == "stream"
+
+
+def _stream_key_for_queue(queue_name: str) -> str:
+    return SELL_STREAM if queue_name == SELL_QUEUE else BUY_STREAM
+
+
+def _queue_name_for_stream(stream_key: str) -> str:
+    return SELL_QUEUE if stream_key == SELL_STREAM else BUY_QUEUE
+
+
+def _stream_consumer_name() -> str:
+    """
+    Consumer name for this worker process.
+    ORDER_STREAM_CONSUMER gives a restart-stable name, so a restarted worker
+    releases its own leftover entries immediately. The default includes the
+    pid: sibling processes on one host (or replicas sharing a hostname) must
+    never see each other's in-flight entries as their own. A previous pid's
+    leftovers are released as soon as its liveness lease has lapsed.
+    """
+    configured = str(settings.order_stream_consumer or "").strip()
+    if configured:
+        return configured
+    return f"{socket.gethostname() or 'worker'}-{os.getpid()}"
+
+
+def _stream_claim_idle_ms() -> int:
+    return max(1000, int(float(settings.order_stream_claim_idle_seconds or 0) * 1000))
+
+
+def _stream_consumer_lease_key(consumer: str) -> str:
+    return f"{STREAM_CONSUMER_LEASE_PREFIX}:{consumer}"
+
+
+async def _renew_stream_consumer_lease(r: redis.Redis) -> None:
+    lease = max(10, int(float(settings.order_stream_consumer_lease_seconds or 60.0)))
+    await r.set(_stream_consumer_lease_key(_stream_consumer_name()), "1", ex=lease)
+
+
 def _idempotency_redis_key(idempotency_key: str) -> str:
     return f"{IDEMPOTENCY_PREFIX}:{idempotency_key}"
 
 
+def _idempotency_bucket_key(epoch: float) -> str:
+    day = datetime.fromtimestamp(epoch, timezone.utc).strftime("%Y%m%d")
+    return f"{IDEMPOTENCY_BUCKET_PREFIX}:{day}"
+
+
+def _idempotency_bucket_field(dedupe_key: str) -> str:
+    """Hash field for a dedupe key; sha256 hex keys keep their first 128 bits."""
+    return dedupe_key[:32] if len(dedupe_key) == 64 else dedupe_key
+
+
+class IdempotencyPrefilter:
+    """
+    In-process LRU of dedupe keys known to be claimed in Redis, with their
+    expiry. A hit answers a retry as duplicate without a Redis round trip; a
+    miss always goes to Redis, so the prefilter never rejects a new order.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max(0, int(max_entries))
+        self._entries: OrderedDict[str, float] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def seen(self, dedupe_key: str, now: float) -> bool:
+        expires_at = self._entries.get(dedupe_key)
+        if expires_at is None or expires_at <= now:
+            if expires_at is not None:
+                del self._entries[dedupe_key]
+            self.misses += 1
+            return False
+        self._entries.move_to_end(dedupe_key)
+        self.hits += 1
+        return True
+
+    def remember(self, dedupe_key: str, expires_at: float) -> None:
+        if self.max_entries <= 0:
+            return
+        self._entries[dedupe_key] = expires_at
+        self._entries.move_to_end(dedupe_key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+class KeyIdempotencyStore:
+    """One SET NX EX marker per order (orders:idempotency:<key>)."""
+
+    name = "keys"
+
+    async def claim_and_push(
+        self, r: redis.Redis, dedupe_key: str, target_key: str, mode: str, order_json: str, ttl: int, now: float
+    ) -> tuple[bool, Optional[float]]:
+        script = _STREAM_ENQUEUE_ONCE_SCRIPT if mode == "stream" else _ENQUEUE_ONCE_SCRIPT
+        result = await _eval_order_script(
+            r,
+            script,
+            [_idempotency_redis_key(dedupe_key), target_key],
+            order_json,
+            datetime.fromtimestamp(now, timezone.utc).isoformat(),
+            ttl,
+        )
+        queued = int(result or 0) == 1
+        # A duplicate's remaining TTL is unknown here, so only fresh claims are cached.
+        return queued, now + ttl if queued else None
+
+
+class DailyBucketIdempotencyStore:
+    """
+    Markers grouped into one hash per UTC day (orders:idempotency:day:<date>),
+    each field holding its own expiry. A bucket lives until its last marker
+    can expire, so Redis keeps ~ttl/1day keys instead of one per alert.
+    """
+
+    name = "buckets"
+
+    def bucket_keys(self, now: float, ttl: int) -> list[str]:
+        """Current bucket first, then every older bucket a live marker could be in."""
+        first = int((now - ttl) // IDEMPOTENCY_BUCKET_SECONDS)
+        last = int(now // IDEMPOTENCY_BUCKET_SECONDS)
+        return [_idempotency_bucket_key(day * IDEMPOTENCY_BUCKET_SECONDS) for day in range(last, first - 1, -1)]
+
+    async def claim_and_push(
+        self, r: redis.Redis, dedupe_key: str, target_key: str, mode: str, order_json: str, ttl: int, now: float
+    ) -> tuple[bool, Optional[float]]:
+        now_s = int(now)
+        bucket_end = (now_s // IDEMPOTENCY_BUCKET_SECONDS + 1) * IDEMPOTENCY_BUCKET_SECONDS
+        buckets = self.bucket_keys(now_s, ttl)
+        result = await _eval_order_script(
+            r,
+            _BUCKET_ENQUEUE_ONCE_SCRIPT,
+            [_idempotency_redis_key(dedupe_key), target_key, *buckets],
+            order_json,
+            mode,
+            _idempotency_bucket_field(dedupe_key),
+            now_s,
+            now_s + ttl,
+            bucket_end + ttl - now_s,
+        )
+        queued, expires_at = (result or [0, 0])[:2]
+        return int(queued) == 1, float(expires_at) or None
+
+
+IDEMPOTENCY_STORES = {store.name: store for store in (KeyIdempotencyStore(), DailyBucketIdempotencyStore())}
+_idempotency_prefilter: Optional[IdempotencyPrefilter] = None
+
+
+def get_idempotency_store():
+    name = (settings.order_idempotency_store or "buckets").strip().lower()
+    store = IDEMPOTENCY_STORES.get(name)
+    if store is None:
+        raise ValueError(f"Unknown ORDER_IDEMPOTENCY_STORE: {name}")
+    return store
+
+
+def get_idempotency_prefilter() -> IdempotencyPrefilter:
+    global _idempotency_prefilter
+    if _idempotency_prefilter is None:
+        _idempotency_prefilter = IdempotencyPrefilter(settings.order_idempotency_prefilter_size)
+    return _idempotency_prefilter
+
+
 def _sanitize_order_for_queue(order_data: dict) -> dict:
     """Remove runtime-only metadata before serializing to Redis."""
     cleaned = dict(order_data)
     cleaned.pop("_queue_source", None)
     cleaned.pop("_raw_queue_payload", None)
+    cleaned.pop("_stream_id", None)
+    cleaned.pop("_delivery_count", None)
     return cleaned
 
 
 def _deserialize_order(order_json: str, source_queue: str) -> Optional[dict]:
     """Decode Redis payload and attach runtime metadata for ack/requeue."""
     try:
-        order = json.loads(order_json)
-    except json.JSONDecodeError:
+        order = decode_json(order_json)
+    except JSONDecodeError:
         logger.error("Invalid order payload in queue", payload=order_json)
         return None
 
@@ -70,6 +605,15 @@ def _deserialize_order(order_json: str, source_queue: str) -> Optional[dict]:
     return order
 
 
+def _signal_key_for_queue(queue_name: str) -> str:
+    return SELL_SIGNAL_KEY if queue_name == SELL_QUEUE else BUY_SIGNAL_KEY
+
+
+async def _notify_order_available(r: redis.Redis, queue_name: str) -> None:
+    """Wake a worker lane blocked in dequeue_order_blocking()."""
+    await r.lpush(_signal_key_for_queue(queue_name), "1")
+
+
 async def get_redis() -> redis.Redis:
     """Get Redis client singleton."""
     global _redis_client
@@ -81,6 +625,30 @@ async def get_redis() -> redis.Redis:
     return _redis_client
 
 
+async def _ensure_stream_groups(r: redis.Redis) -> None:
+    """Create the consumer group on both streams once per process."""
+    global _stream_groups_ready
+    if _stream_groups_ready:
+        return
+    for stream_key in (SELL_STREAM, BUY_STREAM):
+        try:
+            await r.xgroup_create(stream_key, settings.order_stream_group, id="0", mkstream=True)
+        except redis.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+    _stream_groups_ready = True
+
+
+async def _push_active(r: redis.Redis, queue_name: str, order_json: str) -> None:
+    """Append a serialized order to the active queue of the configured backend."""
+    if _use_streams():
+        await _ensure_stream_groups(r)
+        target, mode = _stream_key_for_queue(queue_name), "stream"
+    else:
+        target, mode = queue_name, "list"
+    await _eval_order_script(r, _PUSH_ACTIVE_SCRIPT, [target, _signal_key_for_queue(queue_name)], order_json, mode)
+
+
 async def enqueue_order(order_data: dict):
     """
     Push an order to the appropriate Redis queue.
@@ -89,13 +657,13 @@ async def enqueue_order(order_data: dict):
     """
     r = await get_redis()
     action = order_data.get("action", "").upper()
-    order_json = json.dumps(_sanitize_order_for_queue(order_data))
+    order_json = encode_order(_sanitize_order_for_queue(order_data))
 
     if action == "SELL":
-        await r.lpush(SELL_QUEUE, order_json)
+        await _push_active(r, SELL_QUEUE, order_json)
         logger.info("Order queued (SELL priority)", ticker=order_data.get("ticker"))
     elif action == "BUY":
-        await r.lpush(BUY_QUEUE, order_json)
+        await _push_active(r, BUY_QUEUE, order_json)
         logger.info("Order queued (BUY)", ticker=order_data.get("ticker"))
     else:
         logger.error("Unknown action, not queued", action=action)
@@ -106,17 +674,32 @@ async def enqueue_order_once(order_data: dict, *, ttl_seconds: Optional[int] = N
     Enqueue an active order only once per idempotency key.
 
     TradingView may retry when it times out waiting for a response. The Redis
-    script makes the dedupe marker and LPUSH atomic, so a retry cannot create a
-    second order if the first one was actually accepted.
+    script makes the dedupe marker and LPUSH (or XADD) atomic, so a retry
+    cannot create a second order if the first one was actually accepted.
+    Retries of a key this process already saw claimed are answered from the
+    in-process prefilter.
     """
-    r = await get_redis()
     queue_name = _queue_name_for_action(order_data.get("action", ""))
-    order_json = json.dumps(_sanitize_order_for_queue(order_data))
     idempotency_key = str(order_data.get("idempotency_key") or "").strip()
     dedupe_key = str(order_data.get("dedupe_key") or idempotency_key).strip()
+    now = time.time()
+    prefilter = get_idempotency_prefilter()
+
+    if dedupe_key and prefilter.seen(dedupe_key, now):
+        logger.warning(
+            "Duplicate order ignored by idempotency prefilter",
+            ticker=order_data.get("ticker"),
+            action=order_data.get("action"),
+            idempotency_key=idempotency_key,
+            dedupe_key=dedupe_key,
+        )
+        return False
+
+    r = await get_redis()
+    order_json = encode_order(_sanitize_order_for_queue(order_data))
 
     if not dedupe_key:
-        await r.lpush(queue_name, order_json)
+        await _push_active(r, queue_name, order_json)
         logger.info(
             "Order queued without idempotency key",
             ticker=order_data.get("ticker"),
@@ -126,17 +709,18 @@ async def enqueue_order_once(order_data: dict, *, ttl_seconds: Optional[int] = N
 
     ttl = int(ttl_seconds or settings.webhook_idempotency_ttl_seconds)
     ttl = max(ttl, 60)
-    result = await r.eval(
-        _ENQUEUE_ONCE_SCRIPT,
-        2,
-        _idempotency_redis_key(dedupe_key),
-        queue_name,
-        order_json,
-        datetime.now(timezone.utc).isoformat(),
-        ttl,
+    if _use_streams():
+        await _ensure_stream_groups(r)
+        target_key, mode = _stream_key_for_queue(queue_name), "stream"
+    else:
+        target_key, mode = queue_name, "list"
+    queued, expires_at = await get_idempotency_store().claim_and_push(
+        r, dedupe_key, target_key, mode, order_json, ttl, now
     )
-    queued = int(result or 0) == 1
+    if expires_at:
+        prefilter.remember(dedupe_key, expires_at)
     if queued:
+        await _notify_order_available(r, queue_name)
         logger.info(
             "Order queued with idempotency guard",
             ticker=order_data.get("ticker"),
@@ -153,6 +737,51 @@ async def enqueue_order_once(order_data: dict, *, ttl_seconds: Optional[int] = N
     return queued
 
 
+async def idempotency_memory_report(sample_size: int = 200) -> dict:
+    """
+    Count and size dedupe markers in Redis. Legacy per-order keys are sized
+    from a sample (MEMORY USAGE per key is too slow for a week of alerts).
+    """
+    r = await get_redis()
+    legacy_keys: list[str] = []
+    buckets: list[dict] = []
+    async for key in r.scan_iter(match=f"{IDEMPOTENCY_PREFIX}:*", count=1000):
+        if key.startswith(f"{IDEMPOTENCY_BUCKET_PREFIX}:"):
+            buckets.append(
+                {
+                    "key": key,
+                    "markers": int(await r.hlen(key) or 0),
+                    "bytes": int(await r.memory_usage(key) or 0),
+                    "ttl_seconds": int(await r.ttl(key)),
+                }
+            )
+        else:
+            legacy_keys.append(key)
+
+    sampled = legacy_keys[: max(0, sample_size)]
+    sampled_bytes = [int(await r.memory_usage(key) or 0) for key in sampled]
+    legacy_avg = sum(sampled_bytes) / len(sampled_bytes) if sampled_bytes else 0.0
+    bucket_markers = sum(bucket["markers"] for bucket in buckets)
+    bucket_bytes = sum(bucket["bytes"] for bucket in buckets)
+    prefilter = get_idempotency_prefilter()
+    return {
+        "store": get_idempotency_store().name,
+        "legacy_keys": len(legacy_keys),
+        "legacy_bytes_estimate": int(legacy_avg * len(legacy_keys)),
+        "legacy_bytes_per_marker": round(legacy_avg, 1),
+        "buckets": sorted(buckets, key=lambda bucket: bucket["key"]),
+        "bucket_markers": bucket_markers,
+        "bucket_bytes": bucket_bytes,
+        "bucket_bytes_per_marker": round(bucket_bytes / bucket_markers, 1) if bucket_markers else 0.0,
+        "prefilter": {
+            "entries": len(prefilter),
+            "max_entries": prefilter.max_entries,
+            "hits": prefilter.hits,
+            "misses": prefilter.misses,
+        },
+    }
+
+
 async def enqueue_pending(order_data: dict):
     """
     Queue an order for execution at market open.
@@ -164,8 +793,10 @@ async def enqueue_pending(order_data: dict):
     payload.setdefault("first_queued_at", payload.get("queued_at") or now_iso)
     payload["queued_at"] = now_iso
     payload["pending_reason"] = "outside_market_hours"
-    order_json = json.dumps(payload)
-    await r.lpush(PENDING_QUEUE, order_json)
+    order_json = encode_order(payload)
+    await _eval_order_script(
+        r, _PENDING_ADD_SCRIPT, [_pending_key_for_order(payload)], order_json, _pending_score(payload)
+    )
     logger.info(
         "Order queued for market open",
         ticker=order_data.get("ticker"),
@@ -173,70 +804,287 @@ async def enqueue_pending(order_data: dict):
     )
 
 
-async def dequeue_order() -> Optional[dict]:
+async def dequeue_order(*, sell_only: bool = False) -> Optional[dict]:
     """
     Get next order to process.
-    Priority: SELL queue first, then BUY queue.
+    Priority: SELL queue first, then BUY queue (unless sell_only).
     """
     r = await get_redis()
+    if _use_streams():
+        return await _dequeue_stream_order(r, sell_only=sell_only)
+
+    # Atomic move to processing queue for crash safety, both queues in one call.
+    result = await _eval_order_script(
+        r,
+        _DEQUEUE_SCRIPT,
+        [SELL_QUEUE, BUY_QUEUE, PROCESSING_SET, SELL_SIGNAL_KEY, BUY_SIGNAL_KEY],
+        "1" if sell_only else "0",
+    )
+    if not result:
+        return None
 
-    # Use atomic move to processing queue for crash safety.
-    order_json = await r.rpoplpush(SELL_QUEUE, PROCESSING_SET)
-    if order_json:
-        order = _deserialize_order(order_json, SELL_QUEUE)
-        if order is not None:
-            return order
+    source_queue, order_json = result
+    order = _deserialize_order(order_json, source_queue)
+    if order is None:
         await r.lrem(PROCESSING_SET, 1, order_json)
+    return order
 
-    order_json = await r.rpoplpush(BUY_QUEUE, PROCESSING_SET)
-    if order_json:
-        order = _deserialize_order(order_json, BUY_QUEUE)
-        if order is not None:
-            return order
-        await r.lrem(PROCESSING_SET, 1, order_json)
 
-    return None
+async def _dequeue_stream_order(r: redis.Redis, *, sell_only: bool) -> Optional[dict]:
+    await _ensure_stream_groups(r)
+    result = await _eval_order_script(
+        r,
+        _STREAM_DEQUEUE_SCRIPT,
+        [SELL_STREAM, BUY_STREAM, SELL_SIGNAL_KEY, BUY_SIGNAL_KEY],
+        settings.order_stream_group,
+        _stream_consumer_name(),
+        _stream_claim_idle_ms(),
+        "1" if sell_only else "0",
+    )
+    if not result:
+        return None
+
+    stream_key, entry_id, order_json, deliveries = result
+    order = _deserialize_order(order_json or "", _queue_name_for_stream(stream_key))
+    if order is None:
+        await _ack_stream_entry(r, stream_key, entry_id)
+        return None
+
+    order["_stream_id"] = entry_id
+    order["_delivery_count"] = int(deliveries or 1)
+    _stream_inflight[entry_id] = stream_key
+    return order
+
+
+async def _ack_stream_entry(r: redis.Redis, stream_key: str, entry_id: str) -> None:
+    await _eval_order_script(r, _STREAM_ACK_SCRIPT, [stream_key], settings.order_stream_group, entry_id)
+    _stream_inflight.pop(entry_id, None)
+
+
+async def _release_stream_entry(r: redis.Redis, stream_key: str, entry_id: str) -> None:
+    """Leave an entry pending but make it immediately reclaimable by any lane."""
+    await r.execute_command(
+        "XCLAIM",
+        stream_key,
+        settings.order_stream_group,
+        _stream_consumer_name(),
+        0,
+        entry_id,
+        "IDLE",
+        _stream_claim_idle_ms() + 1000,
+        "JUSTID",
+    )
+    _stream_inflight.pop(entry_id, None)
+    await _notify_order_available(r, _queue_name_for_stream(stream_key))
+
+
+async def dequeue_order_blocking(
+    timeout_seconds: Optional[float] = None,
+    *,
+    sell_only: bool = False,
+) -> Optional[dict]:
+    """
+    Get next order, blocking on Redis until one is enqueued or the timeout ends.
+
+    BLMOVE only watches one list and BLMPOP cannot land the payload in the
+    processing list atomically, so the worker blocks on a wake-up list instead
+    and then takes the order with the same crash-safe move as dequeue_order().
+    SELL priority is preserved because the move always checks SELL first.
+    SELL-only lanes block on the SELL signal alone so BUY bursts never wake them.
+    """
+    order = await dequeue_order(sell_only=sell_only)
+    if order is not None:
+        return order
+
+    r = await get_redis()
+    timeout = float(timeout_seconds or settings.order_dequeue_block_timeout_seconds)
+    signal_keys = [SELL_SIGNAL_KEY] if sell_only else [SELL_SIGNAL_KEY, BUY_SIGNAL_KEY]
+    woke = await r.blpop(signal_keys, timeout=max(timeout, 0.1))
+    if not woke:
+        return None
+    return await dequeue_order(sell_only=sell_only)
 
 
 async def ack_processed_order(order_data: dict):
     """Acknowledge completion by removing payload from processing queue."""
+    stream_id = order_data.get("_stream_id")
+    if stream_id:
+        r = await get_redis()
+        stream_key = _stream_key_for_queue(order_data.get("_queue_source"))
+        await _ack_stream_entry(r, stream_key, stream_id)
+        return
+
     raw_payload = order_data.get("_raw_queue_payload")
     if not raw_payload:
         return
 
     r = await get_redis()
-    await r.lrem(PROCESSING_SET, 1, raw_payload)
+    await _eval_order_script(r, _ACK_SCRIPT, [PROCESSING_SET], raw_payload)
 
 
-async def requeue_inflight_orders() -> int:
+def order_retry_count(order_data: dict) -> int:
     """
-    Move any in-flight orders back to active queues on worker startup.
-    Prevents order loss after worker crash/restart.
+    Return how many times an order has already been retried.
+
+    Stream entries carry the broker-side delivery count; list payloads carry an
+    explicit retry_count field that is bumped on every re-enqueue.
     """
-    r = await get_redis()
-    moved = 0
+    if order_data.get("_stream_id"):
+        return max(0, int(order_data.get("_delivery_count", 1) or 1) - 1)
+    return int(order_data.get("retry_count", 0) or 0)
 
-    while True:
-        order_json = await r.rpop(PROCESSING_SET)
-        if not order_json:
-            break
 
-        try:
-            order = json.loads(order_json)
-        except json.JSONDecodeError:
-            logger.error("Dropping invalid payload from processing queue", payload=order_json)
-            continue
+async def requeue_order_for_retry(order_data: dict) -> bool:
+    """
+    Queue a failed order for another attempt.
+
+    Returns True when the original delivery must still be acked by the caller
+    (list backend: a copy with retry_count + 1 was enqueued). Stream entries are
+    released in place so their delivery count keeps counting retries.
+    """
+    stream_id = order_data.get("_stream_id")
+    if stream_id:
+        r = await get_redis()
+        stream_key = _stream_key_for_queue(order_data.get("_queue_source"))
+        await _release_stream_entry(r, stream_key, stream_id)
+        return False
+
+    retry_order = _sanitize_order_for_queue(order_data)
+    retry_order["retry_count"] = order_retry_count(order_data) + 1
+    await enqueue_order(retry_order)
+    return True
+
+
+async def refresh_inflight_orders() -> int:
+    """
+    Renew this consumer's liveness lease and reset the idle time of stream
+    entries this process is still working on.
+
+    Keeps XAUTOCLAIM in other workers from stealing a slow but live order.
+    Entries another worker already reclaimed are not taken back; they are
+    dropped from this process's in-flight set. No-op for the list backend.
+    """
+    if not _use_streams():
+        return 0
+
+    r = await get_redis()
+    await _renew_stream_consumer_lease(r)
+    if not _stream_inflight:
+        return 0
+
+    by_stream: dict[str, list[str]] = {}
+    for entry_id, stream_key in list(_stream_inflight.items()):
+        by_stream.setdefault(stream_key, []).append(entry_id)
+    refreshed = 0
+    for stream_key, entry_ids in by_stream.items():
+        lost = await r.eval(
+            _STREAM_REFRESH_SCRIPT,
+            1,
+            stream_key,
+            settings.order_stream_group,
+            _stream_consumer_name(),
+            *entry_ids,
+        ) or []
+        for entry_id in lost:
+            _stream_inflight.pop(entry_id, None)
+            logger.warning("In-flight stream entry was reclaimed by another worker", entry_id=entry_id)
+        refreshed += len(entry_ids) - len(lost)
+    return refreshed
+
+
+async def release_dead_stream_consumers(*, include_own: bool = False) -> int:
+    """
+    Release the pending entries of consumers whose liveness lease lapsed
+    (crashed or stopped workers) and delete those consumers from the group.
+
+    Released entries are parked idle past the claim threshold, so the next
+    dequeue in any lane takes them at once instead of waiting for
+    ORDER_STREAM_CLAIM_IDLE_SECONDS. include_own also releases this
+    consumer's leftovers (startup with a restart-stable name).
+    No-op for the list backend.
+    """
+    if not _use_streams():
+        return 0
 
-        action = str(order.get("action", "")).upper()
-        if action == "SELL":
-            await r.lpush(SELL_QUEUE, order_json)
-        elif action == "BUY":
-            await r.lpush(BUY_QUEUE, order_json)
+    r = await get_redis()
+    await _ensure_stream_groups(r)
+    own = _stream_consumer_name()
+    released = 0
+    for stream_key in (SELL_STREAM, BUY_STREAM):
+        consumers = await r.xinfo_consumers(stream_key, settings.order_stream_group)
+        names = {str(row.get("name")) for row in consumers}
+        if include_own:
+            names.add(own)
         else:
-            logger.error("Dropping unknown action from processing queue", action=action)
-            continue
+            names.discard(own)
+        names.discard(STREAM_RECOVERY_CONSUMER)
+        stream_released = 0
+        for name in sorted(names):
+            count = int(
+                await r.eval(
+                    _STREAM_RELEASE_CONSUMER_SCRIPT,
+                    2,
+                    stream_key,
+                    _stream_consumer_lease_key(name),
+                    settings.order_stream_group,
+                    name,
+                    STREAM_RECOVERY_CONSUMER,
+                    _stream_claim_idle_ms() + 1000,
+                    "1" if name == own else "0",
+                )
+            )
+            if count < 0:
+                continue
+            stream_released += count
+            if name == own:
+                continue
+            dropped = await r.xgroup_delconsumer(stream_key, settings.order_stream_group, name)
+            if dropped:
+                # Read after its lease lapsed: the stalled worker still holds
+                # these in memory and XDELs them when it acks.
+                logger.error("Dead stream consumer read entries during release", consumer=name, dropped=dropped)
+            logger.info(
+                "Removed dead stream consumer", consumer=name, stream=stream_key, released=count
+            )
+        if stream_released:
+            await _notify_order_available(r, _queue_name_for_stream(stream_key))
+        released += stream_released
+    return released
+
+
+async def drop_stream_consumer_lease() -> None:
+    """Give up this consumer's lease on shutdown so its leftovers are released at once."""
+    if not _use_streams():
+        return
+    r = await get_redis()
+    await r.delete(_stream_consumer_lease_key(_stream_consumer_name()))
+
+
+async def requeue_inflight_orders() -> int:
+    """
+    Move any in-flight orders back to active queues on worker startup.
+    Prevents order loss after worker crash/restart.
 
-        moved += 1
+    With the stream backend this consumer's own leftovers and those of
+    consumers whose liveness lease lapsed are released; live worker
+    processes keep their in-flight orders.
+    """
+    r = await get_redis()
+    if _use_streams():
+        await _renew_stream_consumer_lease(r)
+        moved = await release_dead_stream_consumers(include_own=True)
+        if moved > 0:
+            logger.warning("Recovered in-flight stream orders after restart", count=moved)
+        return moved
+
+    moved, dropped = await _eval_order_script(
+        r,
+        _REQUEUE_INFLIGHT_SCRIPT,
+        [PROCESSING_SET, SELL_QUEUE, BUY_QUEUE, SELL_SIGNAL_KEY, BUY_SIGNAL_KEY],
+    )
+    moved = int(moved or 0)
+    for order_json in dropped or []:
+        logger.error("Dropping invalid or unknown-action payload from processing queue", payload=order_json)
 
     if moved > 0:
         logger.warning("Recovered in-flight orders after restart", count=moved)
@@ -248,16 +1096,25 @@ async def requeue_processing_order(order_data: dict) -> bool:
     Move a specific processing payload back to its source queue.
     Used when retry-queue insertion fails while handling an exception.
     """
+    stream_id = order_data.get("_stream_id")
+    if stream_id:
+        r = await get_redis()
+        stream_key = _stream_key_for_queue(order_data.get("_queue_source"))
+        await _release_stream_entry(r, stream_key, stream_id)
+        return True
+
     raw_payload = order_data.get("_raw_queue_payload")
     source_queue = order_data.get("_queue_source")
     if not raw_payload or source_queue not in (SELL_QUEUE, BUY_QUEUE):
         return False
 
     r = await get_redis()
-    pipe = r.pipeline(transaction=True)
-    pipe.lrem(PROCESSING_SET, 1, raw_payload)
-    pipe.lpush(source_queue, raw_payload)
-    await pipe.execute()
+    await _eval_order_script(
+        r,
+        _REQUEUE_PROCESSING_SCRIPT,
+        [PROCESSING_SET, source_queue, _signal_key_for_queue(source_queue)],
+        raw_payload,
+    )
     return True
 
 
@@ -265,21 +1122,7 @@ def _pending_order_matches_market(order_data: dict, market: Optional[str]) -> bo
     """Return whether a pending order should wake for the requested market."""
     if not market:
         return True
-
-    from app.broker.market_hours import ASIA_MARKET_SESSIONS
-    from app.gateway.symbol_mapper import is_kis_domestic_symbol, split_tv_ticker
-
-    ticker = str(order_data.get("ticker", "") or "")
-    market_upper = str(market or "").strip().upper()
-    exchange, _ = split_tv_ticker(ticker)
-    is_domestic = is_kis_domestic_symbol(ticker)
-    if market_upper == "KRX":
-        return is_domestic
-    if market_upper in ASIA_MARKET_SESSIONS:
-        return exchange == market_upper
-    if market_upper in ("US", "USA"):
-        return not is_domestic and exchange not in ASIA_MARKET_SESSIONS
-    return True
+    return _pending_market_for_order(order_data) in _pending_markets_for(market)
 
 
 def _parse_order_datetime(value) -> Optional[datetime]:
@@ -320,36 +1163,147 @@ def is_pending_order_expired(order_data: dict, now_utc: Optional[datetime] = Non
     return age_hours is not None and age_hours > ttl_hours
 
 
-async def purge_expired_pending_orders(now_utc: Optional[datetime] = None) -> list[dict]:
-    """
-    Remove expired pending orders and return their decoded payloads.
+def _pending_market_for_order(order_data: dict) -> str:
+    """Return the single pending market an order wakes with."""
+    from app.broker.market_hours import ASIA_MARKET_SESSIONS
+    from app.gateway.symbol_mapper import is_kis_domestic_symbol, split_tv_ticker
+
+    ticker = str(order_data.get("ticker", "") or "")
+    if is_kis_domestic_symbol(ticker):
+        return "KRX"
+    exchange, _ = split_tv_ticker(ticker)
+    if exchange in ASIA_MARKET_SESSIONS:
+        return exchange
+    return "US"
+
+
+def _pending_key(market: str, action: str) -> str:
+    side = "SELL" if str(action or "").upper() == "SELL" else "BUY"
+    return f"{PENDING_PREFIX}:{market}:{side}"
+
+
+def _pending_key_for_order(order_data: dict) -> str:
+    return _pending_key(_pending_market_for_order(order_data), order_data.get("action", ""))
+
+
+def _pending_keys(markets=PENDING_MARKETS) -> list[str]:
+    """Pending sorted-set keys as (SELL, BUY) pairs in market order."""
+    keys: list[str] = []
+    for market in markets:
+        keys.append(_pending_key(market, "SELL"))
+        keys.append(_pending_key(market, "BUY"))
+    return keys
+
+
+def _pending_markets_for(market: Optional[str]) -> set[str]:
+    """Resolve a flush market argument; None or unknown markets wake everything."""
+    market_upper = str(market or "").strip().upper()
+    if market_upper == "USA":
+        market_upper = "US"
+    if market_upper in PENDING_MARKETS:
+        return {market_upper}
+    return set(PENDING_MARKETS)
+
+
+def _pending_score(order_data: dict, now_utc: Optional[datetime] = None) -> float:
+    """Sorted-set score: the same start timestamp pending_order_age_hours() uses."""
+    started_at = (
+        _parse_order_datetime(order_data.get("received_at"))
+        or _parse_order_datetime(order_data.get("created_at"))
+        or _parse_order_datetime(order_data.get("first_queued_at"))
+        or _parse_order_datetime(order_data.get("queued_at"))
+        or now_utc
+        or datetime.now(timezone.utc)
+    )
+    return started_at.timestamp()
+
+
+def _pending_expiry_cutoff(now_utc: datetime) -> str:
+    """Exclusive max score for expired orders, matching is_pending_order_expired()."""
+    ttl_hours = float(settings.pending_order_ttl_hours or 0.0)
+    if ttl_hours <= 0:
+        return "-inf"
+    return f"({now_utc.timestamp() - ttl_hours * 3600.0}"
 
-    The caller is responsible for marking AlertLog rows and sending operator
-    notifications because this queue module should stay broker/UI agnostic.
-    """
-    r = await get_redis()
-    expired: list[dict] = []
-    kept = 0
-    now = now_utc or datetime.now(timezone.utc)
-    pending_count = await r.llen(PENDING_QUEUE)
 
-    for _ in range(pending_count):
+async def _migrate_legacy_pending(r: redis.Redis) -> int:
+    """Move orders left in the pre-sorted-set orders:pending list into the sorted sets."""
+    if await r.type(PENDING_QUEUE) != "list":
+        return 0
+
+    migrated = 0
+    while True:
         order_json = await r.rpop(PENDING_QUEUE)
         if not order_json:
             break
-
         try:
-            order_data = json.loads(order_json)
-        except json.JSONDecodeError:
+            order_data = decode_json(order_json)
+        except JSONDecodeError:
             logger.error("Dropping invalid pending order payload", payload=order_json)
             continue
+        if not isinstance(order_data, dict):
+            continue
+        await _eval_order_script(
+            r,
+            _PENDING_ADD_SCRIPT,
+            [_pending_key_for_order(order_data)],
+            order_json,
+            _pending_score(order_data),
+        )
+        migrated += 1
+
+    if migrated:
+        logger.warning("Migrated legacy pending list to per-market sorted sets", count=migrated)
+    return migrated
+
+
+async def _sweep_pending(
+    r: redis.Redis,
+    *,
+    wake_markets: set[str],
+    now_utc: datetime,
+) -> tuple[int, int, int, list[dict]]:
+    """Run the pending sweep script; returns (moved_sell, moved_buy, kept, expired)."""
+    await _migrate_legacy_pending(r)
+    streams = _use_streams()
+    if streams:
+        await _ensure_stream_groups(r)
+        targets = [SELL_STREAM, BUY_STREAM]
+    else:
+        targets = [SELL_QUEUE, BUY_QUEUE]
+
+    result = await _eval_order_script(
+        r,
+        _PENDING_SWEEP_SCRIPT,
+        [*targets, SELL_SIGNAL_KEY, BUY_SIGNAL_KEY, *_pending_keys()],
+        _pending_expiry_cutoff(now_utc),
+        "stream" if streams else "list",
+        *("1" if market in wake_markets else "0" for market in PENDING_MARKETS),
+    )
+    moved_sell, moved_buy, kept, expired_rows = result
 
-        if is_pending_order_expired(order_data, now_utc=now):
-            expired.append(order_data)
+    expired: list[dict] = []
+    for order_json in expired_rows or []:
+        try:
+            order_data = decode_json(order_json)
+        except JSONDecodeError:
+            logger.error("Dropping invalid pending order payload", payload=order_json)
             continue
+        if isinstance(order_data, dict):
+            expired.append(order_data)
+    return int(moved_sell or 0), int(moved_buy or 0), int(kept or 0), expired
+
 
-        await r.lpush(PENDING_QUEUE, order_json)
-        kept += 1
+async def purge_expired_pending_orders(now_utc: Optional[datetime] = None) -> list[dict]:
+    """
+    Remove expired pending orders and return their decoded payloads.
+
+    The caller is responsible for marking AlertLog rows and sending operator
+    notifications because this queue module should stay broker/UI agnostic.
+    """
+    r = await get_redis()
+    now = now_utc or datetime.now(timezone.utc)
+    _, _, kept, expired = await _sweep_pending(r, wake_markets=set(), now_utc=now)
 
     if expired:
         logger.warning(
@@ -368,42 +1322,15 @@ async def flush_pending_to_active(market: Optional[str] = None, *, return_expire
 
     If market is provided, only matching orders are moved. Non-matching orders
     stay pending so KRX and US sessions do not wake each other's orders.
+    Expired orders of every market are dropped in the same atomic pass.
     """
     r = await get_redis()
-    count = 0
-    kept = 0
-    expired_orders: list[dict] = []
-    now = datetime.now(timezone.utc)
-
-    pending_count = await r.llen(PENDING_QUEUE)
-    for _ in range(pending_count):
-        order_json = await r.rpop(PENDING_QUEUE)
-        if not order_json:
-            break
-
-        try:
-            order_data = json.loads(order_json)
-        except json.JSONDecodeError:
-            logger.error("Dropping invalid pending order payload", payload=order_json)
-            continue
-
-        if is_pending_order_expired(order_data, now_utc=now):
-            expired_orders.append(order_data)
-            continue
-
-        if not _pending_order_matches_market(order_data, market):
-            await r.lpush(PENDING_QUEUE, order_json)
-            kept += 1
-            continue
-
-        action = order_data.get("action", "").upper()
-
-        if action == "SELL":
-            await r.lpush(SELL_QUEUE, order_json)
-        else:
-            await r.lpush(BUY_QUEUE, order_json)
-
-        count += 1
+    moved_sell, moved_buy, kept, expired_orders = await _sweep_pending(
+        r,
+        wake_markets=_pending_markets_for(market),
+        now_utc=datetime.now(timezone.utc),
+    )
+    count = moved_sell + moved_buy
 
     expired = len(expired_orders)
     if count > 0 or expired > 0:
@@ -425,39 +1352,83 @@ async def flush_pending_to_active(market: Optional[str] = None, *, return_expire
     return count
 
 
+async def _stream_pending_ids(r: redis.Redis, stream_key: str) -> set[str]:
+    rows = await r.xpending_range(stream_key, settings.order_stream_group, min="-", max="+", count=10000)
+    return {row["message_id"] for row in rows}
+
+
+async def _stream_payloads(r: redis.Redis, stream_key: str) -> tuple[list[str], list[str]]:
+    """Return (waiting, in-flight) payloads of an order stream."""
+    await _ensure_stream_groups(r)
+    pending_ids = await _stream_pending_ids(r, stream_key)
+    waiting: list[str] = []
+    inflight: list[str] = []
+    for entry_id, fields in await r.xrange(stream_key):
+        payload = fields.get(STREAM_PAYLOAD_FIELD, "")
+        (inflight if entry_id in pending_ids else waiting).append(payload)
+    return waiting, inflight
+
+
+async def _queue_payloads(r: redis.Redis, queue_name: str) -> list[str]:
+    """Return raw payloads of a logical queue for the configured backend."""
+    if queue_name == PENDING_QUEUE:
+        await _migrate_legacy_pending(r)
+        rows: list[str] = []
+        for key in _pending_keys():
+            rows.extend(await r.zrange(key, 0, -1))
+        return rows
+    if not _use_streams():
+        return await r.lrange(queue_name, 0, -1)
+    if queue_name == PROCESSING_SET:
+        inflight: list[str] = []
+        for stream_key in (SELL_STREAM, BUY_STREAM):
+            inflight.extend((await _stream_payloads(r, stream_key))[1])
+        return inflight
+    return (await _stream_payloads(r, _stream_key_for_queue(queue_name)))[0]
+
+
+async def _active_queue_sizes(r: redis.Redis) -> tuple[int, int, int]:
+    """Return (sell waiting, buy waiting, processing) sizes."""
+    if not _use_streams():
+        return await r.llen(SELL_QUEUE), await r.llen(BUY_QUEUE), await r.llen(PROCESSING_SET)
+
+    await _ensure_stream_groups(r)
+    sizes = []
+    processing = 0
+    for stream_key in (SELL_STREAM, BUY_STREAM):
+        summary = await r.xpending(stream_key, settings.order_stream_group)
+        inflight = int(summary.get("pending", 0) or 0)
+        processing += inflight
+        sizes.append(max(0, int(await r.xlen(stream_key)) - inflight))
+    return sizes[0], sizes[1], processing
+
+
 async def get_queue_stats() -> dict:
     """Get current queue sizes for monitoring."""
     r = await get_redis()
 
-    sell_size = await r.llen(SELL_QUEUE)
-    buy_size = await r.llen(BUY_QUEUE)
-    pending_size = await r.llen(PENDING_QUEUE)
-    processing_size = await r.llen(PROCESSING_SET)
-    pending_krx = 0
-    pending_us = 0
-    pending_asia = 0
+    sell_size, buy_size, processing_size = await _active_queue_sizes(r)
+    await _migrate_legacy_pending(r)
+
+    pending_keys = _pending_keys()
+    cutoff = _pending_expiry_cutoff(datetime.now(timezone.utc))
+    pipe = r.pipeline(transaction=False)
+    for key in pending_keys:
+        pipe.zcard(key)
+    for key in pending_keys:
+        pipe.zcount(key, "-inf", cutoff)
+    counts = await pipe.execute()
+    sizes = dict(zip(pending_keys, counts[: len(pending_keys)]))
+    pending_expired = sum(int(value or 0) for value in counts[len(pending_keys):])
+
+    def _market_size(market: str) -> int:
+        return int(sizes[_pending_key(market, "SELL")] or 0) + int(sizes[_pending_key(market, "BUY")] or 0)
+
+    pending_krx = _market_size("KRX")
+    pending_us = _market_size("US")
+    pending_asia = sum(_market_size(market) for market in PENDING_MARKETS if market not in ("KRX", "US"))
     pending_unknown = 0
-    pending_expired = 0
-    now = datetime.now(timezone.utc)
-
-    for order_json in await r.lrange(PENDING_QUEUE, 0, -1):
-        try:
-            order_data = json.loads(order_json)
-        except json.JSONDecodeError:
-            pending_unknown += 1
-            continue
-
-        if is_pending_order_expired(order_data, now_utc=now):
-            pending_expired += 1
-
-        if _pending_order_matches_market(order_data, "KRX"):
-            pending_krx += 1
-        elif any(_pending_order_matches_market(order_data, market) for market in ("HKEX", "SSE", "SZSE", "TSE")):
-            pending_asia += 1
-        elif _pending_order_matches_market(order_data, "US"):
-            pending_us += 1
-        else:
-            pending_unknown += 1
+    pending_size = pending_krx + pending_us + pending_asia
 
     return {
         "sell_queue": sell_size,
@@ -473,28 +1444,64 @@ async def get_queue_stats() -> dict:
     }
 
 
+def _stats_tickers_key(tier: str, action: str) -> str:
+    return f"{STATS_TICKERS_PREFIX}:{tier}:{action}"
+
+
+def _stats_keys() -> list[str]:
+    """STATS_KEY, then the ticker hashes in _STATS_FIELDS order (the stats script KEYS)."""
+    return [STATS_KEY] + [f"{STATS_TICKERS_PREFIX}:{field}" for field in _STATS_FIELDS]
+
+
 async def get_waiting_ticker_stats(include_processing: bool = False) -> dict:
     """
     Aggregate waiting BUY/SELL queue items by order count and unique ticker count.
     Waiting queues include sell/buy/pending, and optionally processing queue.
+
+    Reads the counters the queue scripts maintain, so the cost does not grow
+    with queue depth. rebuild_queue_stats() repairs them from the raw queues.
     """
     r = await get_redis()
-    queue_names = [SELL_QUEUE, BUY_QUEUE, PENDING_QUEUE]
-    if include_processing:
-        queue_names.append(PROCESSING_SET)
+    tier = "all" if include_processing else "waiting"
+
+    pipe = r.pipeline(transaction=False)
+    pipe.hmget(STATS_KEY, f"{tier}:BUY", f"{tier}:SELL")
+    pipe.hlen(_stats_tickers_key(tier, "BUY"))
+    pipe.hlen(_stats_tickers_key(tier, "SELL"))
+    (buy_orders, sell_orders), buy_tickers, sell_tickers = await pipe.execute()
+
+    return {
+        "buy_order_count": max(0, int(buy_orders or 0)),
+        "sell_order_count": max(0, int(sell_orders or 0)),
+        "buy_ticker_count": int(buy_tickers or 0),
+        "sell_ticker_count": int(sell_tickers or 0),
+        "invalid_payload_count": 0,
+    }
 
-    buy_orders = 0
-    sell_orders = 0
-    buy_tickers: set[str] = set()
-    sell_tickers: set[str] = set()
+
+async def rebuild_queue_stats() -> dict:
+    """
+    Recompute the queue stats counters from the raw queues and replace them.
+
+    Repair tool for drift (manual Redis edits, pre-counter payloads). Orders
+    that move while the scan runs can still skew the result slightly, so run
+    it while the queues are quiet.
+    """
+    r = await get_redis()
+    await _migrate_legacy_pending(r)
+
+    tiers: dict[str, dict[str, dict[str, int]]] = {
+        tier: {"BUY": {}, "SELL": {}} for tier in STATS_TIERS
+    }
+    order_counts: dict[str, int] = {}
     invalid_payloads = 0
 
-    for queue_name in queue_names:
-        rows = await r.lrange(queue_name, 0, -1)
-        for raw in rows:
+    for queue_name in (SELL_QUEUE, BUY_QUEUE, PENDING_QUEUE, PROCESSING_SET):
+        queue_tiers = ("all",) if queue_name == PROCESSING_SET else STATS_TIERS
+        for raw in await _queue_payloads(r, queue_name):
             try:
-                payload = json.loads(raw)
-            except json.JSONDecodeError:
+                payload = decode_json(raw)
+            except JSONDecodeError:
                 invalid_payloads += 1
                 continue
 
@@ -504,25 +1511,47 @@ async def get_waiting_ticker_stats(include_processing: bool = False) -> dict:
 
             action = str(payload.get("action", "")).upper().strip()
             ticker = str(payload.get("ticker", "")).upper().strip()
+            if action not in ("BUY", "SELL"):
+                continue
 
-            if action == "BUY":
-                buy_orders += 1
+            for tier in queue_tiers:
+                field = f"{tier}:{action}"
+                order_counts[field] = order_counts.get(field, 0) + 1
                 if ticker:
-                    buy_tickers.add(ticker)
-            elif action == "SELL":
-                sell_orders += 1
-                if ticker:
-                    sell_tickers.add(ticker)
+                    tickers = tiers[tier][action]
+                    tickers[ticker] = tickers.get(ticker, 0) + 1
 
+    pipe = r.pipeline(transaction=True)
+    pipe.delete(*_stats_keys())
+    if order_counts:
+        pipe.hset(STATS_KEY, mapping=order_counts)
+    for tier, actions in tiers.items():
+        for action, tickers in actions.items():
+            if tickers:
+                pipe.hset(_stats_tickers_key(tier, action), mapping=tickers)
+    await pipe.execute()
+
+    logger.info("Rebuilt queue stats counters", counts=order_counts, invalid=invalid_payloads)
     return {
-        "buy_order_count": buy_orders,
-        "sell_order_count": sell_orders,
-        "buy_ticker_count": len(buy_tickers),
-        "sell_ticker_count": len(sell_tickers),
+        "order_counts": order_counts,
+        "ticker_counts": {
+            f"{tier}:{action}": len(tickers)
+            for tier, actions in tiers.items()
+            for action, tickers in actions.items()
+        },
         "invalid_payload_count": invalid_payloads,
     }
 
 
+async def ensure_queue_stats() -> bool:
+    """Build the stats counters if they do not exist yet (first start after upgrade)."""
+    r = await get_redis()
+    if await r.exists(STATS_KEY):
+        return False
+    await rebuild_queue_stats()
+    return True
+
+
 async def get_waiting_buy_orders(include_processing: bool = False) -> list[dict]:
     """Return waiting BUY order payloads for cash coverage checks."""
     r = await get_redis()
@@ -532,11 +1561,11 @@ async def get_waiting_buy_orders(include_processing: bool = False) -> list[dict]
 
     orders: list[dict] = []
     for queue_name in queue_names:
-        rows = await r.lrange(queue_name, 0, -1)
+        rows = await _queue_payloads(r, queue_name)
         for raw in rows:
             try:
-                payload = json.loads(raw)
-            except json.JSONDecodeError:
+                payload = decode_json(raw)
+            except JSONDecodeError:
                 continue
             if not isinstance(payload, dict):
                 continue
@@ -552,6 +1581,20 @@ async def get_waiting_buy_orders(include_processing: bool = False) -> list[dict]
 
 async def clear_all_queues():
     """Clear all order queues (emergency use)."""
+    global _stream_groups_ready
     r = await get_redis()
-    await r.delete(SELL_QUEUE, BUY_QUEUE, PENDING_QUEUE, PROCESSING_SET)
+    await r.delete(
+        SELL_QUEUE,
+        BUY_QUEUE,
+        PENDING_QUEUE,
+        *_pending_keys(),
+        PROCESSING_SET,
+        SELL_SIGNAL_KEY,
+        BUY_SIGNAL_KEY,
+        SELL_STREAM,
+        BUY_STREAM,
+        *_stats_keys(),
+    )
+    _stream_groups_ready = False
+    _stream_inflight.clear()
     logger.warning("All order queues cleared")
@@ -5,6 +5,7 @@ Handles market hours, risk checks, and order execution.
 """
 
 import asyncio
+import contextlib
 import re
 import signal
 import sys
@@ -19,10 +20,16 @@ from app.config import settings
 from app.database.connection import init_db, get_bot_settings, get_session
 from app.queue.order_queue import (
     dequeue_order,
+    dequeue_order_blocking,
+    drop_stream_consumer_lease,
+    ensure_queue_stats,
     enqueue_pending,
-    enqueue_order,
     flush_pending_to_active,
+    order_retry_count,
     purge_expired_pending_orders,
+    refresh_inflight_orders,
+    release_dead_stream_consumers,
+    requeue_order_for_retry,
     requeue_processing_order,
     ack_processed_order,
     requeue_inflight_orders,
@@ -36,12 +43,19 @@ from app.broker.market_hours import (
     is_market_open_for_ticker,
     get_market_status,
     get_market_status_for_ticker,
+    seconds_until_next_session_open,
 )
 from app.broker.order_executor import execute_buy, execute_sell
 from app.risk.risk_manager import check_all_buy_risks, check_sell_risks
+from app.risk.portfolio_ledger import (
+    ledger_change_listener,
+    release_buy,
+    load_portfolio_ledger,
+    verify_portfolio_ledger,
+)
 from app.notifications.telegram_bot import send_notification
 from app.models.alert_log import AlertLog
-from app.models.position import Position, PositionStatus
+from app.models.position import Position, POSITION_IS_OPEN
 
 logger = structlog.get_logger()
 
@@ -206,9 +220,59 @@ def _friendly_order_issue_text(action: str, ticker: str, error_text: str, *, blo
 
     return _build("주문 처리 중 예상하지 못한 오류가 발생했습니다.", raw=raw_for_debug)
 
+class _TokenBucket:
+    """Async token bucket shared by every execution lane."""
+
+    def __init__(self, rate_per_second: float, capacity: Optional[float] = None):
+        self.rate = max(float(rate_per_second or 0.0), 0.1)
+        self.capacity = max(float(capacity or self.rate), 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        # Waiters queue on the lock, so tokens are handed out in arrival order.
+        async with self._lock:
+            self._refill()
+            while self._tokens < 1.0:
+                await asyncio.sleep((1.0 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1.0
+
+
+class _TickerLocks:
+    """Per-ticker locks so orders for one symbol never execute concurrently."""
+
+    def __init__(self):
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._holders: dict[str, int] = {}
+
+    @contextlib.asynccontextmanager
+    async def hold(self, ticker: str):
+        key = str(ticker or "").strip().upper()
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        self._holders[key] = self._holders.get(key, 0) + 1
+        try:
+            async with lock:
+                yield
+        finally:
+            self._holders[key] -= 1
+            if self._holders[key] <= 0:
+                self._holders.pop(key, None)
+                self._locks.pop(key, None)
+
+
 # Rate limiting
-_last_order_time = 0.0
-_min_order_interval = 1.0 / settings.max_orders_per_second  # seconds between orders
+_order_rate_bucket = _TokenBucket(settings.max_orders_per_second)
+_ticker_locks = _TickerLocks()
+# Serialises BUY risk check + limit reservation in this process; execution
+# itself runs outside it, bounded by the reservations.
+_buy_gate = asyncio.Lock()
 _usdkrw_cache_rate = 0.0
 _usdkrw_cache_ts = 0.0
 _outside_hours_notify_lock = asyncio.Lock()
@@ -386,15 +450,8 @@ async def mark_and_notify_expired_pending_orders(expired_orders: list[dict]) ->
 
 
 async def rate_limit():
-    """Enforce rate limiting between orders."""
-    global _last_order_time
-    now = asyncio.get_event_loop().time()
-    elapsed = now - _last_order_time
-
-    if elapsed < _min_order_interval:
-        await asyncio.sleep(_min_order_interval - elapsed)
-
-    _last_order_time = asyncio.get_event_loop().time()
+    """Enforce the global order rate across all execution lanes."""
+    await _order_rate_bucket.acquire()
 
 
 async def mark_alert_status(
@@ -433,14 +490,6 @@ async def mark_alert_status(
         )
 
 
-def _strip_runtime_fields(order_data: dict) -> dict:
-    """Prepare order payload for retry queue insertion."""
-    payload = dict(order_data)
-    payload.pop("_queue_source", None)
-    payload.pop("_raw_queue_payload", None)
-    return payload
-
-
 async def _has_open_position_for_ticker(ticker: str) -> bool:
     """Fast DB check to avoid noisy SELL alerts for symbols we do not hold."""
     symbol = str(ticker or "").strip().upper()
@@ -453,7 +502,7 @@ async def _has_open_position_for_ticker(ticker: str) -> bool:
                 select(Position.id)
                 .where(
                     Position.ticker == symbol,
-                    Position.status == PositionStatus.OPEN,
+                    POSITION_IS_OPEN,
                 )
                 .limit(1)
             )
@@ -540,6 +589,54 @@ async def _mark_alert_status_once(
             row.queued = queued
 
 
+async def _check_and_execute(action: str, ticker: str, alert_id: str) -> dict:
+    """
+    Risk-check, rate-limit and execute one order.
+
+    Returns {"result": ...} on execution, otherwise the process_order response
+    with the pending Telegram text under "notification".
+    """
+    # 2. Risk checks (a passing BUY holds a limit reservation until executed)
+    if action == "BUY":
+        async with _buy_gate:
+            risk_result = await check_all_buy_risks(ticker, reserve=True)
+    elif action == "SELL":
+        risk_result = await check_sell_risks()
+    else:
+        risk_result = True
+    if not risk_result:  # Risk check failed
+        reason = getattr(risk_result, "reason", "리스크 체크 실패")
+        return {
+            "status": "blocked",
+            "reason": reason,
+            "notification": _friendly_order_issue_text(action, ticker, reason, blocked=True),
+        }
+
+    reservation = getattr(risk_result, "reservation", None)
+    try:
+        # 3. Rate limit
+        await rate_limit()
+
+        # 4. Execute order
+        try:
+            if action == "BUY":
+                return {"result": await execute_buy(ticker, alert_id)}
+            if action == "SELL":
+                return {"result": await execute_sell(ticker, alert_id)}
+            return {"status": "error", "reason": f"알 수 없는 주문 유형: {action}"}
+        except Exception as e:
+            logger.error("Order execution failed", action=action, ticker=ticker, error=str(e))
+            return {
+                "status": "error",
+                "reason": str(e),
+                "notification": _friendly_order_issue_text(action, ticker, str(e)),
+            }
+    finally:
+        if reservation is not None:
+            # By now the position is committed (or the BUY failed/was rejected).
+            await release_buy(reservation, executed=True)
+
+
 async def process_order(order_data: dict) -> dict:
     """
     Process a single order from the queue.
@@ -573,38 +670,13 @@ async def process_order(order_data: dict) -> dict:
             await send_notification(msg)
             return {"status": "skipped", "reason": "market_closed"}
 
-    # 2. Risk checks
-    if action == "BUY":
-        risk_result = await check_all_buy_risks(ticker)
-        if not risk_result:  # Risk check failed
-            reason = getattr(risk_result, "reason", "리스크 체크 실패")
-            msg = _friendly_order_issue_text(action, ticker, reason, blocked=True)
-            await send_notification(msg)
-            return {"status": "blocked", "reason": reason}
-    elif action == "SELL":
-        risk_result = await check_sell_risks()
-        if not risk_result:  # Risk check failed
-            reason = getattr(risk_result, "reason", "리스크 체크 실패")
-            msg = _friendly_order_issue_text(action, ticker, reason, blocked=True)
-            await send_notification(msg)
-            return {"status": "blocked", "reason": reason}
-
-    # 3. Rate limit
-    await rate_limit()
-
-    # 4. Execute order
-    try:
-        if action == "BUY":
-            result = await execute_buy(ticker, alert_id)
-        elif action == "SELL":
-            result = await execute_sell(ticker, alert_id)
-        else:
-            return {"status": "error", "reason": f"알 수 없는 주문 유형: {action}"}
-    except Exception as e:
-        error_msg = _friendly_order_issue_text(action, ticker, str(e))
-        logger.error("Order execution failed", action=action, ticker=ticker, error=str(e))
-        await send_notification(error_msg)
-        return {"status": "error", "reason": str(e)}
+    # 2-4. Telegram sends happen after the BUY reservation is released.
+    outcome = await _check_and_execute(action, ticker, alert_id)
+    if "status" in outcome:
+        if outcome.get("notification"):
+            await send_notification(outcome.pop("notification"))
+        return outcome
+    result = outcome["result"]
 
     # 5. Send notification
     if result.get("success"):
@@ -671,21 +743,281 @@ async def process_order(order_data: dict) -> dict:
     return {"status": "failed", "reason": result.get("error", "unknown_error")}
 
 
+def _open_pending_markets() -> list[str]:
+    """Return market keys whose pending orders may be woken right now."""
+    open_markets = []
+    if is_krx_market_open():
+        open_markets.append("KRX")
+    if is_market_open():
+        open_markets.append("US")
+    for market in ASIA_MARKET_SESSIONS:
+        if is_asia_market_open(market):
+            open_markets.append(market)
+    return open_markets
+
+
+async def run_pending_housekeeping(now_ts: float, last_flush_ts: float, last_purge_ts: float) -> tuple[float, float]:
+    """
+    Purge expired pending orders and wake pending orders for open markets.
+
+    Returns the updated (last_flush_ts, last_purge_ts) timestamps.
+    """
+    if now_ts - last_purge_ts >= settings.pending_purge_interval_seconds:
+        last_purge_ts = now_ts
+        expired_orders = await purge_expired_pending_orders()
+        await mark_and_notify_expired_pending_orders(expired_orders)
+
+    open_markets = _open_pending_markets()
+    if open_markets and now_ts - last_flush_ts >= settings.pending_flush_interval_seconds:
+        last_flush_ts = now_ts
+        flushed = 0
+        expired_during_flush = []
+        for market in open_markets:
+            flush_result = await flush_pending_to_active(market=market, return_expired=True)
+            flushed += int(flush_result.get("moved", 0))
+            expired_during_flush.extend(flush_result.get("expired_orders", []))
+        await mark_and_notify_expired_pending_orders(expired_during_flush)
+        if flushed > 0:
+            await send_notification(
+                f"🔁 워커 안전장치가 대기 주문 {flushed}건을 실행 큐로 이동했습니다"
+            )
+
+    return last_flush_ts, last_purge_ts
+
+
+async def pending_housekeeping_loop():
+    """
+    Timer task for pending-queue housekeeping.
+
+    Runs beside the dequeue loop so a flush or purge never delays a live order.
+    Each tick also refreshes in-flight stream entries (and this worker's
+    liveness lease) so other workers do not reclaim them, and releases the
+    entries of workers whose lease lapsed.
+    """
+    last_flush_ts = 0.0
+    last_purge_ts = 0.0
+    tick = max(1.0, min(settings.pending_flush_interval_seconds, settings.pending_purge_interval_seconds) / 4)
+    while True:
+        try:
+            await refresh_inflight_orders()
+            await release_dead_stream_consumers()
+            now_ts = asyncio.get_event_loop().time()
+            last_flush_ts, last_purge_ts = await run_pending_housekeeping(
+                now_ts, last_flush_ts, last_purge_ts
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("Pending housekeeping error", error=str(e))
+        await asyncio.sleep(tick)
+
+
+async def portfolio_ledger_loop():
+    """Periodically verify the in-memory portfolio ledger against the DB."""
+    interval = max(10.0, float(settings.portfolio_ledger_verify_interval_seconds or 300.0))
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await verify_portfolio_ledger()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("Portfolio ledger verify error", error=str(e))
+
+
+async def kis_warmup_loop():
+    """
+    Warm the KIS token and connection pool shortly before each session open
+    so the first orders of the session do not pay token/TLS setup.
+    """
+    from app.broker.kis_client import get_kis_client
+
+    lead = max(0.0, float(settings.kis_warmup_lead_seconds or 0.0))
+    while True:
+        market, seconds = seconds_until_next_session_open()
+        if not market:
+            await asyncio.sleep(3600)
+            continue
+        wait = seconds - lead
+        if wait > 0:
+            # Re-check at least hourly (holidays, DST shifts).
+            await asyncio.sleep(min(wait, 3600))
+            continue
+        try:
+            kis = await get_kis_client()
+            result = await kis.warmup()
+            logger.info("KIS warmup completed", market=market, opens_in_seconds=seconds, **result)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("KIS warmup failed", market=market, error=str(e))
+        # Sleep past this open so the same session is not warmed twice.
+        await asyncio.sleep(seconds + 1)
+
+
+async def handle_dequeued_order(order: dict) -> None:
+    """Process one dequeued order, record its alert status and ack or retry it."""
+    ack_now = True
+    try:
+        try:
+            result = await process_order(order)
+            status = result.get("status", "error")
+            reason = result.get("reason", "")
+
+            if status == "success":
+                await mark_alert_status(
+                    order,
+                    processed=True,
+                    skipped=False,
+                    skip_reason=None,
+                    queued=False,
+                )
+            elif status == "pending":
+                await mark_alert_status(
+                    order,
+                    processed=False,
+                    skipped=False,
+                    skip_reason=None,
+                    queued=True,
+                )
+            elif status in ("blocked", "skipped", "failed", "error"):
+                await mark_alert_status(
+                    order,
+                    processed=True,
+                    skipped=True,
+                    skip_reason=(reason or status)[:180],
+                    queued=False,
+                )
+            else:
+                await mark_alert_status(
+                    order,
+                    processed=True,
+                    skipped=False,
+                    skip_reason=None,
+                    queued=False,
+                )
+        except Exception as proc_exc:
+            retries = order_retry_count(order)
+            if retries < settings.max_order_retries:
+                try:
+                    ack_now = await requeue_order_for_retry(order)
+                    await mark_alert_status(
+                        order,
+                        processed=False,
+                        skipped=False,
+                        skip_reason=None,
+                        queued=True,
+                    )
+                    await send_notification(
+                        f"⚠️ 주문 처리 중 예외가 발생해 재시도 큐에 넣었습니다 "
+                        f"({retries + 1}/{settings.max_order_retries})\n"
+                        f"{order.get('action', '')} {order.get('ticker', '')}\n"
+                        f"사유: {str(proc_exc)}"
+                    )
+                except Exception as retry_enqueue_exc:
+                    requeued = await requeue_processing_order(order)
+                    ack_now = False
+                    logger.error(
+                        "Retry enqueue failed",
+                        error=str(retry_enqueue_exc),
+                        action=order.get("action"),
+                        ticker=order.get("ticker"),
+                        requeued_to_source=requeued,
+                    )
+                    if requeued:
+                        await send_notification(
+                            "⚠️ 재시도 큐 적재 실패로 원본 큐로 되돌렸습니다.\n"
+                            f"{order.get('action', '')} {order.get('ticker', '')}\n"
+                            f"사유: {str(retry_enqueue_exc)}"
+                        )
+                    else:
+                        await send_notification(
+                            "❌ 재시도 큐 적재도 실패했습니다. "
+                            "주문을 processing 큐에 보존했습니다.\n"
+                            f"{order.get('action', '')} {order.get('ticker', '')}\n"
+                            f"사유: {str(retry_enqueue_exc)}"
+                        )
+            else:
+                await mark_alert_status(
+                    order,
+                    processed=True,
+                    skipped=True,
+                    skip_reason=f"max_retries_exceeded: {str(proc_exc)[:140]}",
+                    queued=False,
+                )
+                await send_notification(
+                    f"❌ 주문 처리 예외가 반복되어 폐기했습니다 "
+                    f"({settings.max_order_retries}회 초과)\n"
+                    f"{order.get('action', '')} {order.get('ticker', '')}\n"
+                    f"사유: {str(proc_exc)}"
+                )
+    finally:
+        if ack_now:
+            await ack_processed_order(order)
+
+
+async def execution_lane(lane_id: str, *, sell_only: bool, blocking: bool = True) -> None:
+    """
+    One concurrent order execution lane.
+
+    Lanes share the global order rate bucket and hold the ticker lock while an
+    order runs, so BUY/SELL for the same symbol still execute one at a time in
+    dequeue order. BUYs on different symbols execute concurrently; each holds
+    a limit reservation from its risk check until it was executed, so
+    portfolio-wide limits count BUYs still in flight.
+    SELL-only lanes never take BUYs, so a BUY burst cannot starve SELL orders.
+    """
+    empty_count = 0
+    while True:
+        try:
+            if blocking:
+                order = await dequeue_order_blocking(sell_only=sell_only)
+            else:
+                order = await dequeue_order(sell_only=sell_only)
+
+            if order is None:
+                if not blocking:
+                    # No orders in queue, wait and check again
+                    empty_count += 1
+                    # Progressive backoff: 0.1s → 0.5s → 1s → 2s max
+                    wait_time = min(0.1 * (2 ** min(empty_count, 4)), 2.0)
+                    await asyncio.sleep(wait_time)
+                continue
+
+            empty_count = 0
+            # No await between dequeue and lock acquisition keeps per-ticker order.
+            async with _ticker_locks.hold(order.get("ticker", "")):
+                await handle_dequeued_order(order)
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("Worker lane error", lane=lane_id, error=str(e))
+            await asyncio.sleep(5)  # Wait before retrying
+
+
 async def worker_loop():
     """
     Main worker loop.
-    Continuously polls Redis queues and processes orders.
+    Runs concurrent execution lanes that wait on Redis queues and process
+    orders as they arrive.
     """
     logger.info("Order worker starting...")
 
     # Initialize DB
-    await init_db()
+    await init_db(role="worker")
 
     recovered = await requeue_inflight_orders()
     if recovered > 0:
         await send_notification(
             f"♻️ 워커 재시작으로 처리 중이던 주문 {recovered}건을 큐에 복구했습니다"
         )
+    await ensure_queue_stats()
+    try:
+        await load_portfolio_ledger()
+    except Exception as e:
+        # Risk checks fall back to DB queries; the verify loop retries the load.
+        logger.error("Portfolio ledger load failed", error=str(e))
 
     mode = (settings.broker_mode or "kis_only").strip().lower()
     if mode == "kis_only":
@@ -705,156 +1037,52 @@ async def worker_loop():
             logger.warning(f"IB Gateway connection failed: {e}, will retry...")
             await send_notification(f"🟡 주문 워커가 시작되었습니다. IB 연결 대기 중: {str(e)}")
 
-    # Main processing loop
-    empty_count = 0
-    last_pending_flush_ts = 0.0
-    last_pending_purge_ts = 0.0
-    while True:
-        try:
-            order = await dequeue_order()
+    general_lanes = max(1, int(settings.order_worker_lanes or 1))
+    sell_lanes = max(0, int(settings.order_worker_sell_lanes or 0))
+    blocking = (settings.order_dequeue_mode or "blocking").strip().lower() == "blocking"
+    logger.info(
+        "Starting execution lanes",
+        lanes=general_lanes,
+        sell_lanes=sell_lanes,
+        dequeue_mode="blocking" if blocking else "poll",
+    )
 
-            if order is None:
-                now_ts = asyncio.get_event_loop().time()
-                if now_ts - last_pending_purge_ts >= 300.0:
-                    last_pending_purge_ts = now_ts
-                    expired_orders = await purge_expired_pending_orders()
-                    await mark_and_notify_expired_pending_orders(expired_orders)
-
-                open_markets = []
-                if is_krx_market_open():
-                    open_markets.append("KRX")
-                if is_market_open():
-                    open_markets.append("US")
-                for market in ASIA_MARKET_SESSIONS:
-                    if is_asia_market_open(market):
-                        open_markets.append(market)
-
-                if open_markets and now_ts - last_pending_flush_ts >= 60.0:
-                    last_pending_flush_ts = now_ts
-                    flushed = 0
-                    expired_during_flush = []
-                    for market in open_markets:
-                        flush_result = await flush_pending_to_active(market=market, return_expired=True)
-                        flushed += int(flush_result.get("moved", 0))
-                        expired_during_flush.extend(flush_result.get("expired_orders", []))
-                    await mark_and_notify_expired_pending_orders(expired_during_flush)
-                    if flushed > 0:
-                        await send_notification(
-                            f"🔁 워커 안전장치가 대기 주문 {flushed}건을 실행 큐로 이동했습니다"
-                        )
-                        continue
+    tasks = [
+        asyncio.create_task(pending_housekeeping_loop()),
+        asyncio.create_task(portfolio_ledger_loop()),
+        asyncio.create_task(ledger_change_listener()),
+    ]
+    if (
+        mode != "ib_only"
+        and settings.kis_base_url
+        and settings.kis_app_key
+        and float(settings.kis_warmup_lead_seconds or 0.0) > 0
+    ):
+        tasks.append(asyncio.create_task(kis_warmup_loop()))
+    if mode != "ib_only":
+        try:
+            from app.broker.kis_client import get_kis_client
 
-                # No orders in queue, wait and check again
-                empty_count += 1
-                # Progressive backoff: 0.1s → 0.5s → 1s → 2s max
-                wait_time = min(0.1 * (2 ** min(empty_count, 4)), 2.0)
-                await asyncio.sleep(wait_time)
-                continue
+            kis = await get_kis_client()
+            if kis.start_fill_notices():
+                logger.info("KIS execution notice subscriber started")
+        except Exception as e:
+            logger.warning("KIS execution notice subscriber not started", error=str(e))
+    for lane_id in range(sell_lanes):
+        tasks.append(asyncio.create_task(execution_lane(f"sell-{lane_id}", sell_only=True, blocking=blocking)))
+    for lane_id in range(general_lanes):
+        tasks.append(asyncio.create_task(execution_lane(f"lane-{lane_id}", sell_only=False, blocking=blocking)))
 
-            empty_count = 0
-            ack_now = True
-            try:
-                try:
-                    result = await process_order(order)
-                    status = result.get("status", "error")
-                    reason = result.get("reason", "")
-
-                    if status == "success":
-                        await mark_alert_status(
-                            order,
-                            processed=True,
-                            skipped=False,
-                            skip_reason=None,
-                            queued=False,
-                        )
-                    elif status == "pending":
-                        await mark_alert_status(
-                            order,
-                            processed=False,
-                            skipped=False,
-                            skip_reason=None,
-                            queued=True,
-                        )
-                    elif status in ("blocked", "skipped", "failed", "error"):
-                        await mark_alert_status(
-                            order,
-                            processed=True,
-                            skipped=True,
-                            skip_reason=(reason or status)[:180],
-                            queued=False,
-                        )
-                    else:
-                        await mark_alert_status(
-                            order,
-                            processed=True,
-                            skipped=False,
-                            skip_reason=None,
-                            queued=False,
-                        )
-                except Exception as proc_exc:
-                    retries = int(order.get("retry_count", 0) or 0)
-                    if retries < settings.max_order_retries:
-                        retry_order = _strip_runtime_fields(order)
-                        retry_order["retry_count"] = retries + 1
-                        try:
-                            await enqueue_order(retry_order)
-                            await mark_alert_status(
-                                order,
-                                processed=False,
-                                skipped=False,
-                                skip_reason=None,
-                                queued=True,
-                            )
-                            await send_notification(
-                                f"⚠️ 주문 처리 중 예외가 발생해 재시도 큐에 넣었습니다 "
-                                f"({retries + 1}/{settings.max_order_retries})\n"
-                                f"{order.get('action', '')} {order.get('ticker', '')}\n"
-                                f"사유: {str(proc_exc)}"
-                            )
-                        except Exception as retry_enqueue_exc:
-                            requeued = await requeue_processing_order(order)
-                            ack_now = False
-                            logger.error(
-                                "Retry enqueue failed",
-                                error=str(retry_enqueue_exc),
-                                action=order.get("action"),
-                                ticker=order.get("ticker"),
-                                requeued_to_source=requeued,
-                            )
-                            if requeued:
-                                await send_notification(
-                                    "⚠️ 재시도 큐 적재 실패로 원본 큐로 되돌렸습니다.\n"
-                                    f"{order.get('action', '')} {order.get('ticker', '')}\n"
-                                    f"사유: {str(retry_enqueue_exc)}"
-                                )
-                            else:
-                                await send_notification(
-                                    "❌ 재시도 큐 적재도 실패했습니다. "
-                                    "주문을 processing 큐에 보존했습니다.\n"
-                                    f"{order.get('action', '')} {order.get('ticker', '')}\n"
-                                    f"사유: {str(retry_enqueue_exc)}"
-                                )
-                    else:
-                        await mark_alert_status(
-                            order,
-                            processed=True,
-                            skipped=True,
-                            skip_reason=f"max_retries_exceeded: {str(proc_exc)[:140]}",
-                            queued=False,
-                        )
-                        await send_notification(
-                            f"❌ 주문 처리 예외가 반복되어 폐기했습니다 "
-                            f"({settings.max_order_retries}회 초과)\n"
-                            f"{order.get('action', '')} {order.get('ticker', '')}\n"
-                            f"사유: {str(proc_exc)}"
-                        )
-            finally:
-                if ack_now:
-                    await ack_processed_order(order)
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        from app.broker.fill_latency import get_fill_latency_model
 
-        except Exception as e:
-            logger.error("Worker loop error", error=str(e))
-            await asyncio.sleep(5)  # Wait before retrying
+        get_fill_latency_model().flush()
+        with contextlib.suppress(Exception):
+            await drop_stream_consumer_lease()
 
 
 def handle_shutdown(signum, frame):
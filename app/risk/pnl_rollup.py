@@ -0,0 +1,261 @@
+"""
+Daily P&L rollup maintenance and reads.
+
+Every filled trade is folded into daily_pnl_rollup by an ORM after_flush hook,
+in the same transaction as the trade INSERT, as an additive upsert on
+(ET date, market, currency). Reports then read a handful of rollup rows
+instead of aggregating the trades table.
+
+Trades are written once and never edited, so the hook only looks at new
+rows. rebuild_daily_pnl_rollup() recomputes a date range from trades
+(scripts/backfill_daily_pnl_rollup.py) for history and manual corrections.
+"""
+
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Iterable, Optional
+
+from sqlalchemy import case, delete, event, func, select
+from sqlalchemy.orm import Session
+import structlog
+
+from app.broker.market_hours import ET
+from app.gateway.symbol_mapper import is_kis_domestic_symbol, kis_overseas_exchange_meta
+from app.models.daily_pnl_rollup import DailyPnlRollup
+from app.models.trade import Trade, TradeSide, TradeStatus, trade_time_window
+
+logger = structlog.get_logger()
+
+ROLLUP_KEY_COLUMNS = ("trade_date", "market", "currency")
+_SUM_COLUMNS = (
+    "buy_count",
+    "buy_amount",
+    "sell_count",
+    "sell_amount",
+    "realized_pnl",
+    "commission",
+    "kis_sell_count",
+)
+_ROLLUP_STATUSES = (TradeStatus.FILLED, TradeStatus.PARTIAL)
+
+
+def rollup_market(symbol: str) -> tuple[str, str]:
+    """(market, currency) bucket for a trade symbol."""
+    if is_kis_domestic_symbol(symbol):
+        return "KRX", "KRW"
+    meta = kis_overseas_exchange_meta(symbol)
+    return str(meta.get("region") or "US"), str(meta.get("currency") or "USD").upper()
+
+
+def trade_et_date(ts: Optional[datetime]) -> date:
+    """ET calendar date of a trade's fill (or creation) time."""
+    if ts is None:
+        ts = datetime.now(timezone.utc)
+    elif ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.astimezone(ET).date()
+
+
+def et_date_start_utc(day: date) -> datetime:
+    return ET.localize(datetime.combine(day, time.min)).astimezone(timezone.utc)
+
+
+@dataclass
+class RollupTotals:
+    """Running aggregates for one (date, market, currency) bucket."""
+
+    buy_count: int = 0
+    buy_amount: float = 0.0
+    sell_count: int = 0
+    sell_amount: float = 0.0
+    realized_pnl: float = 0.0
+    commission: float = 0.0
+    kis_sell_count: int = 0
+    first_buy_at: Optional[datetime] = None
+
+    def add(self, trade) -> None:
+        filled = trade.status == TradeStatus.FILLED
+        if trade.side == TradeSide.BUY:
+            ts = trade.filled_at or trade.created_at
+            if ts is not None and ts.tzinfo is None:
+                ts = ts.replace(tzinfo=timezone.utc)
+            if ts is not None and (self.first_buy_at is None or ts < self.first_buy_at):
+                self.first_buy_at = ts
+            if filled:
+                self.buy_count += 1
+                self.buy_amount += float(trade.total_fill_amount_usd or 0.0)
+        elif filled:
+            self.sell_count += 1
+            self.sell_amount += float(trade.total_fill_amount_usd or 0.0)
+            self.realized_pnl += float(trade.total_pnl_usd or 0.0)
+            self.commission += float(trade.commission or 0.0)
+            if trade.ib_order_id is not None and trade.ib_order_id < 0:
+                self.kis_sell_count += 1
+
+
+def aggregate_trades(trades: Iterable) -> dict[tuple[date, str, str], RollupTotals]:
+    """Group FILLED/PARTIAL trades (ORM objects or rows) into rollup buckets."""
+    buckets: dict[tuple[date, str, str], RollupTotals] = {}
+    for trade in trades:
+        if trade.status not in _ROLLUP_STATUSES:
+            continue
+        market, currency = rollup_market(str(trade.ticker or ""))
+        key = (trade_et_date(trade.filled_at or trade.created_at), market, currency)
+        buckets.setdefault(key, RollupTotals()).add(trade)
+    return buckets
+
+
+def _rollup_values(buckets: dict[tuple[date, str, str], RollupTotals]) -> list[dict]:
+    now = datetime.now(timezone.utc)
+    values = []
+    for (trade_date, market, currency), totals in sorted(buckets.items()):
+        row = {"trade_date": trade_date, "market": market, "currency": currency, "updated_at": now}
+        row.update({name: getattr(totals, name) for name in _SUM_COLUMNS})
+        row["first_buy_at"] = totals.first_buy_at
+        values.append(row)
+    return values
+
+
+def _dialect_insert(dialect_name: str):
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"daily_pnl_rollup upsert is not supported on {dialect_name}")
+    return insert
+
+
+def rollup_upsert_statement(dialect_name: str, values: list[dict], additive: bool = True):
+    """
+    INSERT .. ON CONFLICT for rollup rows.
+
+    additive=True folds the values into an existing row (new fills);
+    additive=False replaces it (rebuild from trades).
+    """
+    table = DailyPnlRollup.__table__
+    stmt = _dialect_insert(dialect_name)(table).values(values)
+    excluded = stmt.excluded
+    if additive:
+        set_ = {name: table.c[name] + excluded[name] for name in _SUM_COLUMNS}
+        set_["first_buy_at"] = case(
+            (table.c.first_buy_at.is_(None), excluded.first_buy_at),
+            (excluded.first_buy_at < table.c.first_buy_at, excluded.first_buy_at),
+            else_=table.c.first_buy_at,
+        )
+    else:
+        set_ = {name: excluded[name] for name in (*_SUM_COLUMNS, "first_buy_at")}
+    set_["updated_at"] = excluded.updated_at
+    return stmt.on_conflict_do_update(index_elements=list(ROLLUP_KEY_COLUMNS), set_=set_)
+
+
+def fold_fills_statement(dialect_name: str, trades: Iterable):
+    """
+    Additive rollup upsert for newly written trades, or None when none of them
+    are FILLED/PARTIAL. Callers that insert trades with bulk INSERT statements
+    (which bypass the flush hook below) execute it in the same transaction.
+    """
+    buckets = aggregate_trades(trades)
+    if not buckets:
+        return None
+    try:
+        return rollup_upsert_statement(dialect_name, _rollup_values(buckets))
+    except NotImplementedError as e:
+        logger.warning("Daily P&L rollup not updated", error=str(e))
+        return None
+
+
+@event.listens_for(Session, "after_flush")
+def _fold_new_fills_into_rollup(session: Session, _flush_context) -> None:
+    fills = [obj for obj in session.new if isinstance(obj, Trade) and obj.status in _ROLLUP_STATUSES]
+    if not fills:
+        return
+    connection = session.connection()
+    stmt = fold_fills_statement(connection.dialect.name, fills)
+    if stmt is not None:
+        connection.execute(stmt)
+
+
+async def rebuild_daily_pnl_rollup(
+    session,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+) -> dict:
+    """
+    Recompute rollup rows for ET dates in [start_date, end_date] from trades.
+    Open-ended bounds cover the whole trade history.
+    """
+    delete_stmt = delete(DailyPnlRollup)
+    trade_stmt = select(
+        Trade.ticker,
+        Trade.side,
+        Trade.status,
+        Trade.total_fill_amount_usd,
+        Trade.total_pnl_usd,
+        Trade.commission,
+        Trade.ib_order_id,
+        Trade.filled_at,
+        Trade.created_at,
+    ).where(Trade.status.in_(_ROLLUP_STATUSES))
+    if start_date is not None:
+        delete_stmt = delete_stmt.where(DailyPnlRollup.trade_date >= start_date)
+    if end_date is not None:
+        delete_stmt = delete_stmt.where(DailyPnlRollup.trade_date <= end_date)
+    if start_date is not None or end_date is not None:
+        window_start = et_date_start_utc(start_date) if start_date else datetime(1970, 1, 1, tzinfo=timezone.utc)
+        window_end = (
+            et_date_start_utc(end_date + timedelta(days=1))
+            if end_date
+            else datetime.now(timezone.utc) + timedelta(days=1)
+        )
+        trade_stmt = trade_stmt.where(trade_time_window(window_start, window_end))
+
+    buckets = aggregate_trades((await session.execute(trade_stmt)).all())
+    deleted = (await session.execute(delete_stmt)).rowcount or 0
+    values = _rollup_values(buckets)
+    if values:
+        dialect_name = session.get_bind().dialect.name
+        await session.execute(rollup_upsert_statement(dialect_name, values, additive=False))
+    return {
+        "deleted": deleted,
+        "written": len(values),
+        "dates": len({key[0] for key in buckets}),
+        "trades": sum(totals.buy_count + totals.sell_count for totals in buckets.values()),
+    }
+
+
+async def fetch_rollup_rows(session, start_date: date, end_date: date) -> list[DailyPnlRollup]:
+    """Rollup rows for ET dates in [start_date, end_date)."""
+    result = await session.execute(
+        select(DailyPnlRollup)
+        .where(DailyPnlRollup.trade_date >= start_date, DailyPnlRollup.trade_date < end_date)
+        .order_by(DailyPnlRollup.trade_date, DailyPnlRollup.market, DailyPnlRollup.currency)
+    )
+    return list(result.scalars().all())
+
+
+async def fetch_daily_realized_pnl(
+    session,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+) -> dict[date, tuple[float, float]]:
+    """(realized pnl, commission) per ET date in [start_date, end_date), all markets summed."""
+    stmt = select(
+        DailyPnlRollup.trade_date,
+        func.sum(DailyPnlRollup.realized_pnl),
+        func.sum(DailyPnlRollup.commission),
+    ).where(DailyPnlRollup.sell_count > 0)
+    if start_date is not None:
+        stmt = stmt.where(DailyPnlRollup.trade_date >= start_date)
+    if end_date is not None:
+        stmt = stmt.where(DailyPnlRollup.trade_date < end_date)
+    result = await session.execute(stmt.group_by(DailyPnlRollup.trade_date).order_by(DailyPnlRollup.trade_date))
+    return {row[0]: (float(row[1] or 0.0), float(row[2] or 0.0)) for row in result.all()}
+
+
+async def fetch_first_buy_date(session) -> Optional[date]:
+    """ET date of the first FILLED/PARTIAL BUY fill."""
+    result = await session.execute(
+        select(func.min(DailyPnlRollup.trade_date)).where(DailyPnlRollup.first_buy_at.is_not(None))
+    )
+    return result.scalar()
@@ -0,0 +1,600 @@
+"""
+Worker-resident ledger of open positions.
+
+Loaded once at worker startup and updated by the order executor right after
+its DB transaction commits, so BUY risk checks and the risk summary become
+dictionary lookups instead of scans over OPEN position rows.
+A periodic verify re-aggregates from the DB and replaces the ledger on drift.
+
+Processes that never load the ledger (web, scheduler, scripts) keep it
+unloaded: every update is a no-op there and callers fall back to the DB.
+
+Processes that change OPEN rows (scheduler reconcile/repair jobs, Telegram
+commands, other workers) publish the ticker on TICKER_CHANGED_CHANNEL; the
+worker's listener re-reads just that ticker instead of waiting for verify.
+
+BUYs that passed the risk rules hold a reservation in Redis until their
+order has been executed, so concurrent BUYs in other lanes and worker
+processes count them against the portfolio limits. Releasing an executed
+BUY bumps a generation counter (published with the ticker change); a
+reservation made against a risk snapshot older than the counter is refused,
+and a ledger that has not yet applied the latest generation is bypassed in
+favour of the DB.
+
+The set of open tickers is also mirrored to Redis so the webhook can answer
+"do we hold this?" for allowlist SELLs without a DB session. Full loads and
+verifies republish the set and refresh a freshness marker; the webhook only
+trusts the set while that marker exists. Every per-ticker update bumps a
+version, and a full publish is dropped when the version moved since its DB
+read, so a stale snapshot never removes a ticker another process just added.
+"""
+
+import asyncio
+import json
+import os
+import uuid
+from dataclasses import dataclass
+
+from sqlalchemy import select, func
+import structlog
+
+from app.config import settings
+from app.database.connection import get_session
+from app.gateway.symbol_mapper import is_kis_domestic_symbol
+from app.models.position import Position, POSITION_IS_OPEN
+from app.queue.order_queue import get_redis
+
+logger = structlog.get_logger()
+
+OPEN_TICKERS_KEY = "positions:open_tickers"
+OPEN_TICKERS_SYNCED_KEY = "positions:open_tickers:synced"
+OPEN_TICKERS_VERSION_KEY = "positions:open_tickers:version"
+TICKER_CHANGED_CHANNEL = "positions:ticker_changed"
+BUY_RESERVATIONS_KEY = "positions:buy_reservations"
+BUY_RESERVATION_EXPIRY_KEY = "positions:buy_reservations:expiry"
+BUY_GENERATION_KEY = "positions:buy_generation"
+
+# Tags published changes so a process skips its own messages.
+_PROCESS_ORIGIN = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+# Re-reads of one ticker before giving up on a ticker that keeps changing.
+_SYNC_ATTEMPTS = 3
+
+_QTY_TOLERANCE = 0.0001
+_AMOUNT_TOLERANCE = 0.01
+
+
+@dataclass
+class TickerExposure:
+    """Aggregated OPEN rows for one ticker (amount is in the row's native currency)."""
+
+    count: int = 0
+    qty: float = 0.0
+    invested: float = 0.0
+
+    def matches(self, other: "TickerExposure") -> bool:
+        return (
+            self.count == other.count
+            and abs(self.qty - other.qty) <= _QTY_TOLERANCE
+            and abs(self.invested - other.invested) <= _AMOUNT_TOLERANCE
+        )
+
+
+class PortfolioLedger:
+    """In-memory per-ticker view of OPEN positions."""
+
+    def __init__(self):
+        self._tickers: dict[str, TickerExposure] = {}
+        self.loaded = False
+        # Bumped on every mutation so a DB reload that raced with an update
+        # does not overwrite the newer in-memory state.
+        self._version = 0
+        # Per-ticker stamps of _version, so a one-ticker re-read only has to
+        # retry when that ticker (or the whole ledger) changed under it.
+        self._ticker_versions: dict[str, int] = {}
+        self._reset_version = 0
+        # Highest BUY generation whose committed positions this ledger holds.
+        self.applied_generation = 0
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def ticker_version(self, symbol: str) -> int:
+        return max(self._ticker_versions.get(symbol, 0), self._reset_version)
+
+    def _bump(self, symbol: str | None = None) -> None:
+        self._version += 1
+        if symbol is None:
+            self._ticker_versions = {}
+            self._reset_version = self._version
+        else:
+            self._ticker_versions[symbol] = self._version
+
+    def note_generation(self, generation: int | None) -> None:
+        if generation:
+            self.applied_generation = max(self.applied_generation, int(generation))
+
+    def exposure(self, symbol: str) -> TickerExposure:
+        return self._tickers.get(symbol) or TickerExposure()
+
+    def tickers(self) -> dict[str, TickerExposure]:
+        return dict(self._tickers)
+
+    def open_positions(self) -> int:
+        return sum(item.count for item in self._tickers.values())
+
+    def unique_tickers(self) -> int:
+        return len(self._tickers)
+
+    def ticker_count(self, symbol: str) -> int:
+        return self.exposure(symbol).count
+
+    def total_invested_usd(self) -> float:
+        """USD-named amounts only; domestic/KRX rows hold KRW and are excluded."""
+        return sum(
+            item.invested
+            for ticker, item in self._tickers.items()
+            if not is_kis_domestic_symbol(ticker)
+        )
+
+    def total_invested_krw(self) -> float:
+        return sum(
+            item.invested
+            for ticker, item in self._tickers.items()
+            if is_kis_domestic_symbol(ticker)
+        )
+
+    def record_open(self, symbol: str, qty: float, amount: float) -> None:
+        """Apply one committed OPEN position row."""
+        if not self.loaded:
+            return
+        item = self._tickers.setdefault(symbol, TickerExposure())
+        item.count += 1
+        item.qty += float(qty or 0.0)
+        item.invested += float(amount or 0.0)
+        self._bump(symbol)
+
+    def set_ticker(self, symbol: str, exposure: TickerExposure | None) -> None:
+        if not self.loaded:
+            return
+        if exposure is None or exposure.count <= 0:
+            self._tickers.pop(symbol, None)
+        else:
+            self._tickers[symbol] = exposure
+        self._bump(symbol)
+
+    def replace(self, tickers: dict[str, TickerExposure]) -> None:
+        self._tickers = {ticker: item for ticker, item in tickers.items() if item.count > 0}
+        self.loaded = True
+        self._bump()
+
+    def invalidate(self) -> None:
+        """Stop serving reads until the next full load."""
+        self.loaded = False
+        self._tickers = {}
+        self._bump()
+
+
+portfolio_ledger = PortfolioLedger()
+
+
+def get_portfolio_ledger() -> PortfolioLedger:
+    return portfolio_ledger
+
+
+def _open_tickers_marker_ttl() -> int:
+    # Survive a couple of missed verifies before readers fall back to the DB.
+    interval = max(10.0, float(settings.portfolio_ledger_verify_interval_seconds or 300.0))
+    return int(interval * 3)
+
+
+# KEYS: set, marker, version. ARGV: marker ttl, expected version ('' for
+# unconditional), members... Returns 0 when the version moved (nothing written).
+_PUBLISH_OPEN_TICKERS_SCRIPT = """
+if ARGV[2] ~= '' and (redis.call('GET', KEYS[3]) or '0') ~= ARGV[2] then
+    return 0
+end
+redis.call('DEL', KEYS[1])
+for i = 3, #ARGV do
+    redis.call('SADD', KEYS[1], ARGV[i])
+end
+redis.call('SET', KEYS[2], '1', 'EX', ARGV[1])
+return 1
+"""
+
+
+async def _read_open_tickers_version() -> str | None:
+    """Open-ticker set version to pass to publish_open_tickers; None on error."""
+    try:
+        return str(await (await get_redis()).get(OPEN_TICKERS_VERSION_KEY) or "0")
+    except Exception as e:
+        logger.warning("Open-ticker set version read failed", error=str(e))
+        return None
+
+
+async def publish_open_tickers(tickers, expected_version: str | None = None) -> bool:
+    """
+    Replace the Redis open-ticker set and refresh its freshness marker.
+    With expected_version (read before the DB snapshot), nothing is written
+    when a per-ticker update landed since then; the marker keeps its TTL.
+    """
+    try:
+        r = await get_redis()
+        published = await r.eval(
+            _PUBLISH_OPEN_TICKERS_SCRIPT,
+            3,
+            OPEN_TICKERS_KEY,
+            OPEN_TICKERS_SYNCED_KEY,
+            OPEN_TICKERS_VERSION_KEY,
+            _open_tickers_marker_ttl(),
+            expected_version or "",
+            *sorted(set(tickers)),
+        )
+    except Exception as e:
+        logger.warning("Open-ticker set publish failed", error=str(e))
+        return False
+    if not published:
+        logger.info("Open-ticker set changed during snapshot, publish skipped")
+    return bool(published)
+
+
+async def _mirror_open_ticker(symbol: str, is_open: bool) -> None:
+    try:
+        r = await get_redis()
+        async with r.pipeline(transaction=True) as pipe:
+            if is_open:
+                pipe.sadd(OPEN_TICKERS_KEY, symbol)
+            else:
+                pipe.srem(OPEN_TICKERS_KEY, symbol)
+            pipe.incr(OPEN_TICKERS_VERSION_KEY)
+            await pipe.execute()
+    except Exception as e:
+        # A stale member/miss is corrected by the next full publish; drop the
+        # marker so readers use the DB meanwhile.
+        logger.warning("Open-ticker set update failed", ticker=symbol, error=str(e))
+        try:
+            await (await get_redis()).delete(OPEN_TICKERS_SYNCED_KEY)
+        except Exception:
+            pass
+
+
+async def is_open_ticker(symbol: str) -> bool | None:
+    """
+    Redis answer for "is there an OPEN position in symbol".
+    None when the set is not known to be fresh (callers query the DB).
+    """
+    try:
+        r = await get_redis()
+        async with r.pipeline(transaction=False) as pipe:
+            pipe.exists(OPEN_TICKERS_SYNCED_KEY)
+            pipe.sismember(OPEN_TICKERS_KEY, symbol)
+            synced, member = await pipe.execute()
+    except Exception as e:
+        logger.warning("Open-ticker set lookup failed", ticker=symbol, error=str(e))
+        return None
+    if not synced:
+        return None
+    return bool(member)
+
+
+async def _read_open_exposures(symbol: str | None = None) -> dict[str, TickerExposure]:
+    stmt = (
+        select(
+            Position.ticker,
+            func.count(Position.id),
+            func.coalesce(func.sum(Position.qty), 0.0),
+            func.coalesce(func.sum(Position.entry_amount_usd), 0.0),
+        )
+        .where(POSITION_IS_OPEN)
+        .group_by(Position.ticker)
+    )
+    if symbol is not None:
+        stmt = stmt.where(Position.ticker == symbol)
+
+    async with get_session() as session:
+        rows = (await session.execute(stmt)).all()
+
+    return {
+        str(ticker): TickerExposure(
+            count=int(count or 0),
+            qty=float(qty or 0.0),
+            invested=float(invested or 0.0),
+        )
+        for ticker, count, qty, invested in rows
+    }
+
+
+async def load_portfolio_ledger() -> PortfolioLedger:
+    """Load the ledger from OPEN positions (worker startup)."""
+    generation = await _read_buy_generation()
+    set_version = await _read_open_tickers_version()
+    portfolio_ledger.replace(await _read_open_exposures())
+    portfolio_ledger.note_generation(generation)
+    if set_version is not None:
+        await publish_open_tickers(portfolio_ledger.tickers(), set_version)
+    logger.info(
+        "Portfolio ledger loaded",
+        tickers=portfolio_ledger.unique_tickers(),
+        open_positions=portfolio_ledger.open_positions(),
+    )
+    return portfolio_ledger
+
+
+@dataclass
+class BuyReservation:
+    """One executing BUY's claim on the portfolio limits."""
+
+    reservation_id: str
+    symbol: str
+    amount_usd: float = 0.0
+
+
+# Drops lapsed reservations, refuses a snapshot taken before the latest
+# executed BUY was released (nil), otherwise adds ARGV[2] and returns every
+# reservation that was already held.
+_RESERVE_BUY_SCRIPT = """
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) * 1000 + math.floor(tonumber(clock[2]) / 1000)
+local lapsed = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', now)
+for _, id in ipairs(lapsed) do
+    redis.call('HDEL', KEYS[1], id)
+end
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', now)
+if (redis.call('GET', KEYS[3]) or '0') ~= ARGV[1] then
+    return false
+end
+local held = redis.call('HVALS', KEYS[1])
+redis.call('HSET', KEYS[1], ARGV[2], ARGV[3])
+redis.call('ZADD', KEYS[2], now + tonumber(ARGV[4]), ARGV[2])
+return held
+"""
+
+# Removes one reservation; for an executed BUY also bumps the generation and
+# publishes the ticker change carrying it, so listeners see generations in order.
+_RELEASE_BUY_SCRIPT = """
+redis.call('HDEL', KEYS[1], ARGV[1])
+redis.call('ZREM', KEYS[2], ARGV[1])
+if ARGV[2] ~= '1' then
+    return 0
+end
+local generation = redis.call('INCR', KEYS[3])
+redis.call('PUBLISH', ARGV[3], cjson.encode({ticker = ARGV[4], origin = ARGV[5], generation = generation}))
+return generation
+"""
+
+
+async def current_buy_generation() -> int:
+    r = await get_redis()
+    return int(await r.get(BUY_GENERATION_KEY) or 0)
+
+
+async def reserve_buy(
+    symbol: str, amount_usd: float, generation: int
+) -> tuple[BuyReservation, list[BuyReservation]] | None:
+    """
+    Reserve one BUY against the portfolio limits.
+    Returns (reservation, reservations already held) or None when a BUY was
+    executed since `generation` was read (reload the snapshot and retry).
+    """
+    reservation = BuyReservation(uuid.uuid4().hex, symbol, float(amount_usd or 0.0))
+    ttl_ms = int(max(1.0, float(settings.buy_reservation_ttl_seconds or 300.0)) * 1000)
+    r = await get_redis()
+    held = await r.eval(
+        _RESERVE_BUY_SCRIPT,
+        3,
+        BUY_RESERVATIONS_KEY,
+        BUY_RESERVATION_EXPIRY_KEY,
+        BUY_GENERATION_KEY,
+        str(int(generation)),
+        reservation.reservation_id,
+        json.dumps({"ticker": symbol, "amount_usd": reservation.amount_usd}),
+        ttl_ms,
+    )
+    if held is None:
+        return None
+    others = []
+    for raw in held:
+        try:
+            payload = json.loads(raw)
+        except (TypeError, ValueError):
+            continue
+        others.append(
+            BuyReservation("", str(payload.get("ticker") or ""), float(payload.get("amount_usd") or 0.0))
+        )
+    return reservation, others
+
+
+async def release_buy(reservation: BuyReservation, executed: bool) -> None:
+    """
+    Drop a reservation once its BUY was committed or abandoned. An executed
+    release publishes the ticker change for other workers' ledgers.
+    """
+    try:
+        r = await get_redis()
+        generation = int(
+            await r.eval(
+                _RELEASE_BUY_SCRIPT,
+                3,
+                BUY_RESERVATIONS_KEY,
+                BUY_RESERVATION_EXPIRY_KEY,
+                BUY_GENERATION_KEY,
+                reservation.reservation_id,
+                "1" if executed else "0",
+                TICKER_CHANGED_CHANNEL,
+                reservation.symbol,
+                _PROCESS_ORIGIN,
+            )
+            or 0
+        )
+    except Exception as e:
+        # The reservation lapses after BUY_RESERVATION_TTL_SECONDS.
+        logger.warning("BUY reservation release failed", ticker=reservation.symbol, error=str(e))
+        return
+    if generation and portfolio_ledger.applied_generation == generation - 1:
+        # Our own commit is already in the ledger and no other release is
+        # outstanding, so the ledger stays usable without waiting for the echo.
+        portfolio_ledger.note_generation(generation)
+
+
+async def _read_buy_generation() -> int | None:
+    try:
+        return await current_buy_generation()
+    except Exception as e:
+        logger.warning("BUY generation read failed", error=str(e))
+        return None
+
+
+async def publish_ticker_changed(symbol: str) -> None:
+    """Tell other processes that symbol's OPEN rows changed."""
+    try:
+        r = await get_redis()
+        await r.publish(
+            TICKER_CHANGED_CHANNEL,
+            json.dumps({"ticker": symbol, "origin": _PROCESS_ORIGIN}),
+        )
+    except Exception as e:
+        # The worker's periodic verify still picks the change up.
+        logger.warning("Ticker change publish failed", ticker=symbol, error=str(e))
+
+
+async def record_position_open(symbol: str, qty: float, amount: float) -> None:
+    """
+    Apply a committed BUY to the ledger and the Redis open-ticker set.
+    Other processes hear about it from the reservation release.
+    """
+    portfolio_ledger.record_open(symbol, qty, amount)
+    await _mirror_open_ticker(symbol, True)
+
+
+async def _refresh_ledger_ticker(symbol: str) -> TickerExposure | None:
+    """
+    Re-read one ticker into the ledger (no-op while unloaded) and return its
+    DB exposure. The read is retried when that ticker changed in memory while
+    it ran; other tickers' updates do not matter.
+    """
+    exposure = None
+    for _ in range(_SYNC_ATTEMPTS):
+        version = portfolio_ledger.ticker_version(symbol)
+        exposure = (await _read_open_exposures(symbol)).get(symbol)
+        if portfolio_ledger.ticker_version(symbol) == version:
+            portfolio_ledger.set_ticker(symbol, exposure)
+            return exposure
+    if portfolio_ledger.loaded:
+        logger.warning("Portfolio ledger ticker kept changing during sync", ticker=symbol)
+        portfolio_ledger.invalidate()
+    return exposure
+
+
+async def sync_ledger_ticker(symbol: str) -> None:
+    """
+    Re-read one ticker after a committed SELL/reconcile changed its rows and
+    publish the change for the worker's ledger.
+    On failure the ledger is invalidated so readers fall back to the DB until
+    the next verify reloads it. The Redis open-ticker set is updated even in
+    processes without a loaded ledger (scheduler reconcile jobs).
+    """
+    if not symbol:
+        return
+    await publish_ticker_changed(symbol)
+    try:
+        exposure = await _refresh_ledger_ticker(symbol)
+    except Exception as e:
+        logger.error("Portfolio ledger ticker sync failed", ticker=symbol, error=str(e))
+        if portfolio_ledger.loaded:
+            portfolio_ledger.invalidate()
+        return
+    await _mirror_open_ticker(symbol, exposure is not None and exposure.count > 0)
+
+
+def _ticker_change(message: dict) -> dict | None:
+    """Decoded change message, or None for anything else on the channel."""
+    if message.get("type") != "message":
+        return None
+    try:
+        payload = json.loads(message.get("data") or "")
+    except (TypeError, ValueError):
+        return None
+    return payload if isinstance(payload, dict) else None
+
+
+async def ledger_change_listener() -> None:
+    """
+    Re-read tickers other processes changed (worker only). Changes published
+    while unsubscribed are lost, so every (re)subscribe verifies the whole ledger.
+    """
+    while True:
+        pubsub = None
+        try:
+            r = await get_redis()
+            pubsub = r.pubsub()
+            await pubsub.subscribe(TICKER_CHANGED_CHANNEL)
+            try:
+                await verify_portfolio_ledger()
+            except Exception as e:
+                # Readers use the DB until the verify loop reloads it.
+                logger.error("Portfolio ledger verify error", error=str(e))
+                portfolio_ledger.invalidate()
+            async for message in pubsub.listen():
+                change = _ticker_change(message)
+                if change is None:
+                    continue
+                symbol = str(change.get("ticker") or "")
+                if symbol and change.get("origin") != _PROCESS_ORIGIN:
+                    try:
+                        await _refresh_ledger_ticker(symbol)
+                    except Exception as e:
+                        logger.error("Portfolio ledger ticker sync failed", ticker=symbol, error=str(e))
+                        portfolio_ledger.invalidate()
+                        continue
+                portfolio_ledger.note_generation(change.get("generation"))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("Portfolio ledger change listener error", error=str(e))
+        finally:
+            if pubsub is not None:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+        await asyncio.sleep(1.0)
+
+
+async def verify_portfolio_ledger() -> list[str]:
+    """
+    Compare the ledger with the DB and replace it when they disagree.
+    Returns the tickers that drifted (empty when consistent). Also reloads an
+    invalidated ledger.
+    """
+    version = portfolio_ledger.version
+    was_loaded = portfolio_ledger.loaded
+    generation = await _read_buy_generation()
+    set_version = await _read_open_tickers_version()
+    db_tickers = await _read_open_exposures()
+    if portfolio_ledger.version != version:
+        # An executor update raced with the read; try again next interval.
+        return []
+    if set_version is not None:
+        await publish_open_tickers(
+            (ticker for ticker, item in db_tickers.items() if item.count > 0),
+            set_version,
+        )
+
+    if not was_loaded:
+        portfolio_ledger.replace(db_tickers)
+        portfolio_ledger.note_generation(generation)
+        logger.info("Portfolio ledger reloaded", tickers=len(db_tickers))
+        return []
+
+    current = portfolio_ledger.tickers()
+    drifted = sorted(
+        ticker
+        for ticker in set(current) | set(db_tickers)
+        if not current.get(ticker, TickerExposure()).matches(db_tickers.get(ticker, TickerExposure()))
+    )
+    if drifted:
+        logger.warning("Portfolio ledger drift corrected", tickers=drifted)
+        portfolio_ledger.replace(db_tickers)
+    # Consistent with the DB as of the read, which saw every earlier release.
+    portfolio_ledger.note_generation(generation)
+    return drifted
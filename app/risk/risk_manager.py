@@ -3,13 +3,24 @@ Risk management module.
 All pre-order checks: balance, limits, PDT, etc.
 """
 
-from sqlalchemy import select, func, and_, or_
+import asyncio
+from dataclasses import dataclass
+from time import perf_counter
+
+from sqlalchemy import select, func, and_, or_, literal, cast, Float, String, union_all
 import structlog
 
 from app.config import settings
 from app.database.connection import get_session, get_bot_settings
-from app.models.position import Position, PositionStatus
-from app.models.trade import Trade, TradeSide, TradeStatus
+from app.models.position import Position, POSITION_IS_OPEN
+from app.models.trade import Trade, TradeSide, TradeStatus, trade_time_window
+from app.risk.portfolio_ledger import (
+    BuyReservation,
+    current_buy_generation,
+    get_portfolio_ledger,
+    release_buy,
+    reserve_buy,
+)
 from app.broker.ib_client import get_ib_client
 from app.broker.market_hours import get_et_day_bounds_utc, get_kst_day_bounds_utc
 from app.gateway.symbol_mapper import (
@@ -25,9 +36,13 @@ logger = structlog.get_logger()
 class RiskCheckResult:
     """Result of a risk check."""
 
-    def __init__(self, passed: bool, reason: str = ""):
+    def __init__(self, passed: bool, reason: str = "", timings: dict | None = None):
         self.passed = passed
         self.reason = reason
+        # Per-check latency in milliseconds (only filled by check_all_buy_risks).
+        self.timings = timings or {}
+        # Held limit reservation of a passed check_all_buy_risks(reserve=True).
+        self.reservation: BuyReservation | None = None
 
     def __bool__(self):
         return self.passed
@@ -38,18 +53,7 @@ def _filled_trade_time_window(start_utc, end_utc):
     Prefer filled_at for realized-trade day/week boundaries.
     Fallback to created_at for legacy rows with null filled_at.
     """
-    return or_(
-        and_(
-            Trade.filled_at.is_not(None),
-            Trade.filled_at >= start_utc,
-            Trade.filled_at < end_utc,
-        ),
-        and_(
-            Trade.filled_at.is_(None),
-            Trade.created_at >= start_utc,
-            Trade.created_at < end_utc,
-        ),
-    )
+    return trade_time_window(start_utc, end_utc)
 
 
 def _normalize_broker_name(value: str, fallback: str) -> str:
@@ -210,44 +214,333 @@ async def _check_kis_cash(
     return RiskCheckResult(True)
 
 
-async def check_all_buy_risks(ticker: str) -> RiskCheckResult:
+@dataclass
+class RiskSnapshot:
+    """DB-derived inputs for the BUY risk rules, loaded in one round trip."""
+
+    symbol: str = ""
+    open_positions: int = 0
+    ticker_open_positions: int = 0
+    # USD symbols only; domestic/KRX rows store KRW in the USD-named columns.
+    total_invested_usd: float = 0.0
+    today_ticker_buys: int = 0
+    today_buys: int = 0
+
+    def add_reservations(self, reservations: list[BuyReservation]) -> None:
+        """Count BUYs still executing elsewhere as if they were committed."""
+        for item in reservations:
+            self.open_positions += 1
+            self.today_buys += 1
+            self.total_invested_usd += item.amount_usd
+            if self.symbol and item.symbol == self.symbol:
+                self.ticker_open_positions += 1
+                self.today_ticker_buys += 1
+
+
+def _ticker_day_bounds_utc(symbol: str):
+    """Trading-day bounds used for the one-BUY-per-ticker-per-day rule."""
+    if is_kis_domestic_symbol(symbol) or kis_overseas_currency(symbol) in ("HKD", "CNY", "JPY"):
+        return get_kst_day_bounds_utc()
+    return get_et_day_bounds_utc()
+
+
+def _risk_snapshot_statement(symbol: str, include_positions: bool = True):
+    """
+    Build the single aggregate query behind RiskSnapshot.
+
+    Rows come back in two shapes (UNION ALL):
+      ("position", ticker, open_count, invested_amount) per open ticker
+      ("buys", symbol, today_symbol_buys, today_buys) exactly once
+    Open positions are grouped per ticker because the domestic/USD split is
+    decided by is_kis_domestic_symbol() in Python, not in SQL. They are left
+    out when the portfolio ledger already holds them.
+    """
+    day_start, day_end = get_et_day_bounds_utc()
+    ticker_start, ticker_end = (
+        _ticker_day_bounds_utc(symbol) if symbol else (day_start, day_end)
+    )
+    day_window = _filled_trade_time_window(day_start, day_end)
+    ticker_window = and_(
+        Trade.ticker == symbol,
+        _filled_trade_time_window(ticker_start, ticker_end),
+    )
+
+    open_rows = (
+        select(
+            literal("position", String).label("kind"),
+            Position.ticker.label("ticker"),
+            cast(func.count(Position.id), Float).label("count_value"),
+            cast(func.coalesce(func.sum(Position.entry_amount_usd), 0.0), Float).label(
+                "extra_value"
+            ),
+        )
+        .where(POSITION_IS_OPEN)
+        .group_by(Position.ticker)
+    )
+    buy_rows = select(
+        literal("buys", String).label("kind"),
+        literal(symbol, String).label("ticker"),
+        cast(func.count(Trade.id).filter(ticker_window), Float).label("count_value"),
+        cast(func.count(Trade.id).filter(day_window), Float).label("extra_value"),
+    ).where(
+        Trade.side == TradeSide.BUY,
+        Trade.status == TradeStatus.FILLED,
+        or_(ticker_window, day_window),
+    )
+    if not include_positions:
+        return buy_rows
+    return union_all(open_rows, buy_rows)
+
+
+async def load_risk_snapshot(ticker: str = "", generation: int | None = None) -> RiskSnapshot:
+    """
+    Fetch every DB-derived BUY risk input with one query.
+    Open-position figures come from the portfolio ledger when it is loaded
+    (worker process), leaving only today's BUY counts to the DB. With a BUY
+    generation the ledger is only used once it has applied that generation.
+    """
+    symbol = canonical_trade_symbol(ticker) if ticker else ""
+    ledger = get_portfolio_ledger()
+    use_ledger = ledger.loaded and (generation is None or ledger.applied_generation >= generation)
+
+    async with get_session() as session:
+        rows = (
+            await session.execute(
+                _risk_snapshot_statement(symbol, include_positions=not use_ledger)
+            )
+        ).all()
+
+    snapshot = RiskSnapshot(symbol=symbol)
+    if use_ledger:
+        snapshot.open_positions = ledger.open_positions()
+        snapshot.ticker_open_positions = ledger.ticker_count(symbol) if symbol else 0
+        snapshot.total_invested_usd = ledger.total_invested_usd()
+    for kind, row_ticker, count_value, extra_value in rows:
+        if kind == "position":
+            count = int(count_value or 0)
+            snapshot.open_positions += count
+            if symbol and row_ticker == symbol:
+                snapshot.ticker_open_positions += count
+            if not is_kis_domestic_symbol(str(row_ticker or "")):
+                snapshot.total_invested_usd += float(extra_value or 0.0)
+        elif kind == "buys":
+            snapshot.today_ticker_buys = int(count_value or 0)
+            snapshot.today_buys = int(extra_value or 0)
+    return snapshot
+
+
+def _rule_kill_switch(bot_settings) -> RiskCheckResult:
+    if bot_settings.is_killed:
+        return RiskCheckResult(False, "긴급 정지 상태입니다. /resume 명령으로 재개할 수 있습니다.")
+    return RiskCheckResult(True)
+
+
+def _rule_pause(bot_settings) -> RiskCheckResult:
+    if bot_settings.is_paused:
+        return RiskCheckResult(False, "매수 일시중지 상태입니다. /resume 명령으로 재개할 수 있습니다.")
+    return RiskCheckResult(True)
+
+
+def _rule_total_investment(ticker: str, snapshot: RiskSnapshot, bot_settings) -> RiskCheckResult:
+    # Existing DB amount columns are USD-named. Domestic/KRX positions store KRW
+    # native amounts there, so do not mix them into the USD max-investment guard.
+    if ticker and is_kis_domestic_symbol(ticker):
+        return RiskCheckResult(True)
+
+    total_invested = snapshot.total_invested_usd
+    remaining = bot_settings.max_total_investment - total_invested
+    if remaining < bot_settings.buy_amount_usd:
+        return RiskCheckResult(
+            False,
+            f"총 투자 한도에 도달했습니다. "
+            f"현재: ${total_invested:.2f} / 한도: ${bot_settings.max_total_investment:.2f}",
+        )
+    return RiskCheckResult(True)
+
+
+def _rule_open_positions(snapshot: RiskSnapshot, bot_settings) -> RiskCheckResult:
+    open_count = snapshot.open_positions
+    if open_count >= bot_settings.max_open_positions:
+        return RiskCheckResult(
+            False,
+            f"최대 보유 포지션 수에 도달했습니다: {open_count}/{bot_settings.max_open_positions}",
+        )
+    return RiskCheckResult(True)
+
+
+def _rule_daily_buy_per_ticker(snapshot: RiskSnapshot) -> RiskCheckResult:
+    max_daily_buys_per_ticker = 1
+    today_symbol_buys = snapshot.today_ticker_buys
+    if today_symbol_buys >= max_daily_buys_per_ticker:
+        return RiskCheckResult(
+            False,
+            f"{snapshot.symbol}: 오늘 매수는 1회만 허용됩니다 "
+            f"({today_symbol_buys}/{max_daily_buys_per_ticker})",
+        )
+    return RiskCheckResult(True)
+
+
+def _rule_per_ticker(snapshot: RiskSnapshot, bot_settings) -> RiskCheckResult:
+    ticker_count = snapshot.ticker_open_positions
+    if ticker_count >= bot_settings.max_per_ticker:
+        return RiskCheckResult(
+            False,
+            f"{snapshot.symbol}: 종목당 최대 매수 횟수에 도달했습니다 "
+            f"({ticker_count}/{bot_settings.max_per_ticker})",
+        )
+    return RiskCheckResult(True)
+
+
+def _rule_daily_buys(snapshot: RiskSnapshot, bot_settings) -> RiskCheckResult:
+    today_buys = snapshot.today_buys
+    if today_buys >= bot_settings.max_daily_buys:
+        return RiskCheckResult(
+            False,
+            f"일일 최대 매수 횟수에 도달했습니다: {today_buys}/{bot_settings.max_daily_buys}",
+        )
+    return RiskCheckResult(True)
+
+
+def _elapsed_ms(started: float) -> float:
+    return round((perf_counter() - started) * 1000, 3)
+
+
+async def _timed(coro, timings: dict, name: str):
+    started = perf_counter()
+    try:
+        return await coro
+    finally:
+        timings[name] = _elapsed_ms(started)
+
+
+# Snapshot reloads when other BUYs keep executing between read and reserve.
+_RESERVE_ATTEMPTS = 5
+
+
+async def _reserve_against_snapshot(
+    ticker: str, snapshot: RiskSnapshot, generation: int, amount_usd: float
+) -> tuple[RiskSnapshot, BuyReservation]:
+    """Reserve this BUY and fold every reservation held before it into the snapshot."""
+    for _ in range(_RESERVE_ATTEMPTS):
+        reserved = await reserve_buy(snapshot.symbol, amount_usd, generation)
+        if reserved is not None:
+            reservation, held = reserved
+            snapshot.add_reservations(held)
+            return snapshot, reservation
+        generation = await current_buy_generation()
+        snapshot = await load_risk_snapshot(ticker, generation)
+    raise RuntimeError("다른 매수가 계속 체결되어 한도 예약을 잡지 못했습니다")
+
+
+async def check_all_buy_risks(ticker: str, *, reserve: bool = False) -> RiskCheckResult:
     """
     Run all risk checks before executing a BUY order.
-    Returns RiskCheckResult (truthy if all checks pass).
+
+    The DB-derived inputs come from one snapshot query that runs concurrently
+    with the broker cash check; the rules are then evaluated in memory in the
+    original order, so the first failing check reported is unchanged.
+    Returns RiskCheckResult (truthy if all checks pass) carrying per-check
+    timings in milliseconds.
+
+    With reserve=True the BUY also takes a limit reservation that BUYs
+    executing concurrently (other lanes/workers) count against the limits;
+    a passing result carries it and the caller must release it with
+    release_buy() once the order was executed or abandoned.
     """
-    checks = [
-        ("kill_switch", check_kill_switch),
-        ("pause", check_pause),
-        ("cash_balance", lambda t: check_cash_balance(t)),
-        ("total_investment", lambda t: check_total_investment(t)),
-        ("open_positions", check_open_positions),
-        ("per_ticker_daily", lambda t: check_daily_buy_per_ticker_limit(t)),
-        ("per_ticker", lambda t: check_per_ticker_limit(t)),
-        ("daily_buys", check_daily_buy_limit),
-    ]
+    started = perf_counter()
+    timings: dict[str, float] = {}
 
-    for check_name, check_func in checks:
+    def _finish(result: RiskCheckResult, check_name: str = "") -> RiskCheckResult:
+        timings["total"] = _elapsed_ms(started)
+        result.timings = timings
+        if result:
+            logger.debug("Risk checks passed", ticker=ticker, timings_ms=timings)
+        else:
+            logger.warning(
+                "Risk check failed",
+                check=check_name,
+                ticker=ticker,
+                reason=result.reason,
+                timings_ms=timings,
+            )
+        return result
+
+    def _error(check_name: str, error: BaseException) -> RiskCheckResult:
+        logger.error("Risk check error", check=check_name, error=str(error))
+        return _finish(
+            RiskCheckResult(False, f"리스크 체크 오류 ({check_name}): {str(error)}"),
+            check_name,
+        )
+
+    try:
+        bot_settings = await _timed(get_bot_settings(), timings, "bot_settings")
+    except Exception as e:
+        return _error("bot_settings", e)
+
+    for check_name, rule in (("kill_switch", _rule_kill_switch), ("pause", _rule_pause)):
+        result = rule(bot_settings)
+        if not result:
+            return _finish(result, check_name)
+
+    generation = None
+    if reserve:
         try:
-            if check_name in ("per_ticker_daily", "per_ticker", "cash_balance", "total_investment"):
-                result = await check_func(ticker)
-            elif check_name in ("kill_switch", "pause"):
-                result = await check_func()
-            else:
-                result = await check_func()
-
-            if not result:
-                logger.warning(
-                    "Risk check failed",
-                    check=check_name,
-                    ticker=ticker,
-                    reason=result.reason,
-                )
-                return result
+            generation = await _timed(current_buy_generation(), timings, "buy_generation")
         except Exception as e:
-            logger.error("Risk check error", check=check_name, error=str(e))
-            return RiskCheckResult(False, f"리스크 체크 오류 ({check_name}): {str(e)}")
+            return _error("buy_reservation", e)
 
-    return RiskCheckResult(True)
+    cash_result, snapshot = await asyncio.gather(
+        _timed(check_cash_balance(ticker, bot_settings=bot_settings), timings, "cash_balance"),
+        _timed(load_risk_snapshot(ticker, generation), timings, "risk_snapshot"),
+        return_exceptions=True,
+    )
+    if isinstance(cash_result, BaseException):
+        return _error("cash_balance", cash_result)
+    if not cash_result:
+        return _finish(cash_result, "cash_balance")
+    if isinstance(snapshot, BaseException):
+        return _error("risk_snapshot", snapshot)
+
+    reservation = None
+    if reserve:
+        # Mirrors _rule_total_investment: KRW-priced BUYs do not count against the USD cap.
+        amount_usd = (
+            0.0 if is_kis_domestic_symbol(snapshot.symbol) else float(bot_settings.buy_amount_usd or 0.0)
+        )
+        try:
+            snapshot, reservation = await _timed(
+                _reserve_against_snapshot(ticker, snapshot, generation, amount_usd),
+                timings,
+                "buy_reservation",
+            )
+        except Exception as e:
+            return _error("buy_reservation", e)
+
+    rules = [
+        ("total_investment", lambda: _rule_total_investment(ticker, snapshot, bot_settings)),
+        ("open_positions", lambda: _rule_open_positions(snapshot, bot_settings)),
+        ("per_ticker_daily", lambda: _rule_daily_buy_per_ticker(snapshot)),
+        ("per_ticker", lambda: _rule_per_ticker(snapshot, bot_settings)),
+        ("daily_buys", lambda: _rule_daily_buys(snapshot, bot_settings)),
+    ]
+    for check_name, rule in rules:
+        rule_started = perf_counter()
+        try:
+            result = rule()
+        except Exception as e:
+            result = e
+        finally:
+            timings[check_name] = _elapsed_ms(rule_started)
+        if isinstance(result, Exception) or not result:
+            if reservation is not None:
+                await release_buy(reservation, executed=False)
+            if isinstance(result, Exception):
+                return _error(check_name, result)
+            return _finish(result, check_name)
+
+    result = RiskCheckResult(True)
+    result.reservation = reservation
+    return _finish(result)
 
 
 async def check_sell_risks() -> RiskCheckResult:
@@ -260,23 +553,18 @@ async def check_sell_risks() -> RiskCheckResult:
 
 async def check_kill_switch() -> RiskCheckResult:
     """Check if the emergency kill switch is active."""
-    bot_settings = await get_bot_settings()
-    if bot_settings.is_killed:
-        return RiskCheckResult(False, "긴급 정지 상태입니다. /resume 명령으로 재개할 수 있습니다.")
-    return RiskCheckResult(True)
+    return _rule_kill_switch(await get_bot_settings())
 
 
 async def check_pause() -> RiskCheckResult:
     """Check if buying is paused."""
-    bot_settings = await get_bot_settings()
-    if bot_settings.is_paused:
-        return RiskCheckResult(False, "매수 일시중지 상태입니다. /resume 명령으로 재개할 수 있습니다.")
-    return RiskCheckResult(True)
+    return _rule_pause(await get_bot_settings())
 
 
-async def check_cash_balance(ticker: str) -> RiskCheckResult:
+async def check_cash_balance(ticker: str, *, bot_settings=None) -> RiskCheckResult:
     """Check if we have enough cash to buy."""
-    bot_settings = await get_bot_settings()
+    if bot_settings is None:
+        bot_settings = await get_bot_settings()
     buy_amount = bot_settings.buy_amount_usd
     min_reserve = bot_settings.min_cash_reserve
 
@@ -307,137 +595,36 @@ async def check_cash_balance(ticker: str) -> RiskCheckResult:
 
 async def check_total_investment(ticker: str = "") -> RiskCheckResult:
     """Check if total invested amount is within limit."""
-    # Existing DB amount columns are USD-named. Domestic/KRX positions store KRW
-    # native amounts there, so do not mix them into the USD max-investment guard.
     if ticker and is_kis_domestic_symbol(ticker):
         return RiskCheckResult(True)
-
     bot_settings = await get_bot_settings()
-
-    async with get_session() as session:
-        rows = (
-            await session.execute(
-                select(Position.ticker, Position.entry_amount_usd).where(
-                    Position.status == PositionStatus.OPEN
-                )
-            )
-        ).all()
-        total_invested = sum(
-            float(amount or 0.0)
-            for ticker_value, amount in rows
-            if not is_kis_domestic_symbol(str(ticker_value or ""))
-        )
-
-    remaining = bot_settings.max_total_investment - total_invested
-    if remaining < bot_settings.buy_amount_usd:
-        return RiskCheckResult(
-            False,
-            f"총 투자 한도에 도달했습니다. "
-            f"현재: ${total_invested:.2f} / 한도: ${bot_settings.max_total_investment:.2f}",
-        )
-
-    return RiskCheckResult(True)
+    return _rule_total_investment(ticker, await load_risk_snapshot(ticker), bot_settings)
 
 
 async def check_open_positions() -> RiskCheckResult:
     """Check if we're under the max open positions limit."""
     bot_settings = await get_bot_settings()
-
-    async with get_session() as session:
-        result = await session.execute(
-            select(func.count(Position.id)).where(
-                Position.status == PositionStatus.OPEN
-            )
-        )
-        open_count = result.scalar() or 0
-
-    if open_count >= bot_settings.max_open_positions:
-        return RiskCheckResult(
-            False,
-            f"최대 보유 포지션 수에 도달했습니다: {open_count}/{bot_settings.max_open_positions}",
-        )
-
-    return RiskCheckResult(True)
+    return _rule_open_positions(await load_risk_snapshot(), bot_settings)
 
 
 async def check_per_ticker_limit(ticker: str) -> RiskCheckResult:
     """Check if this ticker has too many open positions (duplicate buys)."""
-    symbol = canonical_trade_symbol(ticker)
     bot_settings = await get_bot_settings()
-
-    async with get_session() as session:
-        result = await session.execute(
-            select(func.count(Position.id)).where(
-                Position.ticker == symbol,
-                Position.status == PositionStatus.OPEN,
-            )
-        )
-        ticker_count = result.scalar() or 0
-
-    if ticker_count >= bot_settings.max_per_ticker:
-        return RiskCheckResult(
-            False,
-            f"{symbol}: 종목당 최대 매수 횟수에 도달했습니다 ({ticker_count}/{bot_settings.max_per_ticker})",
-        )
-
-    return RiskCheckResult(True)
+    return _rule_per_ticker(await load_risk_snapshot(ticker), bot_settings)
 
 
 async def check_daily_buy_per_ticker_limit(ticker: str) -> RiskCheckResult:
     """
-    Enforce at most one BUY fill per ticker per ET day.
+    Enforce at most one BUY fill per ticker per trading day.
     This prevents duplicate same-day buys when duplicate alerts arrive.
     """
-    symbol = canonical_trade_symbol(ticker)
-    if is_kis_domestic_symbol(symbol) or kis_overseas_currency(symbol) in ("HKD", "CNY", "JPY"):
-        today_start, today_end = get_kst_day_bounds_utc()
-    else:
-        today_start, today_end = get_et_day_bounds_utc()
-    max_daily_buys_per_ticker = 1
-
-    async with get_session() as session:
-        result = await session.execute(
-            select(func.count(Trade.id)).where(
-                Trade.ticker == symbol,
-                Trade.side == TradeSide.BUY,
-                Trade.status == TradeStatus.FILLED,
-                _filled_trade_time_window(today_start, today_end),
-            )
-        )
-        today_symbol_buys = result.scalar() or 0
-
-    if today_symbol_buys >= max_daily_buys_per_ticker:
-        return RiskCheckResult(
-            False,
-            f"{symbol}: 오늘 매수는 1회만 허용됩니다 "
-            f"({today_symbol_buys}/{max_daily_buys_per_ticker})",
-        )
-
-    return RiskCheckResult(True)
+    return _rule_daily_buy_per_ticker(await load_risk_snapshot(ticker))
 
 
 async def check_daily_buy_limit() -> RiskCheckResult:
     """Check if we've exceeded today's buy limit."""
     bot_settings = await get_bot_settings()
-    today_start, today_end = get_et_day_bounds_utc()
-
-    async with get_session() as session:
-        result = await session.execute(
-            select(func.count(Trade.id)).where(
-                Trade.side == TradeSide.BUY,
-                Trade.status == TradeStatus.FILLED,
-                _filled_trade_time_window(today_start, today_end),
-            )
-        )
-        today_buys = result.scalar() or 0
-
-    if today_buys >= bot_settings.max_daily_buys:
-        return RiskCheckResult(
-            False,
-            f"일일 최대 매수 횟수에 도달했습니다: {today_buys}/{bot_settings.max_daily_buys}",
-        )
-
-    return RiskCheckResult(True)
+    return _rule_daily_buys(await load_risk_snapshot(), bot_settings)
 
 
 async def get_risk_summary() -> dict:
@@ -445,33 +632,40 @@ async def get_risk_summary() -> dict:
     bot_settings = await get_bot_settings()
     today_start, today_end = get_et_day_bounds_utc()
 
-    async with get_session() as session:
-        # Open positions count
-        pos_count = (await session.execute(
-            select(func.count(Position.id)).where(Position.status == PositionStatus.OPEN)
-        )).scalar() or 0
-
-        # Unique tickers
-        ticker_count = (await session.execute(
-            select(func.count(func.distinct(Position.ticker))).where(
-                Position.status == PositionStatus.OPEN
-            )
-        )).scalar() or 0
+    ledger = get_portfolio_ledger()
 
-        # Total invested in USD symbols only. Domestic/KRX native KRW rows are
-        # intentionally excluded from this legacy USD risk summary.
-        invested_rows = (
-            await session.execute(
-                select(Position.ticker, Position.entry_amount_usd).where(
-                    Position.status == PositionStatus.OPEN
+    async with get_session() as session:
+        if ledger.loaded:
+            pos_count = ledger.open_positions()
+            ticker_count = ledger.unique_tickers()
+            total_invested = ledger.total_invested_usd()
+        else:
+            # Open positions count
+            pos_count = (await session.execute(
+                select(func.count(Position.id)).where(POSITION_IS_OPEN)
+            )).scalar() or 0
+
+            # Unique tickers
+            ticker_count = (await session.execute(
+                select(func.count(func.distinct(Position.ticker))).where(
+                    POSITION_IS_OPEN
                 )
+            )).scalar() or 0
+
+            # Total invested in USD symbols only. Domestic/KRX native KRW rows are
+            # intentionally excluded from this legacy USD risk summary.
+            invested_rows = (
+                await session.execute(
+                    select(Position.ticker, Position.entry_amount_usd).where(
+                        POSITION_IS_OPEN
+                    )
+                )
+            ).all()
+            total_invested = sum(
+                float(amount or 0.0)
+                for ticker_value, amount in invested_rows
+                if not is_kis_domestic_symbol(str(ticker_value or ""))
             )
-        ).all()
-        total_invested = sum(
-            float(amount or 0.0)
-            for ticker_value, amount in invested_rows
-            if not is_kis_domestic_symbol(str(ticker_value or ""))
-        )
 
         # Today's buys
         today_buys = (await session.execute(
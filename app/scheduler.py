@@ -4,6 +4,7 @@ APScheduler jobs for automated tasks:
 - Daily report
 - Periodic position sync
 - Sunday login reminder
+- Alert log partition upkeep and archival
 """
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
@@ -12,6 +13,7 @@ import importlib.util
 import structlog
 
 from app.config import settings
+from app.broker.kis_client import KISPriority, kis_priority_scope
 
 logger = structlog.get_logger()
 
@@ -152,9 +154,12 @@ async def job_position_sync():
         await send_notification(report)
 
 
+@kis_priority_scope(KISPriority.REPORTING)
 async def job_kis_position_reconcile():
     """
     Periodically reconcile KIS real holdings into the local DB.
+    One holdings snapshot and one DB read are diffed and every fix is written
+    in a single transaction (app.broker.kis_reconcile).
 
     This catches ambiguous KIS order states where an order is reported as
     unconfirmed/cancel-failed but later appears in the real account balance.
@@ -163,107 +168,24 @@ async def job_kis_position_reconcile():
         return
 
     try:
-        from sqlalchemy import func, select
-
         from app.broker.kis_client import get_kis_client
-        from app.broker.order_executor import (
-            _reconcile_kis_domestic_symbol_to_db,
-            _reconcile_kis_symbol_to_db,
-        )
-        from app.gateway.symbol_mapper import is_kis_domestic_symbol
-        from app.database.connection import get_session
-        from app.models.position import Position, PositionStatus
+        from app.broker.kis_reconcile import reconcile_kis_holdings
         from app.notifications.telegram_bot import send_notification
 
         kis = await get_kis_client()
         if not kis.is_configured:
             return
 
-        rows = await kis.get_overseas_balance()
-        broker_qty: dict[str, float] = {}
-        for row in rows:
-            symbol = str(
-                row.get("ovrs_pdno")
-                or row.get("pdno")
-                or row.get("item_cd")
-                or ""
-            ).strip().upper()
-            qty = float(
-                row.get("ovrs_cblc_qty")
-                or row.get("cblc_qty")
-                or row.get("hold_qty")
-                or row.get("blce_qty")
-                or 0.0
-            )
-            if symbol and qty > 0:
-                broker_qty[symbol] = broker_qty.get(symbol, 0.0) + qty
-
-        if settings.kis_domestic_enabled:
-            try:
-                domestic_rows = await kis.get_domestic_balance()
-            except Exception:
-                domestic_rows = []
-            for row in domestic_rows:
-                symbol = str(row.get("pdno") or "").strip().upper()
-                qty = float(row.get("hldg_qty") or 0.0)
-                if symbol and qty > 0:
-                    broker_qty[symbol] = broker_qty.get(symbol, 0.0) + qty
-
-        async with get_session() as session:
-            db_rows = (
-                await session.execute(
-                    select(Position.ticker, func.sum(Position.qty))
-                    .where(
-                        Position.status == PositionStatus.OPEN,
-                        Position.entry_order_id < 0,
-                    )
-                    .group_by(Position.ticker)
-                )
-            ).all()
-
-        db_qty = {
-            str(symbol or "").strip().upper(): float(qty or 0.0)
-            for symbol, qty in db_rows
-            if str(symbol or "").strip()
-        }
-        target_symbols = sorted(set(broker_qty) | set(db_qty))
-        mismatches = [
-            symbol
-            for symbol in target_symbols
-            if abs(float(broker_qty.get(symbol, 0.0)) - float(db_qty.get(symbol, 0.0))) > 0.001
-        ]
-        if not mismatches:
-            return
-
-        repaired = []
-        errors = []
-        for symbol in mismatches:
-            try:
-                if is_kis_domestic_symbol(symbol):
-                    result = await _reconcile_kis_domestic_symbol_to_db(kis, symbol)
-                else:
-                    result = await _reconcile_kis_symbol_to_db(kis, symbol)
-                repaired.append(
-                    {
-                        "ticker": symbol,
-                        "added_qty": float(result.get("added_qty", 0.0) or 0.0),
-                        "closed_qty": float(result.get("closed_qty", 0.0) or 0.0),
-                        "ok": bool(result.get("ok")),
-                    }
-                )
-                if not result.get("ok"):
-                    errors.append(f"{symbol}: {result.get('error', 'unknown')}")
-            except Exception as exc:
-                errors.append(f"{symbol}: {str(exc)}")
-
-        changed = [item for item in repaired if item["added_qty"] > 0 or item["closed_qty"] > 0]
+        plan = await reconcile_kis_holdings(kis)
+        changed = plan.changes
+        errors = [f"{symbol}: {error}" for symbol, error in plan.errors]
         if changed or errors:
             lines = ["🧭 KIS 보유/DB 자동 정합화"]
             if changed:
                 lines.append(
                     "복구: "
                     + ", ".join(
-                        f"{item['ticker']}(+{item['added_qty']:.0f}/-{item['closed_qty']:.0f})"
+                        f"{item.symbol}(+{item.add_qty:.0f}/-{item.closed_qty:.0f})"
                         for item in changed
                     )
                 )
@@ -346,6 +268,7 @@ async def job_site_monitor():
         logger.error("Site monitor failed", error=str(e))
 
 
+@kis_priority_scope(KISPriority.REPORTING)
 async def job_missed_sell_repair():
     """
     Detect failed SELL alerts that still have live KIS holdings and requeue them.
@@ -363,6 +286,26 @@ async def job_missed_sell_repair():
         logger.error("Missed SELL repair failed", error=str(e))
 
 
+async def job_alert_log_retention():
+    """
+    Runs daily at 03:30 ET.
+    Creates upcoming alert_logs partitions and archives months past retention.
+    """
+    try:
+        from app.alert_log_archive import run_alert_log_retention
+
+        report = await run_alert_log_retention()
+        if report["created_partitions"] or report["archived"]:
+            logger.info(
+                "Alert log retention completed",
+                created_partitions=report["created_partitions"],
+                archived=[(item["month"], item["rows"]) for item in report["archived"]],
+                cutoff=report["cutoff"],
+            )
+    except Exception as e:
+        logger.error("Alert log retention failed", error=str(e))
+
+
 def setup_scheduler():
     """Configure and start the scheduler."""
     # Market open — flush pending queue (9:30 ET, Mon-Fri)
@@ -465,6 +408,14 @@ def setup_scheduler():
         replace_existing=True,
     )
 
+    scheduler.add_job(
+        job_alert_log_retention,
+        CronTrigger(hour=3, minute=30, timezone="US/Eastern"),
+        id="alert_log_retention",
+        name="Alert Log Partitions & Archive",
+        replace_existing=True,
+    )
+
     if mode == "kis_only":
         scheduler.add_job(
             job_kis_position_reconcile,
@@ -7,20 +7,19 @@ successfully close an existing KIS position because of a transient broker error.
 
 from __future__ import annotations
 
-import json
-import hashlib
 from datetime import datetime, timezone
 from typing import Any
 
 import structlog
-from sqlalchemy import func, select
+from sqlalchemy import and_, func, select, true
 
 from app.broker.kis_client import get_kis_client
 from app.broker.market_hours import is_market_open_for_ticker
+from app.codec import canonical_json, sha256_hex
 from app.database.connection import get_session
 from app.gateway.symbol_mapper import is_kis_domestic_symbol
-from app.models.alert_log import AlertLog
-from app.models.position import Position, PositionStatus
+from app.models.alert_log import AlertLog, alert_log_received_since_column
+from app.models.position import Position, POSITION_IS_OPEN
 from app.queue.order_queue import enqueue_order, enqueue_pending
 
 logger = structlog.get_logger()
@@ -40,6 +39,92 @@ def _normalize_ticker(value: str) -> str:
     return str(value or "").strip().upper()
 
 
+def _missed_sell_statement(dialect_name: str):
+    """
+    One row per OPEN ticker that has a skipped SELL alert since its earliest
+    entry: the latest such alert plus the count of queued-but-unprocessed
+    SELLs. Postgres probes the latest alert per ticker with a LATERAL
+    ... LIMIT 1 on the skipped-alert partial index; other dialects rank
+    the skipped SELLs with a window function instead. Both bound
+    received_month by the entry month, so old partitions are pruned.
+    """
+    open_positions = (
+        select(
+            Position.ticker,
+            func.min(Position.entry_time).label("earliest_entry"),
+            func.sum(Position.qty).label("db_qty"),
+        )
+        .where(POSITION_IS_OPEN)
+        .group_by(Position.ticker)
+        .subquery("open_positions")
+    )
+    skipped_sell = (
+        AlertLog.ticker == open_positions.c.ticker,
+        AlertLog.action == "SELL",
+        alert_log_received_since_column(open_positions.c.earliest_entry, dialect_name),
+        AlertLog.skipped.is_(True),
+    )
+    if dialect_name == "postgresql":
+        latest = (
+            select(AlertLog.id, AlertLog.received_at, AlertLog.skip_reason)
+            .where(*skipped_sell)
+            .order_by(AlertLog.received_at.desc(), AlertLog.id.desc())
+            .limit(1)
+            .lateral("latest_skipped_sell")
+        )
+        source = open_positions.join(latest, true())
+    else:
+        ranked = (
+            select(
+                AlertLog.ticker,
+                AlertLog.id,
+                AlertLog.received_at,
+                AlertLog.skip_reason,
+                func.row_number()
+                .over(
+                    partition_by=AlertLog.ticker,
+                    order_by=(AlertLog.received_at.desc(), AlertLog.id.desc()),
+                )
+                .label("rank"),
+            )
+            .select_from(AlertLog)
+            .join(open_positions, skipped_sell[0])
+            .where(*skipped_sell[1:])
+            .subquery("latest_skipped_sell")
+        )
+        latest = ranked
+        source = open_positions.join(
+            ranked,
+            and_(ranked.c.ticker == open_positions.c.ticker, ranked.c.rank == 1),
+        )
+    # Any pending SELL still applies to the position, whenever it was queued;
+    # only open tickers are counted (partial unprocessed-queue index).
+    queued_sells = (
+        select(AlertLog.ticker, func.count(AlertLog.id).label("queued_sells"))
+        .where(
+            AlertLog.ticker.in_(select(open_positions.c.ticker)),
+            AlertLog.action == "SELL",
+            AlertLog.queued.is_(True),
+            AlertLog.processed.is_(False),
+        )
+        .group_by(AlertLog.ticker)
+        .subquery("queued_sells")
+    )
+    return (
+        select(
+            open_positions.c.ticker,
+            open_positions.c.earliest_entry,
+            open_positions.c.db_qty,
+            latest.c.id.label("failed_alert_id"),
+            latest.c.received_at.label("failed_at"),
+            latest.c.skip_reason,
+            func.coalesce(queued_sells.c.queued_sells, 0).label("queued_sells"),
+        )
+        .select_from(source.outerjoin(queued_sells, queued_sells.c.ticker == open_positions.c.ticker))
+        .order_by(open_positions.c.ticker)
+    )
+
+
 async def find_missed_sell_candidates() -> list[dict[str, Any]]:
     """
     Return open DB positions that had a failed/skipped SELL alert after entry.
@@ -48,90 +133,60 @@ async def find_missed_sell_candidates() -> list[dict[str, Any]]:
     - no-position skips are ignored
     - already queued repair SELLs are ignored
     - KIS balance is checked before returning a candidate
+
+    One DB query and one whole-account KIS balance snapshot, however many
+    tickers are open.
     """
     async with get_session() as session:
-        open_rows = (
-            await session.execute(
-                select(
-                    Position.ticker,
-                    func.min(Position.entry_time).label("earliest_entry"),
-                    func.sum(Position.qty).label("db_qty"),
-                )
-                .where(Position.status == PositionStatus.OPEN)
-                .group_by(Position.ticker)
-            )
+        rows = (
+            await session.execute(_missed_sell_statement(session.get_bind().dialect.name))
         ).all()
 
-        candidates: list[dict[str, Any]] = []
-        for ticker, earliest_entry, db_qty in open_rows:
-            symbol = _normalize_ticker(ticker)
-            if not symbol or not earliest_entry:
-                continue
-
-            failed_sell = (
-                await session.execute(
-                    select(AlertLog)
-                    .where(
-                        AlertLog.ticker == symbol,
-                        AlertLog.action == "SELL",
-                        AlertLog.received_at >= earliest_entry,
-                        AlertLog.skipped.is_(True),
-                    )
-                    .order_by(AlertLog.received_at.desc())
-                    .limit(1)
-                )
-            ).scalar_one_or_none()
-            if not failed_sell:
-                continue
-
-            reason = str(failed_sell.skip_reason or "").strip()
-            if reason in NO_POSITION_REASONS:
-                continue
-            if reason in INTENTIONAL_SELL_HOLD_REASONS:
-                continue
-
-            already_queued = (
-                (
-                    await session.execute(
-                        select(func.count(AlertLog.id)).where(
-                            AlertLog.ticker == symbol,
-                            AlertLog.action == "SELL",
-                            AlertLog.queued.is_(True),
-                            AlertLog.processed.is_(False),
-                        )
-                    )
-                ).scalar()
-                or 0
-            )
-            if int(already_queued) > 0:
-                continue
+    candidates: list[dict[str, Any]] = []
+    for row in rows:
+        symbol = _normalize_ticker(row.ticker)
+        if not symbol or not row.earliest_entry:
+            continue
 
-            candidates.append(
-                {
-                    "ticker": symbol,
-                    "db_qty": float(db_qty or 0.0),
-                    "earliest_entry": earliest_entry,
-                    "failed_alert_id": failed_sell.id,
-                    "failed_at": failed_sell.received_at,
-                    "reason": reason,
-                }
-            )
+        reason = str(row.skip_reason or "").strip()
+        if reason in NO_POSITION_REASONS:
+            continue
+        if reason in INTENTIONAL_SELL_HOLD_REASONS:
+            continue
+        if int(row.queued_sells or 0) > 0:
+            continue
+
+        candidates.append(
+            {
+                "ticker": symbol,
+                "db_qty": float(row.db_qty or 0.0),
+                "earliest_entry": row.earliest_entry,
+                "failed_alert_id": row.failed_alert_id,
+                "failed_at": row.failed_at,
+                "reason": reason,
+            }
+        )
 
     if not candidates:
         return []
 
     kis = await get_kis_client()
+    domestic = [is_kis_domestic_symbol(item["ticker"]) for item in candidates]
+    snapshot = await kis.get_holdings_snapshot(overseas=not all(domestic), domestic=any(domestic))
+    if snapshot["errors"]:
+        logger.warning("Missed SELL KIS balance snapshot incomplete", errors=snapshot["errors"][:5])
+
     verified: list[dict[str, Any]] = []
     for item in candidates:
         symbol = item["ticker"]
         try:
-            if is_kis_domestic_symbol(symbol):
-                balance = await kis.get_domestic_symbol_balance(symbol)
-            else:
-                balance = await kis.get_symbol_balance(symbol)
+            balance = kis.snapshot_symbol_balance(snapshot, symbol)
         except Exception as exc:
+            balance = None
             item["kis_error"] = str(exc)
-            logger.warning("Missed SELL KIS balance check failed", ticker=symbol, error=str(exc))
+        if balance is None:
+            item.setdefault("kis_error", "; ".join(snapshot["errors"][:3]) or "balance unavailable")
+            logger.warning("Missed SELL KIS balance check failed", ticker=symbol, error=item["kis_error"])
             continue
 
         kis_qty = float(balance.get("qty", 0.0) or 0.0)
@@ -162,9 +217,8 @@ async def enqueue_safety_sell(ticker: str, *, reason: str = "missed_sell_repair"
         "reason": reason,
         "created_at": now.isoformat(),
     }
-    idempotency_key = hashlib.sha256(
-        json.dumps(raw_payload, sort_keys=True, separators=(",", ":")).encode("utf-8")
-    ).hexdigest()
+    fingerprint = canonical_json(raw_payload)
+    idempotency_key = sha256_hex(fingerprint)
 
     async with get_session() as session:
         alert = AlertLog(
@@ -172,7 +226,7 @@ async def enqueue_safety_sell(ticker: str, *, reason: str = "missed_sell_repair"
             action="SELL",
             price=None,
             alert_id=alert_id,
-            raw_payload=json.dumps(raw_payload, ensure_ascii=False),
+            raw_payload=fingerprint,
             source_ip="safety_watchdog",
             processed=False,
             queued=False,
@@ -0,0 +1,82 @@
+"""
+Query archived alert logs for audits, or run the retention job by hand.
+
+Archives are the gzip JSONL files the scheduler writes per UTC month under
+ALERT_LOG_ARCHIVE_DIR when alert_logs partitions pass ALERT_LOG_RETENTION_MONTHS.
+
+Usage:
+    python -m scripts.alert_log_archive query --since 2026-01-01 --until 2026-02-01 [--ticker AAPL] [--action SELL]
+    python -m scripts.alert_log_archive query --key <idempotency_key>
+    python -m scripts.alert_log_archive run
+"""
+
+import argparse
+import asyncio
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+from app.alert_log_archive import archived_months, iter_archived_alert_logs, run_alert_log_retention
+from app.codec import dumps
+from app.database.connection import init_db
+
+
+def _utc(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def query(args) -> int:
+    directory = Path(args.archive_dir) if args.archive_dir else None
+    months = archived_months(directory)
+    if not months:
+        print("no archives found", file=sys.stderr)
+        return 0
+    count = 0
+    for record in iter_archived_alert_logs(
+        args.since,
+        args.until,
+        ticker=args.ticker,
+        action=args.action,
+        idempotency_key=args.key,
+        alert_id=args.alert_id,
+        directory=directory,
+    ):
+        print(dumps(record))
+        count += 1
+        if args.limit and count >= args.limit:
+            break
+    print(
+        f"{count} alert logs (archives {months[0]:%Y-%m} ~ {months[-1]:%Y-%m})",
+        file=sys.stderr,
+    )
+    return count
+
+
+async def run():
+    await init_db()
+    report = await run_alert_log_retention()
+    print(f"cutoff: {report['cutoff'] or 'retention off'}")
+    print(f"created partitions: {', '.join(report['created_partitions']) or '-'}")
+    for item in report["archived"]:
+        print(f"* {item['month']}: {item['rows']} rows -> {item['path'] or '(empty)'}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Alert log archive reader and retention runner.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    query_parser = sub.add_parser("query", help="print matching archived alert logs as JSON lines")
+    query_parser.add_argument("--since", type=_utc, help="received_at lower bound (ISO, UTC if naive)")
+    query_parser.add_argument("--until", type=_utc, help="received_at upper bound, exclusive")
+    query_parser.add_argument("--ticker")
+    query_parser.add_argument("--action", choices=("BUY", "SELL"))
+    query_parser.add_argument("--key", help="idempotency key")
+    query_parser.add_argument("--alert-id")
+    query_parser.add_argument("--limit", type=int, default=0)
+    query_parser.add_argument("--archive-dir", help="defaults to ALERT_LOG_ARCHIVE_DIR")
+    sub.add_parser("run", help="create upcoming partitions and archive expired months now")
+    args = parser.parse_args()
+    if args.command == "query":
+        query(args)
+    else:
+        asyncio.run(run())
@@ -0,0 +1,36 @@
+"""
+Rebuild daily_pnl_rollup from the trades table.
+
+Run once after migration 004 to load history, or for a date range after
+correcting trade rows by hand. Rows in the range are replaced, so re-running
+is safe; new fills are folded in by the worker as they happen.
+
+Usage:
+    python -m scripts.backfill_daily_pnl_rollup [--since 2026-01-01] [--until 2026-03-31]
+"""
+
+import argparse
+import asyncio
+from datetime import date
+
+from app.database.connection import get_session, init_db
+from app.risk.pnl_rollup import rebuild_daily_pnl_rollup
+
+
+async def main(since: date | None, until: date | None):
+    await init_db()
+    async with get_session() as session:
+        result = await rebuild_daily_pnl_rollup(session, start_date=since, end_date=until)
+    span = f"{since or 'start'} ~ {until or 'today'}"
+    print(
+        f"daily_pnl_rollup {span}: {result['written']} rows over {result['dates']} ET dates "
+        f"from {result['trades']} filled trades (replaced {result['deleted']} rows)"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the daily P&L rollup from trades.")
+    parser.add_argument("--since", type=date.fromisoformat, help="first ET date (YYYY-MM-DD)")
+    parser.add_argument("--until", type=date.fromisoformat, help="last ET date (YYYY-MM-DD), inclusive")
+    args = parser.parse_args()
+    asyncio.run(main(args.since, args.until))
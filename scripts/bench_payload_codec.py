@@ -0,0 +1,111 @@
+"""
+Micro-benchmark of per-alert payload work: webhook body parse, idempotency
+fingerprint + hashes, and the queue encode/decode round trip.
+
+Compares the previous stdlib path (two sorted dumps per alert, ASCII
+escaping) with app.codec. No Redis/DB needed.
+
+Usage:
+    python -m scripts.bench_payload_codec [--iterations 20000]
+"""
+
+import argparse
+import hashlib
+import json
+from time import perf_counter
+
+from app import codec
+from app.codec import canonical_json, decode_order, encode_order, loads, sha256_hex
+
+BODY = json.dumps(
+    {
+        "secret": "bench-secret",
+        "action": "BUY",
+        "ticker": "NASDAQ:AAPL",
+        "price": "189.37",
+        "time": "2026-05-26T13:45:00Z",
+        "alert_id": "tv-123456789",
+        "comment": "4h crossover",
+    }
+).encode("utf-8")
+
+
+def _legacy_fingerprint(payload: dict) -> tuple[str, str, str]:
+    audit_payload = dict(payload)
+    audit_payload["secret"] = "***"
+    hash_payload = dict(payload)
+    hash_payload.pop("secret", None)
+    fingerprint = json.dumps(audit_payload, sort_keys=True, separators=(",", ":"))
+    hash_fingerprint = json.dumps(hash_payload, sort_keys=True, separators=(",", ":"))
+    payload_hash = hashlib.sha256(hash_fingerprint.encode("utf-8")).hexdigest()
+    raw_key = f"aid|{payload['alert_id']}|BUY|AAPL|{payload['time']}|{payload_hash}"
+    key = hashlib.sha256(raw_key.encode("utf-8")).hexdigest()
+    return fingerprint, key, key
+
+
+def _codec_fingerprint(payload: dict) -> tuple[str, str, str]:
+    audit_payload = dict(payload)
+    audit_payload["secret"] = "***"
+    fingerprint = canonical_json(audit_payload)
+    payload_hash = sha256_hex(fingerprint)
+    key = sha256_hex(f"aid|{payload['alert_id']}|BUY|AAPL|{payload['time']}|{payload_hash}")
+    return fingerprint, key, key
+
+
+def _order(payload: dict, key: str) -> dict:
+    return {
+        "action": "BUY",
+        "ticker": "AAPL",
+        "price": float(payload["price"]),
+        "alert_id": payload["alert_id"],
+        "idempotency_key": key,
+        "dedupe_key": key,
+        "retry_count": 0,
+        "received_at": payload["time"],
+        "source_ip": "52.89.214.238",
+    }
+
+
+def _stages(iterations: int, *, legacy: bool) -> dict[str, float]:
+    parse = json.loads if legacy else loads
+    fingerprint = _legacy_fingerprint if legacy else _codec_fingerprint
+    encode = json.dumps if legacy else encode_order
+    decode = json.loads if legacy else decode_order
+
+    payload = parse(BODY)
+    _, key, _ = fingerprint(payload)
+    order_json = encode(_order(payload, key))
+
+    timings = {}
+    for name, fn in (
+        ("parse", lambda: parse(BODY)),
+        ("fingerprint", lambda: fingerprint(payload)),
+        ("encode", lambda: encode(_order(payload, key))),
+        ("decode", lambda: decode(order_json)),
+    ):
+        started = perf_counter()
+        for _ in range(iterations):
+            fn()
+        timings[name] = (perf_counter() - started) / iterations * 1_000_000
+    timings["total"] = sum(timings.values())
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark per-alert payload codec cost.")
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+    iterations = max(1, args.iterations)
+
+    backend = "orjson" if codec.orjson is not None else "stdlib json"
+    legacy = _stages(iterations, legacy=True)
+    current = _stages(iterations, legacy=False)
+    print(f"Payload codec benchmark ({iterations} iterations, codec backend: {backend})")
+    print(f"{'stage':<12} {'legacy us':>10} {'codec us':>10} {'speedup':>8}")
+    for stage in ("parse", "fingerprint", "encode", "decode", "total"):
+        speedup = legacy[stage] / current[stage] if current[stage] else 0.0
+        print(f"{stage:<12} {legacy[stage]:>10.2f} {current[stage]:>10.2f} {speedup:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,485 @@
+"""
+Load test for the /webhook ingest path.
+
+Boots create_app(skip_startup=True) in-process (httpx ASGITransport) and
+fires bursts of TradingView-style alerts: unique BUY/SELLs, exact duplicate
+retries, and allowlist misses (including SELLs for held tickers outside the
+allowlist). External services are replaced by stand-ins so runs are
+self-contained and comparable:
+
+- Redis: fakeredis (with lupa, so the production enqueue-once and push Lua
+  scripts run unchanged) behind a fixed per-round-trip latency. Needs the
+  dev requirements (requirements-dev.txt).
+- DB: a pool sized like the api engine profile (pool_size + max_overflow) whose
+  sessions hold a slot for a fixed statement latency; peak use and checkout
+  waits show pool saturation.
+
+The payload mix is seeded, so with the same options two runs differ only by
+machine noise. Save a run with --output and gate later runs with --compare.
+
+Usage:
+    python -m scripts.bench_webhook_load [--bursts 5] [--alerts 200] [--concurrency 100]
+    python -m scripts.bench_webhook_load --output bench_webhook.json
+    python -m scripts.bench_webhook_load --compare bench_webhook.json --max-regression-pct 25
+"""
+
+import argparse
+import asyncio
+import contextlib
+import inspect
+import json
+import logging
+import random
+from datetime import datetime, timezone
+from time import perf_counter
+from unittest.mock import patch
+
+import fakeredis.aioredis
+import httpx
+import structlog
+
+from app.config import settings
+from app.database.connection import ENGINE_PROFILES
+from app.gateway import alert_log_writer as alert_log_writer_module
+from app.gateway import webhook
+from app.gateway.alert_log_writer import AlertLogBatchWriter
+from app.main import create_app
+from app.queue import order_queue
+from app.risk.portfolio_ledger import publish_open_tickers
+
+BENCH_SECRET = "bench-secret"
+TRADINGVIEW_IP = "52.89.214.238"
+ALLOWED_TICKERS = [f"T{idx:03d}" for idx in range(40)]
+HELD_OUTSIDE_ALLOWLIST = [f"H{idx:03d}" for idx in range(10)]
+NOT_ALLOWED = [f"X{idx:03d}" for idx in range(40)]
+API_POOL_CAPACITY = ENGINE_PROFILES["api"].pool_size + ENGINE_PROFILES["api"].max_overflow
+
+
+class _LatencyRedis:
+    """
+    fakeredis.aioredis client (lupa runs the production Lua scripts) with a
+    fixed latency and a call count on every round trip. A pipeline is one
+    round trip.
+    """
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency = max(0.0, latency_ms) / 1000.0
+        self.calls = 0
+        self.server = fakeredis.aioredis.FakeRedis(decode_responses=True)
+
+    async def _tick(self) -> None:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+
+    async def _round_trip(self, pending):
+        await self._tick()
+        return await pending
+
+    def __getattr__(self, name):
+        target = getattr(self.server, name)
+        if not callable(target):
+            return target
+
+        # redis-py command methods are plain functions returning awaitables.
+        def call(*args, **kwargs):
+            result = target(*args, **kwargs)
+            return self._round_trip(result) if inspect.isawaitable(result) else result
+
+        return call
+
+    def pipeline(self, transaction=True):
+        return _LatencyPipeline(self, self.server.pipeline(transaction=transaction))
+
+    async def queued_orders(self) -> list[str]:
+        rows = []
+        for queue in (order_queue.SELL_QUEUE, order_queue.BUY_QUEUE):
+            rows += await self.server.lrange(queue, 0, -1)
+        for stream in (order_queue.SELL_STREAM, order_queue.BUY_STREAM):
+            rows += [fields.get("payload", "") for _, fields in await self.server.xrange(stream)]
+        return rows
+
+
+class _LatencyPipeline:
+    def __init__(self, client: _LatencyRedis, pipeline):
+        self.client = client
+        self.pipeline = pipeline
+
+    async def __aenter__(self):
+        await self.pipeline.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc):
+        return await self.pipeline.__aexit__(*exc)
+
+    def __getattr__(self, name):
+        return getattr(self.pipeline, name)
+
+    async def execute(self, *args, **kwargs):
+        await self.client._tick()
+        return await self.pipeline.execute(*args, **kwargs)
+
+
+class _PoolStandIn:
+    """DB pool model: capacity slots, each session holds one for its statements."""
+
+    def __init__(self, capacity: int, statement_latency_ms: float, open_tickers: set[str]):
+        self.capacity = max(1, capacity)
+        self.latency = max(0.0, statement_latency_ms) / 1000.0
+        self.open_tickers = open_tickers
+        self._slots = asyncio.Semaphore(self.capacity)
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.sessions = 0
+        self.statements = 0
+        self.checkout_waits = 0
+        self.checkout_wait_total = 0.0
+        self.checkout_wait_max = 0.0
+
+    def session(self):
+        return _SessionStandIn(self)
+
+
+class _ResultStandIn:
+    def __init__(self, row):
+        self._row = row
+
+    def first(self):
+        return self._row
+
+
+class _SessionStandIn:
+    def __init__(self, pool: _PoolStandIn):
+        self.pool = pool
+
+    async def __aenter__(self):
+        started = perf_counter()
+        await self.pool._slots.acquire()
+        waited = perf_counter() - started
+        pool = self.pool
+        if waited > 0.0005:
+            pool.checkout_waits += 1
+        pool.checkout_wait_total += waited
+        pool.checkout_wait_max = max(pool.checkout_wait_max, waited)
+        pool.sessions += 1
+        pool.in_use += 1
+        pool.peak_in_use = max(pool.peak_in_use, pool.in_use)
+        return self
+
+    async def __aexit__(self, *exc):
+        self.pool.in_use -= 1
+        self.pool._slots.release()
+        return False
+
+    async def execute(self, statement):
+        self.pool.statements += 1
+        await asyncio.sleep(self.pool.latency)
+        # Only the open-position lookup reads a result on the ingest path.
+        params = statement.compile().params
+        held = any(value in self.pool.open_tickers for value in params.values() if isinstance(value, str))
+        return _ResultStandIn((1,) if held else None)
+
+
+def _build_alerts(rng: random.Random, count: int, duplicate_ratio: float, miss_ratio: float, offset: int) -> list[dict]:
+    """Alerts for one burst: each has a payload and the group id of its original."""
+    alerts: list[dict] = []
+    now_iso = datetime.now(timezone.utc).isoformat()
+    for idx in range(count):
+        roll = rng.random()
+        if alerts and roll < duplicate_ratio:
+            original = rng.choice(alerts)
+            alerts.append({"group": original["group"], "payload": original["payload"], "expected": original["expected"]})
+            continue
+        serial = offset + idx
+        if roll < duplicate_ratio + miss_ratio:
+            if rng.random() < 0.5:
+                ticker, action, expected = rng.choice(HELD_OUTSIDE_ALLOWLIST), "SELL", "accepted"
+            else:
+                ticker, action, expected = rng.choice(NOT_ALLOWED), rng.choice(("BUY", "SELL")), "ignored"
+        else:
+            ticker, action, expected = rng.choice(ALLOWED_TICKERS), rng.choice(("BUY", "SELL")), "accepted"
+        payload = {
+            "secret": BENCH_SECRET,
+            "action": action,
+            "ticker": f"NASDAQ:{ticker}",
+            "price": f"{rng.uniform(5, 500):.2f}",
+            "time": now_iso,
+            "alert_id": f"bench-{serial}",
+        }
+        alerts.append({"group": serial, "payload": json.dumps(payload), "expected": expected})
+    return alerts
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100.0 * len(sorted_values) + 0.4999)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def _check_correctness(results: list[dict], queued: list[str]) -> dict:
+    groups: dict[int, list[dict]] = {}
+    for result in results:
+        groups.setdefault(result["group"], []).append(result)
+
+    mismatches = 0
+    expected_queued = 0
+    for rows in groups.values():
+        statuses = [row["status"] for row in rows]
+        if rows[0]["expected"] == "accepted":
+            expected_queued += 1
+            if statuses.count("accepted") != 1 or any(s not in ("accepted", "duplicate") for s in statuses):
+                mismatches += 1
+        elif any(status != "ignored" for status in statuses):
+            mismatches += 1
+    duplicate_keys = len(queued) - len({json.loads(row)["idempotency_key"] for row in queued})
+    return {
+        "ok": mismatches == 0 and len(queued) == expected_queued and duplicate_keys == 0,
+        "mismatched_groups": mismatches,
+        "queued_orders": len(queued),
+        "expected_queued": expected_queued,
+        "duplicate_queue_entries": duplicate_keys,
+    }
+
+
+async def run_benchmark(
+    *,
+    bursts: int = 5,
+    alerts: int = 200,
+    concurrency: int = 100,
+    duplicate_ratio: float = 0.15,
+    miss_ratio: float = 0.15,
+    burst_gap_ms: float = 100.0,
+    redis_latency_ms: float = 0.2,
+    db_latency_ms: float = 2.0,
+    pool_capacity: int = API_POOL_CAPACITY,
+    open_ticker_set: bool = True,
+    queue_backend: str = "list",
+    idempotency_store: str = "buckets",
+    prefilter_size: int = 10000,
+    seed: int = 7,
+) -> dict:
+    rng = random.Random(seed)
+    redis_stand_in = _LatencyRedis(redis_latency_ms)
+    pool = _PoolStandIn(pool_capacity, db_latency_ms, set(HELD_OUTSIDE_ALLOWLIST))
+    writer = AlertLogBatchWriter()
+    prefilter = order_queue.IdempotencyPrefilter(prefilter_size)
+    config = {
+        "bursts": bursts,
+        "alerts": alerts,
+        "concurrency": concurrency,
+        "duplicate_ratio": duplicate_ratio,
+        "miss_ratio": miss_ratio,
+        "burst_gap_ms": burst_gap_ms,
+        "redis_latency_ms": redis_latency_ms,
+        "db_latency_ms": db_latency_ms,
+        "pool_capacity": pool_capacity,
+        "open_ticker_set": open_ticker_set,
+        "queue_backend": queue_backend,
+        "idempotency_store": idempotency_store,
+        "prefilter_size": prefilter_size,
+        "seed": seed,
+    }
+
+    with contextlib.ExitStack() as stack:
+        for target, name, value in (
+            (settings, "webhook_secret", BENCH_SECRET),
+            (settings, "allowed_tickers", ",".join(ALLOWED_TICKERS)),
+            (settings, "allow_sell_for_open_positions_outside_allowlist", True),
+            (settings, "telegram_verbose_webhook_alerts", False),
+            (settings, "order_queue_backend", queue_backend),
+            (settings, "order_idempotency_store", idempotency_store),
+            (order_queue, "_redis_client", redis_stand_in),
+            (order_queue, "_idempotency_prefilter", prefilter),
+            (order_queue, "_stream_groups_ready", False),
+            (webhook, "get_session", pool.session),
+            (alert_log_writer_module, "get_session", pool.session),
+            (alert_log_writer_module, "alert_log_writer", writer),
+        ):
+            stack.enter_context(patch.object(target, name, value))
+
+        if open_ticker_set:
+            await publish_open_tickers(HELD_OUTSIDE_ALLOWLIST)
+
+        app = create_app(skip_startup=True)
+        transport = httpx.ASGITransport(app=app, client=(TRADINGVIEW_IP, 44321))
+        gate = asyncio.Semaphore(max(1, concurrency))
+        results: list[dict] = []
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+            async def fire(alert: dict) -> None:
+                async with gate:
+                    started = perf_counter()
+                    response = await client.post(
+                        "/webhook",
+                        content=alert["payload"],
+                        headers={"content-type": "application/json"},
+                    )
+                    elapsed_ms = (perf_counter() - started) * 1000
+                body = response.json() if response.status_code == 200 else {}
+                results.append(
+                    {
+                        "group": alert["group"],
+                        "expected": alert["expected"],
+                        "status": body.get("status") or f"http_{response.status_code}",
+                        "latency_ms": elapsed_ms,
+                    }
+                )
+
+            started = perf_counter()
+            busy = 0.0
+            for burst in range(max(1, bursts)):
+                burst_alerts = _build_alerts(rng, alerts, duplicate_ratio, miss_ratio, burst * alerts)
+                burst_started = perf_counter()
+                await asyncio.gather(*(fire(alert) for alert in burst_alerts))
+                busy += perf_counter() - burst_started
+                if burst < bursts - 1:
+                    await asyncio.sleep(max(0.0, burst_gap_ms) / 1000.0)
+            wall = perf_counter() - started
+
+        await writer.close()
+        queued = await redis_stand_in.queued_orders()
+
+    latencies = sorted(row["latency_ms"] for row in results)
+    status_counts: dict[str, int] = {}
+    for row in results:
+        status_counts[row["status"]] = status_counts.get(row["status"], 0) + 1
+    return {
+        "config": config,
+        "requests": len(results),
+        "throughput_rps": round(len(results) / busy, 1) if busy else 0.0,
+        "wall_seconds": round(wall, 3),
+        "latency_ms": {
+            "p50": round(_percentile(latencies, 50), 3),
+            "p95": round(_percentile(latencies, 95), 3),
+            "p99": round(_percentile(latencies, 99), 3),
+            "max": round(latencies[-1], 3) if latencies else 0.0,
+            "mean": round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+        },
+        "status_counts": dict(sorted(status_counts.items())),
+        "correctness": _check_correctness(results, queued),
+        "db_pool": {
+            "capacity": pool.capacity,
+            "peak_in_use": pool.peak_in_use,
+            "saturation_pct": round(pool.peak_in_use / pool.capacity * 100, 1),
+            "sessions": pool.sessions,
+            "statements": pool.statements,
+            "checkout_waits": pool.checkout_waits,
+            "checkout_wait_max_ms": round(pool.checkout_wait_max * 1000, 3),
+        },
+        "redis_calls": redis_stand_in.calls,
+        "prefilter_hits": prefilter.hits,
+        "alert_log_rows_dropped": writer.dropped,
+    }
+
+
+def compare_to_baseline(result: dict, baseline: dict, max_regression_pct: float) -> list[str]:
+    """Return regression messages (empty when within budget)."""
+    problems = []
+    if baseline.get("config") != result.get("config"):
+        problems.append("config differs from baseline; results are not comparable")
+    limit = 1.0 + max_regression_pct / 100.0
+    for key in ("p50", "p95", "p99"):
+        old = float(baseline["latency_ms"][key])
+        new = float(result["latency_ms"][key])
+        if old > 0 and new > old * limit:
+            problems.append(f"latency {key} {old:.2f}ms -> {new:.2f}ms")
+    old_rps = float(baseline.get("throughput_rps") or 0.0)
+    if old_rps > 0 and result["throughput_rps"] * limit < old_rps:
+        problems.append(f"throughput {old_rps:.1f} -> {result['throughput_rps']:.1f} req/s")
+    if result["db_pool"]["peak_in_use"] > baseline["db_pool"]["peak_in_use"]:
+        problems.append(
+            f"db pool peak {baseline['db_pool']['peak_in_use']} -> {result['db_pool']['peak_in_use']}"
+        )
+    if not result["correctness"]["ok"]:
+        problems.append(f"correctness failed: {result['correctness']}")
+    return problems
+
+
+def _print_report(result: dict) -> None:
+    latency = result["latency_ms"]
+    pool = result["db_pool"]
+    correctness = result["correctness"]
+    print(f"Webhook load benchmark: {result['requests']} requests, config={result['config']}")
+    print(
+        f"latency ms  p50={latency['p50']:.2f}  p95={latency['p95']:.2f}  "
+        f"p99={latency['p99']:.2f}  max={latency['max']:.2f}"
+    )
+    print(f"throughput  {result['throughput_rps']:.1f} req/s (wall {result['wall_seconds']:.2f}s)")
+    print(f"statuses    {result['status_counts']}")
+    print(
+        f"dedupe      {'OK' if correctness['ok'] else 'FAILED'} "
+        f"queued={correctness['queued_orders']}/{correctness['expected_queued']} "
+        f"mismatched_groups={correctness['mismatched_groups']}"
+    )
+    print(
+        f"db pool     peak={pool['peak_in_use']}/{pool['capacity']} ({pool['saturation_pct']}%) "
+        f"sessions={pool['sessions']} waits={pool['checkout_waits']} "
+        f"wait_max={pool['checkout_wait_max_ms']:.2f}ms"
+    )
+    print(f"redis calls {result['redis_calls']} (prefilter answered {result['prefilter_hits']} retries)")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Load-test the /webhook ingest path.")
+    parser.add_argument("--bursts", type=int, default=5)
+    parser.add_argument("--alerts", type=int, default=200, help="alerts per burst")
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--duplicate-ratio", type=float, default=0.15)
+    parser.add_argument("--miss-ratio", type=float, default=0.15)
+    parser.add_argument("--burst-gap-ms", type=float, default=100.0)
+    parser.add_argument("--redis-latency-ms", type=float, default=0.2)
+    parser.add_argument("--db-latency-ms", type=float, default=2.0)
+    parser.add_argument("--pool-capacity", type=int, default=API_POOL_CAPACITY, help="pool_size + max_overflow")
+    parser.add_argument("--no-open-ticker-set", action="store_true", help="force the DB allowlist fallback")
+    parser.add_argument("--queue-backend", choices=("list", "stream"), default="list")
+    parser.add_argument("--idempotency-store", choices=("buckets", "keys"), default="buckets")
+    parser.add_argument("--prefilter-size", type=int, default=10000, help="0 disables the in-process prefilter")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="write the JSON result here")
+    parser.add_argument("--compare", help="baseline JSON from an earlier --output")
+    parser.add_argument("--max-regression-pct", type=float, default=25.0)
+    args = parser.parse_args()
+
+    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(logging.ERROR))
+    result = asyncio.run(
+        run_benchmark(
+            bursts=args.bursts,
+            alerts=args.alerts,
+            concurrency=args.concurrency,
+            duplicate_ratio=args.duplicate_ratio,
+            miss_ratio=args.miss_ratio,
+            burst_gap_ms=args.burst_gap_ms,
+            redis_latency_ms=args.redis_latency_ms,
+            db_latency_ms=args.db_latency_ms,
+            pool_capacity=args.pool_capacity,
+            open_ticker_set=not args.no_open_ticker_set,
+            queue_backend=args.queue_backend,
+            idempotency_store=args.idempotency_store,
+            prefilter_size=args.prefilter_size,
+            seed=args.seed,
+        )
+    )
+    _print_report(result)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, sort_keys=True)
+        print(f"saved {args.output}")
+
+    exit_code = 0 if result["correctness"]["ok"] else 1
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        problems = compare_to_baseline(result, baseline, args.max_regression_pct)
+        for problem in problems:
+            print(f"! regression: {problem}")
+        if problems:
+            exit_code = 1
+        else:
+            print(f"within {args.max_regression_pct:.0f}% of baseline {args.compare}")
+    return exit_code
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
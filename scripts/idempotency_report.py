@@ -0,0 +1,35 @@
+"""
+Report how much Redis memory the order dedupe markers use: day buckets
+(orders:idempotency:day:<date>) versus legacy per-order keys, which drain
+on their own once ORDER_IDEMPOTENCY_STORE=buckets.
+
+Usage:
+    python -m scripts.idempotency_report [--sample 200]
+"""
+
+import argparse
+import asyncio
+
+from app.queue.order_queue import idempotency_memory_report
+
+
+async def main(sample: int):
+    report = await idempotency_memory_report(sample_size=sample)
+    print(f"Idempotency store: {report['store']}")
+    print(
+        f"day buckets: {len(report['buckets'])} keys, {report['bucket_markers']} markers, "
+        f"{report['bucket_bytes']} bytes ({report['bucket_bytes_per_marker']} B/marker)"
+    )
+    for bucket in report["buckets"]:
+        print(f"* {bucket['key']} markers={bucket['markers']} bytes={bucket['bytes']} ttl={bucket['ttl_seconds']}s")
+    print(
+        f"legacy keys: {report['legacy_keys']} keys, ~{report['legacy_bytes_estimate']} bytes "
+        f"({report['legacy_bytes_per_marker']} B/marker, sampled)"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report Redis memory used by order dedupe markers.")
+    parser.add_argument("--sample", type=int, default=200, help="legacy keys sized with MEMORY USAGE")
+    args = parser.parse_args()
+    asyncio.run(main(args.sample))
@@ -0,0 +1,27 @@
+"""
+Rebuild Redis queue stats counters from the raw order queues.
+
+Usage:
+    python -m scripts.repair_queue_stats
+"""
+
+import asyncio
+
+from app.queue.order_queue import get_waiting_ticker_stats, rebuild_queue_stats
+
+
+async def main():
+    before = await get_waiting_ticker_stats(include_processing=True)
+    result = await rebuild_queue_stats()
+    after = await get_waiting_ticker_stats(include_processing=True)
+    print("Queue stats rebuilt")
+    print(f"before={before}")
+    print(f"after={after}")
+    for field, count in sorted(result["order_counts"].items()):
+        print(f"* {field} orders={count} tickers={result['ticker_counts'].get(field, 0)}")
+    if result["invalid_payload_count"]:
+        print(f"! invalid_payloads={result['invalid_payload_count']}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
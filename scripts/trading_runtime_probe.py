@@ -28,8 +28,8 @@ from app.broker.market_hours import (
 from app.cash_monitor import estimate_pending_buy_cash_coverage
 from app.config import settings
 from app.database.connection import get_session
-from app.models.alert_log import AlertLog
-from app.models.position import Position, PositionStatus
+from app.models.alert_log import AlertLog, alert_log_received_since
+from app.models.position import Position, POSITION_IS_OPEN
 from app.models.trade import Trade, TradeStatus
 from app.notifications import telegram_bot as telegram_bot_module
 from app.queue.order_queue import get_queue_stats, get_redis
@@ -87,7 +87,7 @@ async def gather_probe() -> dict:
         async with get_session() as session:
             db_rows = (
                 await session.execute(
-                    select(Position.ticker).where(Position.status == PositionStatus.OPEN)
+                    select(Position.ticker).where(POSITION_IS_OPEN)
                 )
             ).scalars().all()
             db_symbols = sorted({str(t or "").strip().upper() for t in db_rows if str(t or "").strip()})
@@ -118,7 +118,7 @@ async def gather_probe() -> dict:
                     await session.execute(
                         select(func.count(AlertLog.id)).where(
                             AlertLog.skipped.is_(True),
-                            AlertLog.received_at >= failed_since,
+                            alert_log_received_since(failed_since),
                         )
                     )
                 ).scalar()
@@ -149,8 +149,24 @@ def get_queue_lengths() -> tuple[dict[str, int], list[str]]:
         "processing": "orders:processing",
         "pending": "orders:pending",
     }
+    # Pending orders live in per-market sorted sets plus the legacy list.
+    pending_keys = ["orders:pending"] + [
+        f"orders:pending:{market}:{side}"
+        for market in ("US", "KRX", "HKEX", "SSE", "SZSE", "TSE")
+        for side in ("SELL", "BUY")
+    ]
+    pending_script = (
+        "local n = 0 "
+        "if redis.call('TYPE', KEYS[1]).ok == 'list' then n = redis.call('LLEN', KEYS[1]) end "
+        "for i = 2, #KEYS do n = n + redis.call('ZCARD', KEYS[i]) end "
+        "return n"
+    )
     for key, redis_key in queue_map.items():
-        proc = run_cmd([DOCKER_BIN, "exec", "ib-trading-bot-redis-1", "redis-cli", "LLEN", redis_key], timeout=15)
+        if key == "pending":
+            redis_args = ["EVAL", pending_script, str(len(pending_keys)), *pending_keys]
+        else:
+            redis_args = ["LLEN", redis_key]
+        proc = run_cmd([DOCKER_BIN, "exec", "ib-trading-bot-redis-1", "redis-cli", *redis_args], timeout=15)
         if proc.returncode != 0:
             issues.append(f"Redis 큐 조회 실패: {redis_key} ({proc.stderr.strip() or proc.stdout.strip()})")
             lengths[key] = -1
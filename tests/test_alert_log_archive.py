@@ -0,0 +1,176 @@
+import gzip
+import tempfile
+import unittest
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from unittest.mock import patch
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app import alert_log_archive
+from app.config import settings
+from app.gateway import alert_log_writer as writer_module
+from app.models.alert_log import AlertLog, alert_log_month
+from app.models.base import Base
+from app.models.position import Position, PositionStatus
+
+NOW = datetime(2026, 10, 17, 12, 0, tzinfo=timezone.utc)
+
+
+def _alert(received_at, ticker="AAPL", action="SELL", **kwargs):
+    return AlertLog(ticker=ticker, action=action, received_at=received_at, **kwargs)
+
+
+class AlertLogArchiveTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.engine = create_async_engine("sqlite+aiosqlite://")
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        self.sessionmaker = async_sessionmaker(self.engine, expire_on_commit=False)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.archive_dir = Path(self.tmp.name)
+        for patcher in (
+            patch.object(alert_log_archive, "get_session", self._session),
+            patch.object(settings, "alert_log_archive_dir", self.tmp.name),
+            patch.object(settings, "alert_log_retention_months", 3),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def asyncTearDown(self):
+        await self.engine.dispose()
+
+    @asynccontextmanager
+    async def _session(self):
+        async with self.sessionmaker() as session:
+            yield session
+            await session.commit()
+
+    async def _add(self, *rows):
+        async with self._session() as session:
+            session.add_all(rows)
+
+    async def _months_in_db(self) -> dict:
+        async with self._session() as session:
+            rows = await session.execute(
+                select(AlertLog.received_month, func.count(AlertLog.id)).group_by(AlertLog.received_month)
+            )
+            return dict(rows.all())
+
+    def test_month_helpers(self):
+        # 23:30 ET on Jan 31 is already February in UTC.
+        self.assertEqual(alert_log_month(datetime(2026, 2, 1, 4, 30, tzinfo=timezone.utc)), date(2026, 2, 1))
+        self.assertEqual(alert_log_month(datetime(2026, 1, 31, 23, 59)), date(2026, 1, 1))
+        self.assertEqual(alert_log_archive.add_months(date(2026, 11, 1), 3), date(2027, 2, 1))
+        self.assertEqual(alert_log_archive.add_months(date(2026, 1, 1), -1), date(2025, 12, 1))
+
+    async def test_orm_inserts_fill_the_partition_key(self):
+        await self._add(_alert(datetime(2026, 3, 31, 23, 0, tzinfo=timezone.utc), idempotency_key="k"))
+
+        self.assertEqual(await self._months_in_db(), {date(2026, 3, 1): 1})
+
+    async def test_batch_writer_targets_key_and_month(self):
+        rows = writer_module._merge_rows(
+            [
+                {"idempotency_key": "k", "received_at": datetime(2026, 3, 31, 23, 0, tzinfo=timezone.utc)},
+                {"idempotency_key": "k", "received_at": datetime(2026, 4, 1, 0, 1, tzinfo=timezone.utc)},
+            ]
+        )
+
+        self.assertEqual([row["received_month"] for row in rows], [date(2026, 3, 1), date(2026, 4, 1)])
+
+    async def test_retention_archives_expired_months_and_reader_finds_them(self):
+        await self._add(
+            _alert(datetime(2026, 5, 3, tzinfo=timezone.utc), raw_payload='{"a": 1}', idempotency_key="may"),
+            _alert(datetime(2026, 5, 20, tzinfo=timezone.utc), ticker="MSFT", action="BUY"),
+            _alert(datetime(2026, 6, 9, tzinfo=timezone.utc), skipped=True, skip_reason="no_position"),
+            _alert(datetime(2026, 9, 1, tzinfo=timezone.utc)),
+            _alert(NOW - timedelta(hours=1)),
+        )
+
+        report = await alert_log_archive.run_alert_log_retention(now=NOW)
+
+        self.assertEqual(report["cutoff"], "2026-07-01")
+        self.assertEqual([(item["month"], item["rows"]) for item in report["archived"]], [
+            ("2026-05-01", 2),
+            ("2026-06-01", 1),
+        ])
+        self.assertEqual(await self._months_in_db(), {date(2026, 9, 1): 1, date(2026, 10, 1): 1})
+        self.assertEqual(alert_log_archive.archived_months(), [date(2026, 5, 1), date(2026, 6, 1)])
+        with gzip.open(self.archive_dir / "alert_logs_2026-05.jsonl.gz", "rt") as fh:
+            self.assertEqual(len(fh.readlines()), 2)
+
+        records = list(
+            alert_log_archive.iter_archived_alert_logs(
+                datetime(2026, 5, 1, tzinfo=timezone.utc),
+                datetime(2026, 7, 1, tzinfo=timezone.utc),
+                action="SELL",
+            )
+        )
+        self.assertEqual([record["received_month"] for record in records], ["2026-05-01", "2026-06-01"])
+        self.assertEqual(records[0]["raw_payload"], '{"a": 1}')
+        self.assertEqual(records[1]["skip_reason"], "no_position")
+        self.assertEqual(
+            [r["ticker"] for r in alert_log_archive.iter_archived_alert_logs(idempotency_key="may")],
+            ["AAPL"],
+        )
+
+        # Nothing left to do on the next run.
+        self.assertEqual((await alert_log_archive.run_alert_log_retention(now=NOW))["archived"], [])
+
+    async def test_archiving_a_month_twice_merges_into_the_existing_file(self):
+        await self._add(_alert(datetime(2026, 5, 3, tzinfo=timezone.utc), idempotency_key="first"))
+        await alert_log_archive.run_alert_log_retention(now=NOW)
+
+        # A late row for the same month, then a run that crashes before its
+        # delete commits: the retry must keep the first archive and not
+        # duplicate the row it already exported.
+        await self._add(_alert(datetime(2026, 5, 30, tzinfo=timezone.utc), idempotency_key="late"))
+        async with self.sessionmaker() as session:
+            await alert_log_archive.archive_alert_log_month(session, date(2026, 5, 1))
+            await session.rollback()
+        report = await alert_log_archive.run_alert_log_retention(now=NOW)
+
+        self.assertEqual([(item["month"], item["rows"]) for item in report["archived"]], [("2026-05-01", 0)])
+        self.assertEqual(await self._months_in_db(), {})
+        self.assertEqual(alert_log_archive.archived_months(), [date(2026, 5, 1)])
+        self.assertEqual(
+            [record["idempotency_key"] for record in alert_log_archive.iter_archived_alert_logs()],
+            ["first", "late"],
+        )
+
+    async def test_open_positions_hold_back_their_entry_months(self):
+        await self._add(
+            _alert(datetime(2026, 4, 2, tzinfo=timezone.utc)),
+            _alert(datetime(2026, 5, 2, tzinfo=timezone.utc)),
+            Position(
+                ticker="AAPL",
+                qty=1.0,
+                entry_price=10.0,
+                entry_amount_usd=10.0,
+                entry_time=datetime(2026, 5, 10, tzinfo=timezone.utc),
+                status=PositionStatus.OPEN,
+            ),
+        )
+
+        report = await alert_log_archive.run_alert_log_retention(now=NOW)
+
+        self.assertEqual(report["cutoff"], "2026-05-01")
+        self.assertEqual([item["month"] for item in report["archived"]], ["2026-04-01"])
+        self.assertEqual(await self._months_in_db(), {date(2026, 5, 1): 1})
+
+    async def test_retention_off_keeps_everything(self):
+        await self._add(_alert(datetime(2025, 1, 2, tzinfo=timezone.utc)))
+
+        with patch.object(settings, "alert_log_retention_months", 0):
+            report = await alert_log_archive.run_alert_log_retention(now=NOW)
+
+        self.assertEqual((report["cutoff"], report["archived"]), (None, []))
+        self.assertEqual(await self._months_in_db(), {date(2025, 1, 1): 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
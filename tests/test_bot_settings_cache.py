@@ -0,0 +1,80 @@
+import asyncio
+import unittest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+from app.database import connection
+
+
+class BotSettingsCacheTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self._orig_task = connection._bot_settings_listener_task
+        self._orig_ready = connection._bot_settings_listener_ready
+        # Pretend the pub/sub listener is already running.
+        self._idle = asyncio.get_running_loop().create_future()
+        connection._bot_settings_listener_task = self._idle
+        connection._bot_settings_listener_ready = True
+        connection.invalidate_bot_settings_cache()
+
+    async def asyncTearDown(self):
+        self._idle.cancel()
+        connection._bot_settings_listener_task = self._orig_task
+        connection._bot_settings_listener_ready = self._orig_ready
+        connection.invalidate_bot_settings_cache()
+
+    async def test_repeated_reads_hit_cache_until_invalidated(self):
+        loader = AsyncMock(side_effect=[SimpleNamespace(is_killed=False), SimpleNamespace(is_killed=True)])
+        with patch.object(connection, "_load_bot_settings", loader):
+            first = await connection.get_bot_settings()
+            second = await connection.get_bot_settings()
+            connection.invalidate_bot_settings_cache()
+            third = await connection.get_bot_settings()
+
+        self.assertIs(first, second)
+        self.assertFalse(second.is_killed)
+        self.assertTrue(third.is_killed)
+        self.assertEqual(loader.await_count, 2)
+
+    async def test_cache_is_bypassed_while_listener_is_down(self):
+        connection._bot_settings_listener_ready = False
+        loader = AsyncMock(return_value=SimpleNamespace(is_killed=False))
+        with patch.object(connection, "_load_bot_settings", loader):
+            await connection.get_bot_settings()
+            await connection.get_bot_settings()
+
+        self.assertEqual(loader.await_count, 2)
+
+    async def test_invalidation_during_load_is_not_overwritten(self):
+        async def load_with_concurrent_update():
+            connection.invalidate_bot_settings_cache()
+            return SimpleNamespace(is_killed=False)
+
+        with patch.object(connection, "_load_bot_settings", side_effect=load_with_concurrent_update):
+            await connection.get_bot_settings()
+
+        self.assertIsNone(connection._bot_settings_cache)
+
+    async def test_update_publishes_invalidation(self):
+        row = SimpleNamespace(is_killed=False)
+        session = AsyncMock()
+        session.execute.return_value = SimpleNamespace(scalar_one=lambda: row)
+        redis_client = AsyncMock()
+
+        class _Session:
+            async def __aenter__(self):
+                return session
+
+            async def __aexit__(self, *exc):
+                return False
+
+        with patch.object(connection, "get_session", lambda: _Session()), patch(
+            "app.queue.order_queue.get_redis", AsyncMock(return_value=redis_client)
+        ):
+            await connection.update_bot_setting("is_killed", True)
+
+        self.assertTrue(row.is_killed)
+        redis_client.publish.assert_awaited_once_with(connection.BOT_SETTINGS_CHANNEL, "is_killed")
+
+
+if __name__ == "__main__":
+    unittest.main()
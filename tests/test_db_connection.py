@@ -0,0 +1,119 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, patch
+
+from sqlalchemy import text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.config import settings
+from app.database import connection
+
+
+class EngineProfileTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.stats = connection.PoolCheckoutStats()
+        for patcher in (
+            patch.object(connection, "engine", None),
+            patch.object(connection, "async_session", None),
+            patch.object(connection, "_engine_profile_name", ""),
+            patch.object(connection, "_process_role", connection.DEFAULT_PROCESS_ROLE),
+            patch.object(connection, "_last_health_check", {}),
+            patch.object(connection, "pool_checkout_stats", self.stats),
+            patch.object(settings, "db_engine_profile", ""),
+            patch.object(settings, "database_url", "sqlite+aiosqlite:///:memory:"),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def asyncTearDown(self):
+        if connection.engine is not None:
+            await connection.engine.dispose()
+
+    def _sqlite_engine(self, **overrides):
+        kwargs = connection._engine_kwargs(connection.ENGINE_PROFILES["script"], "sqlite+aiosqlite://")
+        kwargs.update(overrides)
+        return create_async_engine("sqlite+aiosqlite://", **kwargs)
+
+    def test_asyncpg_engines_get_prepared_statement_cache_without_pre_ping(self):
+        profile = connection.ENGINE_PROFILES["worker"]
+        kwargs = connection._engine_kwargs(profile, "postgresql+asyncpg://u:p@db/trading")
+
+        self.assertFalse(kwargs["pool_pre_ping"])
+        self.assertIs(kwargs["poolclass"], connection.InstrumentedQueuePool)
+        self.assertEqual(kwargs["connect_args"], {"prepared_statement_cache_size": profile.prepared_statement_cache_size})
+        self.assertNotIn("connect_args", connection._engine_kwargs(profile, "sqlite+aiosqlite://"))
+
+    def test_api_profile_tolerates_bursts_and_worker_stays_small(self):
+        api = connection.ENGINE_PROFILES["api"]
+        worker = connection.ENGINE_PROFILES["worker"]
+
+        self.assertGreater(api.pool_size + api.max_overflow, worker.pool_size + worker.max_overflow)
+        self.assertLess(api.pool_timeout, worker.pool_timeout)
+        self.assertGreater(worker.prepared_statement_cache_size, api.prepared_statement_cache_size)
+
+    async def test_process_role_selects_profile_and_rebuilds_engine(self):
+        connection.get_engine()
+        self.assertEqual(connection.get_pool_stats()["profile"], "script")
+
+        await connection.set_process_role("worker")
+        engine = connection.get_engine()
+
+        self.assertEqual(connection._engine_profile_name, "worker")
+        self.assertEqual(engine.pool.size(), connection.ENGINE_PROFILES["worker"].pool_size)
+        with patch.object(settings, "db_engine_profile", "telegram"):
+            self.assertEqual(connection._profile_name(), "telegram")
+
+    async def test_checkout_wait_and_timeouts_are_recorded(self):
+        engine = self._sqlite_engine(pool_size=1, max_overflow=0, pool_timeout=0.05)
+        try:
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+                with self.assertRaises(PoolTimeoutError):
+                    async with engine.connect():
+                        pass
+        finally:
+            await engine.dispose()
+
+        snapshot = self.stats.snapshot()
+        self.assertEqual(snapshot["checkouts"], 1)
+        self.assertEqual(snapshot["timeouts"], 1)
+
+    async def test_failed_health_check_recycles_pool(self):
+        self.assertTrue(await connection.check_db_health())
+        self.assertTrue(connection._last_health_check["ok"])
+
+        await connection.engine.dispose()
+        broken = _UnreachableEngine()
+        with patch.object(connection, "engine", broken):
+            healthy = await connection.check_db_health()
+
+        self.assertFalse(healthy)
+        broken.dispose.assert_awaited_once()
+        self.assertEqual(connection.get_pool_stats()["health_check"]["error"], "connection refused")
+
+    async def test_health_check_task_only_runs_for_long_lived_roles(self):
+        connection._start_health_check()
+        self.assertIsNone(connection._health_check_task)
+
+        await connection.set_process_role("api")
+        connection._start_health_check()
+        task = connection._health_check_task
+        self.assertIsNotNone(task)
+
+        await connection.close_db()
+        await asyncio.sleep(0)
+        self.assertTrue(task.cancelled())
+        self.assertIsNone(connection._health_check_task)
+
+
+class _UnreachableEngine:
+    def __init__(self):
+        self.dispose = AsyncMock()
+
+    def connect(self):
+        raise OSError("connection refused")
+
+
+if __name__ == "__main__":
+    unittest.main()
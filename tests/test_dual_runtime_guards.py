@@ -1,4 +1,6 @@
 import unittest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
 
 from app.config import settings
 from app.risk import risk_manager
@@ -46,5 +48,114 @@ class CashCheckRoutingTests(unittest.TestCase):
         self.assertEqual(risk_manager._cash_check_broker_chain(), ["kis", "ib"])
 
 
+def _risk_settings(**overrides):
+    values = dict(
+        is_killed=False,
+        is_paused=False,
+        buy_amount_usd=100.0,
+        min_cash_reserve=0.0,
+        max_total_investment=1000.0,
+        max_open_positions=5,
+        max_per_ticker=2,
+        max_daily_buys=3,
+    )
+    values.update(overrides)
+    return SimpleNamespace(**values)
+
+
+class _SnapshotSession:
+    def __init__(self, rows):
+        self.rows = rows
+        self.statements = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, statement):
+        self.statements.append(statement)
+        return SimpleNamespace(all=lambda: list(self.rows))
+
+
+class BuyRiskSnapshotTests(unittest.IsolatedAsyncioTestCase):
+    def _patch(self, rows, bot_settings=None, cash=None):
+        session = _SnapshotSession(rows)
+        cash = cash or AsyncMock(return_value=risk_manager.RiskCheckResult(True))
+        patches = [
+            patch.object(risk_manager, "get_session", lambda: session),
+            patch.object(
+                risk_manager,
+                "get_bot_settings",
+                AsyncMock(return_value=bot_settings or _risk_settings()),
+            ),
+            patch.object(risk_manager, "check_cash_balance", cash),
+        ]
+        for item in patches:
+            item.start()
+            self.addCleanup(item.stop)
+        return session, cash
+
+    async def test_snapshot_aggregates_rows_from_one_query(self):
+        session, _ = self._patch(
+            [
+                ("position", "AAPL", 2.0, 300.0),
+                ("position", "MSFT", 1.0, 150.0),
+                ("position", "KRX:069500", 1.0, 500000.0),
+                ("buys", "AAPL", 1.0, 2.0),
+            ]
+        )
+
+        snapshot = await risk_manager.load_risk_snapshot("AAPL")
+
+        self.assertEqual(len(session.statements), 1)
+        self.assertEqual(snapshot.open_positions, 4)
+        self.assertEqual(snapshot.ticker_open_positions, 2)
+        self.assertAlmostEqual(snapshot.total_invested_usd, 450.0)
+        self.assertEqual(snapshot.today_ticker_buys, 1)
+        self.assertEqual(snapshot.today_buys, 2)
+
+    async def test_all_checks_pass_with_single_query_and_timings(self):
+        session, cash = self._patch([("position", "MSFT", 1.0, 100.0), ("buys", "AAPL", 0.0, 1.0)])
+
+        result = await risk_manager.check_all_buy_risks("AAPL")
+
+        self.assertTrue(result)
+        self.assertEqual(len(session.statements), 1)
+        cash.assert_awaited_once()
+        for name in ("bot_settings", "cash_balance", "risk_snapshot", "daily_buys", "total"):
+            self.assertIn(name, result.timings)
+
+    async def test_cash_failure_is_reported_before_db_rules(self):
+        cash = AsyncMock(return_value=risk_manager.RiskCheckResult(False, "no cash"))
+        self._patch([("buys", "AAPL", 5.0, 5.0)], cash=cash)
+
+        result = await risk_manager.check_all_buy_risks("AAPL")
+
+        self.assertFalse(result)
+        self.assertEqual(result.reason, "no cash")
+
+    async def test_rules_keep_original_order(self):
+        self._patch(
+            [("position", "AAPL", 2.0, 200.0), ("buys", "AAPL", 0.0, 9.0)],
+        )
+
+        result = await risk_manager.check_all_buy_risks("AAPL")
+
+        self.assertFalse(result)
+        self.assertIn("종목당 최대 매수 횟수", result.reason)
+        self.assertNotIn("daily_buys", result.timings)
+
+    async def test_kill_switch_skips_broker_and_db(self):
+        session, cash = self._patch([], bot_settings=_risk_settings(is_killed=True))
+
+        result = await risk_manager.check_all_buy_risks("AAPL")
+
+        self.assertFalse(result)
+        cash.assert_not_awaited()
+        self.assertEqual(session.statements, [])
+
+
 if __name__ == "__main__":
     unittest.main()
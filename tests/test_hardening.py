@@ -2,6 +2,7 @@ import json
 import time
 import unittest
 from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
 
 from app.config import settings
 from app.gateway.webhook import _build_webhook_idempotency, _clean_tradingview_optional_field
@@ -14,6 +15,8 @@ from app.queue.order_queue import (
     _idempotency_redis_key,
     _queue_name_for_action,
     _sanitize_order_for_queue,
+    dequeue_order,
+    dequeue_order_blocking,
     enqueue_order_once,
     flush_pending_to_active,
 )
@@ -167,10 +170,45 @@ class QueueTests(unittest.TestCase):
         self.assertNotIn("_queue_source", cleaned)
         self.assertNotIn("_raw_queue_payload", cleaned)
 
+    def test_sanitize_order_removes_stream_metadata(self):
+        cleaned = _sanitize_order_for_queue(
+            {"action": "BUY", "ticker": "AAPL", "_stream_id": "1-0", "_delivery_count": 2}
+        )
+        self.assertEqual(cleaned, {"action": "BUY", "ticker": "AAPL"})
+
+    def test_retry_count_uses_stream_delivery_count(self):
+        self.assertEqual(order_queue.order_retry_count({"retry_count": 2}), 2)
+        self.assertEqual(order_queue.order_retry_count({"_stream_id": "1-0", "_delivery_count": 3}), 2)
+        self.assertEqual(order_queue.order_retry_count({"_stream_id": "1-0"}), 0)
+
+    def test_stream_consumer_name_is_per_process_unless_configured(self):
+        with patch.object(settings, "order_stream_consumer", ""), patch.object(
+            order_queue.socket, "gethostname", return_value="host-a"
+        ), patch.object(order_queue.os, "getpid", return_value=4242):
+            self.assertEqual(order_queue._stream_consumer_name(), "host-a-4242")
+        with patch.object(settings, "order_stream_consumer", "worker-1"):
+            self.assertEqual(order_queue._stream_consumer_name(), "worker-1")
+
     def test_queue_name_for_action_routes_buy_and_sell(self):
         self.assertEqual(_queue_name_for_action("buy"), BUY_QUEUE)
         self.assertEqual(_queue_name_for_action("SELL"), "orders:sell")
 
+    def test_pending_orders_route_to_one_market_sorted_set(self):
+        self.assertEqual(order_queue._pending_key_for_order({"action": "SELL", "ticker": "KRX:005930"}), "orders:pending:KRX:SELL")
+        self.assertEqual(order_queue._pending_key_for_order({"action": "BUY", "ticker": "HKEX:700"}), "orders:pending:HKEX:BUY")
+        self.assertEqual(order_queue._pending_key_for_order({"action": "BUY", "ticker": "AAPL"}), "orders:pending:US:BUY")
+
+    def test_pending_markets_cover_every_asia_session(self):
+        from app.broker.market_hours import ASIA_MARKET_SESSIONS
+
+        self.assertTrue(set(ASIA_MARKET_SESSIONS).issubset(order_queue.PENDING_MARKETS))
+
+    def test_pending_expiry_cutoff_matches_ttl(self):
+        now = datetime(2026, 5, 26, tzinfo=timezone.utc)
+        cutoff = order_queue._pending_expiry_cutoff(now)
+        expected = now.timestamp() - settings.pending_order_ttl_hours * 3600.0
+        self.assertEqual(cutoff, f"({expected}")
+
     def test_idempotency_key_is_namespaced(self):
         self.assertEqual(_idempotency_redis_key("abc"), "orders:idempotency:abc")
 
@@ -178,6 +216,12 @@ class QueueTests(unittest.TestCase):
 class QueueIdempotencyTests(unittest.IsolatedAsyncioTestCase):
     async def asyncSetUp(self):
         self._orig_redis = order_queue._redis_client
+        for patcher in (
+            patch.object(settings, "order_idempotency_store", "keys"),
+            patch.object(order_queue, "_idempotency_prefilter", order_queue.IdempotencyPrefilter(100)),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
 
     async def asyncTearDown(self):
         order_queue._redis_client = self._orig_redis
@@ -198,10 +242,9 @@ class QueueIdempotencyTests(unittest.IsolatedAsyncioTestCase):
 
         self.assertTrue(queued)
         self.assertEqual(len(fake.eval_calls), 1)
-        _, numkeys, dedupe_key, queue_name, order_json, _, ttl = fake.eval_calls[0]
-        self.assertEqual(numkeys, 2)
-        self.assertEqual(dedupe_key, "orders:idempotency:idem-1")
-        self.assertEqual(queue_name, BUY_QUEUE)
+        _, numkeys, *rest = fake.eval_calls[0]
+        keys, (order_json, _, ttl) = rest[:numkeys], rest[numkeys:]
+        self.assertEqual(keys, ["orders:idempotency:idem-1", BUY_QUEUE, *order_queue._stats_keys()])
         self.assertEqual(ttl, 60)
         self.assertNotIn("_raw_queue_payload", order_json)
 
@@ -224,22 +267,422 @@ class QueueIdempotencyTests(unittest.IsolatedAsyncioTestCase):
             "idempotency_key": "stale-1",
             "received_at": "2000-01-01T00:00:00+00:00",
         }
-        fresh = {
-            "action": "BUY",
-            "ticker": "QQQ",
-            "idempotency_key": "fresh-1",
-            "received_at": "2999-01-01T00:00:00+00:00",
-        }
-        fake = _PendingFakeRedis([json.dumps(fresh), json.dumps(stale)])
+        fake = _PendingFakeRedis([], sweep_result=[0, 1, 2, [json.dumps(stale), "not-json"]])
         order_queue._redis_client = fake
 
         result = await flush_pending_to_active(market="US", return_expired=True)
 
         self.assertEqual(result["moved"], 1)
+        self.assertEqual(result["kept"], 2)
         self.assertEqual(result["expired"], 1)
         self.assertEqual(result["expired_orders"][0]["idempotency_key"], "stale-1")
-        self.assertEqual(len(fake.queues[BUY_QUEUE]), 1)
-        self.assertEqual(len(fake.queues[PENDING_QUEUE]), 0)
+        args = fake.eval_calls[0]
+        numkeys = args[1]
+        wake_flags = args[2 + numkeys + 2:]
+        self.assertEqual(args[2:6], ("orders:sell", BUY_QUEUE, "orders:signal:sell", "orders:signal:buy"))
+        self.assertEqual(dict(zip(order_queue.PENDING_MARKETS, wake_flags))["US"], "1")
+        self.assertEqual(wake_flags.count("1"), 1)
+
+    async def test_legacy_pending_list_is_migrated_into_market_sorted_sets(self):
+        order = {"action": "SELL", "ticker": "KRX:005930", "received_at": "2026-01-02T00:00:00+00:00"}
+        fake = _PendingFakeRedis([json.dumps(order)], sweep_result=[0, 0, 1, []])
+        order_queue._redis_client = fake
+
+        await order_queue.purge_expired_pending_orders()
+
+        self.assertEqual(fake.queues[PENDING_QUEUE], [])
+        _, numkeys, *rest = fake.eval_calls[0]
+        keys, (member, score) = rest[:numkeys], rest[numkeys:]
+        self.assertEqual(keys, ["orders:pending:KRX:SELL", *order_queue._stats_keys()])
+        self.assertEqual(json.loads(member)["ticker"], "KRX:005930")
+        self.assertEqual(score, datetime(2026, 1, 2, tzinfo=timezone.utc).timestamp())
+
+    async def test_enqueue_order_once_wakes_blocked_worker(self):
+        fake = _FakeRedis(eval_result=1)
+        order_queue._redis_client = fake
+
+        await enqueue_order_once(
+            {"action": "SELL", "ticker": "FCA", "idempotency_key": "idem-2"},
+            ttl_seconds=60,
+        )
+
+        self.assertEqual(fake.lpush_calls, [(order_queue.SELL_SIGNAL_KEY, "1")])
+
+    async def test_list_retry_enqueues_copy_with_bumped_retry_count(self):
+        fake = _PendingFakeRedis([])
+        order_queue._redis_client = fake
+
+        needs_ack = await order_queue.requeue_order_for_retry(
+            {"action": "BUY", "ticker": "FCA", "retry_count": 1, "_raw_queue_payload": "{}"}
+        )
+
+        self.assertTrue(needs_ack)
+        _, numkeys, *rest = fake.eval_calls[0]
+        keys, (order_json, mode) = rest[:numkeys], rest[numkeys:]
+        self.assertEqual(keys, [BUY_QUEUE, "orders:signal:buy", *order_queue._stats_keys()])
+        self.assertEqual(mode, "list")
+        self.assertEqual(json.loads(order_json), {"v": 1, "action": "BUY", "ticker": "FCA", "retry_count": 2})
+
+    async def test_waiting_ticker_stats_read_counters_by_tier(self):
+        fake = _StatsFakeRedis(
+            {"waiting:BUY": "3", "waiting:SELL": "1", "all:BUY": "4", "all:SELL": "2"},
+            {"orders:stats:tickers:waiting:BUY": 2, "orders:stats:tickers:all:SELL": 2},
+        )
+        order_queue._redis_client = fake
+
+        waiting = await order_queue.get_waiting_ticker_stats()
+        everything = await order_queue.get_waiting_ticker_stats(include_processing=True)
+
+        self.assertEqual((waiting["buy_order_count"], waiting["buy_ticker_count"]), (3, 2))
+        self.assertEqual((waiting["sell_order_count"], waiting["sell_ticker_count"]), (1, 0))
+        self.assertEqual((everything["sell_order_count"], everything["sell_ticker_count"]), (2, 2))
+
+    def test_stats_lua_helper_is_part_of_every_mutating_script(self):
+        for script in (
+            order_queue._ENQUEUE_ONCE_SCRIPT,
+            order_queue._STREAM_ENQUEUE_ONCE_SCRIPT,
+            order_queue._BUCKET_ENQUEUE_ONCE_SCRIPT,
+            order_queue._PUSH_ACTIVE_SCRIPT,
+            order_queue._PENDING_ADD_SCRIPT,
+            order_queue._DEQUEUE_SCRIPT,
+            order_queue._STREAM_DEQUEUE_SCRIPT,
+            order_queue._ACK_SCRIPT,
+            order_queue._STREAM_ACK_SCRIPT,
+            order_queue._REQUEUE_PROCESSING_SCRIPT,
+            order_queue._REQUEUE_INFLIGHT_SCRIPT,
+            order_queue._PENDING_SWEEP_SCRIPT,
+        ):
+            self.assertTrue(script.startswith(order_queue._ORDER_STATS_LUA))
+            self.assertIn("order_stats(", script[len(order_queue._ORDER_STATS_LUA):])
+        # Stats hashes are script KEYS, never names built inside the script.
+        self.assertNotIn("orders:stats", order_queue._ORDER_STATS_LUA)
+        self.assertEqual(
+            order_queue._stats_keys(),
+            [
+                "orders:stats",
+                "orders:stats:tickers:waiting:BUY",
+                "orders:stats:tickers:waiting:SELL",
+                "orders:stats:tickers:all:BUY",
+                "orders:stats:tickers:all:SELL",
+            ],
+        )
+
+    async def test_dequeue_order_attaches_source_queue_from_script(self):
+        payload = json.dumps({"action": "SELL", "ticker": "FCA"})
+        fake = _DequeueFakeRedis([["orders:sell", payload]])
+        order_queue._redis_client = fake
+
+        order = await dequeue_order()
+
+        self.assertEqual(order["_queue_source"], "orders:sell")
+        self.assertEqual(order["_raw_queue_payload"], payload)
+        self.assertEqual(fake.blpop_calls, [])
+
+    async def test_blocking_dequeue_waits_for_signal_then_takes_order(self):
+        payload = json.dumps({"action": "BUY", "ticker": "QQQ"})
+        fake = _DequeueFakeRedis([None, ["orders:buy", payload]], blpop_result=("orders:signal:buy", "1"))
+        order_queue._redis_client = fake
+
+        order = await dequeue_order_blocking(timeout_seconds=1)
+
+        self.assertEqual(order["ticker"], "QQQ")
+        self.assertEqual(fake.blpop_calls[0][0], [order_queue.SELL_SIGNAL_KEY, order_queue.BUY_SIGNAL_KEY])
+
+    async def test_sell_only_lane_blocks_on_sell_signal_only(self):
+        fake = _DequeueFakeRedis([None], blpop_result=None)
+        order_queue._redis_client = fake
+
+        await dequeue_order_blocking(timeout_seconds=1, sell_only=True)
+
+        self.assertEqual(fake.eval_args[0][-1], "1")
+        self.assertEqual(fake.blpop_calls[0][0], [order_queue.SELL_SIGNAL_KEY])
+
+    async def test_blocking_dequeue_returns_none_on_timeout_without_extra_move(self):
+        fake = _DequeueFakeRedis([None], blpop_result=None)
+        order_queue._redis_client = fake
+
+        order = await dequeue_order_blocking(timeout_seconds=1)
+
+        self.assertIsNone(order)
+        self.assertEqual(fake.eval_count, 1)
+
+
+class WorkerLaneTests(unittest.IsolatedAsyncioTestCase):
+    async def test_token_bucket_spaces_acquisitions_after_burst(self):
+        from app.queue.order_worker import _TokenBucket
+
+        bucket = _TokenBucket(rate_per_second=20, capacity=2)
+        started = time.monotonic()
+        for _ in range(4):
+            await bucket.acquire()
+        elapsed = time.monotonic() - started
+
+        self.assertGreaterEqual(elapsed, 0.09)
+        self.assertLess(elapsed, 1.0)
+
+    async def test_ticker_lock_serializes_same_symbol_in_arrival_order(self):
+        import asyncio
+        from app.queue.order_worker import _TickerLocks
+
+        locks = _TickerLocks()
+        events = []
+
+        async def run(name, ticker, delay):
+            async with locks.hold(ticker):
+                events.append(f"start:{name}")
+                await asyncio.sleep(delay)
+                events.append(f"end:{name}")
+
+        await asyncio.gather(run("buy", "aapl", 0.05), run("sell", "AAPL", 0), run("other", "MSFT", 0))
+
+        self.assertLess(events.index("end:buy"), events.index("start:sell"))
+        self.assertLess(events.index("start:other"), events.index("end:buy"))
+        self.assertEqual(locks._locks, {})
+
+    async def test_buys_on_different_tickers_overlap_within_portfolio_limits(self):
+        import asyncio
+        from types import SimpleNamespace
+        from unittest.mock import AsyncMock
+        from app.queue import order_worker
+        from app.risk import portfolio_ledger, risk_manager
+
+        try:
+            import fakeredis.aioredis
+        except ImportError:
+            self.skipTest("fakeredis not installed (requirements-dev.txt)")
+        redis_client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+        committed = []
+        state = {"in_flight": 0, "peak": 0}
+
+        async def snapshot(ticker="", generation=None):
+            return risk_manager.RiskSnapshot(
+                symbol=ticker,
+                open_positions=len(committed),
+                total_invested_usd=100.0 * len(committed),
+            )
+
+        async def execute(ticker, alert_id):
+            state["in_flight"] += 1
+            state["peak"] = max(state["peak"], state["in_flight"])
+            await asyncio.sleep(0.05)  # broker submit + outcome polling
+            committed.append(ticker)
+            state["in_flight"] -= 1
+            return {"success": False, "error": "rejected"}
+
+        limits = SimpleNamespace(
+            regular_hours_only=False,
+            is_killed=False,
+            is_paused=False,
+            buy_amount_usd=100.0,
+            max_total_investment=1000.0,
+            max_open_positions=3,
+            max_per_ticker=2,
+            max_daily_buys=10,
+        )
+        for patcher in (
+            patch.object(order_worker, "get_bot_settings", AsyncMock(return_value=limits)),
+            patch.object(risk_manager, "get_bot_settings", AsyncMock(return_value=limits)),
+            patch.object(risk_manager, "check_cash_balance", AsyncMock(return_value=True)),
+            patch.object(risk_manager, "load_risk_snapshot", snapshot),
+            patch.object(portfolio_ledger, "get_redis", AsyncMock(return_value=redis_client)),
+            patch.object(order_worker, "rate_limit", AsyncMock()),
+            patch.object(order_worker, "execute_buy", execute),
+            patch.object(order_worker, "send_notification", AsyncMock()),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        tickers = ["AAPL", "MSFT", "NVDA", "AMD", "TSLA"]
+        results = await asyncio.gather(
+            *(order_worker.process_order({"action": "BUY", "ticker": ticker}) for ticker in tickers)
+        )
+
+        self.assertEqual(state["peak"], 3)
+        self.assertEqual(len(committed), 3)
+        self.assertEqual([r["status"] for r in results].count("blocked"), 2)
+        # Every reservation was released and each executed BUY bumped the generation.
+        self.assertEqual(await redis_client.hlen(portfolio_ledger.BUY_RESERVATIONS_KEY), 0)
+        self.assertEqual(await portfolio_ledger.current_buy_generation(), 3)
+
+
+class StreamConsumerRecoveryTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        try:
+            import fakeredis.aioredis
+        except ImportError:
+            self.skipTest("fakeredis not installed (requirements-dev.txt)")
+        self.redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+        self._orig_redis = order_queue._redis_client
+        order_queue._redis_client = self.redis
+        order_queue._stream_groups_ready = False
+        order_queue._stream_inflight.clear()
+        for patcher in (
+            patch.object(settings, "order_queue_backend", "stream"),
+            patch.object(settings, "order_stream_consumer", "worker-b"),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def asyncTearDown(self):
+        order_queue._redis_client = self._orig_redis
+        order_queue._stream_groups_ready = False
+        order_queue._stream_inflight.clear()
+
+    async def _read_as(self, consumer, stream_key=order_queue.SELL_STREAM):
+        rows = await self.redis.xreadgroup(
+            settings.order_stream_group, consumer, {stream_key: ">"}, count=1
+        )
+        return rows[0][1][0][0]
+
+    async def _owner(self, stream_key, entry_id):
+        rows = await self.redis.xpending_range(
+            stream_key, settings.order_stream_group, min=entry_id, max=entry_id, count=1
+        )
+        return rows[0]["consumer"] if rows else None
+
+    async def test_startup_releases_entries_of_consumers_without_lease(self):
+        await order_queue.enqueue_order({"action": "SELL", "ticker": "AAPL"})
+        await order_queue.enqueue_order({"action": "SELL", "ticker": "MSFT"})
+        crashed = await self._read_as("host-1234")
+        live = await self._read_as("worker-a")
+        await self.redis.set(order_queue._stream_consumer_lease_key("worker-a"), "1", ex=60)
+
+        recovered = await order_queue.requeue_inflight_orders()
+
+        self.assertEqual(recovered, 1)
+        consumers = {row["name"] for row in await self.redis.xinfo_consumers(
+            order_queue.SELL_STREAM, settings.order_stream_group
+        )}
+        self.assertNotIn("host-1234", consumers)
+        self.assertEqual(await self._owner(order_queue.SELL_STREAM, live), "worker-a")
+        self.assertTrue(await self.redis.exists(order_queue._stream_consumer_lease_key("worker-b")))
+        # The crashed worker's SELL is picked up at once, not after the claim idle time.
+        order = await order_queue.dequeue_order(sell_only=True)
+        self.assertEqual((order["_stream_id"], order["ticker"]), (crashed, "AAPL"))
+
+    async def test_refresh_does_not_take_back_reclaimed_entries(self):
+        await order_queue.enqueue_order({"action": "SELL", "ticker": "AAPL"})
+        order = await order_queue.dequeue_order(sell_only=True)
+        entry_id = order["_stream_id"]
+        # This worker stalled and another one reclaimed the entry.
+        await self.redis.execute_command(
+            "XCLAIM", order_queue.SELL_STREAM, settings.order_stream_group, "worker-a", 0, entry_id, "JUSTID"
+        )
+
+        refreshed = await order_queue.refresh_inflight_orders()
+
+        self.assertEqual(refreshed, 0)
+        self.assertEqual(await self._owner(order_queue.SELL_STREAM, entry_id), "worker-a")
+        self.assertNotIn(entry_id, order_queue._stream_inflight)
+
+
+class IdempotencyStoreTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self._orig_redis = order_queue._redis_client
+        self.prefilter = order_queue.IdempotencyPrefilter(100)
+        for patcher in (
+            patch.object(settings, "order_idempotency_store", "buckets"),
+            patch.object(settings, "order_queue_backend", "list"),
+            patch.object(order_queue, "_idempotency_prefilter", self.prefilter),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def asyncTearDown(self):
+        order_queue._redis_client = self._orig_redis
+
+    def test_bucket_keys_cover_the_ttl_window_newest_first(self):
+        store = order_queue.DailyBucketIdempotencyStore()
+        now = datetime(2026, 5, 26, 0, 5, tzinfo=timezone.utc).timestamp()
+
+        week = store.bucket_keys(now, 7 * 86400)
+        short = store.bucket_keys(now, 600)
+
+        self.assertEqual(len(week), 8)
+        self.assertEqual(week[0], "orders:idempotency:day:20260526")
+        self.assertEqual(week[-1], "orders:idempotency:day:20260519")
+        self.assertEqual(short, ["orders:idempotency:day:20260526", "orders:idempotency:day:20260525"])
+
+    async def test_bucket_claim_passes_compact_field_and_bucket_ttl(self):
+        fake = _FakeRedis(eval_result=[1, 0])
+        order_queue._redis_client = fake
+        key = "a" * 64
+
+        with patch.object(order_queue.time, "time", return_value=86400 * 100 + 3600):
+            queued = await enqueue_order_once({"action": "BUY", "ticker": "FCA", "dedupe_key": key}, ttl_seconds=600)
+
+        self.assertTrue(queued)
+        script, numkeys, *rest = fake.eval_calls[0]
+        self.assertIs(script, order_queue._BUCKET_ENQUEUE_ONCE_SCRIPT)
+        keys, argv = rest[:numkeys], rest[numkeys:]
+        self.assertEqual(keys[:2], [f"orders:idempotency:{key}", BUY_QUEUE])
+        self.assertEqual(keys[3:], order_queue._stats_keys())
+        _, mode, field, now, expires_at, bucket_ttl = argv
+        self.assertEqual((mode, field), ("list", "a" * 32))
+        self.assertEqual(expires_at - now, 600)
+        self.assertEqual(bucket_ttl, 86400 - 3600 + 600)
+
+    async def test_prefilter_answers_retry_until_marker_expires(self):
+        fake = _FakeRedis(eval_result=[0, 0])
+        order_queue._redis_client = fake
+        order = {"action": "SELL", "ticker": "FCA", "dedupe_key": "k1"}
+
+        fake.eval_result = [0, 1000.0 + 600]
+        with patch.object(order_queue.time, "time", return_value=1000.0):
+            self.assertFalse(await enqueue_order_once(order, ttl_seconds=600))
+            self.assertFalse(await enqueue_order_once(order, ttl_seconds=600))
+        self.assertEqual(len(fake.eval_calls), 1)
+        self.assertEqual(self.prefilter.hits, 1)
+
+        fake.eval_result = [1, 1700.0 + 600]
+        with patch.object(order_queue.time, "time", return_value=1700.0):
+            self.assertTrue(await enqueue_order_once(order, ttl_seconds=600))
+        self.assertEqual(len(fake.eval_calls), 2)
+
+    def test_prefilter_evicts_least_recently_used(self):
+        prefilter = order_queue.IdempotencyPrefilter(2)
+        for key in ("a", "b"):
+            prefilter.remember(key, 100.0)
+        self.assertTrue(prefilter.seen("a", 0.0))
+        prefilter.remember("c", 100.0)
+
+        self.assertFalse(prefilter.seen("b", 0.0))
+        self.assertTrue(prefilter.seen("a", 0.0))
+        self.assertEqual(len(prefilter), 2)
+
+    async def test_memory_report_separates_buckets_from_legacy_keys(self):
+        fake = _IdempotencyScanFakeRedis(
+            {
+                "orders:idempotency:day:20260526": (3, 300),
+                "orders:idempotency:abc": (None, 90),
+                "orders:idempotency:def": (None, 110),
+            }
+        )
+        order_queue._redis_client = fake
+
+        report = await order_queue.idempotency_memory_report()
+
+        self.assertEqual(report["store"], "buckets")
+        self.assertEqual((report["legacy_keys"], report["legacy_bytes_estimate"]), (2, 200))
+        self.assertEqual((report["bucket_markers"], report["bucket_bytes_per_marker"]), (3, 100.0))
+
+
+class _IdempotencyScanFakeRedis:
+    def __init__(self, keys):
+        self.keys = keys
+
+    async def scan_iter(self, match=None, count=None):
+        for key in self.keys:
+            yield key
+
+    async def hlen(self, key):
+        return self.keys[key][0]
+
+    async def memory_usage(self, key):
+        return self.keys[key][1]
+
+    async def ttl(self, key):
+        return 86400
 
 
 class _FakeRedis:
@@ -257,12 +700,21 @@ class _FakeRedis:
 
 
 class _PendingFakeRedis:
-    def __init__(self, pending_rows):
+    def __init__(self, pending_rows, sweep_result=None):
         self.queues = {
             PENDING_QUEUE: list(pending_rows),
             BUY_QUEUE: [],
             "orders:sell": [],
         }
+        self.sweep_result = sweep_result
+        self.eval_calls = []
+
+    async def type(self, key):
+        return "list" if self.queues.get(key) else "none"
+
+    async def eval(self, *args):
+        self.eval_calls.append(args)
+        return self.sweep_result
 
     async def llen(self, key):
         return len(self.queues.get(key, []))
@@ -277,5 +729,50 @@ class _PendingFakeRedis:
         self.queues.setdefault(key, []).insert(0, value)
 
 
+class _StatsFakeRedis:
+    def __init__(self, counters, hash_lengths):
+        self.counters = counters
+        self.hash_lengths = hash_lengths
+
+    def pipeline(self, transaction=True):
+        return _StatsFakePipeline(self)
+
+
+class _StatsFakePipeline:
+    def __init__(self, fake):
+        self.fake = fake
+        self.results = []
+
+    def hmget(self, key, *fields):
+        self.results.append([self.fake.counters.get(field) for field in fields])
+
+    def hlen(self, key):
+        self.results.append(self.fake.hash_lengths.get(key, 0))
+
+    async def execute(self):
+        return self.results
+
+
+class _DequeueFakeRedis:
+    def __init__(self, eval_results, blpop_result=None):
+        self.eval_results = list(eval_results)
+        self.eval_count = 0
+        self.eval_args = []
+        self.blpop_result = blpop_result
+        self.blpop_calls = []
+
+    async def eval(self, *args):
+        self.eval_count += 1
+        self.eval_args.append(args)
+        return self.eval_results.pop(0) if self.eval_results else None
+
+    async def blpop(self, keys, timeout=0):
+        self.blpop_calls.append((keys, timeout))
+        return self.blpop_result
+
+    async def lrem(self, *args):
+        return 0
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -1,20 +1,35 @@
+import asyncio
 import unittest
 import atexit
 from datetime import datetime, timedelta, timezone
 import os
 from pathlib import Path
-from unittest.mock import AsyncMock
+import tempfile
+from unittest.mock import AsyncMock, patch
 
 TEST_KIS_TOKEN_CACHE_PATH = Path(__file__).resolve().parent / ".tmp_kis_access_token.json"
 os.environ["KIS_TOKEN_CACHE_PATH"] = str(TEST_KIS_TOKEN_CACHE_PATH)
 atexit.register(lambda: TEST_KIS_TOKEN_CACHE_PATH.unlink(missing_ok=True))
 
-from app.broker.kis_client import KISClient, _format_krw_order_price, _normalize_domestic_symbol
+from app.broker.kis_client import (
+    KISClient,
+    KISPriority,
+    _KISAccountRateBucket,
+    _KISRateGovernor,
+    _request_timeout,
+    _format_krw_order_price,
+    _infer_kis_priority,
+    _normalize_domestic_symbol,
+    kis_priority,
+)
 from app.gateway.symbol_mapper import (
     canonical_trade_symbol,
     is_kis_domestic_symbol,
     kis_overseas_currency,
 )
+from app.broker import fill_latency, market_hours
+from app.broker.fill_latency import FillLatencyModel
+from app.config import settings
 from app.broker.market_hours import ASIA_MARKET_SESSIONS
 from app.queue.order_queue import _pending_order_matches_market, is_pending_order_expired, pending_order_age_hours
 from app.queue.order_worker import _format_money, _format_signed_money
@@ -225,7 +240,7 @@ class KISOverseasOrderRoutingTests(unittest.IsolatedAsyncioTestCase):
         client = KISClient()
         seen_exchanges = []
 
-        async def fake_balance(exchange_code=None, currency_code=None):
+        async def fake_balance(exchange_code=None, currency_code=None, max_age_seconds=None):
             seen_exchanges.append(exchange_code)
             if exchange_code == "AMEX":
                 return [
@@ -252,7 +267,7 @@ class KISOverseasOrderRoutingTests(unittest.IsolatedAsyncioTestCase):
         client._authorized_headers = AsyncMock(return_value={})
         client._request_json = AsyncMock(return_value={"rt_cd": "0", "output": {"ODNO": "1"}})
 
-        async def fake_quote(symbol):
+        async def fake_quote(symbol, max_age_seconds=None):
             client._remember_symbol_exchange(symbol, "AMS")
             return {"symbol": symbol, "price": 100.0, "quote_exchange": "AMS", "currency": "USD"}
 
@@ -289,6 +304,231 @@ class KISOverseasOrderRoutingTests(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(body["PDNO"], "515050")
 
 
+class KISQuoteCacheTests(unittest.IsolatedAsyncioTestCase):
+    def _client(self):
+        client = KISClient()
+        client._fetch_quote_snapshot = AsyncMock(
+            side_effect=lambda symbol: {"symbol": symbol, "price": 100.0, "currency": "USD"}
+        )
+        return client
+
+    async def test_cached_quote_is_reused_within_default_ttl(self):
+        client = self._client()
+
+        await client.get_quote_snapshot("SPY")
+        await client.get_quote_price("SPY")
+
+        self.assertEqual(client._fetch_quote_snapshot.await_count, 1)
+
+    async def test_order_pricing_demands_fresh_quote(self):
+        client = self._client()
+
+        await client.get_quote_snapshot("SPY")
+        await client.get_quote_snapshot("SPY", max_age_seconds=0)
+
+        self.assertEqual(client._fetch_quote_snapshot.await_count, 2)
+
+    async def test_concurrent_callers_share_one_request(self):
+        client = KISClient()
+        release = asyncio.Event()
+
+        async def slow_quote(symbol):
+            await release.wait()
+            return {"symbol": symbol, "price": 10.0}
+
+        client._fetch_quote_snapshot = AsyncMock(side_effect=slow_quote)
+        waiters = [
+            asyncio.create_task(client.get_quote_snapshot("QQQ", max_age_seconds=0)) for _ in range(4)
+        ]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*waiters)
+
+        self.assertEqual(client._fetch_quote_snapshot.await_count, 1)
+        self.assertEqual({r["price"] for r in results}, {10.0})
+
+    async def test_caller_does_not_join_a_request_sent_before_its_bound(self):
+        client = KISClient()
+        release = asyncio.Event()
+        prices = iter([10.0, 11.0])
+
+        async def slow_quote(symbol):
+            price = next(prices)
+            await release.wait()
+            return {"symbol": symbol, "price": price}
+
+        client._fetch_quote_snapshot = AsyncMock(side_effect=slow_quote)
+        first = asyncio.create_task(client.get_quote_snapshot("QQQ", max_age_seconds=0))
+        await asyncio.sleep(0.01)
+        # The first request is already out; a fresh-quote caller sends its own,
+        # a cache-tolerant one joins the newest.
+        fresh = asyncio.create_task(client.get_quote_snapshot("QQQ", max_age_seconds=0))
+        tolerant = asyncio.create_task(client.get_quote_snapshot("QQQ"))
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(first, fresh, tolerant)
+
+        self.assertEqual(client._fetch_quote_snapshot.await_count, 2)
+        self.assertEqual([r["price"] for r in results], [10.0, 11.0, 11.0])
+        self.assertEqual((await client.get_quote_snapshot("QQQ"))["price"], 11.0)
+
+    async def test_failed_request_is_not_cached(self):
+        client = KISClient()
+        client._fetch_quote_snapshot = AsyncMock(
+            side_effect=[RuntimeError("timeout"), {"symbol": "SPY", "price": 5.0}]
+        )
+
+        with self.assertRaises(RuntimeError):
+            await client.get_quote_snapshot("SPY")
+        result = await client.get_quote_snapshot("SPY")
+
+        self.assertEqual(result["price"], 5.0)
+
+
+class KISRateGovernorTests(unittest.IsolatedAsyncioTestCase):
+    async def test_queued_calls_are_served_by_priority(self):
+        governor = _KISRateGovernor(rate_per_second=50.0, capacity=1.0)
+        await governor.acquire(KISPriority.LIVE)  # drain the bucket
+        served = []
+
+        async def call(priority):
+            await governor.acquire(priority)
+            served.append(priority)
+
+        tasks = [
+            asyncio.create_task(call(KISPriority.REPORTING)),
+            asyncio.create_task(call(KISPriority.LIVE)),
+            asyncio.create_task(call(KISPriority.ORDER_SUBMIT)),
+        ]
+        await asyncio.sleep(0)
+        self.assertEqual(governor.metrics()["classes"]["reporting"]["queue_depth"], 1)
+        await asyncio.gather(*tasks)
+
+        self.assertEqual(served, [KISPriority.ORDER_SUBMIT, KISPriority.LIVE, KISPriority.REPORTING])
+        self.assertEqual(governor.metrics()["classes"]["order_submit"]["granted"], 1)
+
+    async def test_reporting_leaves_reserved_tokens_for_live_calls(self):
+        governor = _KISRateGovernor(rate_per_second=1.0, capacity=3.0, reserved=2.0)
+
+        await governor.acquire(KISPriority.REPORTING)
+        blocked = asyncio.create_task(governor.acquire(KISPriority.REPORTING))
+        await asyncio.sleep(0)
+        await asyncio.wait_for(governor.acquire(KISPriority.ORDER_SUBMIT), timeout=0.2)
+
+        self.assertFalse(blocked.done())
+        blocked.cancel()
+
+    async def test_account_bucket_keeps_reserve_across_processes(self):
+        try:
+            import fakeredis.aioredis
+        except ImportError:
+            self.skipTest("fakeredis not installed (requirements-dev.txt)")
+        redis_client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+        # Two clients on one account, as in the scheduler and worker processes.
+        scheduler = _KISAccountRateBucket("kis:rate:test", rate_per_second=3.0, reserved=2.0)
+        worker = _KISAccountRateBucket("kis:rate:test", rate_per_second=3.0, reserved=2.0)
+
+        with patch("app.queue.order_queue.get_redis", AsyncMock(return_value=redis_client)):
+            await scheduler.acquire(KISPriority.REPORTING)
+            blocked = asyncio.create_task(scheduler.acquire(KISPriority.REPORTING))
+            await asyncio.sleep(0.01)
+            await asyncio.wait_for(worker.acquire(KISPriority.ORDER_SUBMIT), timeout=0.05)
+            await asyncio.wait_for(worker.acquire(KISPriority.LIVE), timeout=0.05)
+
+            self.assertFalse(blocked.done())
+            blocked.cancel()
+        self.assertEqual(worker.metrics()["granted"], 2)
+        self.assertEqual(scheduler.metrics()["bypassed"], 0)
+
+    async def test_account_bucket_falls_back_to_local_limit_without_redis(self):
+        bucket = _KISAccountRateBucket("kis:rate:test", rate_per_second=5.0)
+
+        with patch("app.queue.order_queue.get_redis", AsyncMock(side_effect=ConnectionError("down"))):
+            await asyncio.wait_for(bucket.acquire(KISPriority.LIVE), timeout=0.05)
+            await asyncio.wait_for(bucket.acquire(KISPriority.LIVE), timeout=0.05)
+
+        self.assertEqual(bucket.metrics()["bypassed"], 2)
+
+    def test_priority_inference(self):
+        self.assertEqual(_infer_kis_priority("POST", "/any"), KISPriority.ORDER_SUBMIT)
+        self.assertEqual(
+            _infer_kis_priority("GET", "/uapi/overseas-stock/v1/trading/inquire-ccnl"),
+            KISPriority.ORDER_POLL,
+        )
+        self.assertEqual(_infer_kis_priority("GET", "/uapi/quote"), KISPriority.LIVE)
+        with kis_priority(KISPriority.REPORTING):
+            self.assertEqual(
+                _infer_kis_priority("GET", "/uapi/overseas-stock/v1/trading/inquire-ccnl"),
+                KISPriority.REPORTING,
+            )
+
+
+class KISExchangeFanOutTests(unittest.IsolatedAsyncioTestCase):
+    def _client(self, responses):
+        client = KISClient()
+        client._authorized_headers = AsyncMock(return_value={})
+        state = {"in_flight": 0, "peak": 0}
+
+        async def fake_get(path, *, headers=None, params=None, **kwargs):
+            state["in_flight"] += 1
+            state["peak"] = max(state["peak"], state["in_flight"])
+            await asyncio.sleep(0.01)
+            state["in_flight"] -= 1
+            response = responses[params["OVRS_EXCG_CD"]]
+            if isinstance(response, Exception):
+                raise response
+            return response
+
+        client._get = AsyncMock(side_effect=fake_get)
+        return client, state
+
+    async def test_unfilled_orders_query_exchanges_concurrently_and_dedupe_in_order(self):
+        row = {"odno": "1", "pdno": "SPY", "source": "NASD"}
+        client, state = self._client(
+            {
+                "NASD": {"rt_cd": "0", "output": [row]},
+                "NYSE": {"rt_cd": "0", "output": [{"odno": "1", "pdno": "SPY", "source": "NYSE"}]},
+                "AMEX": {"rt_cd": "1", "msg1": "no data"},
+            }
+        )
+        client._order_exchange_candidates = lambda symbol=None: ["NASD", "NYSE", "AMEX"]
+
+        rows = await client.get_unfilled_orders()
+
+        self.assertEqual(rows, [row])
+        self.assertEqual(state["peak"], 3)
+
+    async def test_history_raises_only_when_every_exchange_fails(self):
+        client, _ = self._client(
+            {"NASD": RuntimeError("timeout"), "NYSE": {"rt_cd": "1", "msg1": "denied"}}
+        )
+        client._order_exchange_candidates = lambda symbol=None: ["NASD", "NYSE"]
+
+        with self.assertRaises(RuntimeError) as ctx:
+            await client.get_order_history("20260101", "20260102")
+
+        self.assertIn("NASD:timeout", str(ctx.exception))
+        self.assertIn("NYSE:denied", str(ctx.exception))
+
+    async def test_orderable_runs_exchanges_and_integrated_margin_together(self):
+        client, state = self._client(
+            {
+                "NASD": {"rt_cd": "0", "output": {"ovrs_ord_psbl_amt": "50"}},
+                "NYSE": {"rt_cd": "0", "output": {"ovrs_ord_psbl_amt": "80"}},
+            }
+        )
+        client._order_exchange_candidates = lambda symbol=None: ["NASD", "NYSE"]
+        client.get_integrated_margin_usd_orderable = AsyncMock(
+            return_value={"usd_itgr_orderable_usd": 60.0, "usd_exrt": 1400.0}
+        )
+
+        funds = await client.get_effective_usd_orderable("SPY", 10.0)
+
+        self.assertEqual(funds["effective_usd"], 80.0)
+        self.assertEqual(funds["usd_exrt"], 1400.0)
+        self.assertEqual(state["peak"], 2)
+
+
 class KISDomesticPaginationTests(unittest.IsolatedAsyncioTestCase):
     async def test_domestic_balance_reads_continuation_pages(self):
         client = KISClient()
@@ -325,5 +565,271 @@ class KISDomesticPaginationTests(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(client._get.await_count, 2)
 
 
+class KISBalanceCacheTests(unittest.IsolatedAsyncioTestCase):
+    def _client(self, qty="1"):
+        client = KISClient()
+        client._authorized_headers = AsyncMock(return_value={})
+        client._get = AsyncMock(
+            return_value={"rt_cd": "0", "output1": [{"ovrs_pdno": "XHE", "ovrs_cblc_qty": qty}]}
+        )
+        return client
+
+    async def test_repeated_balance_reads_share_one_request_per_exchange(self):
+        client = self._client()
+
+        await client.get_overseas_balance(exchange_code="AMEX", currency_code="USD")
+        await client.get_overseas_balance(exchange_code="AMEX", currency_code="USD")
+        await client.get_overseas_balance(exchange_code="NASD", currency_code="USD")
+
+        self.assertEqual(client._get.await_count, 2)
+
+    async def test_concurrent_misses_are_coalesced(self):
+        client = self._client()
+
+        await asyncio.gather(
+            *(client.get_overseas_balance(exchange_code="AMEX", currency_code="USD") for _ in range(5))
+        )
+
+        self.assertEqual(client._get.await_count, 1)
+
+    async def test_fill_polling_forces_fresh_read(self):
+        client = self._client()
+
+        await client.get_overseas_balance(exchange_code="AMEX", currency_code="USD")
+        await client.get_overseas_balance(exchange_code="AMEX", currency_code="USD", max_age_seconds=0)
+
+        self.assertEqual(client._get.await_count, 2)
+
+    async def test_order_submit_invalidates_snapshot(self):
+        client = self._client()
+        client._request_json = AsyncMock(return_value={"rt_cd": "0", "output": {"ODNO": "1"}})
+        client.get_quote_snapshot = AsyncMock(return_value={"price": 10.0})
+
+        await client.get_overseas_balance(exchange_code="AMEX", currency_code="USD")
+        await client.place_market_order("XHE", "BUY", 1, limit_price=10.0)
+        await client.get_overseas_balance(exchange_code="AMEX", currency_code="USD")
+
+        self.assertEqual(client._get.await_count, 2)
+
+    async def test_invalidation_during_fetch_is_not_recached(self):
+        client = self._client()
+        stale = {"rt_cd": "0", "output1": [{"ovrs_pdno": "XHE", "ovrs_cblc_qty": "1"}]}
+
+        async def fetch_then_fill(*args, **kwargs):
+            client.invalidate_balance_cache()
+            return stale
+
+        client._get = AsyncMock(side_effect=fetch_then_fill)
+        await client.get_overseas_balance(exchange_code="AMEX", currency_code="USD")
+        await client.get_overseas_balance(exchange_code="AMEX", currency_code="USD")
+
+        self.assertEqual(client._get.await_count, 2)
+
+
+class KISConnectionPoolTests(unittest.IsolatedAsyncioTestCase):
+    async def test_http_client_uses_configured_pool_and_falls_back_without_h2(self):
+        client = KISClient()
+        with patch.object(settings, "kis_http2", True), patch.object(
+            settings, "kis_http_max_connections", 7
+        ), patch.dict("sys.modules", {"h2": None}):
+            http = await client._http()
+        self.addAsyncCleanup(client.close)
+
+        pool = http._transport._pool
+        self.assertEqual(pool._max_connections, 7)
+        self.assertFalse(pool._http2)
+
+    def test_order_posts_use_order_read_timeout(self):
+        with patch.object(settings, "kis_http_read_timeout_seconds", 8.0), patch.object(
+            settings, "kis_http_order_read_timeout_seconds", 30.0
+        ):
+            self.assertEqual(_request_timeout("GET").read, 8.0)
+            self.assertEqual(_request_timeout("POST").read, 30.0)
+
+    async def test_warmup_refreshes_token_and_opens_connections(self):
+        client = KISClient()
+        client.get_access_token = AsyncMock(return_value="token")
+        http = AsyncMock()
+        http.head = AsyncMock(side_effect=[object(), RuntimeError("reset")])
+        client._client = http
+
+        with patch.object(settings, "kis_base_url", "https://kis.example"), patch.object(
+            settings, "kis_warmup_connections", 2
+        ):
+            result = await client.warmup()
+
+        client.get_access_token.assert_awaited_once()
+        http.head.assert_awaited_with("https://kis.example/")
+        self.assertEqual(result["connections"], 1)
+        self.assertEqual(result["errors"], ["reset"])
+
+    def test_next_session_open_skips_markets_already_open(self):
+        with patch.object(market_hours, "seconds_until_market_open", return_value=7200), patch.object(
+            market_hours, "seconds_until_krx_market_open", return_value=0
+        ), patch.object(
+            market_hours,
+            "seconds_until_asia_market_open",
+            side_effect=lambda market: 3600 if market == "TSE" else 0,
+        ):
+            self.assertEqual(market_hours.seconds_until_next_session_open(), ("TSE", 3600))
+
+
+class KISAdaptivePollingTests(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "latency.json")
+        self.model = FillLatencyModel(self.path)
+        patcher = patch.object(fill_latency, "fill_latency_model", self.model)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_cold_schedule_starts_fast_and_keeps_poll_budget(self):
+        offsets = self.model.poll_offsets("NASD", 6, 10.0)
+
+        self.assertEqual(len(offsets), 6)
+        self.assertEqual(offsets[0], 0.2)
+        self.assertEqual(offsets[-1], 10.0)
+        self.assertEqual(offsets, sorted(offsets))
+
+    def test_learned_schedule_polls_at_typical_latency_and_persists(self):
+        for _ in range(10):
+            self.model.record("NASD", 0.3)
+        self.model.flush()
+
+        reloaded = FillLatencyModel(self.path)
+        offsets = reloaded.poll_offsets("NASD", 6, 10.0)
+
+        self.assertEqual(reloaded.samples("NASD"), 10)
+        self.assertEqual(offsets[0], 0.4)
+        self.assertEqual(len(offsets), 6)
+        self.assertEqual(offsets[-1], 10.0)
+        self.assertEqual(reloaded.poll_offsets("NYSE", 6, 10.0)[0], 0.2)
+
+    def test_late_schedule_follows_the_fills_slower_than_the_wait(self):
+        for _ in range(10):
+            self.model.record("NASD", 0.3)
+            self.model.record("NASD", 5.0)
+
+        offsets = self.model.poll_offsets("NASD", 6, 10.0, elapsed_seconds=3.0)
+
+        # The median of the fills slower than 3s, not the 0.4s overall median.
+        self.assertIn(6.0, offsets)
+        self.assertGreater(offsets[0], 3.0)
+        self.assertEqual(len(offsets), 6)
+        self.assertEqual(offsets[-1], 13.0)
+        self.assertEqual(offsets, sorted(offsets))
+        self.assertEqual(self.model.poll_offsets("NYSE", 3, 0.4, elapsed_seconds=0.3), [0.5, 0.583, 0.7])
+
+    async def test_notice_fill_records_its_own_latency(self):
+        client = KISClient()
+
+        async def notice(market, order_id, expected_qty):
+            await asyncio.sleep(0.05)
+            return {"state": "filled", "filled_qty": 1}
+
+        client._await_fill_notice = notice
+
+        with patch.object(self.model, "record") as record:
+            await client.wait_for_order_outcome("1", "SPY", "BUY", 1)
+
+        exchange, latency = record.call_args.args
+        self.assertEqual(exchange, client._order_exchange_candidates("SPY")[0])
+        self.assertGreaterEqual(latency, 0.05)
+        self.assertLess(latency, 0.2)
+
+    async def test_polled_fill_records_the_midpoint_between_polls(self):
+        client = KISClient()
+        history = AsyncMock(side_effect=[None, {"odno": "1"}])
+        client.find_order_history_row = history
+        client.find_unfilled_order = AsyncMock(return_value=None)
+        client._parse_execution_row = lambda row: {"filled_qty": 1, "unfilled_qty": 0, "status_name": ""}
+
+        with patch.object(self.model, "record") as record:
+            await client.wait_for_order_outcome("1", "SPY", "BUY", 1, poll_count=3, poll_delay_seconds=0.2)
+
+        # Cold schedule 0.2/0.283/0.4s: seen by the 0.283s poll, missed at 0.2s.
+        latency = record.call_args.args[1]
+        self.assertGreater(latency, 0.2)
+        self.assertLess(latency, 0.283)
+
+    async def test_history_and_unfilled_are_queried_concurrently(self):
+        client = KISClient()
+        state = {"in_flight": 0, "peak": 0, "history_calls": 0}
+        filled_row = {"odno": "1"}
+
+        async def tracked(result):
+            state["in_flight"] += 1
+            state["peak"] = max(state["peak"], state["in_flight"])
+            await asyncio.sleep(0.01)
+            state["in_flight"] -= 1
+            return result
+
+        async def history(order_id, symbol):
+            state["history_calls"] += 1
+            return await tracked(filled_row if state["history_calls"] >= 2 else None)
+
+        client.find_order_history_row = history
+        client.find_unfilled_order = lambda order_id, symbol: tracked(None)
+        client._parse_execution_row = lambda row: {"filled_qty": 1, "unfilled_qty": 0, "status_name": ""}
+
+        outcome = await client.wait_for_order_outcome("1", "SPY", "BUY", 1, poll_count=3, poll_delay_seconds=0.2)
+
+        self.assertEqual(outcome["state"], "filled")
+        self.assertEqual(state["peak"], 2)
+        self.assertEqual(state["history_calls"], 2)
+        self.assertEqual(self.model.samples(client._order_exchange_candidates("SPY")[0]), 1)
+
+    async def test_recorded_samples_are_written_once_off_the_loop(self):
+        with patch.object(fill_latency.FillLatencyModel, "_write") as write, patch.object(
+            fill_latency, "_SAVE_DELAY_SECONDS", 0.01
+        ):
+            for _ in range(5):
+                self.model.record("NASD", 0.3)
+            write.assert_not_called()
+            await asyncio.sleep(0.05)
+
+        write.assert_called_once()
+        self.assertEqual(sum(write.call_args.args[1]["exchanges"]["NASD"]), 5)
+        self.assertFalse(self.model._dirty)
+
+    async def test_polling_starts_after_the_notice_wait(self):
+        client = KISClient()
+        polled_at = []
+        loop = asyncio.get_running_loop()
+
+        async def slow_notice(market, order_id, expected_qty):
+            await asyncio.sleep(0.3)
+            return None
+
+        async def history(order_id, symbol):
+            polled_at.append(loop.time())
+            return None
+
+        client._await_fill_notice = slow_notice
+        client.find_order_history_row = history
+        client.find_unfilled_order = AsyncMock(return_value=None)
+        client._infer_fill_from_balance_delta = AsyncMock(return_value={"filled_qty": 0})
+
+        await client.wait_for_order_outcome("1", "SPY", "BUY", 1, poll_count=3, poll_delay_seconds=0.2)
+
+        self.assertEqual(len(polled_at), 3)
+        # Cold schedule 0.2/0.283/0.4s from the end of the notice wait, not a back-to-back burst.
+        self.assertGreaterEqual(polled_at[1] - polled_at[0], 0.05)
+        self.assertGreaterEqual(polled_at[2] - polled_at[1], 0.08)
+
+    async def test_unresolved_order_uses_exactly_poll_count_polls(self):
+        client = KISClient()
+        client.find_order_history_row = AsyncMock(return_value=None)
+        client.find_unfilled_order = AsyncMock(return_value=None)
+        client._infer_fill_from_balance_delta = AsyncMock(return_value={"filled_qty": 0})
+
+        outcome = await client.wait_for_order_outcome("1", "SPY", "BUY", 1, poll_count=3, poll_delay_seconds=0.2)
+
+        self.assertEqual(outcome["state"], "unknown")
+        self.assertEqual(client.find_order_history_row.await_count, 3)
+        self.assertEqual(client.find_unfilled_order.await_count, 3)
+
+
 if __name__ == "__main__":
     unittest.main()
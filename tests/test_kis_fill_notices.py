@@ -0,0 +1,148 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, patch
+
+from app.broker.kis_client import KISClient
+from app.broker.kis_fill_notices import (
+    KISFillNoticeSubscriber,
+    LocalNoticeServer,
+    decrypt_notice,
+    encrypt_notice,
+)
+from app.config import settings
+
+
+class KISFillNoticeSubscriberTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.server = await LocalNoticeServer().start()
+        self.addAsyncCleanup(self.server.stop)
+        self.fills = []
+        self.subscriber = KISFillNoticeSubscriber(
+            self.server.url,
+            AsyncMock(return_value="approval"),
+            "htsuser",
+            ["H0GSCNI0", "H0STCNI0"],
+            on_fill=self.fills.append,
+            reconnect_delay_seconds=0.05,
+        )
+        self.subscriber.start()
+        self.addAsyncCleanup(self.subscriber.stop)
+        self.assertTrue(await self.subscriber.wait_ready(2.0))
+
+    def test_cipher_round_trip(self):
+        key, iv = self.server.key, self.server.iv
+        self.assertEqual(decrypt_notice(encrypt_notice("a^b^체결", key, iv), key, iv), "a^b^체결")
+
+    async def test_subscribes_each_tr_with_hts_id(self):
+        inputs = [item["body"]["input"] for item in self.server.subscriptions]
+        self.assertEqual(
+            inputs,
+            [{"tr_id": "H0GSCNI0", "tr_key": "htsuser"}, {"tr_id": "H0STCNI0", "tr_key": "htsuser"}],
+        )
+        self.assertEqual(self.server.subscriptions[0]["header"]["approval_key"], "approval")
+
+    async def test_partial_fills_accumulate_until_expected_qty(self):
+        waiter = asyncio.create_task(self.subscriber.wait_for_fill("overseas", "0000012345", 3, timeout=2.0))
+        await asyncio.sleep(0.05)
+        await self.server.push_notice("H0GSCNI0", "0000012345", "SPY", qty=1, price=10.0, order_qty=3)
+        await self.server.push_notice("H0GSCNI0", "0000012345", "SPY", qty=2, price=13.0, order_qty=3)
+
+        outcome = await waiter
+
+        self.assertEqual(outcome["state"], "filled")
+        self.assertEqual(outcome["filled_qty"], 3)
+        self.assertAlmostEqual(outcome["fill_price"], 12.0)
+        self.assertAlmostEqual(outcome["fill_amount"], 36.0)
+        self.assertEqual(len(self.fills), 2)
+
+    async def test_notice_before_waiter_registers_is_kept(self):
+        await self.server.push_notice("H0STCNI0", "777", "069500", qty=5, price=100.0, encrypted=False)
+        await asyncio.sleep(0.05)
+
+        outcome = await self.subscriber.wait_for_fill("domestic", "0000000777", 5, timeout=0.1)
+
+        self.assertEqual(outcome["state"], "filled")
+        self.assertEqual(outcome["raw"]["STCK_SHRN_ISCD"], "069500")
+
+    async def test_rejection_settles_without_fill(self):
+        waiter = asyncio.create_task(self.subscriber.wait_for_fill("overseas", "42", 1, timeout=2.0))
+        await asyncio.sleep(0.05)
+        await self.server.push_notice("H0GSCNI0", "42", "SPY", order_qty=1, filled=False, rejected=True)
+
+        outcome = await waiter
+
+        self.assertEqual(outcome["state"], "closed_unfilled")
+        self.assertEqual(outcome["unfilled_qty"], 1)
+        self.assertEqual(self.fills, [])
+
+    async def test_order_ack_alone_times_out(self):
+        await self.server.push_notice("H0GSCNI0", "43", "SPY", order_qty=1, filled=False)
+
+        self.assertIsNone(await self.subscriber.wait_for_fill("overseas", "43", 1, timeout=0.1))
+
+    async def test_same_order_number_in_other_market_is_kept_apart(self):
+        await self.server.push_notice("H0STCNI0", "501", "069500", qty=3, price=100.0)
+        await asyncio.sleep(0.05)
+
+        self.assertIsNone(await self.subscriber.wait_for_fill("overseas", "501", 3, timeout=0.1))
+        waiter = asyncio.create_task(self.subscriber.wait_for_fill("overseas", "501", 1, timeout=2.0))
+        await asyncio.sleep(0.05)
+        await self.server.push_notice("H0GSCNI0", "501", "SPY", qty=1, price=10.0)
+
+        self.assertEqual((await waiter)["raw"]["STCK_SHRN_ISCD"], "SPY")
+        domestic = await self.subscriber.wait_for_fill("domestic", "501", 3, timeout=0.1)
+        self.assertEqual((domestic["filled_qty"], domestic["raw"]["STCK_SHRN_ISCD"]), (3, "069500"))
+
+    async def test_pingpong_is_echoed(self):
+        await self.server.ping()
+        await asyncio.sleep(0.05)
+
+        self.assertEqual(len(self.server.pongs), 1)
+
+    async def test_reconnects_and_resubscribes_after_drop(self):
+        await self.server.drop_connections()
+        await asyncio.sleep(0.02)
+        self.assertTrue(await self.subscriber.wait_ready(2.0))
+
+        self.assertEqual(len(self.server.subscriptions), 4)
+
+
+class KISOrderOutcomeNoticeTests(unittest.IsolatedAsyncioTestCase):
+    def _client(self):
+        client = KISClient()
+        client.find_order_history_row = AsyncMock(return_value=None)
+        client.find_unfilled_order = AsyncMock(return_value=None)
+        client._infer_fill_from_balance_delta = AsyncMock(return_value={"filled_qty": 0})
+        return client
+
+    async def test_pushed_fill_skips_polling_and_drops_balance_cache(self):
+        client = self._client()
+        client._fill_notices = AsyncMock()
+        client._fill_notices.ready = True
+        client._fill_notices.wait_for_fill = AsyncMock(
+            return_value={"state": "filled", "filled_qty": 2, "unfilled_qty": 0, "fill_price": 5.0}
+        )
+        client._balance_cache[("NASD", "USD")] = (0.0, [])
+
+        outcome = await client.wait_for_order_outcome("1", "SPY", "BUY", 2)
+
+        self.assertEqual(outcome["state"], "filled")
+        self.assertEqual(client._fill_notices.wait_for_fill.await_args.args[:2], ("overseas", "1"))
+        client.find_order_history_row.assert_not_awaited()
+        self.assertEqual(client._balance_cache, {})
+
+    async def test_polls_when_subscriber_is_not_ready(self):
+        client = self._client()
+        client._fill_notices = AsyncMock()
+        client._fill_notices.ready = False
+
+        with patch.object(settings, "kis_fill_notice_timeout_seconds", 5.0):
+            outcome = await client.wait_for_order_outcome("1", "SPY", "BUY", 2, poll_count=1)
+
+        self.assertEqual(outcome["state"], "unknown")
+        client._fill_notices.wait_for_fill.assert_not_awaited()
+        client.find_order_history_row.assert_awaited_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,171 @@
+import unittest
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, patch
+
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.broker import kis_reconcile
+from app.broker.kis_client import KISClient
+from app.models.base import Base
+from app.models.daily_pnl_rollup import DailyPnlRollup
+from app.models.position import Position, PositionStatus
+from app.models.trade import Trade, TradeSide
+
+NOW = datetime(2026, 10, 16, 15, 0, tzinfo=timezone.utc)
+
+
+def _position(ticker, qty, days_ago, entry_price=10.0, entry_order_id=-1):
+    return Position(
+        ticker=ticker,
+        qty=qty,
+        entry_price=entry_price,
+        entry_amount_usd=entry_price * qty,
+        entry_time=NOW - timedelta(days=days_ago),
+        status=PositionStatus.OPEN,
+        entry_order_id=entry_order_id,
+    )
+
+
+class KisBulkReconcileTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.engine = create_async_engine("sqlite+aiosqlite://")
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        self.sessionmaker = async_sessionmaker(self.engine, expire_on_commit=False)
+        self.statements = []
+        event.listen(
+            self.engine.sync_engine,
+            "before_cursor_execute",
+            lambda _conn, _cursor, sql, *_: self.statements.append(sql),
+        )
+
+        self.overseas = {
+            "NASD": [
+                {"ovrs_pdno": "AAPL", "ovrs_cblc_qty": "4", "pchs_avg_pric": "10"},
+                {"ovrs_pdno": "NVDA", "ovrs_cblc_qty": "2", "pchs_avg_pric": "0"},
+                {"ovrs_pdno": "TSLA", "ovrs_cblc_qty": "1", "pchs_avg_pric": "10"},
+            ],
+        }
+        self.kis = KISClient()
+        self.kis.get_overseas_balance = AsyncMock(side_effect=self._overseas_rows)
+        self.kis.get_domestic_balance = AsyncMock(
+            return_value=[{"pdno": "069500", "hldg_qty": "3", "pchs_avg_pric": "100"}]
+        )
+        self.kis.get_symbol_balance = AsyncMock(side_effect=AssertionError("per-symbol balance read"))
+        self.kis.get_quote_price = AsyncMock(return_value=50.0)
+        self.sync_ledger = AsyncMock()
+        for patcher in (
+            patch.object(kis_reconcile, "get_session", self._session),
+            patch.object(kis_reconcile, "sync_ledger_ticker", self.sync_ledger),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        await self._seed(
+            _position("AAPL", 2.0, 10),
+            _position("AAPL", 3.0, 5),
+            _position("MSFT", 1.0, 7),
+            _position("TSLA", 1.0, 3),
+            _position("069500", 3.0, 4, entry_price=100.0),
+            # IB/legacy rows are not KIS-managed.
+            _position("MSFT", 5.0, 9, entry_order_id=42),
+        )
+
+    async def asyncTearDown(self):
+        await self.engine.dispose()
+
+    @asynccontextmanager
+    async def _session(self):
+        async with self.sessionmaker() as session:
+            yield session
+            await session.commit()
+
+    async def _overseas_rows(self, exchange_code=None, currency_code=None, max_age_seconds=None):
+        return self.overseas.get(exchange_code, [])
+
+    async def _seed(self, *rows):
+        async with self._session() as session:
+            session.add_all(rows)
+
+    async def _positions(self, ticker):
+        async with self._session() as session:
+            rows = await session.execute(
+                select(Position).where(Position.ticker == ticker).order_by(Position.entry_time, Position.id)
+            )
+            return [(row.qty, row.status, row.entry_amount_usd) for row in rows.scalars()]
+
+    async def test_dry_run_plans_every_fix_without_writing(self):
+        plan = await kis_reconcile.reconcile_kis_holdings(self.kis, dry_run=True)
+
+        self.assertEqual([item.symbol for item in plan.changes], ["AAPL", "MSFT", "NVDA"])
+        aapl, msft, nvda = plan.changes
+        self.assertEqual([(c.qty, c.full, c.remaining_qty) for c in aapl.closes], [(1.0, False, 1.0)])
+        self.assertEqual(([c.full for c in msft.closes], msft.add_qty), ([True], 0.0))
+        self.assertEqual((nvda.add_qty, nvda.add_price, nvda.add_amount), (2.0, 50.0, 100.0))
+        self.assertEqual((plan.symbols_checked, plan.broker_symbols, plan.db_symbols), (5, 4, 4))
+        self.assertFalse(plan.applied)
+        self.assertEqual(await self._positions("AAPL"), [(2.0, PositionStatus.OPEN, 20.0), (3.0, PositionStatus.OPEN, 30.0)])
+        self.kis.get_quote_price.assert_awaited_once_with("NVDA")
+        self.sync_ledger.assert_not_awaited()
+
+    async def test_apply_writes_the_diff_in_bulk(self):
+        plan = await kis_reconcile.build_kis_reconcile_plan(self.kis)
+        self.statements.clear()
+
+        applied = await kis_reconcile.apply_kis_reconcile_plan(plan)
+        statements = [sql.split()[0] for sql in self.statements]
+
+        self.assertEqual([item.symbol for item in applied], ["AAPL", "MSFT", "NVDA"])
+        # Lock/re-check, two bulk UPDATEs, position INSERT, trade INSERT, rollup upsert.
+        self.assertEqual(statements, ["SELECT", "UPDATE", "UPDATE", "INSERT", "INSERT", "INSERT"])
+        self.assertEqual(
+            await self._positions("AAPL"),
+            [
+                (1.0, PositionStatus.OPEN, 10.0),
+                (1.0, PositionStatus.CLOSED, 10.0),
+                (3.0, PositionStatus.OPEN, 30.0),
+            ],
+        )
+        self.assertEqual(
+            await self._positions("MSFT"),
+            [(5.0, PositionStatus.OPEN, 50.0), (1.0, PositionStatus.CLOSED, 10.0)],
+        )
+        self.assertEqual(await self._positions("NVDA"), [(2.0, PositionStatus.OPEN, 100.0)])
+        async with self._session() as session:
+            trades = (await session.execute(select(Trade))).scalars().all()
+            rollup = (await session.execute(select(DailyPnlRollup))).scalars().all()
+        self.assertEqual([(t.ticker, t.side, t.filled_qty) for t in trades], [("NVDA", TradeSide.BUY, 2.0)])
+        self.assertEqual([(row.market, row.buy_count, row.buy_amount) for row in rollup], [("US", 1, 100.0)])
+
+        self.assertEqual([call.args[0] for call in self.sync_ledger.await_args_list], ["AAPL", "MSFT", "NVDA"])
+
+    async def test_rows_changed_after_planning_are_left_for_next_run(self):
+        plan = await kis_reconcile.build_kis_reconcile_plan(self.kis)
+        await self._seed(_position("AAPL", 1.0, 0))
+
+        applied = await kis_reconcile.apply_kis_reconcile_plan(plan)
+
+        self.assertEqual([item.symbol for item in applied], ["MSFT", "NVDA"])
+        self.assertEqual([symbol for symbol, _ in plan.errors], ["AAPL"])
+        self.assertEqual(len(await self._positions("AAPL")), 3)
+        self.assertTrue(all(status == PositionStatus.OPEN for _, status, _ in await self._positions("AAPL")))
+
+    async def test_unreadable_exchange_never_closes_positions(self):
+        async def failing_nasdaq(exchange_code=None, currency_code=None, max_age_seconds=None):
+            if exchange_code == "NASD":
+                raise RuntimeError("rate limited")
+            return []
+
+        self.kis.get_overseas_balance = AsyncMock(side_effect=failing_nasdaq)
+
+        plan = await kis_reconcile.reconcile_kis_holdings(self.kis)
+
+        self.assertEqual(plan.unreadable, ["AAPL", "MSFT", "TSLA"])
+        self.assertEqual(plan.changes, [])
+        self.assertEqual(await self._positions("MSFT"), [(5.0, PositionStatus.OPEN, 50.0), (1.0, PositionStatus.OPEN, 10.0)])
+
+
+if __name__ == "__main__":
+    unittest.main()
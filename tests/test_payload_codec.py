@@ -0,0 +1,64 @@
+import unittest
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+from app import codec
+from app.codec import canonical_json, decode_order, encode_order, order_envelope_version
+from app.gateway.webhook import _build_webhook_idempotency
+from app.queue.order_queue import BUY_QUEUE, _deserialize_order
+
+
+class PayloadCodecTests(unittest.TestCase):
+    def test_order_envelope_is_compact_and_versioned(self):
+        text = encode_order({"action": "BUY", "ticker": "005930"})
+
+        self.assertEqual(text, '{"v":1,"action":"BUY","ticker":"005930"}')
+        self.assertEqual(order_envelope_version(decode_order(text)), 1)
+
+    def test_legacy_payload_decodes_as_version_zero(self):
+        order = decode_order('{"action": "SELL", "ticker": "AAPL"}')
+
+        self.assertEqual(order_envelope_version(order), 0)
+        self.assertEqual(encode_order(order), '{"v":1,"action":"SELL","ticker":"AAPL"}')
+
+    def test_non_object_payload_is_rejected(self):
+        with self.assertRaises(ValueError):
+            decode_order("[1, 2]")
+        with self.assertRaises(codec.JSONDecodeError):
+            decode_order("{not json")
+
+    def test_stdlib_fallback_produces_identical_canonical_text(self):
+        payload = {"ticker": "KRX:005930", "action": "BUY", "note": "삼성전자", "qty": 3, "flag": True}
+        fast = (canonical_json(payload), encode_order(payload))
+        with patch.object(codec, "orjson", None):
+            fallback = (canonical_json(payload), encode_order(payload))
+
+        self.assertEqual(fast, fallback)
+
+    def test_idempotency_key_ignores_field_order_and_masks_secret(self):
+        now = datetime(2026, 5, 26, 1, 2, 3, tzinfo=timezone.utc)
+        common = dict(action="BUY", trade_symbol="AAPL", price_float=1.0, alert_id="a1", alert_time="t", now_utc=now)
+
+        fingerprint1, key1, _, _ = _build_webhook_idempotency(
+            payload={"secret": "s", "action": "BUY", "ticker": "AAPL", "alert_id": "a1"}, **common
+        )
+        fingerprint2, key2, _, _ = _build_webhook_idempotency(
+            payload={"alert_id": "a1", "ticker": "AAPL", "action": "BUY", "secret": "s"}, **common
+        )
+
+        self.assertEqual(key1, key2)
+        self.assertEqual(fingerprint1, fingerprint2)
+        self.assertIn('"secret":"***"', fingerprint1)
+
+    def test_queue_deserializer_keeps_raw_payload_for_ack(self):
+        raw = encode_order({"action": "BUY", "ticker": "AAPL"})
+
+        order = _deserialize_order(raw, BUY_QUEUE)
+
+        self.assertEqual(order["_raw_queue_payload"], raw)
+        self.assertEqual(order["v"], 1)
+        self.assertIsNone(_deserialize_order("[]", BUY_QUEUE))
+
+
+if __name__ == "__main__":
+    unittest.main()
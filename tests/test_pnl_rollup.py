@@ -0,0 +1,162 @@
+import unittest
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timedelta, timezone
+from unittest.mock import AsyncMock, patch
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.models.base import Base
+from app.models.daily_pnl_rollup import DailyPnlRollup
+from app.models.trade import Trade, TradeSide, TradeStatus
+from app.notifications import telegram_bot
+from app.risk import pnl_rollup
+
+# 2026-05-26 11:00 ET
+NOW = datetime(2026, 5, 26, 15, 0, tzinfo=timezone.utc)
+TODAY = date(2026, 5, 26)
+
+
+def _trade(ticker, side, status=TradeStatus.FILLED, hours_ago=0.0, **kwargs):
+    filled = NOW - timedelta(hours=hours_ago)
+    return Trade(
+        ticker=ticker,
+        side=side,
+        status=status,
+        created_at=filled - timedelta(seconds=5),
+        filled_at=filled,
+        **kwargs,
+    )
+
+
+class DailyPnlRollupTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.engine = create_async_engine("sqlite+aiosqlite://")
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        self.sessionmaker = async_sessionmaker(self.engine, expire_on_commit=False)
+
+    async def asyncTearDown(self):
+        await self.engine.dispose()
+
+    @asynccontextmanager
+    async def _session(self):
+        async with self.sessionmaker() as session:
+            yield session
+            await session.commit()
+
+    async def _add(self, *trades):
+        async with self._session() as session:
+            for trade in trades:
+                session.add(trade)
+
+    async def _rollup_totals(self) -> dict:
+        return {key: (row.buy_count, row.sell_count, row.realized_pnl) for key, row in (await self._rollup()).items()}
+
+    async def _rollup(self) -> dict:
+        async with self._session() as session:
+            rows = (await session.execute(select(DailyPnlRollup))).scalars().all()
+        return {(row.trade_date, row.market, row.currency): row for row in rows}
+
+    def test_market_buckets(self):
+        self.assertEqual(pnl_rollup.rollup_market("005930"), ("KRX", "KRW"))
+        self.assertEqual(pnl_rollup.rollup_market("AAPL"), ("US", "USD"))
+        self.assertEqual(pnl_rollup.rollup_market("HKEX:00700"), ("ASIA", "HKD"))
+        # 01:00 UTC is still the previous ET day.
+        self.assertEqual(pnl_rollup.trade_et_date(datetime(2026, 5, 27, 1, 0)), TODAY)
+
+    async def test_fills_are_folded_in_on_flush(self):
+        await self._add(
+            _trade("AAPL", TradeSide.BUY, total_fill_amount_usd=100.0, hours_ago=3),
+            _trade("005930", TradeSide.BUY, total_fill_amount_usd=70000.0),
+            _trade("AAPL", TradeSide.BUY, status=TradeStatus.FAILED, total_fill_amount_usd=999.0),
+        )
+        await self._add(
+            _trade(
+                "AAPL",
+                TradeSide.SELL,
+                total_fill_amount_usd=110.0,
+                total_pnl_usd=10.0,
+                commission=1.0,
+                ib_order_id=-5,
+            ),
+            _trade("AAPL", TradeSide.BUY, status=TradeStatus.PARTIAL, total_fill_amount_usd=50.0, hours_ago=5),
+        )
+
+        rollup = await self._rollup()
+        us = rollup[(TODAY, "US", "USD")]
+        self.assertEqual((us.buy_count, us.buy_amount), (1, 100.0))
+        self.assertEqual((us.sell_count, us.sell_amount, us.realized_pnl, us.commission), (1, 110.0, 10.0, 1.0))
+        self.assertEqual(us.kis_sell_count, 1)
+        # PARTIAL buys only move the investment start time.
+        self.assertEqual(us.first_buy_at.replace(tzinfo=timezone.utc), NOW - timedelta(hours=5))
+        self.assertEqual(rollup[(TODAY, "KRX", "KRW")].buy_amount, 70000.0)
+
+    async def test_rebuild_matches_incremental_rollup(self):
+        await self._add(
+            _trade("AAPL", TradeSide.BUY, total_fill_amount_usd=100.0, hours_ago=30),
+            _trade("AAPL", TradeSide.SELL, total_fill_amount_usd=120.0, total_pnl_usd=20.0, hours_ago=1),
+            _trade("069500", TradeSide.SELL, total_fill_amount_usd=9000.0, total_pnl_usd=-500.0),
+        )
+        incremental = await self._rollup_totals()
+
+        async with self._session() as session:
+            await session.execute(DailyPnlRollup.__table__.delete())
+        async with self._session() as session:
+            result = await pnl_rollup.rebuild_daily_pnl_rollup(session)
+        rebuilt = await self._rollup_totals()
+
+        self.assertEqual(rebuilt, incremental)
+        self.assertEqual((result["written"], result["dates"], result["trades"]), (3, 2, 3))
+
+        # A ranged rebuild replaces only its own dates.
+        async with self._session() as session:
+            await pnl_rollup.rebuild_daily_pnl_rollup(session, start_date=TODAY, end_date=TODAY)
+        self.assertEqual(await self._rollup_totals(), incremental)
+
+    async def test_reports_read_the_rollup(self):
+        await self._add(
+            _trade("AAPL", TradeSide.BUY, total_fill_amount_usd=100.0, hours_ago=48),
+            _trade("AAPL", TradeSide.SELL, total_fill_amount_usd=130.0, total_pnl_usd=30.0, commission=2.0),
+            _trade("005930", TradeSide.SELL, total_fill_amount_usd=80000.0, total_pnl_usd=5.0, hours_ago=24),
+        )
+        et_now = NOW.astimezone(telegram_bot.get_et_now().tzinfo)
+        with (
+            patch.object(telegram_bot, "get_session", self._session),
+            patch("app.database.connection.get_session", self._session),
+            patch.object(telegram_bot, "get_et_now", return_value=et_now),
+        ):
+            series = await telegram_bot._fetch_recent_daily_pnl_series(days=3)
+            start_label = await telegram_bot._fetch_investment_start_date_label()
+
+        self.assertEqual([item["label"] for item in series], ["05-24", "05-25", "05-26"])
+        self.assertEqual([item["net_pnl_usd"] for item in series], [0.0, 5.0, 28.0])
+        self.assertEqual(start_label, "2026-05-24")
+
+    async def test_weekly_pnl_sums_rollup_rows(self):
+        await self._add(
+            _trade("AAPL", TradeSide.BUY, total_fill_amount_usd=100.0, hours_ago=24),
+            _trade("AAPL", TradeSide.SELL, total_pnl_usd=30.0, commission=2.0, ib_order_id=-1),
+            # Previous week (Sunday ET).
+            _trade("MSFT", TradeSide.SELL, total_pnl_usd=99.0, hours_ago=48),
+        )
+        update = AsyncMock()
+        week_start = datetime(2026, 5, 25, 4, 0, tzinfo=timezone.utc)
+        week_bounds = (week_start, week_start + timedelta(days=7))
+        with (
+            patch.object(telegram_bot, "is_authorized", return_value=True),
+            patch("app.database.connection.get_session", self._session),
+            patch.object(telegram_bot, "get_et_week_bounds_utc", return_value=week_bounds),
+            patch.object(telegram_bot, "_get_display_usdkrw_rate", AsyncMock(return_value=(1400.0, "test"))),
+        ):
+            await telegram_bot.cmd_pnl_week(update, None)
+
+        message = update.message.reply_text.await_args.args[0]
+        self.assertIn("매수: 1\n매도: 1\n", message)
+        self.assertIn("+$30.00", message)
+        # Commission was recorded, so no "KIS commission missing" note.
+        self.assertNotIn("KIS 체결 수수료", message)
+
+
+if __name__ == "__main__":
+    unittest.main()
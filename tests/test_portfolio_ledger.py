@@ -0,0 +1,231 @@
+import asyncio
+import json
+import unittest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+from app.broker import order_executor
+from app.risk import portfolio_ledger as ledger_module
+from app.risk import risk_manager
+from app.risk.portfolio_ledger import PortfolioLedger, TickerExposure
+
+
+class _RowsSession:
+    def __init__(self, rows):
+        self.rows = rows
+        self.statements = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, statement):
+        self.statements.append(statement)
+        return SimpleNamespace(all=lambda: list(self.rows))
+
+
+class _FakePubSub:
+    def __init__(self, messages):
+        self.messages = messages
+        self.channels = []
+        self.closed = False
+
+    async def subscribe(self, channel):
+        self.channels.append(channel)
+
+    async def listen(self):
+        for message in self.messages:
+            yield message
+        await asyncio.Event().wait()
+
+    async def aclose(self):
+        self.closed = True
+
+
+class PortfolioLedgerTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.ledger = PortfolioLedger()
+        for patcher in (
+            patch.object(ledger_module, "portfolio_ledger", self.ledger),
+            patch.object(ledger_module, "publish_open_tickers", AsyncMock()),
+            patch.object(ledger_module, "_read_open_tickers_version", AsyncMock(return_value="0")),
+            patch.object(ledger_module, "_mirror_open_ticker", AsyncMock()),
+            patch.object(ledger_module, "publish_ticker_changed", AsyncMock()),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_updates_are_ignored_until_loaded(self):
+        self.ledger.record_open("AAPL", 1.0, 100.0)
+        self.assertFalse(self.ledger.loaded)
+        self.assertEqual(self.ledger.open_positions(), 0)
+
+    def test_totals_split_usd_and_domestic(self):
+        self.ledger.replace(
+            {
+                "AAPL": TickerExposure(count=2, qty=3.0, invested=300.0),
+                "KRX:069500": TickerExposure(count=1, qty=10.0, invested=500000.0),
+            }
+        )
+        self.ledger.record_open("MSFT", 1.0, 150.0)
+
+        self.assertEqual(self.ledger.open_positions(), 4)
+        self.assertEqual(self.ledger.unique_tickers(), 3)
+        self.assertEqual(self.ledger.ticker_count("AAPL"), 2)
+        self.assertAlmostEqual(self.ledger.total_invested_usd(), 450.0)
+        self.assertAlmostEqual(self.ledger.total_invested_krw(), 500000.0)
+
+    async def test_sync_ticker_drops_fully_closed_symbol(self):
+        self.ledger.replace({"AAPL": TickerExposure(count=1, qty=1.0, invested=100.0)})
+        with patch.object(ledger_module, "_read_open_exposures", AsyncMock(return_value={})):
+            await ledger_module.sync_ledger_ticker("AAPL")
+
+        self.assertTrue(self.ledger.loaded)
+        self.assertEqual(self.ledger.ticker_count("AAPL"), 0)
+
+    async def test_sync_ticker_ignores_updates_to_other_tickers(self):
+        self.ledger.replace({"AAPL": TickerExposure(count=2, qty=2.0, invested=200.0)})
+        reads = []
+
+        async def read_while_other_buy_commits(symbol=None):
+            reads.append(symbol)
+            self.ledger.record_open("MSFT", 1.0, 50.0)
+            return {"AAPL": TickerExposure(count=1, qty=1.0, invested=100.0)}
+
+        with patch.object(ledger_module, "_read_open_exposures", read_while_other_buy_commits):
+            await ledger_module.sync_ledger_ticker("AAPL")
+
+        self.assertEqual(reads, ["AAPL"])
+        self.assertTrue(self.ledger.loaded)
+        self.assertEqual(self.ledger.ticker_count("AAPL"), 1)
+        self.assertEqual(self.ledger.ticker_count("MSFT"), 1)
+        ledger_module.publish_ticker_changed.assert_awaited_once_with("AAPL")
+
+    async def test_sync_ticker_rereads_when_same_ticker_changed(self):
+        self.ledger.replace({"AAPL": TickerExposure(count=1, qty=1.0, invested=100.0)})
+        reads = []
+
+        async def read(symbol=None):
+            reads.append(symbol)
+            if len(reads) == 1:
+                self.ledger.record_open("AAPL", 1.0, 100.0)
+                return {"AAPL": TickerExposure(count=1, qty=1.0, invested=100.0)}
+            return {"AAPL": TickerExposure(count=2, qty=2.0, invested=200.0)}
+
+        with patch.object(ledger_module, "_read_open_exposures", read):
+            await ledger_module.sync_ledger_ticker("AAPL")
+
+        self.assertEqual(reads, ["AAPL", "AAPL"])
+        self.assertTrue(self.ledger.loaded)
+        self.assertEqual(self.ledger.ticker_count("AAPL"), 2)
+
+    async def test_listener_resyncs_tickers_changed_by_other_processes(self):
+        self.ledger.replace({"AAPL": TickerExposure(count=1, qty=1.0, invested=100.0)})
+
+        def change(ticker, origin):
+            return {"type": "message", "data": json.dumps({"ticker": ticker, "origin": origin})}
+
+        pubsub = _FakePubSub(
+            [
+                {"type": "subscribe", "data": 1},
+                change("MSFT", ledger_module._PROCESS_ORIGIN),
+                change("AAPL", "scheduler"),
+            ]
+        )
+        redis_client = SimpleNamespace(pubsub=lambda: pubsub)
+        synced = asyncio.Event()
+        reads = []
+
+        async def read(symbol=None):
+            reads.append(symbol)
+            if symbol is None:
+                return {"AAPL": TickerExposure(count=1, qty=1.0, invested=100.0)}
+            synced.set()
+            return {}
+
+        with patch.object(ledger_module, "get_redis", AsyncMock(return_value=redis_client)), patch.object(
+            ledger_module, "_read_open_exposures", read
+        ):
+            listener = asyncio.create_task(ledger_module.ledger_change_listener())
+            await asyncio.wait_for(synced.wait(), 1.0)
+            listener.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await listener
+
+        self.assertEqual(pubsub.channels, [ledger_module.TICKER_CHANGED_CHANNEL])
+        # Full verify on subscribe, then only the other process's ticker.
+        self.assertEqual(reads, [None, "AAPL"])
+        self.assertEqual(self.ledger.ticker_count("AAPL"), 0)
+        self.assertTrue(self.ledger.loaded)
+        self.assertTrue(pubsub.closed)
+
+    async def test_verify_replaces_drifted_ledger(self):
+        self.ledger.replace({"AAPL": TickerExposure(count=1, qty=1.0, invested=100.0)})
+        db = {
+            "AAPL": TickerExposure(count=2, qty=2.0, invested=200.0),
+            "MSFT": TickerExposure(count=1, qty=1.0, invested=50.0),
+        }
+        with patch.object(ledger_module, "_read_open_exposures", AsyncMock(return_value=db)):
+            drifted = await ledger_module.verify_portfolio_ledger()
+
+        self.assertEqual(drifted, ["AAPL", "MSFT"])
+        self.assertEqual(self.ledger.open_positions(), 3)
+
+    async def test_verify_does_not_overwrite_update_that_raced_the_read(self):
+        self.ledger.replace({})
+
+        async def read_while_buy_commits(symbol=None):
+            self.ledger.record_open("AAPL", 1.0, 100.0)
+            return {}
+
+        with patch.object(ledger_module, "_read_open_exposures", read_while_buy_commits):
+            drifted = await ledger_module.verify_portfolio_ledger()
+
+        self.assertEqual(drifted, [])
+        self.assertEqual(self.ledger.ticker_count("AAPL"), 1)
+
+    async def test_risk_snapshot_reads_positions_from_loaded_ledger(self):
+        self.ledger.replace({"AAPL": TickerExposure(count=2, qty=2.0, invested=200.0)})
+        session = _RowsSession([("buys", "AAPL", 1.0, 3.0)])
+        with patch.object(risk_manager, "get_portfolio_ledger", lambda: self.ledger), patch.object(
+            risk_manager, "get_session", lambda: session
+        ):
+            snapshot = await risk_manager.load_risk_snapshot("AAPL")
+
+        self.assertEqual(len(session.statements), 1)
+        self.assertNotIn("positions", str(session.statements[0]))
+        self.assertEqual(snapshot.ticker_open_positions, 2)
+        self.assertAlmostEqual(snapshot.total_invested_usd, 200.0)
+        self.assertEqual(snapshot.today_buys, 3)
+
+    async def test_risk_snapshot_bypasses_ledger_behind_buy_generation(self):
+        self.ledger.replace({"AAPL": TickerExposure(count=2, qty=2.0, invested=200.0)})
+        self.ledger.note_generation(4)
+        session = _RowsSession([("position", "AAPL", 3.0, 300.0), ("buys", "AAPL", 0.0, 3.0)])
+        with patch.object(risk_manager, "get_portfolio_ledger", lambda: self.ledger), patch.object(
+            risk_manager, "get_session", lambda: session
+        ):
+            # Another worker's BUY (generation 5) is committed but not yet applied here.
+            snapshot = await risk_manager.load_risk_snapshot("AAPL", generation=5)
+
+        self.assertIn("positions", str(session.statements[0]))
+        self.assertEqual(snapshot.ticker_open_positions, 3)
+
+    async def test_reconcile_syncs_ledger_only_when_rows_changed(self):
+        sync = AsyncMock()
+
+        @order_executor._syncs_portfolio_ledger
+        async def reconcile(kis, symbol, alert_id=None):
+            return {"ok": True, "reconciled": symbol == "AAPL"}
+
+        with patch.object(order_executor, "sync_ledger_ticker", sync):
+            await reconcile(None, "MSFT")
+            await reconcile(None, "AAPL")
+
+        sync.assert_awaited_once_with("AAPL")
+
+
+if __name__ == "__main__":
+    unittest.main()
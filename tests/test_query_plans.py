@@ -0,0 +1,206 @@
+import importlib.util
+import random
+import unittest
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from sqlalchemy import create_engine, event, func, select
+from sqlalchemy.orm import Session
+
+from app.models import AlertLog, Position, Trade
+from app.models.base import Base
+from app.models.position import POSITION_IS_OPEN, POSITION_IS_SYNTHETIC, PositionStatus
+from app.models.trade import TradeSide, TradeStatus, trade_time_window
+from app.risk.risk_manager import _risk_snapshot_statement
+
+MIGRATIONS_DIR = Path(__file__).resolve().parents[1] / "app" / "database" / "migrations" / "versions"
+NOW = datetime(2026, 5, 26, 15, 0, tzinfo=timezone.utc)
+TICKERS = [f"T{idx:03d}" for idx in range(60)]
+
+
+class _Captured(Exception):
+    pass
+
+
+def _explain(conn, statement) -> str:
+    """EXPLAIN QUERY PLAN for a statement exactly as SQLAlchemy would send it."""
+    captured = {}
+
+    def capture(_conn, _cursor, sql, parameters, _context, _executemany):
+        captured["sql"], captured["parameters"] = sql, parameters
+        raise _Captured
+
+    event.listen(conn, "before_cursor_execute", capture)
+    try:
+        conn.execute(statement)
+    except Exception:
+        pass
+    finally:
+        event.remove(conn, "before_cursor_execute", capture)
+    cursor = conn.connection.dbapi_connection.cursor()
+    cursor.execute("EXPLAIN QUERY PLAN " + captured["sql"], captured["parameters"])
+    return "\n".join(row[-1] for row in cursor.fetchall())
+
+
+def _seed(session: Session) -> None:
+    rng = random.Random(11)
+    for idx in range(3000):
+        created = NOW - timedelta(hours=rng.uniform(0, 24 * 60))
+        filled = None if idx % 5 == 0 else created + timedelta(seconds=rng.uniform(1, 7200))
+        session.add(
+            Trade(
+                ticker=rng.choice(TICKERS),
+                side=rng.choice((TradeSide.BUY, TradeSide.SELL)),
+                status=TradeStatus.FILLED if rng.random() < 0.8 else TradeStatus.FAILED,
+                created_at=created,
+                filled_at=filled,
+            )
+        )
+    for _ in range(4000):
+        skipped = rng.random() < 0.1
+        queued = not skipped
+        session.add(
+            AlertLog(
+                ticker=rng.choice(TICKERS),
+                action=rng.choice(("BUY", "SELL")),
+                received_at=NOW - timedelta(hours=rng.uniform(0, 24 * 60)),
+                skipped=skipped,
+                queued=queued,
+                processed=queued and rng.random() < 0.98,
+            )
+        )
+    for idx in range(1500):
+        is_open = rng.random() < 0.05
+        session.add(
+            Position(
+                ticker=rng.choice(TICKERS),
+                qty=1.0,
+                entry_price=10.0,
+                entry_amount_usd=10.0,
+                entry_time=NOW - timedelta(days=rng.uniform(0, 60)),
+                status=PositionStatus.OPEN if is_open else PositionStatus.CLOSED,
+                entry_order_id=-idx if idx % 2 else idx,
+            )
+        )
+
+
+class QueryPlanTests(unittest.TestCase):
+    """Hot queries must keep hitting the indexes added in migration 003."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.engine = create_engine("sqlite://")
+        Base.metadata.create_all(cls.engine)
+        with Session(cls.engine) as session:
+            _seed(session)
+            session.commit()
+        with cls.engine.connect() as conn:
+            conn.exec_driver_sql("ANALYZE")
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.engine.dispose()
+
+    def _plan(self, statement) -> str:
+        with self.engine.connect() as conn:
+            return _explain(conn, statement)
+
+    def test_risk_snapshot_trade_windows_use_effective_time_indexes(self):
+        plan = self._plan(_risk_snapshot_statement("T001", include_positions=False))
+
+        self.assertIn("effective_time", plan)
+        self.assertIn("<expr>>? AND <expr><?", plan)
+        self.assertNotIn("SCAN trades", plan)
+
+    def test_ticker_trade_window_uses_ticker_index(self):
+        statement = select(func.count(Trade.id)).where(
+            Trade.ticker == "T001",
+            Trade.side == TradeSide.SELL,
+            Trade.status == TradeStatus.FILLED,
+            trade_time_window(NOW - timedelta(days=7), NOW),
+        )
+
+        self.assertIn(
+            "USING INDEX ix_trades_ticker_side_status_effective_time "
+            "(ticker=? AND side=? AND status=? AND <expr>>? AND <expr><?)",
+            self._plan(statement),
+        )
+
+    def test_time_window_prefers_filled_at_and_falls_back_to_created_at(self):
+        start, end = NOW - timedelta(days=3), NOW
+        with Session(self.engine) as session:
+            expected = sum(
+                1
+                for trade in session.scalars(select(Trade))
+                if start <= (trade.filled_at or trade.created_at).replace(tzinfo=timezone.utc) < end
+            )
+            counted = session.scalar(select(func.count(Trade.id)).where(trade_time_window(start, end)))
+
+        self.assertGreater(expected, 0)
+        self.assertEqual(counted, expected)
+
+    def test_failed_sell_lookup_uses_partial_skipped_index(self):
+        statement = (
+            select(AlertLog)
+            .where(
+                AlertLog.ticker == "T001",
+                AlertLog.action == "SELL",
+                AlertLog.received_at >= NOW - timedelta(days=10),
+                AlertLog.skipped.is_(True),
+            )
+            .order_by(AlertLog.received_at.desc())
+            .limit(1)
+        )
+
+        self.assertIn("USING INDEX ix_alert_logs_ticker_action_received_skipped", self._plan(statement))
+
+    def test_daily_skip_counts_use_partial_action_index(self):
+        statement = (
+            select(AlertLog.action, func.count(AlertLog.id))
+            .where(
+                AlertLog.skipped.is_(True),
+                AlertLog.received_at >= NOW - timedelta(days=1),
+                AlertLog.received_at < NOW,
+            )
+            .group_by(AlertLog.action)
+        )
+
+        self.assertIn("ix_alert_logs_action_received_skipped", self._plan(statement))
+
+    def test_unprocessed_sell_check_uses_partial_queue_index(self):
+        statement = select(func.count(AlertLog.id)).where(
+            AlertLog.ticker == "T001",
+            AlertLog.action == "SELL",
+            AlertLog.queued.is_(True),
+            AlertLog.processed.is_(False),
+        )
+
+        self.assertIn("USING INDEX ix_alert_logs_ticker_action_unprocessed", self._plan(statement))
+
+    def test_open_synthetic_positions_use_partial_index(self):
+        statement = (
+            select(Position)
+            .where(Position.ticker == "T001", POSITION_IS_OPEN, POSITION_IS_SYNTHETIC)
+            .order_by(Position.entry_time.asc(), Position.id.asc())
+        )
+
+        plan = self._plan(statement)
+        self.assertRegex(plan, r"USING INDEX ix_positions_open_(synthetic_)?ticker")
+        self.assertIn("'OPEN'", str(statement.compile(self.engine)))
+
+    def test_migration_creates_the_model_indexes(self):
+        spec = importlib.util.spec_from_file_location("migration_003", MIGRATIONS_DIR / "003_hot_query_indexes.py")
+        migration = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(migration)
+        model_indexes = {
+            index.name: index.table.name
+            for table in Base.metadata.tables.values()
+            for index in table.indexes
+        }
+
+        for name, table, _, _ in migration.INDEXES:
+            self.assertEqual(model_indexes.get(name), table, name)
+
+
+if __name__ == "__main__":
+    unittest.main()
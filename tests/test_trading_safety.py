@@ -0,0 +1,148 @@
+import unittest
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, patch
+
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app import trading_safety
+from app.broker.kis_client import KISClient
+from app.models.alert_log import AlertLog
+from app.models.base import Base
+from app.models.position import Position, PositionStatus
+
+NOW = datetime(2026, 10, 16, 15, 0, tzinfo=timezone.utc)
+
+
+def _position(ticker, days_ago, qty=1.0, status=PositionStatus.OPEN):
+    return Position(
+        ticker=ticker,
+        qty=qty,
+        entry_price=10.0,
+        entry_amount_usd=10.0 * qty,
+        entry_time=NOW - timedelta(days=days_ago),
+        status=status,
+        entry_order_id=-1,
+    )
+
+
+def _sell_alert(ticker, days_ago, **kwargs):
+    return AlertLog(ticker=ticker, action="SELL", received_at=NOW - timedelta(days=days_ago), **kwargs)
+
+
+class MissedSellDetectorTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.engine = create_async_engine("sqlite+aiosqlite://")
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        self.sessionmaker = async_sessionmaker(self.engine, expire_on_commit=False)
+        self.statements = []
+        event.listen(
+            self.engine.sync_engine,
+            "before_cursor_execute",
+            lambda _conn, _cursor, sql, *_: self.statements.append(sql),
+        )
+
+        self.kis = KISClient()
+        self.kis.get_overseas_balance = AsyncMock(side_effect=self._overseas_rows)
+        self.kis.get_domestic_balance = AsyncMock(
+            return_value=[{"pdno": "069500", "hldg_qty": "3", "ord_psbl_qty": "3", "pchs_avg_pric": "100"}]
+        )
+        for patcher in (
+            patch.object(trading_safety, "get_session", self._session),
+            patch.object(trading_safety, "get_kis_client", AsyncMock(return_value=self.kis)),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def asyncTearDown(self):
+        await self.engine.dispose()
+
+    @asynccontextmanager
+    async def _session(self):
+        async with self.sessionmaker() as session:
+            yield session
+            await session.commit()
+
+    async def _overseas_rows(self, exchange_code=None, currency_code=None, max_age_seconds=None):
+        holdings = {"NASD": [{"ovrs_pdno": "AAPL", "ovrs_cblc_qty": "2", "ord_psbl_qty": "2"}]}
+        return holdings.get(exchange_code, [])
+
+    async def _seed(self, *rows):
+        async with self._session() as session:
+            session.add_all(rows)
+
+    async def test_latest_skip_after_entry_decides_each_ticker(self):
+        await self._seed(
+            # Missed: failed SELL after entry, still held at KIS.
+            _position("AAPL", 10),
+            _position("AAPL", 3),
+            _sell_alert("AAPL", 12, skipped=True, skip_reason="before_entry"),
+            _sell_alert("AAPL", 5, skipped=True, skip_reason="kis_error"),
+            _sell_alert("AAPL", 4, skipped=True, skip_reason="kis_timeout"),
+            # Latest skip says there was nothing to sell.
+            _position("MSFT", 10),
+            _sell_alert("MSFT", 6, skipped=True, skip_reason="kis_error"),
+            _sell_alert("MSFT", 2, skipped=True, skip_reason="no_open_position"),
+            # A repair SELL is already queued.
+            _position("NVDA", 10),
+            _sell_alert("NVDA", 2, skipped=True, skip_reason="kis_error"),
+            _sell_alert("NVDA", 1, queued=True, processed=False),
+            # Only skipped before the entry.
+            _position("TSLA", 2),
+            _sell_alert("TSLA", 3, skipped=True, skip_reason="kis_error"),
+            # Missed in the DB but no longer held at KIS.
+            _position("AMD", 10),
+            _sell_alert("AMD", 2, skipped=True, skip_reason="kis_error"),
+            # Domestic symbol answered from the domestic snapshot.
+            _position("069500", 10),
+            _sell_alert("069500", 1, skipped=True, skip_reason="kis_error"),
+            # Closed positions are ignored.
+            _position("META", 10, status=PositionStatus.CLOSED),
+            _sell_alert("META", 1, skipped=True, skip_reason="kis_error"),
+        )
+        self.statements.clear()
+
+        candidates = await trading_safety.find_missed_sell_candidates()
+
+        self.assertEqual([item["ticker"] for item in candidates], ["069500", "AAPL"])
+        aapl = candidates[1]
+        self.assertEqual((aapl["db_qty"], aapl["kis_qty"], aapl["reason"]), (2.0, 2.0, "kis_timeout"))
+        self.assertEqual(aapl["earliest_entry"].replace(tzinfo=timezone.utc), NOW - timedelta(days=10))
+        self.assertEqual(candidates[0]["kis_qty"], 3.0)
+        self.assertEqual(len(self.statements), 1)
+        # One read per overseas exchange plus the domestic account, not per ticker.
+        self.assertEqual(
+            self.kis.get_overseas_balance.await_count,
+            len(self.kis._order_exchange_candidates()),
+        )
+        self.kis.get_domestic_balance.assert_awaited_once()
+
+    async def test_unreadable_exchange_skips_instead_of_guessing(self):
+        await self._seed(_position("AAPL", 10), _sell_alert("AAPL", 2, skipped=True, skip_reason="kis_error"))
+
+        async def failing_nasdaq(exchange_code=None, currency_code=None, max_age_seconds=None):
+            if exchange_code == "NASD":
+                raise RuntimeError("rate limited")
+            return []
+
+        self.kis.get_overseas_balance = AsyncMock(side_effect=failing_nasdaq)
+
+        self.assertEqual(await trading_safety.find_missed_sell_candidates(), [])
+        self.kis.get_domestic_balance.assert_not_awaited()
+
+    def test_postgres_uses_a_lateral_probe(self):
+        sql = str(trading_safety._missed_sell_statement("postgresql").compile(dialect=postgresql.dialect()))
+
+        self.assertIn("JOIN LATERAL", sql)
+        self.assertIn("LIMIT", sql)
+        self.assertNotIn("row_number", sql)
+        # Partition-key bounds: the skipped probe by entry month, the queued count by open ticker.
+        self.assertIn("alert_logs.received_month >= CAST(date_trunc(", sql)
+        self.assertIn("alert_logs.ticker IN (SELECT open_positions.ticker", sql)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,191 @@
+import asyncio
+import unittest
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, patch
+
+from sqlalchemy.dialects import postgresql
+
+from app.gateway import alert_log_writer as writer_module
+from app.gateway import webhook
+from app.gateway.alert_log_writer import AlertLogBatchWriter
+from app.risk import portfolio_ledger as ledger_module
+from app.risk.portfolio_ledger import OPEN_TICKERS_KEY, OPEN_TICKERS_SYNCED_KEY, PortfolioLedger
+
+
+def _row(key, **overrides):
+    row = {
+        "ticker": "AAPL",
+        "action": "BUY",
+        "price": 1.0,
+        "alert_id": "",
+        "raw_payload": "{}",
+        "source_ip": "1.2.3.4",
+        "idempotency_key": key,
+        "received_at": datetime.now(timezone.utc),
+        "queued": True,
+        "processed": False,
+        "skipped": False,
+    }
+    row.update(overrides)
+    return row
+
+
+class _RecordingSession:
+    def __init__(self, sink, fail=False):
+        self.sink = sink
+        self.fail = fail
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, statement):
+        if self.fail:
+            raise RuntimeError("db down")
+        self.sink.append(statement)
+
+
+class AlertLogBatchWriterTests(unittest.IsolatedAsyncioTestCase):
+    async def test_burst_is_written_in_batches_with_one_session_each(self):
+        statements = []
+        writer = AlertLogBatchWriter(flush_interval_ms=60000, max_batch=100, max_buffer=1000)
+        with patch.object(writer_module, "get_session", lambda: _RecordingSession(statements)):
+            for idx in range(250):
+                writer.submit(_row(f"k{idx}"))
+            written = await writer.flush()
+            await writer.close()
+
+        self.assertEqual(written, 250)
+        self.assertEqual(len(statements), 3)
+        sql = str(statements[0].compile(dialect=postgresql.dialect()))
+        self.assertIn("ON CONFLICT (idempotency_key, received_month) DO UPDATE", sql)
+
+    async def test_duplicate_keys_in_one_batch_are_merged(self):
+        rows = writer_module._merge_rows([_row("k", raw_payload=""), _row("k", raw_payload="{\"a\":1}")])
+
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["raw_payload"], "{\"a\":1}")
+
+    async def test_failed_batch_is_kept_for_retry(self):
+        statements = []
+        writer = AlertLogBatchWriter(flush_interval_ms=60000, max_batch=10)
+        writer.submit(_row("k1"))
+        with patch.object(writer_module, "get_session", lambda: _RecordingSession(statements, fail=True)):
+            with self.assertRaises(RuntimeError):
+                await writer.flush()
+        self.assertEqual(writer.pending, 1)
+
+        with patch.object(writer_module, "get_session", lambda: _RecordingSession(statements)):
+            await writer.close()
+        self.assertEqual(writer.pending, 0)
+        self.assertEqual(len(statements), 1)
+
+    async def test_timer_flushes_small_batches(self):
+        statements = []
+        writer = AlertLogBatchWriter(flush_interval_ms=10, max_batch=100)
+        with patch.object(writer_module, "get_session", lambda: _RecordingSession(statements)):
+            writer.submit(_row("k1"))
+            await asyncio.sleep(0.05)
+            await writer.close()
+
+        self.assertEqual(len(statements), 1)
+
+    def test_overflow_drops_oldest_rows(self):
+        writer = AlertLogBatchWriter(flush_interval_ms=60000, max_batch=2, max_buffer=3)
+        writer._ensure_started = lambda: None
+        writer._wakeup = asyncio.Event()
+        for idx in range(5):
+            writer.submit(_row(f"k{idx}"))
+
+        self.assertEqual([row["idempotency_key"] for row in writer._buffer], ["k2", "k3", "k4"])
+        self.assertEqual(writer.dropped, 2)
+
+
+class OpenTickerSetTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        try:
+            import fakeredis.aioredis
+        except ImportError:
+            self.skipTest("fakeredis not installed (requirements-dev.txt)")
+        self.redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+        patcher = patch.object(ledger_module, "get_redis", AsyncMock(return_value=self.redis))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_lookup_is_unknown_until_published(self):
+        self.assertIsNone(await ledger_module.is_open_ticker("AAPL"))
+
+        await ledger_module.publish_open_tickers(["AAPL"])
+
+        self.assertTrue(await ledger_module.is_open_ticker("AAPL"))
+        self.assertFalse(await ledger_module.is_open_ticker("MSFT"))
+
+    async def test_webhook_check_skips_db_when_set_is_fresh(self):
+        await ledger_module.publish_open_tickers(["AAPL"])
+        session = AsyncMock(side_effect=AssertionError("DB should not be queried"))
+
+        with patch.object(webhook, "get_session", session):
+            self.assertTrue(await webhook._has_open_position("AAPL"))
+
+    async def test_sync_updates_set_without_loaded_ledger(self):
+        await ledger_module.publish_open_tickers(["AAPL"])
+        with patch.object(ledger_module, "portfolio_ledger", PortfolioLedger()), patch.object(
+            ledger_module, "_read_open_exposures", AsyncMock(return_value={})
+        ):
+            await ledger_module.sync_ledger_ticker("AAPL")
+
+        self.assertEqual(await self.redis.smembers(OPEN_TICKERS_KEY), set())
+        self.assertTrue(await self.redis.exists(OPEN_TICKERS_SYNCED_KEY))
+
+    async def test_buy_adds_ticker_immediately(self):
+        await ledger_module.publish_open_tickers([])
+
+        await ledger_module.record_position_open("MSFT", 1.0, 100.0)
+
+        self.assertTrue(await ledger_module.is_open_ticker("MSFT"))
+
+    async def test_stale_verify_publish_keeps_a_ticker_added_after_its_read(self):
+        await ledger_module.publish_open_tickers([])
+        ledger = PortfolioLedger()
+        ledger.replace({})
+
+        async def read_then_buy_elsewhere(symbol=None):
+            # Another process commits a BUY after this DB read.
+            await ledger_module._mirror_open_ticker("MSFT", True)
+            return {}
+
+        with patch.object(ledger_module, "portfolio_ledger", ledger), patch.object(
+            ledger_module, "_read_open_exposures", read_then_buy_elsewhere
+        ), patch.object(ledger_module, "_read_buy_generation", AsyncMock(return_value=0)):
+            await ledger_module.verify_portfolio_ledger()
+
+        self.assertTrue(await ledger_module.is_open_ticker("MSFT"))
+
+        # With no concurrent update the verify replaces the set.
+        with patch.object(ledger_module, "portfolio_ledger", ledger), patch.object(
+            ledger_module, "_read_open_exposures", AsyncMock(return_value={})
+        ), patch.object(ledger_module, "_read_buy_generation", AsyncMock(return_value=0)):
+            await ledger_module.verify_portfolio_ledger()
+
+        self.assertFalse(await ledger_module.is_open_ticker("MSFT"))
+
+
+class WebhookLoadHarnessTests(unittest.IsolatedAsyncioTestCase):
+    async def test_small_burst_dedupes_and_reports(self):
+        from scripts.bench_webhook_load import compare_to_baseline, run_benchmark
+
+        result = await run_benchmark(
+            bursts=2, alerts=40, concurrency=20, redis_latency_ms=0, db_latency_ms=0, burst_gap_ms=0
+        )
+
+        self.assertEqual(result["requests"], 80)
+        self.assertTrue(result["correctness"]["ok"], result["correctness"])
+        self.assertIn("duplicate", result["status_counts"])
+        self.assertLessEqual(result["db_pool"]["peak_in_use"], result["db_pool"]["capacity"])
+        self.assertEqual(compare_to_baseline(result, result, 25.0), [])
+
+
+if __name__ == "__main__":
+    unittest.main()